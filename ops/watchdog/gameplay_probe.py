@@ -0,0 +1,548 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Slime Arena Watchdog — синтетическая проба геймплея
+
+/health MetaServer-а проверяет только Postgres и Redis: зависший матчмейкер
+Colyseus или заклинившая ArenaRoom его проходят. Проба делает то же, что
+клиент игры:
+
+1. (опционально) guest-токен и joinToken у MetaServer — при JOIN_TOKEN_REQUIRED
+2. POST /matchmake/joinOrCreate/arena — резервирование места
+3. WebSocket /<processId>/<roomId>?sessionId=... — JOIN_ROOM и подтверждение
+4. ожидание полного состояния (ROOM_STATE) и первых патчей (ROOM_STATE_PATCH)
+5. LEAVE_ROOM
+
+Метрики: время резервирования, время до JOIN_ROOM, время до первого
+состояния (латентность входа) и интервалы между патчами (каденс,
+штатно ~50 мс). Последний результат и скользящие перцентили пишутся
+в PROBE_METRICS_FILE.
+
+Бот на секунду появляется в матче как игрок с именем PROBE_NAME.
+
+Проверка без сервера (локальный заменитель Colyseus из
+tests/watchdog/probe_test_server.py — только из клона репозитория):
+    python3 ops/watchdog/gameplay_probe.py --self-test
+
+Разовая проба:
+    python3 gameplay_probe.py --url http://127.0.0.1:2567
+
+Требования: Python 3.9+
+"""
+
+import argparse
+import base64
+import hashlib
+import json
+import logging
+import os
+import socket
+import struct
+import sys
+import time
+from collections import deque
+from pathlib import Path
+from typing import Callable, Deque, Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+import requests
+
+logger = logging.getLogger("watchdog")
+
+# ============================================================================
+# Конфигурация
+# ============================================================================
+
+# MatchServer (Colyseus): HTTP-матчмейкинг и WebSocket на одном порту
+PROBE_URL = os.getenv("PROBE_URL", "http://127.0.0.1:2567")
+
+# MetaServer для joinToken; пусто — входить без токена (dev-режим)
+PROBE_META_URL = os.getenv("PROBE_META_URL", "http://127.0.0.1:3000")
+
+PROBE_ROOM = os.getenv("PROBE_ROOM", "arena")
+PROBE_NAME = os.getenv("PROBE_NAME", "watchdog")
+
+# Интервал проб (сек) и таймаут одной пробы (сек)
+PROBE_INTERVAL = int(os.getenv("PROBE_INTERVAL", "60"))
+PROBE_TIMEOUT = float(os.getenv("PROBE_TIMEOUT", "10"))
+
+# Сколько патчей ждать для оценки каденса
+PROBE_PATCHES = int(os.getenv("PROBE_PATCHES", "10"))
+
+# Деградация: вход дольше / средний интервал патчей больше (мс)
+PROBE_JOIN_WARN_MS = float(os.getenv("PROBE_JOIN_WARN_MS", "2000"))
+PROBE_PATCH_WARN_MS = float(os.getenv("PROBE_PATCH_WARN_MS", "150"))
+
+# Проваленных (или деградировавших) проб подряд до тревоги
+PROBE_FAIL_THRESHOLD = int(os.getenv("PROBE_FAIL_THRESHOLD", "3"))
+
+# Реакция: alert — уведомление, restart — уведомление и рестарт
+PROBE_ACTION = os.getenv("PROBE_ACTION", "alert").lower()
+
+# Файл метрик (последняя проба и перцентили по последним PROBE_HISTORY)
+PROBE_METRICS_FILE = Path(os.getenv("PROBE_METRICS_FILE", str(Path(__file__).parent / "probe-metrics.json")))
+PROBE_HISTORY = 60
+
+# Коды протокола Colyseus 0.15
+JOIN_ROOM = 10
+ERROR = 11
+LEAVE_ROOM = 12
+ROOM_DATA = 13
+ROOM_STATE = 14
+ROOM_STATE_PATCH = 15
+
+# Опкоды WebSocket (RFC 6455)
+OP_CONTINUATION = 0x0
+OP_TEXT = 0x1
+OP_BINARY = 0x2
+OP_CLOSE = 0x8
+OP_PING = 0x9
+OP_PONG = 0xA
+
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+
+class ProbeError(Exception):
+    """Проба не прошла: этап и причина в тексте."""
+
+
+# ============================================================================
+# WebSocket-клиент (stdlib, только то, что нужно пробе)
+# ============================================================================
+
+
+class WebSocketClient:
+    """Минимальный WebSocket-клиент: бинарные сообщения, ping/pong, close."""
+
+    def __init__(self, url: str, timeout: float):
+        parts = urlsplit(url)
+        if parts.scheme not in ("ws", "wss"):
+            raise ProbeError(f"ws: неподдерживаемая схема {parts.scheme}")
+        port = parts.port or (443 if parts.scheme == "wss" else 80)
+        sock = socket.create_connection((parts.hostname, port), timeout=timeout)
+        if parts.scheme == "wss":
+            import ssl
+
+            sock = ssl.create_default_context().wrap_socket(sock, server_hostname=parts.hostname)
+        self.sock = sock
+        self._buffer = b""
+        path = parts.path or "/"
+        if parts.query:
+            path += "?" + parts.query
+        self._handshake(parts.netloc, path)
+
+    def _handshake(self, host: str, path: str) -> None:
+        key = base64.b64encode(os.urandom(16)).decode("ascii")
+        request = (
+            f"GET {path} HTTP/1.1\r\n"
+            f"Host: {host}\r\n"
+            "Upgrade: websocket\r\n"
+            "Connection: Upgrade\r\n"
+            f"Sec-WebSocket-Key: {key}\r\n"
+            "Sec-WebSocket-Version: 13\r\n\r\n"
+        )
+        self.sock.sendall(request.encode("ascii"))
+        while b"\r\n\r\n" not in self._buffer:
+            chunk = self.sock.recv(4096)
+            if not chunk:
+                raise ProbeError("ws: соединение закрыто во время handshake")
+            self._buffer += chunk
+        head, _, self._buffer = self._buffer.partition(b"\r\n\r\n")
+        lines = head.decode("latin-1").split("\r\n")
+        if " 101 " not in lines[0] + " ":
+            raise ProbeError(f"ws: handshake отклонён: {lines[0]}")
+        headers = {}
+        for line in lines[1:]:
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+        expected = base64.b64encode(hashlib.sha1((key + WS_GUID).encode("ascii")).digest()).decode("ascii")
+        if headers.get("sec-websocket-accept") != expected:
+            raise ProbeError("ws: неверный Sec-WebSocket-Accept")
+
+    def _read_exact(self, size: int) -> bytes:
+        while len(self._buffer) < size:
+            chunk = self.sock.recv(max(4096, size - len(self._buffer)))
+            if not chunk:
+                raise ProbeError("ws: соединение закрыто сервером")
+            self._buffer += chunk
+        data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+    def _send_frame(self, opcode: int, payload: bytes) -> None:
+        header = bytearray([0x80 | opcode])
+        length = len(payload)
+        if length < 126:
+            header.append(0x80 | length)
+        elif length < 1 << 16:
+            header.append(0x80 | 126)
+            header += struct.pack("!H", length)
+        else:
+            header.append(0x80 | 127)
+            header += struct.pack("!Q", length)
+        mask = os.urandom(4)
+        masked = bytes(byte ^ mask[i & 3] for i, byte in enumerate(payload))
+        self.sock.sendall(bytes(header) + mask + masked)
+
+    def send(self, payload: bytes) -> None:
+        self._send_frame(OP_BINARY, payload)
+
+    def recv(self, timeout: float) -> Tuple[int, bytes]:
+        """Следующее сообщение (opcode, payload); ping отвечается автоматически."""
+        self.sock.settimeout(max(timeout, 0.001))
+        opcode = None
+        message = b""
+        while True:
+            first, second = self._read_exact(2)
+            frame_opcode = first & 0x0F
+            length = second & 0x7F
+            if length == 126:
+                length = struct.unpack("!H", self._read_exact(2))[0]
+            elif length == 127:
+                length = struct.unpack("!Q", self._read_exact(8))[0]
+            mask = self._read_exact(4) if second & 0x80 else None
+            payload = self._read_exact(length)
+            if mask:
+                payload = bytes(byte ^ mask[i & 3] for i, byte in enumerate(payload))
+            if frame_opcode == OP_PING:
+                self._send_frame(OP_PONG, payload)
+                continue
+            if frame_opcode == OP_PONG:
+                continue
+            if frame_opcode == OP_CLOSE:
+                return OP_CLOSE, payload
+            if frame_opcode != OP_CONTINUATION:
+                opcode = frame_opcode
+            message += payload
+            if first & 0x80:
+                return opcode if opcode is not None else OP_BINARY, message
+
+    def close(self) -> None:
+        try:
+            self._send_frame(OP_CLOSE, struct.pack("!H", 1000))
+        except OSError:
+            pass
+        try:
+            self.sock.close()
+        except OSError:
+            pass
+
+
+# ============================================================================
+# Проба
+# ============================================================================
+
+
+def _ws_url(base_url: str) -> str:
+    parts = urlsplit(base_url)
+    scheme = "wss" if parts.scheme == "https" else "ws"
+    return f"{scheme}://{parts.netloc}{parts.path.rstrip('/')}"
+
+
+class GameplayProbe:
+    """Один вход бота в комнату с замером латентности и каденса патчей."""
+
+    def __init__(
+        self,
+        url: str = PROBE_URL,
+        meta_url: str = PROBE_META_URL,
+        room: str = PROBE_ROOM,
+        timeout: float = PROBE_TIMEOUT,
+        patches: int = PROBE_PATCHES,
+    ):
+        self.url = url.rstrip("/")
+        self.meta_url = meta_url.rstrip("/")
+        self.room = room
+        self.timeout = timeout
+        self.patches = patches
+        self._guest_token: Optional[str] = None
+
+    def _join_token(self) -> Optional[str]:
+        """joinToken гостя от MetaServer; None — входим без токена."""
+        if not self.meta_url:
+            return None
+        for _ in range(2):
+            if self._guest_token is None:
+                response = requests.post(f"{self.meta_url}/api/v1/auth/guest", json={}, timeout=self.timeout)
+                response.raise_for_status()
+                self._guest_token = response.json()["guestToken"]
+            response = requests.post(
+                f"{self.meta_url}/api/v1/auth/join-token",
+                json={"nickname": PROBE_NAME},
+                headers={"Authorization": f"Bearer {self._guest_token}"},
+                timeout=self.timeout,
+            )
+            if response.status_code == 401:
+                self._guest_token = None  # Истёк — берём новый
+                continue
+            response.raise_for_status()
+            return response.json()["joinToken"]
+        raise ProbeError("meta: joinToken не выдан (401)")
+
+    def run(self) -> Dict[str, float]:
+        """
+        Выполнить пробу.
+
+        Returns:
+            Метрики в мс: reserve_ms, join_ms, state_ms, patch_avg_ms, patch_max_ms, patches
+
+        Raises:
+            ProbeError: на любом этапе
+        """
+        deadline = time.monotonic() + self.timeout
+        try:
+            join_token = self._join_token()
+        except (requests.RequestException, KeyError, ValueError) as e:
+            raise ProbeError(f"meta: {e}") from e
+
+        options: Dict[str, object] = {"name": PROBE_NAME}
+        if join_token:
+            options["joinToken"] = join_token
+
+        started = time.monotonic()
+        try:
+            response = requests.post(
+                f"{self.url}/matchmake/joinOrCreate/{self.room}", json=options, timeout=self.timeout
+            )
+            reservation = response.json()
+        except (requests.RequestException, ValueError) as e:
+            raise ProbeError(f"matchmake: {e}") from e
+        if "room" not in reservation:
+            raise ProbeError(f"matchmake: {reservation.get('error') or response.status_code}")
+        reserve_ms = (time.monotonic() - started) * 1000
+
+        room = reservation["room"]
+        ws_url = f"{_ws_url(self.url)}/{room['processId']}/{room['roomId']}?sessionId={reservation['sessionId']}"
+        try:
+            ws = WebSocketClient(ws_url, timeout=max(deadline - time.monotonic(), 0.1))
+        except OSError as e:
+            raise ProbeError(f"ws: {e}") from e
+
+        metrics: Dict[str, float] = {"reserve_ms": round(reserve_ms, 1)}
+        try:
+            patch_times = []
+            while len(patch_times) < self.patches:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    stage = "state" if "state_ms" not in metrics else f"patches ({len(patch_times)}/{self.patches})"
+                    raise ProbeError(f"timeout: {stage}")
+                try:
+                    opcode, payload = ws.recv(remaining)
+                except socket.timeout:
+                    continue
+                if opcode == OP_CLOSE:
+                    code = struct.unpack("!H", payload[:2])[0] if len(payload) >= 2 else 0
+                    raise ProbeError(f"ws: сервер закрыл соединение ({code})")
+                if opcode != OP_BINARY or not payload:
+                    continue
+                now_ms = (time.monotonic() - started) * 1000
+                code = payload[0]
+                if code == JOIN_ROOM:
+                    metrics["join_ms"] = round(now_ms, 1)
+                    ws.send(bytes([JOIN_ROOM]))  # Подтверждение: после него сервер шлёт состояние
+                elif code == ROOM_STATE:
+                    metrics.setdefault("state_ms", round(now_ms, 1))
+                elif code == ROOM_STATE_PATCH:
+                    metrics.setdefault("state_ms", round(now_ms, 1))
+                    patch_times.append(now_ms)
+                elif code == ERROR:
+                    # [ERROR, код, строка] — для лога достаточно печатной части
+                    message = "".join(ch for ch in payload[1:].decode("utf-8", errors="replace") if ch.isprintable())
+                    raise ProbeError(f"room: {message.strip()}")
+            intervals = [b - a for a, b in zip(patch_times, patch_times[1:])]
+            if intervals:
+                metrics["patch_avg_ms"] = round(sum(intervals) / len(intervals), 1)
+                metrics["patch_max_ms"] = round(max(intervals), 1)
+            metrics["patches"] = len(patch_times)
+            ws.send(bytes([LEAVE_ROOM]))
+            # Дожидаемся close от сервера, чтобы бот гарантированно покинул комнату
+            try:
+                while time.monotonic() < deadline + 1.0:
+                    opcode, _ = ws.recv(max(deadline + 1.0 - time.monotonic(), 0.1))
+                    if opcode == OP_CLOSE:
+                        break
+            except (socket.timeout, ProbeError, OSError):
+                pass
+        except OSError as e:
+            raise ProbeError(f"ws: {e}") from e
+        finally:
+            ws.close()
+        return metrics
+
+
+# ============================================================================
+# Монитор
+# ============================================================================
+
+
+def _percentile(values, q: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class ProbeMonitor:
+    """
+    Периодические пробы, метрики и реакция на устойчивый отказ входа.
+
+    Args:
+        container: Имя Docker-контейнера (для уведомлений)
+        notify: Отправка уведомления (send_telegram_message)
+        restart: Рестарт контейнера (docker_restart) для PROBE_ACTION=restart
+    """
+
+    def __init__(
+        self,
+        container: str,
+        notify: Optional[Callable[[str], bool]] = None,
+        restart: Optional[Callable[[], Tuple[bool, str]]] = None,
+        probe: Optional[GameplayProbe] = None,
+        action: str = PROBE_ACTION,
+        metrics_file: Path = PROBE_METRICS_FILE,
+    ):
+        self.container = container
+        self.notify = notify
+        self.restart = restart
+        self.probe = probe or GameplayProbe()
+        self.action = action
+        self.metrics_file = metrics_file
+        self.history: Deque[Dict[str, float]] = deque(maxlen=PROBE_HISTORY)
+        self.fail_count = 0
+        self.last_error = ""
+        self.last_check_time = 0.0
+        self.paused_until = 0.0
+
+    def should_check(self) -> bool:
+        now = time.time()
+        return now >= self.paused_until and now - self.last_check_time >= PROBE_INTERVAL
+
+    def pause(self, seconds: float) -> None:
+        """Не проверять (например, после рестарта контейнера)."""
+        self.paused_until = time.time() + seconds
+
+    def check(self) -> bool:
+        """Выполнить пробу и записать метрики. True — вход здоров."""
+        self.last_check_time = time.time()
+        try:
+            metrics = self.probe.run()
+        except ProbeError as e:
+            self.fail_count += 1
+            self.last_error = str(e)
+            logger.warning(f"Gameplay probe: {e}")
+            self._save({"ok": False, "error": str(e)})
+            return False
+
+        self.history.append(metrics)
+        degraded = []
+        if metrics.get("state_ms", 0) > PROBE_JOIN_WARN_MS:
+            degraded.append(f"вход {metrics['state_ms']:.0f} мс > {PROBE_JOIN_WARN_MS:.0f}")
+        if metrics.get("patch_avg_ms", 0) > PROBE_PATCH_WARN_MS:
+            degraded.append(f"патчи раз в {metrics['patch_avg_ms']:.0f} мс > {PROBE_PATCH_WARN_MS:.0f}")
+
+        logger.info(
+            f"Gameplay probe: вход {metrics.get('state_ms', 0):.0f} мс "
+            f"(резерв {metrics['reserve_ms']:.0f} мс), патчи {metrics.get('patch_avg_ms', 0):.0f}/"
+            f"{metrics.get('patch_max_ms', 0):.0f} мс (ср/макс)"
+        )
+        if degraded:
+            self.fail_count += 1
+            self.last_error = "; ".join(degraded)
+            self._save({"ok": False, **metrics, "degraded": degraded})
+            return False
+        if self.fail_count > 0:
+            logger.info(f"Gameplay probe: вход восстановился после {self.fail_count} неудач")
+        self.fail_count = 0
+        self._save({"ok": True, **metrics})
+        return True
+
+    def summary(self) -> Dict[str, Optional[float]]:
+        """Перцентили по последним пробам."""
+        result: Dict[str, Optional[float]] = {"samples": len(self.history)}
+        for key in ("state_ms", "patch_avg_ms", "patch_max_ms"):
+            values = [metrics[key] for metrics in self.history if key in metrics]
+            result[f"{key}_p50"] = _percentile(values, 0.5)
+            result[f"{key}_p95"] = _percentile(values, 0.95)
+        return result
+
+    def _save(self, last: Dict[str, object]) -> None:
+        """Атомарно записать последнюю пробу и сводку."""
+        data = {
+            "updatedAt": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "last": last,
+            "failCount": self.fail_count,
+            "window": self.summary(),
+        }
+        try:
+            tmp_path = self.metrics_file.with_suffix(".tmp")
+            tmp_path.write_text(json.dumps(data, indent=2, ensure_ascii=False), encoding="utf-8")
+            tmp_path.replace(self.metrics_file)
+        except Exception as e:
+            logger.warning(f"Gameplay probe: не удалось записать метрики: {e}")
+
+    def handle_failures(self) -> bool:
+        """
+        Уведомить (и при PROBE_ACTION=restart перезапустить контейнер).
+
+        Returns:
+            True если контейнер перезапущен
+        """
+        if self.fail_count < PROBE_FAIL_THRESHOLD:
+            return False
+
+        logger.error(f"Gameplay probe: {self.fail_count} неудач подряд, последняя: {self.last_error}")
+        restarted = False
+        status = ""
+        if self.action == "restart" and self.restart is not None:
+            success, message = self.restart()
+            restarted = success
+            status = f"\nРестарт: {'✅' if success else '❌'} {message}"
+        if self.notify is not None:
+            self.notify(
+                f"🎮 <b>Gameplay probe failed</b>\n"
+                f"Контейнер: {self.container}\n"
+                f"Неудач подряд: {self.fail_count}\n"
+                f"Последняя: {self.last_error}{status}"
+            )
+        self.fail_count = 0
+        return restarted
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Синтетическая проба входа в арену")
+    parser.add_argument("--url", default=PROBE_URL, help="MatchServer (Colyseus)")
+    parser.add_argument("--meta-url", default=PROBE_META_URL, help="MetaServer для joinToken (пусто — без токена)")
+    parser.add_argument("--self-test", action="store_true", help="Проба против локального заменителя Colyseus")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+
+    server = None
+    url, meta_url = args.url, args.meta_url
+    if args.self_test:
+        # Заменитель лежит в tests/ и на сервер не копируется
+        test_dir = Path(__file__).resolve().parent.parent.parent / "tests" / "watchdog"
+        sys.path.insert(0, str(test_dir))
+        try:
+            from probe_test_server import ProbeTestServer
+        except ImportError:
+            print(f"[ERROR] --self-test запускается из клона репозитория: нет {test_dir / 'probe_test_server.py'}")
+            sys.exit(1)
+
+        server = ProbeTestServer()
+        server.start()
+        url, meta_url = server.url, server.url
+    try:
+        metrics = GameplayProbe(url=url, meta_url=meta_url).run()
+        print(json.dumps(metrics, ensure_ascii=False))
+        if server is not None:
+            print(f"[OK] Сервер получил LEAVE_ROOM: {server.left.wait(2.0)}")
+    except ProbeError as e:
+        print(f"[ERROR] {e}")
+        sys.exit(1)
+    finally:
+        if server is not None:
+            server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,438 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Slime Arena Watchdog — сбор статистики комнат для планирования ёмкости
+
+MatchServer отдаёт ArenaRoom.getRoomStats() всех комнат на
+GET /api/internal/rooms (Bearer MATCH_SERVER_TOKEN) — тот же эндпоинт, что
+использует админка. Watchdog опрашивает его через одну keep-alive сессию
+и складывает замеры в кольцевой файл фиксированного размера.
+
+Формат файла (little-endian):
+- страница заголовка: magic, версия, размер блока, число блоков, индекс
+  текущего (дописываемого) блока
+- блоки по BLOCK_SIZE байт. Блок — заголовок (magic, base_ts, count) и
+  колонки фиксированной ширины на CAPACITY замеров:
+      dt        u16  секунды от base_ts блока (дельта)
+      room      u32  crc32(roomId)
+      players   u8
+      max       u8   maxPlayers
+      phase     u8   код фазы (PHASES), 255 — неизвестная
+      duration  u16  секунды от начала матча
+      tick_avg  u16  сотые доли мс
+      tick_max  u16  сотые доли мс
+
+Блок декодируется независимо от соседей, поэтому при перезаписи кольца
+теряется ровно самый старый блок. Замеры одного опроса имеют одинаковый dt.
+Опрос без комнат пишется одним замером-меткой (room 0, phase EMPTY_POLL):
+иначе простой выпадал бы из средних по часам.
+
+Запросы:
+    python3 room_stats.py rooms    [--since 24h]   # комнат на сервере по часам
+    python3 room_stats.py players  [--since 7d]    # игроков в комнате
+    python3 room_stats.py ticks    [--since 7d]    # время тика от числа игроков
+    python3 room_stats.py poll                     # один опрос (проверка токена)
+
+Требования: Python 3.9+
+"""
+
+import argparse
+import logging
+import os
+import struct
+import sys
+import time
+import zlib
+from array import array
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, Iterator, List, NamedTuple, Optional
+
+import requests
+
+logger = logging.getLogger("watchdog")
+
+# ============================================================================
+# Конфигурация
+# ============================================================================
+
+# Internal API MatchServer и его токен (тот же, что у MetaServer)
+ROOM_STATS_URL = os.getenv("ROOM_STATS_URL", "http://127.0.0.1:2567/api/internal/rooms")
+MATCH_SERVER_TOKEN = os.getenv("MATCH_SERVER_TOKEN", "")
+
+# Интервал опроса (сек)
+ROOM_STATS_INTERVAL = int(os.getenv("ROOM_STATS_INTERVAL", "15"))
+
+# Кольцевой файл и его размер в блоках (2048 × 4 KiB = 8 MiB, ~неделя при 10 комнатах)
+ROOM_STATS_FILE = Path(os.getenv("ROOM_STATS_FILE", str(Path(__file__).parent / "room-stats.ring")))
+ROOM_STATS_BLOCKS = int(os.getenv("ROOM_STATS_BLOCKS", "2048"))
+
+# Бюджет тика (мс) для оценки ёмкости
+TICK_BUDGET_MS = float(os.getenv("TICK_BUDGET_MS", str(1000 / 30)))
+
+PHASES = ("Spawn", "Growth", "Hunt", "Final", "Results")
+PHASE_UNKNOWN = 255
+EMPTY_POLL = 254  # Код фазы метки опроса без комнат
+
+FILE_MAGIC = b"SARS"
+BLOCK_MAGIC = 0x4B4C4253  # "SBLK"
+VERSION = 1
+BLOCK_SIZE = 4096
+FILE_HEADER = struct.Struct("<4sHHII")  # magic, version, reserved, block_size, blocks
+FILE_HEADER_SIZE = 4096  # Заголовок занимает страницу; индекс головы — сразу за ним в той же странице
+HEAD = struct.Struct("<I")
+HEAD_OFFSET = FILE_HEADER.size
+BLOCK_HEADER = struct.Struct("<IIHH")  # magic, base_ts, count, reserved
+
+# Колонки: имя и typecode array (ширина в байтах)
+COLUMNS = (
+    ("dt", "H"),
+    ("room", "I"),
+    ("players", "B"),
+    ("max_players", "B"),
+    ("phase", "B"),
+    ("duration", "H"),
+    ("tick_avg", "H"),
+    ("tick_max", "H"),
+)
+SAMPLE_SIZE = sum(array(code).itemsize for _, code in COLUMNS)
+CAPACITY = (BLOCK_SIZE - BLOCK_HEADER.size) // SAMPLE_SIZE
+MAX_DT = 0xFFFF
+
+
+class Sample(NamedTuple):
+    """Замер одной комнаты"""
+
+    ts: int
+    room: int
+    players: int
+    max_players: int
+    phase: int
+    duration: int
+    tick_avg_ms: float
+    tick_max_ms: float
+
+    @property
+    def is_empty_poll(self) -> bool:
+        """Метка опроса, на котором комнат не было"""
+        return self.phase == EMPTY_POLL
+
+
+def _clamp(value: float, limit: int) -> int:
+    return max(0, min(int(round(value)), limit))
+
+
+def phase_code(phase: str) -> int:
+    try:
+        return PHASES.index(phase)
+    except ValueError:
+        return PHASE_UNKNOWN
+
+
+# ============================================================================
+# Блок
+# ============================================================================
+
+
+class Block:
+    """Колонки одного блока в памяти"""
+
+    def __init__(self, base_ts: int):
+        self.base_ts = base_ts
+        self.columns = {name: array(code) for name, code in COLUMNS}
+
+    def __len__(self) -> int:
+        return len(self.columns["dt"])
+
+    def accepts(self, ts: int) -> bool:
+        return len(self) < CAPACITY and 0 <= ts - self.base_ts <= MAX_DT
+
+    def append(self, ts: int, stats: Optional[dict]) -> None:
+        """Замер комнаты; None — метка опроса без комнат."""
+        columns = self.columns
+        if stats is None:
+            columns["dt"].append(ts - self.base_ts)
+            columns["phase"].append(EMPTY_POLL)
+            for name in ("room", "players", "max_players", "duration", "tick_avg", "tick_max"):
+                columns[name].append(0)
+            return
+        tick = stats.get("tick") or {}
+        columns["dt"].append(ts - self.base_ts)
+        columns["room"].append(zlib.crc32(str(stats.get("roomId", "")).encode("utf-8")))
+        columns["players"].append(_clamp(stats.get("playerCount", 0), 0xFF))
+        columns["max_players"].append(_clamp(stats.get("maxPlayers", 0), 0xFF))
+        columns["phase"].append(phase_code(str(stats.get("phase", ""))))
+        columns["duration"].append(_clamp(stats.get("duration", 0), 0xFFFF))
+        columns["tick_avg"].append(_clamp(float(tick.get("avg", 0)) * 100, 0xFFFF))
+        columns["tick_max"].append(_clamp(float(tick.get("max", 0)) * 100, 0xFFFF))
+
+    def pack(self) -> bytes:
+        """Блок ровно BLOCK_SIZE байт: колонки на CAPACITY элементов, хвост нулями."""
+        parts = [BLOCK_HEADER.pack(BLOCK_MAGIC, self.base_ts, len(self), 0)]
+        for name, code in COLUMNS:
+            column = self.columns[name]
+            if sys.byteorder != "little":
+                column = array(code, column)
+                column.byteswap()
+            parts.append(column.tobytes())
+            parts.append(bytes(column.itemsize * (CAPACITY - len(column))))
+        data = b"".join(parts)
+        return data + bytes(BLOCK_SIZE - len(data))
+
+    @classmethod
+    def unpack(cls, data: bytes) -> Optional["Block"]:
+        if len(data) < BLOCK_SIZE:
+            return None
+        magic, base_ts, count, _ = BLOCK_HEADER.unpack_from(data)
+        if magic != BLOCK_MAGIC or count > CAPACITY:
+            return None
+        block = cls(base_ts)
+        offset = BLOCK_HEADER.size
+        for name, code in COLUMNS:
+            column = block.columns[name]
+            width = column.itemsize
+            column.frombytes(data[offset:offset + width * count])
+            if sys.byteorder != "little":
+                column.byteswap()
+            offset += width * CAPACITY
+        return block
+
+    def samples(self) -> Iterator[Sample]:
+        c = self.columns
+        for i in range(len(self)):
+            yield Sample(
+                self.base_ts + c["dt"][i], c["room"][i], c["players"][i], c["max_players"][i],
+                c["phase"][i], c["duration"][i], c["tick_avg"][i] / 100, c["tick_max"][i] / 100,
+            )
+
+
+# ============================================================================
+# Кольцевой файл
+# ============================================================================
+
+
+class RingFile:
+    """
+    Кольцо блоков в файле. Текущий блок держится в памяти и целиком
+    переписывается на место после каждого опроса.
+    """
+
+    def __init__(self, path: Path = ROOM_STATS_FILE, blocks: int = ROOM_STATS_BLOCKS):
+        self.path = Path(path)
+        self.blocks = blocks
+        self.head = 0  # Индекс текущего (дописываемого) блока
+        self.current: Optional[Block] = None
+        self._open()
+
+    def _open(self) -> None:
+        if self.path.exists() and self.path.stat().st_size >= FILE_HEADER_SIZE:
+            with open(self.path, "rb") as f:
+                header = f.read(FILE_HEADER_SIZE)
+            magic, version, _, block_size, blocks = FILE_HEADER.unpack_from(header)
+            if magic == FILE_MAGIC and version == VERSION and block_size == BLOCK_SIZE:
+                self.blocks = blocks  # Размер кольца задаётся при создании файла
+                self.head = HEAD.unpack_from(header, HEAD_OFFSET)[0] % blocks
+                self.current = self._read_block(self.head)
+                return
+            logger.warning(f"Room stats: {self.path} в неизвестном формате, создаю заново")
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "wb") as f:
+            header = FILE_HEADER.pack(FILE_MAGIC, VERSION, 0, BLOCK_SIZE, self.blocks) + HEAD.pack(0)
+            f.write(header + bytes(FILE_HEADER_SIZE - len(header)))
+            f.truncate(FILE_HEADER_SIZE + self.blocks * BLOCK_SIZE)
+
+    def _read_block(self, index: int) -> Optional[Block]:
+        with open(self.path, "rb") as f:
+            f.seek(FILE_HEADER_SIZE + index * BLOCK_SIZE)
+            return Block.unpack(f.read(BLOCK_SIZE))
+
+    def append(self, ts: int, rooms: List[dict]) -> None:
+        """Записать замеры одного опроса (все с одним ts); пустой опрос — меткой."""
+        advanced = False
+        for stats in rooms or [None]:
+            if self.current is None:
+                self.current = Block(ts)
+            elif not self.current.accepts(ts):
+                self._flush()
+                self.head = (self.head + 1) % self.blocks
+                self.current = Block(ts)
+                advanced = True
+            self.current.append(ts, stats)
+        self._flush(write_head=advanced)
+
+    def _flush(self, write_head: bool = False) -> None:
+        with open(self.path, "r+b") as f:
+            f.seek(FILE_HEADER_SIZE + self.head * BLOCK_SIZE)
+            f.write(self.current.pack())
+            if write_head:
+                f.seek(HEAD_OFFSET)
+                f.write(HEAD.pack(self.head))
+
+    def samples(self, since: int = 0) -> Iterator[Sample]:
+        """Замеры от старых к новым (с base_ts не раньше since - MAX_DT)."""
+        with open(self.path, "rb") as f:
+            for step in range(1, self.blocks + 1):
+                index = (self.head + step) % self.blocks
+                f.seek(FILE_HEADER_SIZE + index * BLOCK_SIZE)
+                block = Block.unpack(f.read(BLOCK_SIZE))
+                if block is None or block.base_ts + MAX_DT < since:
+                    continue
+                for sample in block.samples():
+                    if sample.ts >= since:
+                        yield sample
+
+
+# ============================================================================
+# Опрос
+# ============================================================================
+
+
+class RoomStatsPoller:
+    """Периодический опрос /api/internal/rooms через одну keep-alive сессию."""
+
+    def __init__(self, url: str = ROOM_STATS_URL, token: str = MATCH_SERVER_TOKEN, ring: Optional[RingFile] = None):
+        self.url = url
+        self.session = requests.Session()
+        self.session.headers.update({"Authorization": f"Bearer {token}", "Accept": "application/json"})
+        self.ring = ring or RingFile()
+        self.last_check_time = 0.0
+        self.fail_count = 0
+
+    def should_check(self) -> bool:
+        return time.time() - self.last_check_time >= ROOM_STATS_INTERVAL
+
+    def poll(self) -> Optional[int]:
+        """Один опрос. Возвращает число комнат или None при ошибке."""
+        self.last_check_time = time.time()
+        try:
+            response = self.session.get(self.url, timeout=5)
+            if response.status_code != 200:
+                raise ValueError(f"статус {response.status_code}")
+            rooms = response.json()
+        except (requests.RequestException, ValueError) as e:
+            self.fail_count += 1
+            # Логируем первую ошибку серии и затем раз в ~10 минут, чтобы не засорять журнал
+            if self.fail_count == 1 or self.fail_count % max(1, 600 // ROOM_STATS_INTERVAL) == 0:
+                logger.warning(f"Room stats: {e} (ошибок подряд: {self.fail_count})")
+            return None
+        self.fail_count = 0
+        try:
+            self.ring.append(int(self.last_check_time), rooms)
+        except OSError as e:
+            logger.warning(f"Room stats: ошибка записи {self.ring.path}: {e}")
+        return len(rooms)
+
+
+# ============================================================================
+# Запросы
+# ============================================================================
+
+
+def _percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else 0.0
+
+
+def query_rooms(samples: Iterator[Sample]) -> List[tuple]:
+    """Комнат на сервере: (час, опросов, среднее, максимум, игроков макс) по часам.
+
+    Опросы без комнат входят в число опросов и в среднее.
+    """
+    per_poll: Dict[int, List[int]] = defaultdict(lambda: [0, 0])
+    for sample in samples:
+        poll = per_poll[sample.ts]
+        if sample.is_empty_poll:
+            continue
+        poll[0] += 1
+        poll[1] += sample.players
+    hours: Dict[int, List[List[int]]] = defaultdict(list)
+    for ts, poll in per_poll.items():
+        hours[ts // 3600 * 3600].append(poll)
+    result = []
+    for hour in sorted(hours):
+        polls = hours[hour]
+        rooms = [poll[0] for poll in polls]
+        result.append((hour, len(polls), sum(rooms) / len(rooms), max(rooms), max(poll[1] for poll in polls)))
+    return result
+
+
+def query_players(samples: Iterator[Sample]) -> Dict[int, int]:
+    """Распределение числа игроков в комнате (вне фазы Results): игроков → замеров."""
+    histogram: Dict[int, int] = defaultdict(int)
+    results = PHASES.index("Results")
+    for sample in samples:
+        if sample.phase != results and not sample.is_empty_poll:
+            histogram[sample.players] += 1
+    return dict(sorted(histogram.items()))
+
+
+def query_ticks(samples: Iterator[Sample], bucket: int = 5) -> List[tuple]:
+    """Время тика от числа игроков: (игроки от, до, замеров, avg p50, max p50, max p95, доля max > бюджета)."""
+    groups: Dict[int, List[Sample]] = defaultdict(list)
+    for sample in samples:
+        if sample.tick_max_ms > 0:
+            groups[sample.players // bucket].append(sample)
+    result = []
+    for key in sorted(groups):
+        group = groups[key]
+        tick_max = [sample.tick_max_ms for sample in group]
+        over = sum(1 for value in tick_max if value > TICK_BUDGET_MS) / len(group)
+        result.append((
+            key * bucket, key * bucket + bucket - 1, len(group),
+            _percentile([sample.tick_avg_ms for sample in group], 0.5),
+            _percentile(tick_max, 0.5), _percentile(tick_max, 0.95), over,
+        ))
+    return result
+
+
+def _parse_since(text: str) -> int:
+    units = {"m": 60, "h": 3600, "d": 86400}
+    if text and text[-1] in units:
+        return int(time.time() - float(text[:-1]) * units[text[-1]])
+    return int(time.time() - float(text))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Статистика комнат для планирования ёмкости")
+    parser.add_argument("command", choices=("rooms", "players", "ticks", "poll"))
+    parser.add_argument("--since", default="24h", help="Окно: 30m, 24h, 7d")
+    parser.add_argument("--file", type=Path, default=ROOM_STATS_FILE)
+    parser.add_argument("--bucket", type=int, default=5, help="Ширина группы игроков для ticks")
+    args = parser.parse_args()
+
+    if args.command != "poll" and not args.file.exists():
+        print(f"[ERROR] Нет файла {args.file}")
+        sys.exit(1)
+    ring = RingFile(args.file)
+
+    if args.command == "poll":
+        if not MATCH_SERVER_TOKEN:
+            print("[ERROR] MATCH_SERVER_TOKEN не задан")
+            sys.exit(1)
+        logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+        count = RoomStatsPoller(ring=ring).poll()
+        if count is None:
+            sys.exit(1)
+        print(f"[OK] Комнат: {count}, записано в {ring.path}")
+        return
+
+    samples = ring.samples(_parse_since(args.since))
+    if args.command == "rooms":
+        print(f"{'час (UTC)':<17} {'опросов':>7} {'комнат ср':>9} {'макс':>5} {'игроков макс':>12}")
+        for hour, polls, avg, peak, players in query_rooms(samples):
+            stamp = time.strftime("%Y-%m-%d %H:00", time.gmtime(hour))
+            print(f"{stamp:<17} {polls:>7} {avg:>9.1f} {peak:>5} {players:>12}")
+    elif args.command == "players":
+        histogram = query_players(samples)
+        total = sum(histogram.values()) or 1
+        for players, count in histogram.items():
+            print(f"{players:>3} игроков: {count:>7} ({count / total:6.1%}) {'#' * int(40 * count / total)}")
+    else:
+        print(f"{'игроков':>9} {'замеров':>8} {'avg p50':>8} {'max p50':>8} {'max p95':>8} {'> бюджета':>10}")
+        for low, high, count, avg50, max50, max95, over in query_ticks(samples, args.bucket):
+            flag = "  [WARN]" if max95 > TICK_BUDGET_MS else ""
+            print(f"{low:>4}-{high:<4} {count:>8} {avg50:>8.2f} {max50:>8.2f} {max95:>8.2f} {over:>10.1%}{flag}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,464 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Slime Arena Watchdog — монитор бюджета тика ArenaRoom
+
+Сервер может отвечать 200 на /health, но не успевать симулировать матч:
+тик дольше 33.3 мс (30 Hz) означает пропущенные тики и «рывки» у игроков.
+ArenaRoom.reportMetrics() пишет в stdout/stderr контейнера:
+
+    [PERF] room=<id> tick=<n> took <ms>ms (budget: <ms>ms, warn ≥ <ms>ms)
+    room=<id> tick=<n> dt_avg=<ms>ms dt_max=<ms>ms players=<n> orbs=<n> chests=<n>
+
+(раз в секунду; `room=` может отсутствовать у старых образов).
+
+Монитор читает логи контейнера инкрементально (`docker logs --since <курсор>`),
+разбирает строки без регулярных выражений и держит по каждой комнате
+распределение dt_max/dt_avg за скользящее окно (кольцо поминутных
+гистограмм фиксированного размера). Нарушение бюджета считается
+устойчивым, если dt_max превышает бюджет TICK_BREACH_SAMPLES секунд подряд
+или p95(dt_max) за окно выше бюджета. Тогда — уведомление в Telegram
+и, при TICK_ACTION=restart, рестарт контейнера.
+
+Разбор лога вручную:
+    docker logs --timestamps slime-arena 2>&1 | python3 tick_monitor.py
+
+Требования: Python 3.9+
+"""
+
+import logging
+import os
+import subprocess
+import sys
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger("watchdog")
+
+# ============================================================================
+# Конфигурация
+# ============================================================================
+
+# Бюджет тика (мс): simulationIntervalMs сервера, 1000 / 30
+TICK_BUDGET_MS = float(os.getenv("TICK_BUDGET_MS", str(1000 / 30)))
+
+# Как часто читать логи контейнера (сек)
+TICK_CHECK_INTERVAL = int(os.getenv("TICK_CHECK_INTERVAL", "10"))
+
+# Окно распределений (сек) и размер одного слота гистограммы
+TICK_WINDOW_SEC = int(os.getenv("TICK_WINDOW_SEC", "300"))
+TICK_SLOT_SEC = 60
+
+# Секунд подряд с dt_max > бюджета до тревоги
+TICK_BREACH_SAMPLES = int(os.getenv("TICK_BREACH_SAMPLES", "10"))
+
+# Минимум секундных замеров в окне, чтобы судить по p95
+TICK_MIN_SAMPLES = int(os.getenv("TICK_MIN_SAMPLES", "60"))
+
+# Реакция на устойчивое нарушение: alert — уведомление, restart — уведомление и рестарт
+TICK_ACTION = os.getenv("TICK_ACTION", "alert").lower()
+
+# Не повторять тревогу по той же комнате чаще (сек)
+TICK_ALERT_COOLDOWN = int(os.getenv("TICK_ALERT_COOLDOWN", "600"))
+
+# Сколько ждать `docker logs` (сек)
+DOCKER_LOGS_TIMEOUT = 30
+
+# Границы корзин гистограммы (мс): подробнее около бюджета, граница ровно на 1000 / 30
+BUCKET_EDGES_MS = (
+    1.0, 2.0, 3.0, 4.0, 5.0, 6.0, 8.0, 10.0, 12.0, 15.0, 18.0, 21.0, 24.0, 27.0, 30.0,
+    1000 / 30, 40.0, 50.0, 66.7, 100.0, 200.0, 500.0, 1000.0,
+)
+BUCKETS = len(BUCKET_EDGES_MS) + 1  # Последняя — всё, что больше 1 с
+
+KIND_PERF = "perf"
+KIND_STATS = "stats"
+
+
+# ============================================================================
+# Разбор строк
+# ============================================================================
+
+
+def _number_after(line: str, key: str, start: int = 0) -> Tuple[Optional[str], int]:
+    """Текст числа после key (до пробела, запятой или `ms`) и позиция конца."""
+    i = line.find(key, start)
+    if i < 0:
+        return None, start
+    i += len(key)
+    end = i
+    n = len(line)
+    while end < n and (line[end].isdigit() or line[end] in ".-"):
+        end += 1
+    return (line[i:end] if end > i else None), end
+
+
+def _room_before(line: str, tick_at: int) -> str:
+    """Значение `room=` перед `tick=` или "-" для строк старого формата."""
+    i = line.rfind("room=", 0, tick_at)
+    if i < 0:
+        return "-"
+    i += 5
+    end = line.find(" ", i, tick_at)
+    return line[i:end] if end > 0 else line[i:tick_at].rstrip()
+
+
+def parse_line(line: str) -> Optional[Tuple[str, str, int, float, float, int]]:
+    """
+    Разобрать строку лога ArenaRoom.
+
+    Returns:
+        (KIND_PERF, room, tick, took_ms, budget_ms, 0)
+        (KIND_STATS, room, tick, dt_avg_ms, dt_max_ms, players)
+        или None для прочих строк
+    """
+    # Быстрый отсев: подавляющее большинство строк лога не содержит "tick="
+    tick_at = line.find("tick=")
+    if tick_at < 0:
+        return None
+    try:
+        perf_at = line.find("[PERF]", 0, tick_at)
+        tick_text, pos = _number_after(line, "tick=", tick_at)
+        if tick_text is None:
+            return None
+        if perf_at >= 0:
+            took, pos = _number_after(line, " took ", pos)
+            budget, _ = _number_after(line, "budget: ", pos)
+            if took is None:
+                return None
+            return (KIND_PERF, _room_before(line, tick_at), int(tick_text), float(took),
+                    float(budget) if budget else TICK_BUDGET_MS, 0)
+        dt_avg, pos = _number_after(line, "dt_avg=", pos)
+        dt_max, pos = _number_after(line, "dt_max=", pos)
+        if dt_avg is None or dt_max is None:
+            return None
+        players, _ = _number_after(line, "players=", pos)
+        return (KIND_STATS, _room_before(line, tick_at), int(tick_text), float(dt_avg), float(dt_max), int(players) if players else 0)
+    except ValueError:
+        return None
+
+
+# ============================================================================
+# Распределения
+# ============================================================================
+
+
+class WindowHistogram:
+    """
+    Гистограмма за скользящее окно: кольцо слотов по TICK_SLOT_SEC.
+
+    Память фиксирована (слоты × корзины), добавление — O(log корзин).
+    """
+
+    def __init__(self, window_sec: int = TICK_WINDOW_SEC, slot_sec: int = TICK_SLOT_SEC):
+        self.slot_sec = slot_sec
+        self.slots = max(1, window_sec // slot_sec)
+        self.counts = [array("I", bytes(4 * BUCKETS)) for _ in range(self.slots)]
+        self.epochs = array("q", [-1] * self.slots)  # Номер минуты, которой принадлежит слот
+
+    def _slot(self, now: float) -> array:
+        epoch = int(now // self.slot_sec)
+        index = epoch % self.slots
+        if self.epochs[index] != epoch:
+            counts = self.counts[index]
+            for bucket in range(BUCKETS):
+                counts[bucket] = 0
+            self.epochs[index] = epoch
+        return self.counts[index]
+
+    def add(self, value_ms: float, now: float) -> None:
+        self._slot(now)[bisect_left(BUCKET_EDGES_MS, value_ms)] += 1
+
+    def totals(self, now: float) -> List[int]:
+        oldest = int(now // self.slot_sec) - self.slots + 1
+        totals = [0] * BUCKETS
+        for index in range(self.slots):
+            if self.epochs[index] >= oldest:
+                counts = self.counts[index]
+                for bucket in range(BUCKETS):
+                    totals[bucket] += counts[bucket]
+        return totals
+
+    def count(self, now: float) -> int:
+        return sum(self.totals(now))
+
+    def _bucket(self, q: float, now: float) -> Optional[int]:
+        """Номер корзины, в которую попадает q-й перцентиль."""
+        totals = self.totals(now)
+        total = sum(totals)
+        if not total:
+            return None
+        rank = q * total
+        seen = 0
+        for bucket, count in enumerate(totals):
+            seen += count
+            if seen >= rank:
+                return bucket
+        return BUCKETS - 1
+
+    def percentile(self, q: float, now: float) -> Optional[float]:
+        """Верхняя граница корзины, в которую попадает q-й перцентиль (мс)."""
+        bucket = self._bucket(q, now)
+        if bucket is None:
+            return None
+        return BUCKET_EDGES_MS[bucket] if bucket < len(BUCKET_EDGES_MS) else float("inf")
+
+    def percentile_floor(self, q: float, now: float) -> Optional[float]:
+        """Нижняя граница той же корзины (мс): q-й перцентиль точно не меньше её."""
+        bucket = self._bucket(q, now)
+        if bucket is None:
+            return None
+        return BUCKET_EDGES_MS[bucket - 1] if bucket > 0 else 0.0
+
+
+class RoomTicks:
+    """Состояние одной комнаты"""
+
+    __slots__ = ("room", "dt_max", "dt_avg", "over_budget", "consecutive", "last_seen",
+                 "last_tick", "players", "worst_ms", "last_alert")
+
+    def __init__(self, room: str):
+        self.room = room
+        self.dt_max = WindowHistogram()
+        self.dt_avg = WindowHistogram()
+        self.over_budget = WindowHistogram()  # Тики из [PERF] дольше бюджета
+        self.consecutive = 0  # Секунд подряд с dt_max > бюджета
+        self.last_seen = 0.0
+        self.last_tick = 0
+        self.players = 0
+        self.worst_ms = 0.0
+        self.last_alert = 0.0
+
+    def summary(self, now: float) -> str:
+        p50 = self.dt_max.percentile(0.5, now)
+        p95 = self.dt_max.percentile(0.95, now)
+        fmt = lambda value: "—" if value is None else f"≤{value:g}"
+        return (
+            f"room={self.room} players={self.players} dt_max p50 {fmt(p50)} ms, p95 {fmt(p95)} ms, "
+            f"худший тик {self.worst_ms:.1f} ms, тиков сверх бюджета за окно: {self.over_budget.count(now)}"
+        )
+
+
+# ============================================================================
+# Чтение логов контейнера
+# ============================================================================
+
+
+def _ts_key(ts: str) -> str:
+    """RFC3339Nano docker-а с дробной частью, дополненной до 9 знаков (для сравнения строк)."""
+    dot = ts.find(".")
+    if dot < 0:
+        return ts[:-1] + ".000000000Z" if ts.endswith("Z") else ts
+    end = ts.find("Z", dot)
+    if end < 0:
+        return ts
+    return ts[:dot + 1] + ts[dot + 1:end].ljust(9, "0") + ts[end:]
+
+
+class ContainerLogCursor:
+    """
+    Инкрементальное чтение `docker logs --timestamps` с курсором.
+
+    `--since` включает границу, поэтому строки с временем курсора, уже
+    прочитанные в прошлый раз, пропускаются.
+    """
+
+    def __init__(self, container: str, initial_since: str = f"{TICK_CHECK_INTERVAL * 3}s"):
+        self.container = container
+        self.initial_since = initial_since
+        self.cursor: Optional[str] = None  # Время последней строки (как выдал docker)
+        self._cursor_key: Optional[str] = None
+        self._seen_at_cursor: set = set()
+
+    def lines(self) -> Iterator[str]:
+        """Новые строки лога (без префикса времени)."""
+        since = self.cursor or self.initial_since
+        process = subprocess.Popen(
+            ["docker", "logs", "--timestamps", "--since", since, self.container],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,  # console.warn ([PERF]) пишет в stderr контейнера
+            text=True,
+            encoding="utf-8",
+            errors="replace",
+        )
+        killer = threading.Timer(DOCKER_LOGS_TIMEOUT, process.kill)
+        killer.start()
+        try:
+            for raw in process.stdout:
+                ts, _, line = raw.rstrip("\n").partition(" ")
+                key = _ts_key(ts)
+                if self._cursor_key is not None:
+                    if key < self._cursor_key:
+                        continue
+                    if key == self._cursor_key:
+                        if line in self._seen_at_cursor:
+                            continue
+                        self._seen_at_cursor.add(line)
+                    else:
+                        self._cursor_key, self.cursor = key, ts
+                        self._seen_at_cursor = {line}
+                else:
+                    self._cursor_key, self.cursor = key, ts
+                    self._seen_at_cursor = {line}
+                yield line
+        finally:
+            killer.cancel()
+            process.stdout.close()
+            process.wait()
+
+
+# ============================================================================
+# Монитор
+# ============================================================================
+
+
+class TickMonitor:
+    """
+    Распределения времени тика по комнатам и реакция на устойчивое нарушение бюджета.
+
+    Args:
+        container: Имя Docker-контейнера
+        notify: Отправка уведомления (send_telegram_message)
+        restart: Рестарт контейнера (docker_restart) для TICK_ACTION=restart
+    """
+
+    def __init__(
+        self,
+        container: str,
+        notify: Optional[Callable[[str], bool]] = None,
+        restart: Optional[Callable[[], Tuple[bool, str]]] = None,
+        budget_ms: float = TICK_BUDGET_MS,
+        action: str = TICK_ACTION,
+    ):
+        self.container = container
+        self.notify = notify
+        self.restart = restart
+        self.budget_ms = budget_ms
+        self.action = action
+        self.rooms: Dict[str, RoomTicks] = {}
+        self.cursor = ContainerLogCursor(container)
+        self.last_check_time = 0.0
+        self.paused_until = 0.0
+
+    def should_check(self) -> bool:
+        now = time.time()
+        return now >= self.paused_until and now - self.last_check_time >= TICK_CHECK_INTERVAL
+
+    def pause(self, seconds: float) -> None:
+        """Не проверять (например, после рестарта контейнера)."""
+        self.paused_until = time.time() + seconds
+        self.rooms.clear()
+
+    def feed(self, line: str, now: float) -> None:
+        """Учесть одну строку лога."""
+        parsed = parse_line(line)
+        if parsed is None:
+            return
+        kind, room_id, tick, first, second, players = parsed
+        room = self.rooms.get(room_id)
+        if room is None:
+            room = self.rooms[room_id] = RoomTicks(room_id)
+        room.last_seen = now
+        room.last_tick = tick
+        if kind == KIND_PERF:
+            if first > self.budget_ms:
+                room.over_budget.add(first, now)
+            if first > room.worst_ms:
+                room.worst_ms = first
+            return
+        room.players = players
+        room.dt_avg.add(first, now)
+        room.dt_max.add(second, now)
+        if second > room.worst_ms:
+            room.worst_ms = second
+        room.consecutive = room.consecutive + 1 if second > self.budget_ms else 0
+
+    def poll(self) -> int:
+        """Прочитать новые строки логов контейнера. Возвращает число строк."""
+        self.last_check_time = time.time()
+        count = 0
+        try:
+            for line in self.cursor.lines():
+                self.feed(line, time.time())
+                count += 1
+        except FileNotFoundError:
+            logger.warning("Tick monitor: docker не найден")
+        except Exception as e:
+            logger.warning(f"Tick monitor: ошибка чтения логов: {e}")
+        self._forget_idle(time.time())
+        return count
+
+    def _forget_idle(self, now: float) -> None:
+        """Комнаты без строк дольше окна (матч завершён) больше не отслеживаются."""
+        for room_id in [room_id for room_id, room in self.rooms.items() if now - room.last_seen > TICK_WINDOW_SEC]:
+            del self.rooms[room_id]
+
+    def breaches(self, now: Optional[float] = None) -> List[Tuple[RoomTicks, str]]:
+        """Комнаты с устойчивым нарушением бюджета и причина."""
+        now = time.time() if now is None else now
+        found = []
+        for room in self.rooms.values():
+            if room.consecutive >= TICK_BREACH_SAMPLES:
+                found.append((room, f"dt_max > {self.budget_ms:.1f} мс {room.consecutive} сек подряд"))
+                continue
+            if room.dt_max.count(now) >= TICK_MIN_SAMPLES:
+                # Верхняя граница корзины завышает p95: нарушение — только если
+                # нижняя граница корзины p95 не ниже бюджета
+                p95 = room.dt_max.percentile_floor(0.95, now)
+                if p95 is not None and p95 >= self.budget_ms:
+                    found.append((room, f"p95(dt_max) за {TICK_WINDOW_SEC // 60} мин выше {self.budget_ms:.1f} мс"))
+        return found
+
+    def handle_breaches(self, now: Optional[float] = None) -> bool:
+        """
+        Уведомить (и при TICK_ACTION=restart перезапустить контейнер).
+
+        Returns:
+            True если контейнер перезапущен
+        """
+        now = time.time() if now is None else now
+        fresh = [(room, reason) for room, reason in self.breaches(now) if now - room.last_alert >= TICK_ALERT_COOLDOWN]
+        if not fresh:
+            return False
+
+        for room, reason in fresh:
+            room.last_alert = now
+            logger.error(f"Tick budget: {reason}; {room.summary(now)}")
+
+        lines = "\n".join(f"• {room.summary(now)}\n  {reason}" for room, reason in fresh)
+        restarted = False
+        status = ""
+        if self.action == "restart" and self.restart is not None:
+            success, message = self.restart()
+            restarted = success
+            status = f"\nРестарт: {'✅' if success else '❌'} {message}"
+        if self.notify is not None:
+            self.notify(
+                f"🐢 <b>Tick budget exceeded</b>\n"
+                f"Контейнер: {self.container}\n"
+                f"Комнат: {len(fresh)} из {len(self.rooms)}\n{lines}{status}"
+            )
+        return restarted
+
+
+def main() -> None:
+    """Разбор лога из stdin (с префиксом времени docker или без) и сводка по комнатам."""
+    monitor = TickMonitor("stdin")
+    now = time.time()
+    for raw in sys.stdin:
+        line = raw.rstrip("\n")
+        # Префикс `docker logs --timestamps`
+        if line[:4].isdigit() and " " in line:
+            line = line.partition(" ")[2]
+        monitor.feed(line, now)
+    for room in monitor.rooms.values():
+        print(room.summary(now))
+    for room, reason in monitor.breaches(now):
+        print(f"[WARN] room={room.room}: {reason}")
+
+
+if __name__ == "__main__":
+    main()
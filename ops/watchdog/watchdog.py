@@ -9,6 +9,9 @@ Slime Arena Watchdog
 1. Recovery при старте — проверка незавершённых рестартов
 2. Outbox-приёмник — обработка запросов на рестарт (каждые 5 сек)
 3. Health monitor — проверка здоровья сервера (каждые 30 сек)
+4. Tick monitor — бюджет тика комнат по логам контейнера (tick_monitor.py)
+5. Gameplay probe — вход бота в арену через Colyseus (gameplay_probe.py, опционально)
+6. Room stats — замеры комнат для планирования ёмкости (room_stats.py, при MATCH_SERVER_TOKEN)
 
 Взаимодействие с сервером:
 - Сервер создаёт restart-requested → watchdog выполняет рестарт
@@ -63,6 +66,12 @@ HEALTH_FAIL_THRESHOLD = int(os.getenv("FAILURE_THRESHOLD", "3"))
 # Пауза после рестарта перед следующими проверками (секунды)
 COOLDOWN_AFTER_RESTART = int(os.getenv("COOLDOWN_AFTER_RESTART", "60"))
 
+# Монитор бюджета тика (остальные параметры — в tick_monitor.py)
+TICK_MONITOR_ENABLED = os.getenv("TICK_MONITOR_ENABLED", "true").lower() in ("1", "true", "yes")
+
+# Синтетическая проба входа в арену (остальные параметры — в gameplay_probe.py)
+PROBE_ENABLED = os.getenv("PROBE_ENABLED", "false").lower() in ("1", "true", "yes")
+
 # ============================================================================
 # Логирование
 # ============================================================================
@@ -510,6 +519,40 @@ def main() -> None:
     # Инициализируем health monitor
     health_monitor = HealthMonitor()
 
+    # Монитор бюджета тика: модуль рядом с watchdog.py, конфигурация читается
+    # при импорте — поэтому импорт после load_dotenv()
+    tick_monitor = None
+    if TICK_MONITOR_ENABLED:
+        try:
+            from tick_monitor import TickMonitor
+
+            tick_monitor = TickMonitor(CONTAINER_NAME, notify=send_telegram_message, restart=docker_restart)
+            logger.info(f"Tick monitor: бюджет {tick_monitor.budget_ms:.1f} ms, действие: {tick_monitor.action}")
+        except ImportError:
+            logger.warning("Tick monitor: tick_monitor.py не найден рядом с watchdog.py, монитор отключён")
+
+    # Синтетическая проба геймплея (опционально)
+    gameplay_probe = None
+    if PROBE_ENABLED:
+        try:
+            from gameplay_probe import ProbeMonitor
+
+            gameplay_probe = ProbeMonitor(CONTAINER_NAME, notify=send_telegram_message, restart=docker_restart)
+            logger.info(f"Gameplay probe: {gameplay_probe.probe.url}, действие: {gameplay_probe.action}")
+        except ImportError:
+            logger.warning("Gameplay probe: gameplay_probe.py не найден рядом с watchdog.py, проба отключена")
+
+    # Статистика комнат: нужен токен internal API MatchServer
+    room_stats = None
+    if os.getenv("MATCH_SERVER_TOKEN"):
+        try:
+            from room_stats import RoomStatsPoller
+
+            room_stats = RoomStatsPoller()
+            logger.info(f"Room stats: {room_stats.url} → {room_stats.ring.path}")
+        except ImportError:
+            logger.warning("Room stats: room_stats.py не найден рядом с watchdog.py, сбор отключён")
+
     # Основной цикл
     last_outbox_check = 0.0
 
@@ -527,6 +570,28 @@ def main() -> None:
                 health_monitor.check_health()
                 health_monitor.handle_failures()
 
+            # Бюджет тика (каждые 10 секунд)
+            if tick_monitor is not None and tick_monitor.should_check():
+                tick_monitor.poll()
+                if tick_monitor.handle_breaches():
+                    health_monitor.last_restart_time = time.time()
+                    save_state(f"auto-tick-{int(time.time())}")
+                    tick_monitor.pause(COOLDOWN_AFTER_RESTART)
+
+            # Проба входа в арену (каждые 60 секунд)
+            if gameplay_probe is not None and gameplay_probe.should_check():
+                gameplay_probe.check()
+                if gameplay_probe.handle_failures():
+                    health_monitor.last_restart_time = time.time()
+                    save_state(f"auto-probe-{int(time.time())}")
+                    gameplay_probe.pause(COOLDOWN_AFTER_RESTART)
+                    if tick_monitor is not None:
+                        tick_monitor.pause(COOLDOWN_AFTER_RESTART)
+
+            # Статистика комнат (каждые 15 секунд)
+            if room_stats is not None and room_stats.should_check():
+                room_stats.poll()
+
             # Короткий sleep чтобы не нагружать CPU
             time.sleep(1)
 
@@ -2716,10 +2716,11 @@ export class ArenaRoom extends Room<GameState> {
         }
         
         // Предупреждаем, если тик стабильно приближается к исчерпанию бюджета (≈85%)
+        // Формат строк разбирает ops/watchdog/tick_monitor.py — менять согласованно
         const tickBudgetMs = this.balance.server.simulationIntervalMs;
         const warnThresholdMs = tickBudgetMs * 0.85;
         if (dt > warnThresholdMs) {
-            console.warn(`[PERF] tick=${this.tick} took ${dt.toFixed(1)}ms (budget: ${tickBudgetMs.toFixed(1)}ms, warn ≥ ${warnThresholdMs.toFixed(1)}ms)`);
+            console.warn(`[PERF] room=${this.roomId} tick=${this.tick} took ${dt.toFixed(1)}ms (budget: ${tickBudgetMs.toFixed(1)}ms, warn ≥ ${warnThresholdMs.toFixed(1)}ms)`);
         }
         
         if (this.metricsTickCount >= this.metricsIntervalTicks) {
@@ -2728,7 +2729,7 @@ export class ArenaRoom extends Room<GameState> {
             this.lastMetricsAvgMs = avg;
             this.lastMetricsMaxMs = this.metricsMaxTickMs;
             console.log(
-                `tick=${this.tick} dt_avg=${avg.toFixed(2)}ms dt_max=${this.metricsMaxTickMs.toFixed(2)}ms players=${this.state.players.size} orbs=${this.state.orbs.size} chests=${this.state.chests.size}`
+                `room=${this.roomId} tick=${this.tick} dt_avg=${avg.toFixed(2)}ms dt_max=${this.metricsMaxTickMs.toFixed(2)}ms players=${this.state.players.size} orbs=${this.state.orbs.size} chests=${this.state.chests.size}`
             );
             this.metricsAccumulatorMs = 0;
             this.metricsTickCount = 0;
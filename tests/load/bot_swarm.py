@@ -0,0 +1,1033 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Bot Swarm — безголовые боты ArenaRoom для замера времени тика под нагрузкой
+
+Каждый бот — отдельная WebSocket-сессия Colyseus 0.15 (без браузера и без
+клиентского SDK): matchmake → JOIN_ROOM → selectClass, затем "input"
+с частотой 30 Гц (случайное блуждание moveX/moveY, умения раз в 2–4 с,
+изредка talentChoice/cardChoice) — как живой игрок, а не пустая сессия.
+
+Боты набираются ступенями (--steps 10,20,40,80 — всего ботов на шаге),
+комнаты заполняются по --room-size: первый бот группы создаёт комнату
+(/matchmake/create), остальные входят в неё по roomId (/matchmake/joinById),
+поэтому число игроков в комнате задаётся явно, а не балансировщиком.
+
+На каждом шаге (после прогрева --warmup) собираются:
+- на клиентах: интервал между PATCH (джиттер цикла событий сервера),
+  RTT по WebSocket ping/pong (pong отвечает цикл событий Node — долгий
+  тик задерживает и его), трафик патчей, отвалы и ошибки;
+- на сервере: строки `room=... dt_avg=...ms dt_max=...ms players=N`
+  ArenaRoom (раз в секунду на комнату) и [PERF] из `docker logs`
+  (--container) или файла лога (--server-log); разбор — parse_line
+  из ops/watchdog/tick_monitor.py, учитываются только комнаты роя.
+
+Итог — таблица по шагам и оценка ёмкости: сколько игроков в комнате
+укладывается в бюджет тика (dt_max p99 ≤ 33.3 мс) и сколько таких комнат
+помещается на ядро: Node исполняет все комнаты процесса в одном потоке,
+комната занимает dt_avg / бюджет ядра, запас — --target-util.
+
+Задержка отправки ввода относительно расписания 30 Гц пишется отдельно:
+если p99 больше INPUT_LAG_WARN_MS, перегружен сам клиент и замеры
+недостоверны — запустите несколько процессов роя (комнаты у каждого свои).
+
+Проверка без сервера (локальная заглушка Colyseus, пишет строки dt_avg в файл):
+    python3 tests/load/bot_swarm.py --self-test
+
+Сколько игроков выдерживает одна комната (maxPlayers в balance.json поднять):
+    python3 tests/load/bot_swarm.py --server-url http://localhost:2567 \\
+        --container slime-arena-match-server --room-size 60 --steps 10,20,30,40,60
+
+Сколько комнат по 20 игроков на ядро:
+    python3 tests/load/bot_swarm.py --server-url http://localhost:2567 \\
+        --container slime-arena-match-server --room-size 20 --steps 20,60,100,160 \\
+        --server-cores 4 --out tests/load/swarm-results.json
+
+Требования: Python 3.9+
+"""
+
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import math
+import os
+import random
+import ssl
+import struct
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+sys.path.insert(0, str(Path(__file__).parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent / "ops" / "watchdog"))
+
+from hdr_histogram import HdrHistogram  # noqa: E402
+from metaserver_load import HttpPool  # noqa: E402
+from tick_monitor import KIND_PERF, ContainerLogCursor, parse_line  # noqa: E402
+
+# ============================================================================
+# Конфигурация
+# ============================================================================
+
+SERVER_URL = os.getenv("SERVER_URL", "http://localhost:2567")
+ROOM_NAME = os.getenv("ROOM_NAME", "arena")
+
+BALANCE_PATH = Path(__file__).resolve().parent.parent.parent / "config" / "balance.json"
+
+DEFAULT_STEPS = "10,20,40,80"
+DEFAULT_STEP_DURATION = 60.0
+DEFAULT_WARMUP = 10.0
+
+INPUT_HZ = 30
+PING_INTERVAL = 1.0
+# Боты входят не все разом: пауза между входами (сек)
+JOIN_SPACING = 0.02
+
+# Доля ядра, которую допустимо занимать тиками комнат (остальное — сеть, GC, сериализация)
+DEFAULT_TARGET_UTIL = 0.7
+
+# p99 задержки отправки ввода, выше которой клиент считается перегруженным
+INPUT_LAG_WARN_MS = 10.0
+
+CONNECT_TIMEOUT = 10.0
+LOG_POLL_INTERVAL = 1.0
+
+# Коды протокола Colyseus 0.15
+JOIN_ROOM = 10
+ERROR = 11
+LEAVE_ROOM = 12
+ROOM_DATA = 13
+ROOM_STATE = 14
+ROOM_STATE_PATCH = 15
+
+# Коды WebSocket-кадров
+OP_CONT = 0x0
+OP_TEXT = 0x1
+OP_BINARY = 0x2
+OP_CLOSE = 0x8
+OP_PING = 0x9
+OP_PONG = 0xA
+
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+
+def _balance_server() -> Tuple[float, int]:
+    """Бюджет тика (мс) и maxPlayers из config/balance.json."""
+    try:
+        server = json.loads(BALANCE_PATH.read_text(encoding="utf-8"))["server"]
+        return float(server["simulationIntervalMs"]), int(server["maxPlayers"])
+    except (OSError, ValueError, KeyError):
+        return 1000 / 30, 20
+
+
+# ============================================================================
+# msgpack (только кодирование — для сообщений клиента)
+# ============================================================================
+
+
+def _pack_str(text: str) -> bytes:
+    data = text.encode("utf-8")
+    if len(data) < 32:
+        return bytes([0xA0 | len(data)]) + data
+    if len(data) < 256:
+        return bytes([0xD9, len(data)]) + data
+    return struct.pack(">BH", 0xDA, len(data)) + data
+
+
+def pack(value) -> bytes:
+    """Закодировать None/bool/int/float/str/list/dict в msgpack."""
+    if value is None:
+        return b"\xc0"
+    if value is True:
+        return b"\xc3"
+    if value is False:
+        return b"\xc2"
+    if isinstance(value, int):
+        if 0 <= value < 128:
+            return bytes([value])
+        if -32 <= value < 0:
+            return struct.pack(">b", value)
+        if 0 <= value < 1 << 32:
+            return struct.pack(">BI", 0xCE, value)
+        return struct.pack(">Bq", 0xD3, value)
+    if isinstance(value, float):
+        return struct.pack(">Bd", 0xCB, value)
+    if isinstance(value, str):
+        return _pack_str(value)
+    if isinstance(value, (list, tuple)):
+        head = bytes([0x90 | len(value)]) if len(value) < 16 else struct.pack(">BH", 0xDC, len(value))
+        return head + b"".join(pack(item) for item in value)
+    if isinstance(value, dict):
+        head = bytes([0x80 | len(value)]) if len(value) < 16 else struct.pack(">BH", 0xDE, len(value))
+        return head + b"".join(_pack_str(str(key)) + pack(item) for key, item in value.items())
+    raise TypeError(f"msgpack: неподдерживаемый тип {type(value).__name__}")
+
+
+def room_message(message_type: str, payload) -> bytes:
+    """Сообщение room.send(type, payload) клиента Colyseus."""
+    return bytes([ROOM_DATA]) + _pack_str(message_type) + pack(payload)
+
+
+# ============================================================================
+# WebSocket (RFC 6455) поверх asyncio streams
+# ============================================================================
+
+
+def _mask(data: bytes, key: bytes) -> bytes:
+    if not data:
+        return data
+    size = len(data)
+    stream = (key * (size // 4 + 1))[:size]
+    return (int.from_bytes(data, "big") ^ int.from_bytes(stream, "big")).to_bytes(size, "big")
+
+
+def encode_frame(opcode: int, payload: bytes, masked: bool) -> bytes:
+    size = len(payload)
+    head = bytearray([0x80 | opcode])
+    mask_bit = 0x80 if masked else 0
+    if size < 126:
+        head.append(mask_bit | size)
+    elif size < 1 << 16:
+        head.append(mask_bit | 126)
+        head += struct.pack(">H", size)
+    else:
+        head.append(mask_bit | 127)
+        head += struct.pack(">Q", size)
+    if not masked:
+        return bytes(head) + payload
+    key = os.urandom(4)
+    return bytes(head) + key + _mask(payload, key)
+
+
+async def read_frame(reader: asyncio.StreamReader) -> Tuple[bool, int, bytes]:
+    """Прочитать кадр: (FIN, opcode, payload); маска снимается, если есть."""
+    first, second = await reader.readexactly(2)
+    size = second & 0x7F
+    if size == 126:
+        size = struct.unpack(">H", await reader.readexactly(2))[0]
+    elif size == 127:
+        size = struct.unpack(">Q", await reader.readexactly(8))[0]
+    key = await reader.readexactly(4) if second & 0x80 else None
+    payload = await reader.readexactly(size) if size else b""
+    return bool(first & 0x80), first & 0x0F, _mask(payload, key) if key else payload
+
+
+def _accept_key(key: str) -> str:
+    return base64.b64encode(hashlib.sha1((key + WS_GUID).encode("ascii")).digest()).decode("ascii")
+
+
+class WebSocket:
+    """Клиентское соединение: рукопожатие, маскированные кадры, ping с меткой времени."""
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+
+    @classmethod
+    async def connect(cls, url: str, timeout: float = CONNECT_TIMEOUT) -> "WebSocket":
+        parts = urlsplit(url)
+        secure = parts.scheme in ("wss", "https")
+        port = parts.port or (443 if secure else 80)
+        context = ssl.create_default_context() if secure else None
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(parts.hostname, port, ssl=context), timeout)
+        key = base64.b64encode(os.urandom(16)).decode("ascii")
+        target = parts.path + (f"?{parts.query}" if parts.query else "")
+        request = (
+            f"GET {target} HTTP/1.1\r\nHost: {parts.netloc}\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+            f"Sec-WebSocket-Key: {key}\r\nSec-WebSocket-Version: 13\r\n\r\n"
+        )
+        writer.write(request.encode("latin-1"))
+        try:
+            head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), timeout)
+        except BaseException:
+            writer.close()
+            raise
+        status_line, *header_lines = head.decode("latin-1").split("\r\n")
+        headers = {}
+        for line in header_lines:
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+        if " 101 " not in f"{status_line} " or headers.get("sec-websocket-accept") != _accept_key(key):
+            writer.close()
+            raise ConnectionError(f"WebSocket рукопожатие отклонено: {status_line}")
+        return cls(reader, writer)
+
+    def send(self, payload: bytes, opcode: int = OP_BINARY) -> None:
+        self.writer.write(encode_frame(opcode, payload, masked=True))
+
+    def ping(self) -> None:
+        self.send(struct.pack(">Q", time.perf_counter_ns()), OP_PING)
+
+    async def recv(self) -> Tuple[int, bytes]:
+        """Следующее сообщение (opcode, payload); на ping отвечает сам, фрагменты склеивает."""
+        parts: List[bytes] = []
+        message_opcode = OP_BINARY
+        while True:
+            fin, opcode, payload = await read_frame(self.reader)
+            if opcode == OP_PING:
+                self.send(payload, OP_PONG)
+                continue
+            if opcode in (OP_PONG, OP_CLOSE):
+                return opcode, payload
+            if opcode != OP_CONT:
+                message_opcode = opcode
+            parts.append(payload)
+            if fin:
+                return message_opcode, b"".join(parts)
+
+    def close(self) -> None:
+        try:
+            self.writer.write(encode_frame(OP_CLOSE, struct.pack(">H", 1000), masked=True))
+        except (ConnectionError, RuntimeError):
+            pass
+        self.writer.close()
+
+
+def _error_text(payload: bytes) -> str:
+    """Текст ERROR/LEAVE_ROOM Colyseus (код + строка) без полного декодера схемы."""
+    text = payload[1:].decode("utf-8", "ignore")
+    return "".join(ch for ch in text if ch.isprintable()).strip() or payload[1:].hex()
+
+
+# ============================================================================
+# Метрики
+# ============================================================================
+
+
+class ServerStats:
+    """Строки dt_avg/dt_max и [PERF] комнат роя за шаг."""
+
+    def __init__(self, budget_ms: float):
+        self.budget_ms = budget_ms
+        self.dt_avg = HdrHistogram()
+        self.dt_max = HdrHistogram()
+        self.seconds = 0
+        self.over_budget_seconds = 0
+        self.perf_lines = 0
+        self.dt_avg_sum = 0.0
+        self.players: Dict[str, int] = {}
+
+    def add(self, parsed: Tuple[str, str, int, float, float, int]) -> None:
+        kind, room, _tick, first, second, players = parsed
+        if kind == KIND_PERF:
+            self.perf_lines += 1
+            return
+        self.dt_avg.record(first)
+        self.dt_max.record(second)
+        self.dt_avg_sum += first
+        self.seconds += 1
+        if second > self.budget_ms:
+            self.over_budget_seconds += 1
+        self.players[room] = players
+
+    def summary(self, window_sec: float) -> Dict[str, object]:
+        # Каждая комната пишет строку раз в секунду: сумма dt_avg / бюджет / окно —
+        # доля времени однопоточного процесса, занятая тиками всех комнат
+        busy = self.dt_avg_sum / self.budget_ms / window_sec if window_sec > 0 else 0.0
+        return {
+            "samples": self.seconds,
+            "dt_avg": self.dt_avg.values(),
+            "dt_max": self.dt_max.values(),
+            "overBudgetShare": round(self.over_budget_seconds / self.seconds, 4) if self.seconds else None,
+            "perfLines": self.perf_lines,
+            "tickLoad": round(busy, 4),
+            "playersReported": sum(self.players.values()),
+        }
+
+
+class StepMetrics:
+    """Клиентские и серверные метрики одного шага (или прогрева)."""
+
+    def __init__(self, budget_ms: float):
+        self.started = time.monotonic()
+        self.patch_interval = HdrHistogram()
+        self.room_patch_interval: Dict[str, HdrHistogram] = {}
+        self.rtt = HdrHistogram()
+        self.input_lag = HdrHistogram()
+        self.counters = {
+            "patches": 0,
+            "patchBytes": 0,
+            "roomData": 0,
+            "inputsSent": 0,
+            "inputsSkipped": 0,
+            "joins": 0,
+            "joinFailures": 0,
+            "disconnects": 0,
+            "errors": 0,
+        }
+        self.server = ServerStats(budget_ms)
+
+    def patch(self, room_id: str, interval_ms: Optional[float], size: int) -> None:
+        self.counters["patches"] += 1
+        self.counters["patchBytes"] += size
+        if interval_ms is not None:
+            self.patch_interval.record(interval_ms)
+            histogram = self.room_patch_interval.get(room_id)
+            if histogram is None:
+                histogram = self.room_patch_interval[room_id] = HdrHistogram()
+            histogram.record(interval_ms)
+
+    def summary(self, bots: int, rooms: int) -> Dict[str, object]:
+        duration = max(time.monotonic() - self.started, 1e-9)
+        worst_room = max(
+            self.room_patch_interval.items(), key=lambda item: item[1].percentile(0.99) or 0, default=(None, None)
+        )
+        return {
+            "bots": bots,
+            "rooms": rooms,
+            "playersPerRoom": round(bots / rooms, 1) if rooms else 0,
+            "duration": round(duration, 1),
+            "patchInterval": self.patch_interval.values(),
+            "worstRoom": {"roomId": worst_room[0], **worst_room[1].values()} if worst_room[1] else None,
+            "rtt": self.rtt.values(),
+            "inputLag": self.input_lag.values(),
+            "patchKbPerClient": round(self.counters["patchBytes"] / 1024 / duration / bots, 2) if bots else 0,
+            "counters": dict(self.counters),
+            "server": self.server.summary(duration),
+            "histograms": {
+                "patchInterval": self.patch_interval.to_dict(),
+                "rtt": self.rtt.to_dict(),
+                "serverDtMax": self.server.dt_max.to_dict(),
+            },
+        }
+
+
+# ============================================================================
+# Источники серверного лога
+# ============================================================================
+
+
+class FileLogTail:
+    """Дочитывание файла лога с конца (переживает усечение и ротацию)."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.offset = path.stat().st_size if path.exists() else 0
+        self.partial = b""
+
+    def lines(self) -> List[str]:
+        try:
+            size = self.path.stat().st_size
+        except OSError:
+            return []
+        if size < self.offset:
+            self.offset, self.partial = 0, b""  # Файл пересоздан
+        if size == self.offset:
+            return []
+        with open(self.path, "rb") as f:
+            f.seek(self.offset)
+            data = self.partial + f.read(size - self.offset)
+        self.offset = size
+        *complete, self.partial = data.split(b"\n")
+        return [line.decode("utf-8", "replace") for line in complete]
+
+
+# ============================================================================
+# Бот
+# ============================================================================
+
+
+class RoomGroup:
+    """Комната роя: первый бот создаёт её, остальные входят по roomId."""
+
+    def __init__(self, index: int):
+        self.index = index
+        self.room_id: "asyncio.Future[str]" = asyncio.get_running_loop().create_future()
+        self.process_id = ""
+
+
+class Bot:
+    def __init__(self, bot_id: int, group: RoomGroup, leader: bool, swarm: "Swarm"):
+        self.bot_id = bot_id
+        self.group = group
+        self.leader = leader
+        self.swarm = swarm
+        self.rng = random.Random(bot_id)
+        self.name = f"bot-{bot_id}"
+        self.class_id = bot_id % 3
+        self.ws: Optional[WebSocket] = None
+        self.room_id = ""
+        self.last_patch: Optional[float] = None
+        self.seq = 0
+        self.in_room = False
+
+    async def _reserve_seat(self) -> Dict[str, object]:
+        options: Dict[str, object] = {"name": self.name, "classId": self.class_id}
+        token = await self.swarm.join_token(self.name)
+        if token:
+            options["joinToken"] = token
+        if self.leader:
+            path = f"/matchmake/create/{ROOM_NAME}"
+        else:
+            room_id = await asyncio.shield(self.group.room_id)
+            path = f"/matchmake/joinById/{room_id}"
+        status, data, _ = await self.swarm.http.request(
+            "POST", path, json.dumps(options).encode("utf-8"), {"Content-Type": "application/json"}
+        )
+        reservation = json.loads(data or b"{}")
+        if status != 200 or "room" not in reservation:
+            raise ConnectionError(f"matchmake {status}: {reservation.get('error', data[:200])}")
+        return reservation
+
+    async def run(self) -> None:
+        metrics = self.swarm.metrics
+        try:
+            reservation = await self._reserve_seat()
+            room = reservation["room"]
+            self.room_id = room["roomId"]
+            if self.leader:
+                self.group.process_id = room.get("processId", "")
+                self.group.room_id.set_result(self.room_id)
+            url = f"{self.swarm.ws_base}/{room.get('processId', '')}/{self.room_id}?sessionId={reservation['sessionId']}"
+            self.ws = await WebSocket.connect(url)
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            if self.leader and not self.group.room_id.done():
+                self.group.room_id.set_exception(exc)
+            self.swarm.metrics.counters["joinFailures"] += 1
+            self.swarm.note_error(f"вход бота {self.bot_id}: {exc}")
+            return
+
+        tasks: List[asyncio.Task] = []
+        try:
+            while True:
+                opcode, payload = await self.ws.recv()
+                metrics = self.swarm.metrics
+                if opcode == OP_PONG:
+                    if len(payload) == 8:
+                        metrics.rtt.record((time.perf_counter_ns() - struct.unpack(">Q", payload)[0]) / 1e6)
+                    continue
+                if opcode == OP_CLOSE:
+                    break
+                if not payload:
+                    continue
+                code = payload[0]
+                if code in (ROOM_STATE_PATCH, ROOM_STATE):
+                    now = time.perf_counter()
+                    interval = (now - self.last_patch) * 1000 if self.last_patch is not None and code == ROOM_STATE_PATCH else None
+                    self.last_patch = now
+                    metrics.patch(self.room_id, interval, len(payload))
+                elif code == ROOM_DATA:
+                    metrics.counters["roomData"] += 1
+                elif code == JOIN_ROOM:
+                    self.ws.send(bytes([JOIN_ROOM]))
+                    self.ws.send(room_message("selectClass", {"classId": self.class_id, "name": self.name}))
+                    metrics.counters["joins"] += 1
+                    self.swarm.joined += 1
+                    self.in_room = True
+                    tasks = [asyncio.ensure_future(self._input_loop()), asyncio.ensure_future(self._ping_loop())]
+                elif code == ERROR:
+                    metrics.counters["errors"] += 1
+                    self.swarm.note_error(f"бот {self.bot_id}: {_error_text(payload)}")
+                elif code == LEAVE_ROOM:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, OSError) as exc:
+            if not self.swarm.stopping:
+                self.swarm.note_error(f"бот {self.bot_id}: {exc.__class__.__name__}")
+        finally:
+            for task in tasks:
+                task.cancel()
+            if self.in_room:
+                self.swarm.joined -= 1
+            if not self.swarm.stopping:
+                self.swarm.metrics.counters["disconnects"] += 1
+            self.ws.close()
+
+    async def _input_loop(self) -> None:
+        """Ввод 30 Гц по абсолютному расписанию; пропущенные слоты не догоняются пачкой."""
+        period = 1 / INPUT_HZ
+        move_x = move_y = 0.0
+        next_ability = time.monotonic() + self.rng.uniform(2, 4)
+        next_choice = time.monotonic() + self.rng.uniform(8, 15)
+        scheduled = time.monotonic()
+        while True:
+            scheduled += period
+            delay = scheduled - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            now = time.monotonic()
+            metrics = self.swarm.metrics
+            lag = now - scheduled
+            metrics.input_lag.record(max(0.0, lag) * 1000)
+            if lag > period:
+                skipped = int(lag / period)
+                metrics.counters["inputsSkipped"] += skipped
+                scheduled += skipped * period
+
+            # Случайное блуждание: направление меняется плавно, как у пальца на джойстике
+            move_x = max(-1.0, min(1.0, move_x + self.rng.uniform(-0.3, 0.3)))
+            move_y = max(-1.0, min(1.0, move_y + self.rng.uniform(-0.3, 0.3)))
+            self.seq += 1
+            command: Dict[str, object] = {"seq": self.seq, "moveX": round(move_x, 3), "moveY": round(move_y, 3)}
+            if now >= next_ability:
+                command["abilitySlot"] = self.rng.randrange(3)
+                next_ability = now + self.rng.uniform(2, 4)
+            self.ws.send(room_message("input", command))
+            if now >= next_choice:
+                self.ws.send(room_message(self.rng.choice(("talentChoice", "cardChoice")), {"choice": self.rng.randrange(3)}))
+                next_choice = now + self.rng.uniform(8, 15)
+            metrics.counters["inputsSent"] += 1
+            await self.ws.writer.drain()
+
+    async def _ping_loop(self) -> None:
+        await asyncio.sleep(self.rng.uniform(0, PING_INTERVAL))
+        while True:
+            self.ws.ping()
+            await asyncio.sleep(PING_INTERVAL)
+
+
+# ============================================================================
+# Рой
+# ============================================================================
+
+
+class Swarm:
+    """
+    Набор ботов ступенями и сбор метрик по шагам.
+
+    Args:
+        server_url: http(s)://host:port матч-сервера Colyseus
+        room_size: Ботов в одной комнате
+        budget_ms: Бюджет тика (simulationIntervalMs)
+        meta_url: MetaServer для joinToken (если JOIN_TOKEN_REQUIRED)
+        log_source: FileLogTail или ContainerLogCursor
+    """
+
+    def __init__(
+        self,
+        server_url: str,
+        room_size: int,
+        budget_ms: float,
+        meta_url: Optional[str] = None,
+        log_source=None,
+        connections: int = 50,
+    ):
+        parts = urlsplit(server_url)
+        scheme = "wss" if parts.scheme == "https" else "ws"
+        self.ws_base = f"{scheme}://{parts.netloc}"
+        self.http = HttpPool(server_url, connections, CONNECT_TIMEOUT)
+        self.meta = HttpPool(meta_url, connections, CONNECT_TIMEOUT) if meta_url else None
+        self.room_size = room_size
+        self.budget_ms = budget_ms
+        self.log_source = log_source
+        self.metrics = StepMetrics(budget_ms)
+        self.groups: List[RoomGroup] = []
+        self.tasks: List[asyncio.Task] = []
+        self.joined = 0
+        self.stopping = False
+        self.errors: Dict[str, int] = {}
+        self.log_lines = 0
+
+    def note_error(self, message: str) -> None:
+        if len(self.errors) < 20 or message in self.errors:
+            self.errors[message] = self.errors.get(message, 0) + 1
+
+    async def join_token(self, name: str) -> Optional[str]:
+        if self.meta is None:
+            return None
+        status, data, _ = await self.meta.request("POST", "/api/v1/auth/guest", b"{}", {"Content-Type": "application/json"})
+        guest = json.loads(data or b"{}").get("guestToken") if status == 200 else None
+        if not guest:
+            raise ConnectionError(f"auth/guest {status}")
+        status, data, _ = await self.meta.request(
+            "POST", "/api/v1/auth/join-token", json.dumps({"nickname": name}).encode("utf-8"),
+            {"Content-Type": "application/json", "Authorization": f"Bearer {guest}"},
+        )
+        token = json.loads(data or b"{}").get("joinToken") if status == 200 else None
+        if not token:
+            raise ConnectionError(f"auth/join-token {status}")
+        return token
+
+    @property
+    def room_ids(self) -> List[str]:
+        return [group.room_id.result() for group in self.groups if group.room_id.done() and not group.room_id.exception()]
+
+    async def grow(self, target: int) -> None:
+        """Добавить ботов до target, заполняя комнаты по room_size."""
+        for bot_id in range(len(self.tasks), target):
+            index = bot_id // self.room_size
+            leader = index == len(self.groups)
+            if leader:
+                self.groups.append(RoomGroup(index))
+            bot = Bot(bot_id, self.groups[index], leader, self)
+            self.tasks.append(asyncio.ensure_future(bot.run()))
+            await asyncio.sleep(JOIN_SPACING)
+
+    async def poll_logs(self) -> None:
+        """Строки сервера → метрики текущего шага (только комнаты роя)."""
+        while True:
+            await asyncio.sleep(LOG_POLL_INTERVAL)
+            if isinstance(self.log_source, ContainerLogCursor):
+                lines = await asyncio.get_running_loop().run_in_executor(None, lambda: list(self.log_source.lines()))
+            else:
+                lines = self.log_source.lines()
+            rooms = set(self.room_ids)
+            for line in lines:
+                parsed = parse_line(line)
+                if parsed is not None and parsed[1] in rooms:
+                    self.metrics.server.add(parsed)
+                    self.log_lines += 1
+
+    async def run_steps(
+        self, steps: List[int], warmup: float, duration: float, report_interval: float = 10.0
+    ) -> List[Dict[str, object]]:
+        poller = asyncio.ensure_future(self.poll_logs()) if self.log_source is not None else None
+        results = []
+        try:
+            for number, target in enumerate(steps, 1):
+                rooms = math.ceil(target / self.room_size)
+                print(f"[INFO] Шаг {number}/{len(steps)}: {target} ботов, комнат {rooms}, прогрев {warmup:.0f} с, замер {duration:.0f} с")
+                self.metrics = StepMetrics(self.budget_ms)
+                await self.grow(target)
+                await asyncio.sleep(warmup)
+                self.metrics = StepMetrics(self.budget_ms)
+                deadline = time.monotonic() + duration
+                while time.monotonic() < deadline:
+                    await asyncio.sleep(min(report_interval, max(0.0, deadline - time.monotonic())))
+                    patch = self.metrics.patch_interval.percentile(0.99)
+                    print(
+                        f"[INFO]   в комнатах {self.joined}/{target}, патчей {self.metrics.counters['patches']}, "
+                        f"patch p99 {patch or 0:.1f} мс, строк сервера {self.metrics.server.seconds}"
+                    )
+                results.append({"step": number, **self.metrics.summary(self.joined, len(self.room_ids))})
+        finally:
+            self.stopping = True
+            if poller:
+                poller.cancel()
+            for task in self.tasks:
+                task.cancel()
+            await asyncio.gather(*self.tasks, *([poller] if poller else []), return_exceptions=True)
+            self.http.close()
+            if self.meta:
+                self.meta.close()
+        return results
+
+
+# ============================================================================
+# Отчёт
+# ============================================================================
+
+
+def _fmt(value: Optional[float], digits: int = 1) -> str:
+    return "—" if value is None else f"{value:.{digits}f}"
+
+
+def estimate_capacity(results: List[Dict[str, object]], budget_ms: float, target_util: float, cores: Optional[int]) -> Dict[str, object]:
+    """
+    Ёмкость по шагам: самый нагруженный шаг, где dt_max p99 в бюджете.
+
+    Комнат на ядро = target_util × бюджет / dt_avg (среднее за шаг): тики всех
+    комнат процесса Node исполняются в одном потоке друг за другом.
+    """
+    within = [
+        result for result in results
+        if result["server"]["samples"] and result["server"]["dt_max"]["p(99)"] is not None
+        and result["server"]["dt_max"]["p(99)"] <= budget_ms
+    ]
+    if not within:
+        return {"withinBudget": False}
+    best = max(within, key=lambda result: (result["playersPerRoom"], result["bots"]))
+    dt_avg = best["server"]["dt_avg"]["avg"] or 0.0
+    rooms_per_core = int(target_util * budget_ms / dt_avg) if dt_avg > 0 else None
+    capacity = {
+        "withinBudget": True,
+        "step": best["step"],
+        "playersPerRoom": best["playersPerRoom"],
+        "dtAvgMs": dt_avg,
+        "dtMaxP99Ms": best["server"]["dt_max"]["p(99)"],
+        "roomsPerCore": rooms_per_core,
+        "playersPerCore": int(rooms_per_core * best["playersPerRoom"]) if rooms_per_core is not None else None,
+    }
+    if cores and rooms_per_core is not None:
+        capacity["serverCores"] = cores
+        capacity["serverCcu"] = capacity["playersPerCore"] * cores
+    return capacity
+
+
+def print_report(results: List[Dict[str, object]], capacity: Dict[str, object], budget_ms: float, target_util: float) -> None:
+    print("\n" + "=" * 118)
+    print(f"BOT SWARM — бюджет тика {budget_ms:.1f} мс")
+    print("=" * 118)
+    print(
+        f"{'ботов':>6} {'комнат':>6} {'игр/комн':>8} | {'dt_avg p95':>10} {'dt_max p95':>10} {'dt_max p99':>10} "
+        f"{'>бюджета':>8} {'загрузка':>8} | {'патч p99':>8} {'RTT p99':>8} {'ввод p99':>8} {'КБ/с':>6}"
+    )
+    for result in results:
+        server = result["server"]
+        over = server["overBudgetShare"]
+        print(
+            f"{result['bots']:>6} {result['rooms']:>6} {result['playersPerRoom']:>8} | "
+            f"{_fmt(server['dt_avg']['p(95)'], 2):>10} {_fmt(server['dt_max']['p(95)'], 2):>10} {_fmt(server['dt_max']['p(99)'], 2):>10} "
+            f"{'—' if over is None else f'{over * 100:.1f}%':>8} {server['tickLoad'] * 100:>7.0f}% | "
+            f"{_fmt(result['patchInterval']['p(99)']):>8} {_fmt(result['rtt']['p(99)']):>8} "
+            f"{_fmt(result['inputLag']['p(99)']):>8} {result['patchKbPerClient']:>6}"
+        )
+    print("-" * 118)
+    print("dt_* — строки ArenaRoom раз в секунду на комнату; загрузка — доля потока Node под тиками комнат роя")
+
+    for result in results:
+        counters = result["counters"]
+        if counters["joinFailures"] or counters["disconnects"] or counters["errors"]:
+            print(
+                f"[WARN] Шаг {result['step']}: не вошли {counters['joinFailures']}, отвалились {counters['disconnects']}, "
+                f"ошибок сервера {counters['errors']}"
+            )
+        lag = result["inputLag"]["p(99)"]
+        if lag is not None and lag > INPUT_LAG_WARN_MS:
+            print(
+                f"[WARN] Шаг {result['step']}: ввод отстаёт от 30 Гц (p99 {lag:.1f} мс) — клиент перегружен, "
+                "замеры патчей и RTT завышены; запустите несколько процессов роя"
+            )
+    if not any(result["server"]["samples"] for result in results):
+        print("[WARN] Нет строк dt_avg/dt_max комнат роя: укажите --container или --server-log")
+        return
+
+    if not capacity.get("withinBudget"):
+        print(f"[ERROR] Ни на одном шаге dt_max p99 не уложился в {budget_ms:.1f} мс")
+        return
+    print(
+        f"[OK] В бюджете: {capacity['playersPerRoom']:g} игроков в комнате "
+        f"(dt_avg {capacity['dtAvgMs']:.2f} мс, dt_max p99 {capacity['dtMaxP99Ms']:.2f} мс)"
+    )
+    if capacity["roomsPerCore"] is not None:
+        line = (
+            f"[OK] Оценка: {capacity['roomsPerCore']} комнат на ядро при загрузке {target_util * 100:.0f}% "
+            f"(~{capacity['playersPerCore']} игроков)"
+        )
+        if "serverCcu" in capacity:
+            line += f", на {capacity['serverCores']} ядрах ~{capacity['serverCcu']} CCU"
+        print(line)
+
+
+# ============================================================================
+# Заглушка Colyseus для --self-test
+# ============================================================================
+
+
+class _StubRoom:
+    def __init__(self, room_id: str):
+        self.room_id = room_id
+        self.clients: List[asyncio.StreamWriter] = []
+        self.seats = 0
+        self.inputs = 0
+        self.tick = 0
+
+
+class StubColyseus:
+    """
+    Матчмейкинг create/joinById, WebSocket-комнаты с патчами 20 Гц и ответом на ping,
+    строки `room=... dt_avg=... dt_max=... players=N` в файл лога раз в секунду
+    (время тика растёт с числом игроков — чтобы отчёт показал выход за бюджет).
+    """
+
+    def __init__(self, log_path: Path, max_players: int, budget_ms: float):
+        self.log_path = log_path
+        self.max_players = max_players
+        self.budget_ms = budget_ms
+        self.rooms: Dict[str, _StubRoom] = {}
+        self.tasks: List[asyncio.Task] = []
+        self.server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self) -> str:
+        self.server = await asyncio.start_server(self._connection, "127.0.0.1", 0)
+        self.tasks = [asyncio.ensure_future(self._patch_loop()), asyncio.ensure_future(self._stats_loop())]
+        return f"http://127.0.0.1:{self.server.sockets[0].getsockname()[1]}"
+
+    async def stop(self) -> None:
+        for task in self.tasks:
+            task.cancel()
+        self.server.close()
+        await self.server.wait_closed()
+
+    @property
+    def inputs(self) -> int:
+        return sum(room.inputs for room in self.rooms.values())
+
+    def _matchmake(self, target: str) -> Tuple[str, Dict[str, object]]:
+        if target == f"/matchmake/create/{ROOM_NAME}":
+            room = _StubRoom(uuid.uuid4().hex[:9])
+            self.rooms[room.room_id] = room
+        elif target.startswith("/matchmake/joinById/"):
+            room = self.rooms.get(target.rsplit("/", 1)[1])
+            if room is None or room.seats >= self.max_players:
+                return "400 Bad Request", {"code": 4212, "error": "room is locked"}
+        else:
+            return "404 Not Found", {"error": "not_found"}
+        room.seats += 1
+        return "200 OK", {"room": {"roomId": room.room_id, "processId": "stub"}, "sessionId": uuid.uuid4().hex[:9]}
+
+    async def _connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                request_line, *header_lines = head.decode("latin-1").split("\r\n")
+                method, target = request_line.split()[:2]
+                headers = {}
+                for line in header_lines:
+                    name, _, value = line.partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                if headers.get("upgrade", "").lower() == "websocket":
+                    await self._websocket(reader, writer, target, headers["sec-websocket-key"])
+                    return
+                length = int(headers.get("content-length", 0))
+                if length:
+                    await reader.readexactly(length)
+                status, payload = self._matchmake(target) if method == "POST" else ("404 Not Found", {"error": "not_found"})
+                data = json.dumps(payload).encode("utf-8")
+                writer.write(f"HTTP/1.1 {status}\r\nContent-Type: application/json\r\nContent-Length: {len(data)}\r\n\r\n".encode() + data)
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            pass  # Клиент закрыл соединение или цикл событий завершается
+        finally:
+            writer.close()
+
+    async def _websocket(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, target: str, key: str) -> None:
+        writer.write(
+            "HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+            f"Sec-WebSocket-Accept: {_accept_key(key)}\r\n\r\n".encode("latin-1")
+        )
+        room = self.rooms.get(urlsplit(target).path.rsplit("/", 1)[1])
+        if room is None:
+            writer.write(encode_frame(OP_BINARY, bytes([ERROR, 4212]) + _pack_str("room not found"), masked=False))
+            return
+        writer.write(encode_frame(OP_BINARY, bytes([JOIN_ROOM, 0, 6]) + b"schema", masked=False))
+        try:
+            while True:
+                _fin, opcode, payload = await read_frame(reader)
+                if opcode == OP_PING:
+                    writer.write(encode_frame(OP_PONG, payload, masked=False))
+                elif opcode == OP_CLOSE:
+                    break
+                elif payload[:1] == bytes([JOIN_ROOM]):
+                    room.clients.append(writer)
+                    writer.write(encode_frame(OP_BINARY, bytes([ROOM_STATE]) + os.urandom(256), masked=False))
+                elif payload[:1] == bytes([ROOM_DATA]) and payload[1:7] == b"\xa5input":
+                    room.inputs += 1
+        finally:
+            if writer in room.clients:
+                room.clients.remove(writer)
+            room.seats -= 1
+
+    async def _patch_loop(self) -> None:
+        while True:
+            await asyncio.sleep(0.05)
+            for room in list(self.rooms.values()):
+                frame = encode_frame(OP_BINARY, bytes([ROOM_STATE_PATCH]) + os.urandom(16 + 24 * len(room.clients)), masked=False)
+                for writer in room.clients:
+                    writer.write(frame)
+
+    async def _stats_loop(self) -> None:
+        with open(self.log_path, "a", encoding="utf-8") as log:
+            while True:
+                await asyncio.sleep(1.0)
+                for room in list(self.rooms.values()):
+                    room.tick += INPUT_HZ
+                    players = len(room.clients)
+                    if not players:
+                        continue
+                    dt_avg = 0.5 + 0.35 * players ** 1.8 * random.uniform(0.9, 1.1)
+                    dt_max = dt_avg * random.uniform(1.5, 2.5)
+                    log.write(
+                        f"room={room.room_id} tick={room.tick} dt_avg={dt_avg:.2f}ms dt_max={dt_max:.2f}ms "
+                        f"players={players} orbs=120 chests=3\n"
+                    )
+                    if dt_max > self.budget_ms:
+                        log.write(f"[PERF] room={room.room_id} tick={room.tick} took {dt_max:.2f}ms (budget: {self.budget_ms:.2f}ms)\n")
+                log.flush()
+
+
+# ============================================================================
+# Main
+# ============================================================================
+
+
+async def _main(args: argparse.Namespace) -> int:
+    budget_ms, max_players = _balance_server()
+    budget_ms = args.budget_ms or budget_ms
+    steps = [int(step) for step in args.steps.split(",") if step.strip()]
+    room_size = args.room_size or max_players
+    if room_size > max_players and not args.self_test:
+        print(f"[WARN] --room-size {room_size} больше maxPlayers={max_players} в balance.json: лишние боты не войдут")
+
+    stub = None
+    log_dir = None
+    if args.self_test:
+        log_dir = tempfile.TemporaryDirectory(prefix="bot-swarm-")
+        args.server_log = Path(log_dir.name) / "server.log"
+        args.server_log.touch()
+        stub = StubColyseus(args.server_log, max(room_size, max_players), budget_ms)
+        args.server_url = await stub.start()
+        print(f"[INFO] Self-test: заглушка Colyseus {args.server_url}, лог {args.server_log}")
+
+    if args.container:
+        log_source = ContainerLogCursor(args.container, initial_since="1s")
+    elif args.server_log:
+        log_source = FileLogTail(args.server_log)
+    else:
+        log_source = None
+
+    swarm = Swarm(args.server_url, room_size, budget_ms, args.meta_url, log_source)
+    print(f"[INFO] Colyseus {args.server_url}: шаги {steps} ботов, по {room_size} в комнате, ввод {INPUT_HZ} Гц")
+    try:
+        results = await swarm.run_steps(steps, args.warmup, args.step_duration)
+    finally:
+        if stub:
+            await stub.stop()
+
+    capacity = estimate_capacity(results, budget_ms, args.target_util, args.server_cores)
+    print_report(results, capacity, budget_ms, args.target_util)
+    for message, count in list(swarm.errors.items())[:10]:
+        print(f"[WARN] {message}" + (f" (×{count})" if count > 1 else ""))
+
+    if args.out:
+        report = {"budgetMs": budget_ms, "roomSize": room_size, "targetUtil": args.target_util, "steps": results, "capacity": capacity}
+        args.out.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"[OK] Результаты: {args.out}")
+
+    if args.self_test:
+        log_dir.cleanup()
+        last = results[-1] if results else None
+        if not last or not last["counters"]["patches"] or not last["rtt"]["count"] or not last["server"]["samples"] or not stub.inputs:
+            print("[ERROR] Self-test: нет патчей, RTT, ввода или строк сервера")
+            return 1
+        print(f"[OK] Self-test: заглушка приняла {stub.inputs} сообщений input")
+    return 0 if any(result["bots"] for result in results) else 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Рой ботов ArenaRoom: время тика при заданном числе игроков")
+    parser.add_argument("--server-url", default=SERVER_URL, help=f"Матч-сервер Colyseus (по умолчанию: {SERVER_URL})")
+    parser.add_argument("--meta-url", default=None, help="MetaServer для joinToken (при JOIN_TOKEN_REQUIRED)")
+    parser.add_argument("--steps", default=DEFAULT_STEPS, help=f"Всего ботов на шагах (по умолчанию: {DEFAULT_STEPS})")
+    parser.add_argument("--room-size", type=int, default=None, help="Ботов в комнате (по умолчанию maxPlayers из balance.json)")
+    parser.add_argument("--step-duration", type=float, default=DEFAULT_STEP_DURATION, help="Замер на шаге (сек)")
+    parser.add_argument("--warmup", type=float, default=DEFAULT_WARMUP, help="Прогрев после набора шага (сек)")
+    parser.add_argument("--container", default=None, help="Контейнер матч-сервера для docker logs")
+    parser.add_argument("--server-log", type=Path, default=None, help="Файл лога матч-сервера (вместо --container)")
+    parser.add_argument("--budget-ms", type=float, default=None, help="Бюджет тика (по умолчанию simulationIntervalMs)")
+    parser.add_argument("--target-util", type=float, default=DEFAULT_TARGET_UTIL, help="Допустимая загрузка ядра тиками")
+    parser.add_argument("--server-cores", type=int, default=None, help="Ядер сервера для оценки CCU")
+    parser.add_argument("--out", type=Path, default=None, help="Сохранить результаты в JSON")
+    parser.add_argument("--self-test", action="store_true", help="Прогон против локальной заглушки Colyseus")
+    args = parser.parse_args()
+
+    if args.self_test and args.steps == DEFAULT_STEPS:
+        args.steps, args.room_size = "4,16", args.room_size or 8
+        args.step_duration, args.warmup = min(args.step_duration, 4.0), min(args.warmup, 1.5)
+
+    try:
+        sys.exit(asyncio.run(_main(args)))
+    except KeyboardInterrupt:
+        print("\n[INFO] Прервано пользователем")
+        sys.exit(130)
+
+
+if __name__ == "__main__":
+    main()
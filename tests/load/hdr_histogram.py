@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+HDR-гистограмма латентности для нагрузочных инструментов
+
+Логарифмически-линейные корзины как в HdrHistogram: значения в микросекундах,
+в каждой степени двойки SUB_BUCKETS / 2 линейных корзин, поэтому
+относительная ошибка перцентиля не больше 1 / (SUB_BUCKETS / 2) (~0.8%)
+на всём диапазоне — от долей миллисекунды до минут. Память — несколько
+тысяч счётчиков независимо от числа измерений; гистограммы складываются
+(по сценариям, по процессам) и сериализуются в JSON.
+
+Требования: Python 3.9+
+"""
+
+from typing import Dict, List, Optional
+
+SUB_BUCKET_BITS = 8
+SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+HALF_BUCKETS = SUB_BUCKETS // 2
+
+
+def _index(value: int) -> int:
+    if value < SUB_BUCKETS:
+        return value
+    shift = value.bit_length() - SUB_BUCKET_BITS
+    return SUB_BUCKETS + (shift - 1) * HALF_BUCKETS + (value >> shift) - HALF_BUCKETS
+
+
+def _bounds(index: int) -> tuple:
+    """[нижняя, верхняя) граница корзины в микросекундах."""
+    if index < SUB_BUCKETS:
+        return index, index + 1
+    shift = (index - SUB_BUCKETS) // HALF_BUCKETS + 1
+    low = ((index - SUB_BUCKETS) % HALF_BUCKETS + HALF_BUCKETS) << shift
+    return low, low + (1 << shift)
+
+
+class HdrHistogram:
+    """Гистограмма значений в миллисекундах (хранятся микросекунды)."""
+
+    def __init__(self):
+        self.counts: List[int] = []
+        self.count = 0
+        self.total_us = 0
+        self.min_us: Optional[int] = None
+        self.max_us = 0
+
+    def record(self, value_ms: float, count: int = 1) -> None:
+        value = max(0, int(value_ms * 1000))
+        index = _index(value)
+        if index >= len(self.counts):
+            self.counts.extend([0] * (index + 1 - len(self.counts)))
+        self.counts[index] += count
+        self.count += count
+        self.total_us += value * count
+        self.min_us = value if self.min_us is None else min(self.min_us, value)
+        self.max_us = max(self.max_us, value)
+
+    def merge(self, other: "HdrHistogram") -> None:
+        if len(other.counts) > len(self.counts):
+            self.counts.extend([0] * (len(other.counts) - len(self.counts)))
+        for index, count in enumerate(other.counts):
+            self.counts[index] += count
+        self.count += other.count
+        self.total_us += other.total_us
+        if other.min_us is not None:
+            self.min_us = other.min_us if self.min_us is None else min(self.min_us, other.min_us)
+        self.max_us = max(self.max_us, other.max_us)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Значение (мс), не меньше которого доля q измерений; q в [0, 1]."""
+        if self.count == 0:
+            return None
+        rank = max(1, round(q * self.count))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                low, high = _bounds(index)
+                value = min((low + high - 1) / 2, self.max_us)
+                return max(value, self.min_us or 0) / 1000
+        return self.max_us / 1000
+
+    @property
+    def mean(self) -> Optional[float]:
+        return self.total_us / self.count / 1000 if self.count else None
+
+    def values(self) -> Dict[str, Optional[float]]:
+        """Сводка в терминах k6: avg, min, med, max, p(90), p(95), p(99)."""
+        def ms(value):
+            return None if value is None else round(value, 2)
+
+        return {
+            "count": self.count,
+            "avg": ms(self.mean),
+            "min": ms(None if self.min_us is None else self.min_us / 1000),
+            "med": ms(self.percentile(0.5)),
+            "max": ms(self.max_us / 1000 if self.count else None),
+            "p(90)": ms(self.percentile(0.9)),
+            "p(95)": ms(self.percentile(0.95)),
+            "p(99)": ms(self.percentile(0.99)),
+        }
+
+    def to_dict(self) -> Dict[str, object]:
+        """Разреженная сериализация: {индекс: счётчик} только непустых корзин."""
+        return {
+            "subBucketBits": SUB_BUCKET_BITS,
+            "count": self.count,
+            "totalUs": self.total_us,
+            "minUs": self.min_us,
+            "maxUs": self.max_us,
+            "counts": {str(index): count for index, count in enumerate(self.counts) if count},
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, object]) -> "HdrHistogram":
+        if data.get("subBucketBits") != SUB_BUCKET_BITS:
+            raise ValueError(f"Несовместимая гистограмма: subBucketBits={data.get('subBucketBits')}")
+        histogram = cls()
+        counts = {int(index): count for index, count in data["counts"].items()}
+        histogram.counts = [counts.get(index, 0) for index in range(max(counts, default=-1) + 1)]
+        histogram.count = data["count"]
+        histogram.total_us = data["totalUs"]
+        histogram.min_us = data["minUs"]
+        histogram.max_us = data["maxUs"]
+        return histogram
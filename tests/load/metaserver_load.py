@@ -0,0 +1,825 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+MetaServer Load — асинхронный генератор нагрузки на MetaServer (локальная замена k6)
+
+Повторяет сценарий tests/load/soft-launch.js (health, auth/verify, config,
+profile, matchmaking join/status/cancel, match-results/submit каждую 5-ю
+итерацию, wallet) без k6 — только стандартная библиотека Python и asyncio.
+
+Модель нагрузки открытая (как ramping-arrival-rate в k6): новые сессии
+игроков приходят с заданной частотой независимо от того, как быстро
+отвечает сервер, поэтому замедление сервера не снижает нагрузку
+(в закрытой модели k6 с VU оно её снижает и маскирует деградацию).
+Сессия — вход и --iterations итераций сценария; одновременных сессий
+(CCU) по закону Литтла ≈ частота прихода × длительность сессии: при
+10 итерациях по ~2.5 с 20 сессий/с дают ~500 CCU. Сверх --max-vus
+сессии не запускаются и считаются в dropped_iterations.
+
+Запросы идут через пул keep-alive соединений (--connections): тысячи
+сессий делят сотню TCP-соединений, как за балансировщиком. Латентность
+пишется в HDR-гистограммы (hdr_histogram.py) по метрикам k6
+(http_req_duration, auth_latency, ...), пороги задаются в синтаксисе k6
+и по умолчанию совпадают с soft-launch.js; код выхода 99 — пороги не
+выполнены (как у k6).
+
+Проверка детекта watchdog под нагрузкой: с --watchdog-dir (SHARED_DIR
+watchdog) и/или --probe-metrics (PROBE_METRICS_FILE) файлы watchdog
+опрашиваются во время прогона, авто-рестарты и проваленные пробы
+попадают в хронологию отчёта со временем от начала прогона.
+
+Проверка без сервера (локальная заглушка MetaServer):
+    python3 tests/load/metaserver_load.py --self-test
+
+Прогон как soft-launch.js (~500 CCU):
+    python3 tests/load/metaserver_load.py --base-url http://localhost:3000 \\
+        --stages 1m:4,2m:12,2m:20,5m:20,1m:0 --out tests/load/results-py.json
+
+Постоянная нагрузка рядом с watchdog:
+    python3 tests/load/metaserver_load.py --rate 30 --duration 10m \\
+        --watchdog-dir /opt/slime-arena/shared --probe-metrics /opt/slime-arena/watchdog/probe-metrics.json
+
+Требования: Python 3.9+
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import ssl
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from hdr_histogram import HdrHistogram  # noqa: E402
+
+# ============================================================================
+# Конфигурация
+# ============================================================================
+
+BASE_URL = os.getenv("BASE_URL", "http://localhost:3000")
+SERVER_TOKEN = os.getenv("SERVER_TOKEN", "test-server-token")
+
+# Этапы: длительность:сессий в секунду (линейный переход от предыдущего значения)
+DEFAULT_STAGES = "1m:4,2m:12,2m:20,5m:20,1m:0"
+DEFAULT_ITERATIONS = 10
+
+# Потолок одновременных сессий и размер пула соединений
+DEFAULT_MAX_VUS = 2000
+DEFAULT_CONNECTIONS = 100
+
+# Разных игроков (platformAuthToken повторяются — как возвращающиеся игроки)
+DEFAULT_USERS = 1000
+
+REQUEST_TIMEOUT = 10.0
+
+# Сколько ждать незавершённые сессии после последнего этапа (как gracefulStop в k6)
+GRACEFUL_STOP = 30.0
+
+REPORT_INTERVAL = 10.0
+WATCHDOG_POLL_INTERVAL = 2.0
+
+# Пороги soft-launch.js
+DEFAULT_THRESHOLDS = [
+    "http_req_duration:p(99)<2000",
+    "errors:rate<0.01",
+    "auth_latency:p(95)<1500",
+    "config_latency:p(95)<500",
+    "matchmaking_latency:p(95)<1000",
+    "match_results_latency:p(95)<1500",
+]
+
+TRENDS = ["http_req_duration", "http_req_blocked", "auth_latency", "config_latency", "matchmaking_latency", "match_results_latency"]
+COUNTERS = ["http_reqs", "iterations", "dropped_iterations", "successful_auths", "successful_match_results"]
+
+THRESHOLD_RE = re.compile(r"^(\w+):(p\(\d+(?:\.\d+)?\)|avg|med|max|min|rate|count)\s*(<=|<|>=|>)\s*([\d.]+)$")
+
+
+def parse_duration(text: str) -> float:
+    """'90s', '5m', '1h', '1m30s' → секунды."""
+    total = 0.0
+    for value, unit in re.findall(r"(\d+(?:\.\d+)?)([hms]?)", text):
+        total += float(value) * {"h": 3600, "m": 60, "s": 1, "": 1}[unit]
+    return total
+
+
+def parse_stages(text: str) -> List[Tuple[float, float]]:
+    """'1m:4,2m:12' → [(60, 4.0), (120, 12.0)]"""
+    stages = []
+    for part in text.split(","):
+        duration, _, target = part.strip().partition(":")
+        stages.append((parse_duration(duration), float(target)))
+    return stages
+
+
+# ============================================================================
+# HTTP/1.1 keep-alive пул
+# ============================================================================
+
+
+class _Connection:
+    """Одно keep-alive соединение: запрос → ответ, последовательно."""
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+
+    async def request(self, method: str, target: str, host: str, headers: Dict[str, str], body: bytes) -> Tuple[int, bool, bytes]:
+        lines = [f"{method} {target} HTTP/1.1", f"Host: {host}", f"Content-Length: {len(body)}", "Connection: keep-alive"]
+        lines += [f"{name}: {value}" for name, value in headers.items()]
+        self.writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body)
+        await self.writer.drain()
+
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionResetError("Соединение закрыто сервером")
+        status = int(status_line.split(None, 2)[1])
+        response_headers: Dict[str, str] = {}
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            response_headers[name.strip().lower()] = value.strip()
+
+        keep_alive = response_headers.get("connection", "").lower() != "close"
+        if response_headers.get("transfer-encoding", "").lower() == "chunked":
+            chunks = []
+            while True:
+                size = int((await self.reader.readline()).split(b";")[0], 16)
+                if size == 0:
+                    while (await self.reader.readline()) not in (b"\r\n", b"\n", b""):
+                        pass  # Трейлеры
+                    break
+                chunks.append(await self.reader.readexactly(size))
+                await self.reader.readexactly(2)
+            data = b"".join(chunks)
+        elif "content-length" in response_headers:
+            data = await self.reader.readexactly(int(response_headers["content-length"]))
+        elif status in (204, 304) or method == "HEAD":
+            data = b""
+        else:
+            data = await self.reader.read()
+            keep_alive = False
+        return status, keep_alive, data
+
+    def close(self) -> None:
+        self.writer.close()
+
+
+class HttpPool:
+    """
+    Пул keep-alive соединений к одному хосту.
+
+    Args:
+        base_url: http(s)://host:port
+        size: Максимум одновременных соединений
+        timeout: Таймаут запроса (сек)
+    """
+
+    def __init__(self, base_url: str, size: int = DEFAULT_CONNECTIONS, timeout: float = REQUEST_TIMEOUT):
+        parts = urlsplit(base_url)
+        self.secure = parts.scheme == "https"
+        self.host = parts.hostname or "localhost"
+        self.port = parts.port or (443 if self.secure else 80)
+        self.host_header = parts.netloc
+        self.timeout = timeout
+        self.opened = 0
+        self._idle: List[_Connection] = []
+        self._slots = asyncio.Semaphore(size)
+
+    async def _open(self) -> _Connection:
+        context = ssl.create_default_context() if self.secure else None
+        reader, writer = await asyncio.open_connection(self.host, self.port, ssl=context)
+        self.opened += 1
+        return _Connection(reader, writer)
+
+    async def request(
+        self, method: str, path: str, body: bytes = b"", headers: Optional[Dict[str, str]] = None
+    ) -> Tuple[int, bytes, float]:
+        """Выполнить запрос; вернуть статус, тело и ожидание свободного соединения (мс, как http_req_blocked в k6)."""
+        waiting = time.perf_counter()
+        async with self._slots:
+            blocked_ms = (time.perf_counter() - waiting) * 1000
+            for _ in range(2):
+                connection = self._idle.pop() if self._idle else None
+                fresh = connection is None
+                if fresh:
+                    connection = await asyncio.wait_for(self._open(), self.timeout)
+                try:
+                    status, keep_alive, data = await asyncio.wait_for(
+                        connection.request(method, path, self.host_header, headers or {}, body), self.timeout
+                    )
+                except (ConnectionError, asyncio.IncompleteReadError):
+                    connection.close()
+                    if fresh:
+                        raise
+                    continue  # Сервер закрыл простаивающее соединение — повтор на новом
+                except BaseException:
+                    connection.close()
+                    raise
+                if keep_alive:
+                    self._idle.append(connection)
+                else:
+                    connection.close()
+                return status, data, blocked_ms
+            raise ConnectionResetError("Соединение закрыто сервером")
+
+    def close(self) -> None:
+        for connection in self._idle:
+            connection.close()
+        self._idle.clear()
+
+
+# ============================================================================
+# Метрики
+# ============================================================================
+
+
+class Metrics:
+    """Метрики прогона в терминах k6: тренды (HDR), счётчики, доля ошибок."""
+
+    def __init__(self):
+        self.trends: Dict[str, HdrHistogram] = {name: HdrHistogram() for name in TRENDS}
+        self.counters: Dict[str, int] = {name: 0 for name in COUNTERS}
+        self.checks = 0
+        self.failed_checks = 0
+        self.failed_requests = 0
+        self.vus = 0
+        self.vus_max = 0
+        self.window = HdrHistogram()  # http_req_duration с последнего отчёта о ходе
+        self.window_failed = 0
+
+    def request(self, duration_ms: float, blocked_ms: float, failed: bool, trend: Optional[str] = None) -> None:
+        self.trends["http_req_duration"].record(duration_ms)
+        self.trends["http_req_blocked"].record(blocked_ms)
+        self.window.record(duration_ms)
+        self.counters["http_reqs"] += 1
+        if failed:
+            self.failed_requests += 1
+            self.window_failed += 1
+        if trend:
+            self.trends[trend].record(duration_ms)
+
+    def check(self, ok: bool) -> None:
+        """Проверка, входящая в метрику errors (errorRate.add в soft-launch.js)."""
+        self.checks += 1
+        if not ok:
+            self.failed_checks += 1
+
+    def summary(self, duration_sec: float) -> Dict[str, object]:
+        """Сводка в формате data.metrics из handleSummary k6."""
+        metrics: Dict[str, Dict[str, object]] = {}
+        for name, histogram in self.trends.items():
+            metrics[name] = {"type": "trend", "values": histogram.values()}
+        for name, count in self.counters.items():
+            metrics[name] = {"type": "counter", "values": {"count": count, "rate": round(count / max(duration_sec, 1e-9), 2)}}
+        metrics["errors"] = {
+            "type": "rate",
+            "values": {"rate": self.failed_checks / self.checks if self.checks else 0.0, "passes": self.failed_checks, "fails": self.checks - self.failed_checks},
+        }
+        requests = self.counters["http_reqs"]
+        metrics["http_req_failed"] = {"type": "rate", "values": {"rate": self.failed_requests / requests if requests else 0.0}}
+        metrics["vus_max"] = {"type": "gauge", "values": {"value": self.vus_max}}
+        return {"state": {"testRunDurationMs": round(duration_sec * 1000)}, "metrics": metrics}
+
+
+def evaluate_thresholds(summary: Dict[str, object], thresholds: List[str]) -> List[Dict[str, object]]:
+    """Проверить пороги вида 'метрика:p(99)<2000' по сводке."""
+    results = []
+    for threshold in thresholds:
+        match = THRESHOLD_RE.match(threshold.strip())
+        if not match:
+            raise ValueError(f"Неверный порог: {threshold} (ожидается метрика:p(99)<2000)")
+        name, stat, op, limit = match.group(1), match.group(2), match.group(3), float(match.group(4))
+        metric = summary["metrics"].get(name)
+        value = metric["values"].get(stat) if metric else None
+        if value is None:
+            ok = True  # Метрики не было (например, ни одной отправки результатов) — как в k6, порог не нарушен
+        else:
+            ok = {"<": value < limit, "<=": value <= limit, ">": value > limit, ">=": value >= limit}[op]
+        results.append({"metric": name, "threshold": f"{stat}{op}{match.group(4)}", "value": value, "ok": ok})
+        if metric is not None:
+            metric.setdefault("thresholds", {})[f"{stat}{op}{match.group(4)}"] = {"ok": ok}
+    return results
+
+
+# ============================================================================
+# Наблюдение за watchdog
+# ============================================================================
+
+
+def _read_json(path: Optional[Path]) -> Dict[str, object]:
+    if path is None:
+        return {}
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+class WatchdogObserver:
+    """
+    Хронология реакций watchdog за прогон.
+
+    Args:
+        shared_dir: SHARED_DIR watchdog (файл .watchdog-state меняется при авто-рестарте)
+        probe_metrics: PROBE_METRICS_FILE пробы геймплея
+    """
+
+    def __init__(self, shared_dir: Optional[Path], probe_metrics: Optional[Path]):
+        self.state_file = shared_dir / ".watchdog-state" if shared_dir else None
+        self.probe_file = probe_metrics
+        self.events: List[Dict[str, object]] = []
+        # Состояние до прогона — не событие
+        self.last_audit = _read_json(self.state_file).get("lastAuditId")
+        self.last_probe = _read_json(self.probe_file).get("updatedAt")
+
+    @property
+    def enabled(self) -> bool:
+        return self.state_file is not None or self.probe_file is not None
+
+    def poll(self, elapsed: float) -> None:
+        audit = _read_json(self.state_file).get("lastAuditId")
+        if audit and audit != self.last_audit:
+            self.last_audit = audit
+            self.events.append({"t": round(elapsed, 1), "event": "restart", "auditId": audit})
+            print(f"[WARN] t={elapsed:.0f}s watchdog: рестарт ({audit})")
+
+        probe = _read_json(self.probe_file)
+        updated = probe.get("updatedAt")
+        if updated and updated != self.last_probe:
+            self.last_probe = updated
+            last = probe.get("last") or {}
+            event = {"t": round(elapsed, 1), "event": "probe", "ok": bool(last.get("ok"))}
+            for key in ("state_ms", "patch_avg_ms"):
+                if key in last:
+                    event[key] = last[key]
+            problem = last.get("error") or "; ".join(last.get("degraded") or [])
+            if problem:
+                event["error"] = problem
+            self.events.append(event)
+            if not event["ok"]:
+                print(f"[WARN] t={elapsed:.0f}s watchdog: проба не прошла — {problem}")
+
+    def summary(self) -> Dict[str, object]:
+        failed = [event for event in self.events if event["event"] == "probe" and not event["ok"]]
+        restarts = [event for event in self.events if event["event"] == "restart"]
+        return {
+            "probes": sum(1 for event in self.events if event["event"] == "probe"),
+            "failedProbes": len(failed),
+            "firstFailedProbeAt": failed[0]["t"] if failed else None,
+            "restarts": len(restarts),
+            "events": self.events,
+        }
+
+
+# ============================================================================
+# Сценарий
+# ============================================================================
+
+
+class VirtualUser:
+    """Сессия игрока: вход и итерации сценария soft-launch.js."""
+
+    def __init__(self, vu_id: int, runner: "LoadRunner"):
+        self.vu_id = vu_id
+        self.runner = runner
+        self.metrics = runner.metrics
+        self.token: Optional[str] = None
+        self.user_id: Optional[str] = None
+
+    async def call(self, method: str, path: str, payload=None, trend: Optional[str] = None, auth: Optional[str] = None) -> Tuple[int, Dict]:
+        headers = {"Content-Type": "application/json"}
+        if auth:
+            headers["Authorization"] = auth
+        body = json.dumps(payload).encode("utf-8") if payload is not None else b""
+        start = time.perf_counter()
+        try:
+            status, data, blocked_ms = await self.runner.pool.request(method, path, body, headers)
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError, IndexError):
+            status, data, blocked_ms = 0, b"", 0.0
+        # Как в k6: http_req_duration — без ожидания соединения из пула
+        duration_ms = (time.perf_counter() - start) * 1000 - blocked_ms
+        self.metrics.request(duration_ms, blocked_ms, status == 0 or status >= 400, trend)
+        try:
+            parsed = json.loads(data) if data else {}
+        except ValueError:
+            parsed = {}
+        return status, parsed if isinstance(parsed, dict) else {}
+
+    async def think(self, seconds: float) -> None:
+        if self.runner.think_scale > 0:
+            await asyncio.sleep(seconds * self.runner.think_scale)
+
+    async def run(self, iterations: int) -> None:
+        for iteration in range(iterations):
+            if self.runner.stopping:
+                return
+            await self.iteration(iteration)
+            self.metrics.counters["iterations"] += 1
+
+    async def iteration(self, iteration: int) -> None:
+        check = self.metrics.check
+        status, data = await self.call("GET", "/health")
+        check(status == 200 and data.get("status") == "ok")
+
+        if not self.token:
+            payload = {"platformType": "dev", "platformAuthToken": f"loadtest_vu{self.vu_id}:LoadTester{self.vu_id}"}
+            status, data = await self.call("POST", "/api/v1/auth/verify", payload, trend="auth_latency")
+            ok = status == 200 and data.get("accessToken") is not None
+            if ok:
+                self.token, self.user_id = data["accessToken"], data.get("userId")
+                self.metrics.counters["successful_auths"] += 1
+            check(ok)
+
+        await self.think(0.5)
+        if not self.token:
+            return
+        bearer = f"Bearer {self.token}"
+
+        status, data = await self.call("GET", "/api/v1/config/runtime", trend="config_latency")
+        check(status == 200 and data.get("configVersion") is not None)
+
+        status, data = await self.call("GET", "/api/v1/profile", auth=bearer)
+        check(status == 200 and data.get("nickname") is not None)
+
+        await self.think(0.3)
+        status, data = await self.call("POST", "/api/v1/matchmaking/join", {"rating": 1500}, trend="matchmaking_latency", auth=bearer)
+        check(status == 200 and data.get("success") is True)
+        await self.think(0.2)
+        await self.call("GET", "/api/v1/matchmaking/status", auth=bearer)
+        await self.call("POST", "/api/v1/matchmaking/cancel", auth=bearer)
+
+        await self.think(0.5)
+        if iteration % 5 == 0:
+            now = datetime.now(timezone.utc)
+            summary = {
+                "matchId": str(uuid.uuid4()),
+                "mode": "arena",
+                "startedAt": (now - timedelta(minutes=5)).isoformat(),
+                "endedAt": now.isoformat(),
+                "configVersion": "v1.0.0",
+                "buildVersion": "loadtest",
+                "playerResults": [{
+                    "userId": self.user_id,
+                    "sessionId": f"loadtest-session-{self.vu_id}",
+                    "placement": random.randint(1, 10),
+                    "finalMass": random.randint(100, 599),
+                    "killCount": random.randint(0, 9),
+                    "deathCount": random.randint(0, 4),
+                    "level": random.randint(1, 5),
+                    "classId": random.randint(1, 4),
+                    "isDead": random.random() > 0.5,
+                }],
+            }
+            status, data = await self.call(
+                "POST", "/api/v1/match-results/submit", summary, trend="match_results_latency", auth=f"ServerToken {self.runner.server_token}"
+            )
+            ok = status == 200 and data.get("success") is True
+            if ok:
+                self.metrics.counters["successful_match_results"] += 1
+            check(ok)
+
+        await self.call("GET", "/api/v1/wallet/balance", auth=bearer)
+        await self.think(1.0)
+
+
+class LoadRunner:
+    """
+    Открытая модель: сессии приходят по расписанию этапов.
+
+    Args:
+        pool: Пул соединений к MetaServer
+        stages: [(длительность сек, сессий/с в конце этапа)]
+        start_rate: Сессий/с в начале первого этапа
+        iterations: Итераций сценария на сессию
+        max_vus: Потолок одновременных сессий
+        users: Разных игроков
+        think_scale: Множитель пауз сценария (0 — без пауз)
+        poisson: Экспоненциальные интервалы прихода вместо равномерных
+    """
+
+    def __init__(
+        self,
+        pool: HttpPool,
+        stages: List[Tuple[float, float]],
+        start_rate: float = 0.0,
+        iterations: int = DEFAULT_ITERATIONS,
+        max_vus: int = DEFAULT_MAX_VUS,
+        users: int = DEFAULT_USERS,
+        think_scale: float = 1.0,
+        poisson: bool = False,
+        server_token: str = SERVER_TOKEN,
+        observer: Optional[WatchdogObserver] = None,
+        report_interval: float = REPORT_INTERVAL,
+    ):
+        self.pool = pool
+        self.stages = stages
+        self.start_rate = start_rate
+        self.iterations = iterations
+        self.max_vus = max_vus
+        self.users = users
+        self.think_scale = think_scale
+        self.poisson = poisson
+        self.server_token = server_token
+        self.observer = observer
+        self.report_interval = report_interval
+        self.metrics = Metrics()
+        self.stopping = False
+        self.duration = sum(duration for duration, _ in stages)
+        self._sessions: set = set()
+        self._arrivals = 0
+
+    def rate_at(self, elapsed: float) -> float:
+        """Частота прихода сессий в момент elapsed (линейно внутри этапа)."""
+        previous = self.start_rate
+        for duration, target in self.stages:
+            if elapsed < duration:
+                return previous + (target - previous) * elapsed / duration if duration else target
+            elapsed -= duration
+            previous = target
+        return 0.0
+
+    def _arrive(self) -> None:
+        if len(self._sessions) >= self.max_vus:
+            self.metrics.counters["dropped_iterations"] += 1
+            return
+        vu_id = self._arrivals % self.users + 1
+        self._arrivals += 1
+        task = asyncio.ensure_future(self._session(vu_id))
+        self._sessions.add(task)
+        task.add_done_callback(self._sessions.discard)
+
+    async def _session(self, vu_id: int) -> None:
+        self.metrics.vus += 1
+        self.metrics.vus_max = max(self.metrics.vus_max, self.metrics.vus)
+        try:
+            await VirtualUser(vu_id, self).run(self.iterations)
+        finally:
+            self.metrics.vus -= 1
+
+    async def _arrivals_loop(self, start: float) -> None:
+        loop = asyncio.get_running_loop()
+        scheduled = 0.0
+        while scheduled < self.duration:
+            rate = self.rate_at(scheduled)
+            if rate <= 0:
+                scheduled += 0.1
+                continue
+            scheduled += random.expovariate(rate) if self.poisson else 1.0 / rate
+            delay = start + scheduled - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            if scheduled < self.duration:
+                self._arrive()
+
+    async def _monitor(self, start: float) -> None:
+        loop = asyncio.get_running_loop()
+        next_report = start + self.report_interval
+        while True:
+            await asyncio.sleep(WATCHDOG_POLL_INTERVAL if self.observer else self.report_interval)
+            now = loop.time()
+            if self.observer:
+                self.observer.poll(now - start)
+            if now >= next_report:
+                next_report += self.report_interval
+                window, failed = self.metrics.window, self.metrics.window_failed
+                self.metrics.window, self.metrics.window_failed = HdrHistogram(), 0
+                p99 = window.percentile(0.99)
+                print(
+                    f"[INFO] t={now - start:.0f}s rate={self.rate_at(now - start):.1f}/s vus={self.metrics.vus} "
+                    f"reqs={window.count / self.report_interval:.0f}/s err={failed / max(window.count, 1) * 100:.2f}% "
+                    f"p99={'—' if p99 is None else f'{p99:.0f}ms'}"
+                )
+
+    async def run(self) -> float:
+        """Выполнить прогон; вернуть длительность (сек)."""
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        monitor = asyncio.ensure_future(self._monitor(start))
+        try:
+            await self._arrivals_loop(start)
+            if self._sessions:
+                print(f"[INFO] Этапы завершены, ждём {len(self._sessions)} сессий (до {GRACEFUL_STOP:.0f} с)")
+                self.stopping = True  # Сессии доигрывают текущую итерацию
+                _, pending = await asyncio.wait(list(self._sessions), timeout=GRACEFUL_STOP)
+                for task in pending:
+                    task.cancel()
+                if pending:
+                    await asyncio.wait(pending)
+        finally:
+            monitor.cancel()
+            self.pool.close()
+        if self.observer:
+            self.observer.poll(loop.time() - start)
+        return loop.time() - start
+
+
+# ============================================================================
+# Отчёт
+# ============================================================================
+
+
+def print_summary(summary: Dict[str, object], results: List[Dict[str, object]], watchdog: Optional[Dict[str, object]]) -> bool:
+    metrics = summary["metrics"]
+    passed = all(result["ok"] for result in results)
+    print("\n=== Load Test Results ===\n")
+    print("Thresholds:")
+    for result in results:
+        value = result["value"]
+        shown = "N/A" if value is None else (f"{value * 100:.2f}%" if result["threshold"].startswith("rate") else f"{value:.0f}ms")
+        print(f"  {'✓' if result['ok'] else '✗'} {result['metric']} {result['threshold']} (факт: {shown})")
+
+    print("\nLatency (ms):")
+    print(f"  {'metric':<24} {'count':>8} {'avg':>8} {'p(50)':>8} {'p(95)':>8} {'p(99)':>8} {'max':>8}")
+    for name in TRENDS:
+        values = metrics[name]["values"]
+        if not values["count"]:
+            continue
+        cells = [values[key] for key in ("avg", "med", "p(95)", "p(99)", "max")]
+        print(f"  {name:<24} {values['count']:>8} " + " ".join(f"{cell:>8.1f}" for cell in cells))
+
+    duration = summary["state"]["testRunDurationMs"] / 1000
+    print(f"\n  http_reqs: {metrics['http_reqs']['values']['count']} ({metrics['http_reqs']['values']['rate']}/s за {duration:.0f} с)")
+    print(f"  http_req_failed: {metrics['http_req_failed']['values']['rate'] * 100:.2f}%")
+    print(f"  errors rate: {metrics['errors']['values']['rate'] * 100:.2f}%")
+    print(f"  iterations: {metrics['iterations']['values']['count']}, dropped_iterations: {metrics['dropped_iterations']['values']['count']}")
+    print(f"  vus_max: {metrics['vus_max']['values']['value']}")
+    print(f"  successful_auths: {metrics['successful_auths']['values']['count']}")
+    print(f"  successful_match_results: {metrics['successful_match_results']['values']['count']}")
+
+    if watchdog is not None:
+        print(
+            f"\nWatchdog: проб {watchdog['probes']}, проваленных {watchdog['failedProbes']}"
+            + (f" (первая на {watchdog['firstFailedProbeAt']:.0f} с)" if watchdog["firstFailedProbeAt"] is not None else "")
+            + f", рестартов {watchdog['restarts']}"
+        )
+    print(f"\nStatus: {'PASSED' if passed else 'FAILED'}")
+    return passed
+
+
+# ============================================================================
+# Заглушка MetaServer для --self-test
+# ============================================================================
+
+STUB_ROUTES = {
+    ("GET", "/health"): {"status": "ok"},
+    ("POST", "/api/v1/auth/verify"): {"accessToken": "stub-token", "userId": "00000000-0000-4000-8000-000000000001"},
+    ("GET", "/api/v1/config/runtime"): {"configVersion": "stub"},
+    ("GET", "/api/v1/profile"): {"nickname": "LoadTester"},
+    ("POST", "/api/v1/matchmaking/join"): {"success": True},
+    ("GET", "/api/v1/matchmaking/status"): {"status": "idle"},
+    ("POST", "/api/v1/matchmaking/cancel"): {"success": True},
+    ("POST", "/api/v1/match-results/submit"): {"success": True},
+    ("GET", "/api/v1/wallet/balance"): {"soft": 0, "hard": 0},
+}
+
+
+async def _stub_connection(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, delay: float) -> None:
+    try:
+        while True:
+            request_line = await reader.readline()
+            if not request_line:
+                break
+            method, target = request_line.decode("latin-1").split()[:2]
+            length = 0
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                if name.strip().lower() == "content-length":
+                    length = int(value)
+            if length:
+                await reader.readexactly(length)
+            await asyncio.sleep(random.expovariate(1 / delay) if delay > 0 else 0)
+            payload = STUB_ROUTES.get((method, target.split("?")[0]))
+            status = "200 OK" if payload is not None else "404 Not Found"
+            data = json.dumps(payload if payload is not None else {"error": "not_found"}).encode("utf-8")
+            writer.write(f"HTTP/1.1 {status}\r\nContent-Type: application/json\r\nContent-Length: {len(data)}\r\n\r\n".encode() + data)
+            await writer.drain()
+    except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+        pass  # Клиент закрыл соединение или цикл событий завершается
+    finally:
+        writer.close()
+
+
+async def start_stub(delay_ms: float = 5.0) -> Tuple[asyncio.AbstractServer, str]:
+    """Заглушка MetaServer на свободном порту; вернуть сервер и base URL."""
+    server = await asyncio.start_server(lambda r, w: _stub_connection(r, w, delay_ms / 1000), "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    return server, f"http://127.0.0.1:{port}"
+
+
+# ============================================================================
+# Main
+# ============================================================================
+
+
+async def _main(args: argparse.Namespace) -> int:
+    stub = None
+    if args.self_test:
+        stub, args.base_url = await start_stub(args.stub_delay_ms)
+        print(f"[INFO] Self-test: заглушка MetaServer {args.base_url}, задержка ~{args.stub_delay_ms:.0f} мс")
+
+    if args.rate is not None:
+        stages = [(parse_duration(args.duration), args.rate)]
+        start_rate = args.rate
+    else:
+        stages = parse_stages(args.stages)
+        start_rate = args.start_rate
+
+    observer = WatchdogObserver(args.watchdog_dir, args.probe_metrics)
+    runner = LoadRunner(
+        HttpPool(args.base_url, args.connections, args.timeout),
+        stages,
+        start_rate=start_rate,
+        iterations=args.iterations,
+        max_vus=args.max_vus,
+        users=args.users,
+        think_scale=args.think_scale,
+        poisson=args.poisson,
+        server_token=args.server_token,
+        observer=observer if observer.enabled else None,
+        report_interval=args.report_interval,
+    )
+    peak = max(max(target for _, target in stages), start_rate)
+    print(
+        f"[INFO] MetaServer {args.base_url}: {runner.duration:.0f} с, до {peak:g} сессий/с "
+        f"по {args.iterations} итераций, пул {args.connections} соединений"
+    )
+    try:
+        duration = await runner.run()
+    finally:
+        if stub:
+            stub.close()
+            await stub.wait_closed()
+
+    summary = runner.metrics.summary(duration)
+    results = evaluate_thresholds(summary, args.threshold or DEFAULT_THRESHOLDS)
+    watchdog = observer.summary() if observer.enabled else None
+    if watchdog is not None:
+        summary["watchdog"] = watchdog
+    summary["histograms"] = {name: histogram.to_dict() for name, histogram in runner.metrics.trends.items()}
+    summary["connectionsOpened"] = runner.pool.opened
+    passed = print_summary(summary, results, watchdog)
+
+    if args.out:
+        args.out.write_text(json.dumps(summary, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"[OK] Результаты: {args.out}")
+    if args.self_test and runner.metrics.counters["http_reqs"] == 0:
+        print("[ERROR] Self-test: ни одного запроса")
+        return 1
+    return 0 if passed else 99
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Асинхронный нагрузочный тест MetaServer (сценарий soft-launch.js)")
+    parser.add_argument("--base-url", default=BASE_URL, help=f"MetaServer (по умолчанию: {BASE_URL})")
+    parser.add_argument("--server-token", default=SERVER_TOKEN, help="MATCH_SERVER_TOKEN для match-results/submit")
+    parser.add_argument("--stages", default=DEFAULT_STAGES, help=f"Этапы длительность:сессий/с (по умолчанию: {DEFAULT_STAGES})")
+    parser.add_argument("--start-rate", type=float, default=0.0, help="Сессий/с в начале первого этапа")
+    parser.add_argument("--rate", type=float, default=None, help="Постоянная частота сессий/с (вместо --stages)")
+    parser.add_argument("--duration", default="5m", help="Длительность для --rate")
+    parser.add_argument("--poisson", action="store_true", help="Пуассоновский поток прихода сессий")
+    parser.add_argument("--iterations", type=int, default=DEFAULT_ITERATIONS, help="Итераций сценария на сессию")
+    parser.add_argument("--max-vus", type=int, default=DEFAULT_MAX_VUS, help="Потолок одновременных сессий")
+    parser.add_argument("--users", type=int, default=DEFAULT_USERS, help="Разных игроков")
+    parser.add_argument("--connections", type=int, default=DEFAULT_CONNECTIONS, help="Размер пула соединений")
+    parser.add_argument("--timeout", type=float, default=REQUEST_TIMEOUT, help="Таймаут запроса (сек)")
+    parser.add_argument("--think-scale", type=float, default=1.0, help="Множитель пауз сценария (0 — без пауз)")
+    parser.add_argument("--threshold", action="append", help="Порог в синтаксисе k6, напр. http_req_duration:p(99)<2000 (можно несколько)")
+    parser.add_argument("--report-interval", type=float, default=REPORT_INTERVAL, help="Интервал отчёта о ходе (сек)")
+    parser.add_argument("--watchdog-dir", type=Path, default=None, help="SHARED_DIR watchdog — следить за авто-рестартами")
+    parser.add_argument("--probe-metrics", type=Path, default=None, help="PROBE_METRICS_FILE — следить за пробами геймплея")
+    parser.add_argument("--out", type=Path, default=None, help="Сохранить сводку (формат data.metrics k6 + гистограммы) в JSON")
+    parser.add_argument("--self-test", action="store_true", help="Короткий прогон против локальной заглушки MetaServer")
+    parser.add_argument("--stub-delay-ms", type=float, default=5.0, help="Средняя задержка заглушки (мс)")
+    args = parser.parse_args()
+
+    if args.self_test and args.rate is None and args.stages == DEFAULT_STAGES:
+        args.stages, args.start_rate = "5s:50,5s:50", 10.0
+        args.iterations = min(args.iterations, 3)
+        args.think_scale = min(args.think_scale, 0.1)
+        args.report_interval = min(args.report_interval, 5.0)
+    try:
+        sys.exit(asyncio.run(_main(args)))
+    except KeyboardInterrupt:
+        print("\n[WARN] Прервано")
+        sys.exit(130)
+    except ValueError as e:
+        print(f"[ERROR] {e}")
+        sys.exit(2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Локальный заменитель Colyseus для проверки gameplay_probe.py
+
+Отвечает так же, как MatchServer (Colyseus 0.15) и MetaServer на пути пробы:
+- POST /api/v1/auth/guest, POST /api/v1/auth/join-token
+- POST /matchmake/joinOrCreate/<room>
+- WebSocket /<processId>/<roomId>?sessionId=...: JOIN_ROOM → (подтверждение
+  клиента) → ROOM_STATE → ROOM_STATE_PATCH каждые patch_ms → LEAVE_ROOM → close
+
+Параметры позволяют изобразить деградацию: медленный матчмейкинг
+(reserve_delay), «заклинившую» комнату (patch_ms=0 — патчей нет).
+
+Запуск для ручной проверки:
+    python3 tests/watchdog/probe_test_server.py --port 2567 --patch-ms 50
+
+Лежит в tests/, а не в ops/watchdog: на сервер не деплоится.
+
+Требования: Python 3.9+
+"""
+
+import argparse
+import base64
+import hashlib
+import json
+import struct
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+JOIN_ROOM = 10
+LEAVE_ROOM = 12
+ROOM_STATE = 14
+ROOM_STATE_PATCH = 15
+
+
+def _string(value: str) -> bytes:
+    data = value.encode("utf-8")
+    return bytes([len(data)]) + data
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = "ProbeTestServer/1.0"
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):  # noqa: A002 — сигнатура BaseHTTPRequestHandler
+        pass
+
+    def _json(self, status: int, payload: dict) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        owner = self.server.owner
+        length = int(self.headers.get("Content-Length") or 0)
+        options = json.loads(self.rfile.read(length) or b"{}")
+        if self.path == "/api/v1/auth/guest":
+            return self._json(200, {"guestToken": "guest-token", "guestSubjectId": str(uuid.uuid4())})
+        if self.path == "/api/v1/auth/join-token":
+            if self.headers.get("Authorization") != "Bearer guest-token":
+                return self._json(401, {"error": "invalid_token"})
+            return self._json(200, {"joinToken": "join-token", "expiresIn": 300})
+        if self.path.startswith("/matchmake/joinOrCreate/"):
+            if owner.require_token and options.get("joinToken") != "join-token":
+                return self._json(500, {"code": 4215, "error": "Authentication required: joinToken missing"})
+            time.sleep(owner.reserve_delay)
+            session_id = uuid.uuid4().hex[:9]
+            owner.sessions.add(session_id)
+            return self._json(200, {
+                "room": {"roomId": owner.room_id, "processId": owner.process_id, "name": self.path.rsplit("/", 1)[1]},
+                "sessionId": session_id,
+            })
+        self._json(404, {"error": "not_found"})
+
+    def do_GET(self):
+        owner = self.server.owner
+        path, _, query = self.path.partition("?")
+        session_id = query.partition("sessionId=")[2].partition("&")[0]
+        if (
+            self.headers.get("Upgrade", "").lower() != "websocket"
+            or path != f"/{owner.process_id}/{owner.room_id}"
+            or session_id not in owner.sessions
+        ):
+            return self._json(404, {"error": "not_found"})
+
+        accept = base64.b64encode(
+            hashlib.sha1((self.headers["Sec-WebSocket-Key"] + WS_GUID).encode("ascii")).digest()
+        ).decode("ascii")
+        self.send_response(101, "Switching Protocols")
+        self.send_header("Upgrade", "websocket")
+        self.send_header("Connection", "Upgrade")
+        self.send_header("Sec-WebSocket-Accept", accept)
+        self.end_headers()
+        self.wfile.flush()
+        self.close_connection = True
+        self._session()
+
+    def _send(self, opcode: int, payload: bytes) -> None:
+        header = bytes([0x80 | opcode])
+        if len(payload) < 126:
+            header += bytes([len(payload)])
+        else:
+            header += bytes([126]) + struct.pack("!H", len(payload))
+        self.wfile.write(header + payload)
+        self.wfile.flush()
+
+    def _recv(self) -> tuple:
+        first, second = self.rfile.read(2)
+        length = second & 0x7F
+        if length == 126:
+            length = struct.unpack("!H", self.rfile.read(2))[0]
+        elif length == 127:
+            length = struct.unpack("!Q", self.rfile.read(8))[0]
+        mask = self.rfile.read(4) if second & 0x80 else b"\0\0\0\0"
+        payload = bytes(byte ^ mask[i & 3] for i, byte in enumerate(self.rfile.read(length)))
+        return first & 0x0F, payload
+
+    def _session(self) -> None:
+        owner = self.server.owner
+        self._send(0x2, bytes([JOIN_ROOM]) + _string(uuid.uuid4().hex) + _string("schema"))
+        opcode, payload = self._recv()
+        if payload[:1] != bytes([JOIN_ROOM]):
+            return self._send(0x8, struct.pack("!H", 4002))
+        self._send(0x2, bytes([ROOM_STATE, 0x80, 0x01]))
+
+        # Патчи из отдельного потока, чтобы читать LEAVE_ROOM без ожидания
+        stop = threading.Event()
+        lock = threading.Lock()
+
+        def patches():
+            while owner.patch_ms > 0 and not stop.wait(owner.patch_ms / 1000):
+                with lock:
+                    self._send(0x2, bytes([ROOM_STATE_PATCH, 0xFF]))
+
+        sender = threading.Thread(target=patches, daemon=True)
+        sender.start()
+        try:
+            while True:
+                opcode, payload = self._recv()
+                if opcode == 0x8:
+                    break
+                if payload[:1] == bytes([LEAVE_ROOM]):
+                    owner.left.set()
+                    stop.set()
+                    with lock:
+                        self._send(0x8, struct.pack("!H", 4000))
+                    break
+        except (OSError, ValueError):
+            pass
+        finally:
+            stop.set()
+
+
+class ProbeTestServer:
+    """
+    Заменитель Colyseus + MetaServer в отдельном потоке.
+
+    Args:
+        port: 0 — свободный порт
+        patch_ms: Интервал патчей (0 — патчи не приходят)
+        reserve_delay: Задержка ответа матчмейкинга (сек)
+        require_token: Требовать joinToken (как JOIN_TOKEN_REQUIRED=true)
+    """
+
+    def __init__(self, port: int = 0, patch_ms: float = 50, reserve_delay: float = 0.0, require_token: bool = True):
+        self.patch_ms = patch_ms
+        self.reserve_delay = reserve_delay
+        self.require_token = require_token
+        self.process_id = uuid.uuid4().hex[:9]
+        self.room_id = uuid.uuid4().hex[:9]
+        self.sessions = set()
+        self.left = threading.Event()
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", port), _Handler)
+        self._httpd.daemon_threads = True
+        self._httpd.owner = self
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._httpd.server_address[1]}"
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Локальный заменитель Colyseus для gameplay_probe.py")
+    parser.add_argument("--port", type=int, default=2567)
+    parser.add_argument("--patch-ms", type=float, default=50)
+    parser.add_argument("--reserve-delay", type=float, default=0.0)
+    parser.add_argument("--no-token", action="store_true", help="Не требовать joinToken")
+    args = parser.parse_args()
+
+    server = ProbeTestServer(args.port, args.patch_ms, args.reserve_delay, require_token=not args.no_token)
+    print(f"[INFO] Заменитель Colyseus: {server.url} (patch {args.patch_ms} мс)")
+    server.start()
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Batch Reviewer — Gemini ревью пачки PR
+
+Ревьюит несколько PR параллельно (например, после спринта):
+- Все запросы к Gemini идут через общий TokenBucket, настроенный под квоту API
+  (GEMINI_RPM запросов в минуту), поэтому параллельные PR не ловят 429.
+- Временные ошибки (429, 5xx, сеть) повторяются с экспоненциальной
+  задержкой и разбросом (rate_limit.retry_call внутри GeminiReviewer).
+- Прогресс по каждому PR сохраняется в tools/.pm_state/{owner__repo}-batch.json:
+  прерванная пачка при повторном запуске продолжает с незавершённых PR.
+
+Использование:
+  python tools/batch_reviewer.py --prs 120 121 122
+  python tools/batch_reviewer.py --all-open --rpm 10 --workers 3
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+# Добавляем корень репозитория в sys.path для импортов
+_REPO_ROOT = Path(__file__).parent.parent
+if str(_REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(_REPO_ROOT))
+
+from tools.pr_parser import DEFAULT_REPO
+from tools.rate_limit import TokenBucket
+from tools.review_cycle import DEFAULT_STATE_DIR
+from tools.transport import get_transport
+
+logger = logging.getLogger(__name__)
+
+# Квота Gemini API (запросов в минуту) и число PR, обрабатываемых одновременно
+DEFAULT_RPM = float(os.getenv("GEMINI_RPM", "10"))
+DEFAULT_WORKERS = int(os.getenv("GEMINI_BATCH_WORKERS", "3"))
+
+# Статусы PR в файле прогресса
+STATUS_RUNNING = "running"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+
+# (pr_number, iteration, repo, limiter) → отчёт
+ReviewFn = Callable[[int, int, str, TokenBucket], object]
+
+
+def _default_review(pr_number: int, iteration: int, repo: str, limiter: TokenBucket) -> str:
+    """Ревью одного PR: кэш открывается в потоке задачи (соединение SQLite не делится)."""
+    from tools.gemini_reviewer import run_review
+    from tools.review_cache import ReviewCache
+
+    with ReviewCache() as cache:
+        return run_review(pr_number, iteration, repo=repo, limiter=limiter, cache=cache)
+
+
+def list_open_prs(repo: str = DEFAULT_REPO, limit: int = 100) -> List[int]:
+    """Номера открытых PR."""
+    result = get_transport().run_gh(
+        ["gh", "pr", "list", "--repo", repo, "--state", "open", "--json", "number", "--limit", str(limit)],
+        check=True,
+    )
+    return sorted(item["number"] for item in json.loads(result.stdout))
+
+
+class BatchReviewer:
+    """
+    Параллельное ревью пачки PR с общим бюджетом запросов и сохранением прогресса.
+
+    Args:
+        repo: Репозиторий owner/repo
+        iteration: Номер итерации ревью для всех PR пачки
+        limiter: Бюджет запросов к Gemini (None = DEFAULT_RPM)
+        max_workers: Сколько PR ревьюить одновременно
+        review_fn: Функция ревью одного PR (для тестов)
+        state_dir: Каталог состояния (None = DEFAULT_STATE_DIR)
+    """
+
+    def __init__(
+        self,
+        repo: str = DEFAULT_REPO,
+        iteration: int = 1,
+        limiter: Optional[TokenBucket] = None,
+        max_workers: int = DEFAULT_WORKERS,
+        review_fn: Optional[ReviewFn] = None,
+        state_dir: Optional[Path] = None,
+    ):
+        self.repo = repo
+        self.iteration = iteration
+        self.limiter = limiter or TokenBucket.per_minute(DEFAULT_RPM)
+        self.max_workers = max(1, max_workers)
+        self.review_fn = review_fn or _default_review
+
+        safe_repo = repo.replace("/", "__")
+        state_dir = Path(state_dir) if state_dir is not None else DEFAULT_STATE_DIR
+        self.state_path = state_dir / f"{safe_repo}-batch.json"
+        self.progress: Dict[str, dict] = {}  # str(pr_number) → {status, iteration, attempts, error, updated_at}
+        self._lock = threading.Lock()
+        self._load_state()
+
+    # ------------------------------------------------------------------
+    # Состояние
+    # ------------------------------------------------------------------
+
+    def _load_state(self) -> None:
+        if not self.state_path.exists():
+            return
+        try:
+            self.progress = json.loads(self.state_path.read_text(encoding="utf-8")).get("prs", {})
+        except ValueError as e:
+            logger.warning(f"Повреждённое состояние пачки {self.state_path}: {e}")
+
+    def _save_state(self) -> None:
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.state_path.with_suffix(f".tmp{os.getpid()}")
+        tmp_path.write_text(json.dumps({"prs": self.progress}, ensure_ascii=False, indent=2), encoding="utf-8")
+        tmp_path.replace(self.state_path)
+
+    def _set_status(self, pr_number: int, status: str, error: Optional[str] = None) -> None:
+        with self._lock:
+            entry = self.progress.setdefault(str(pr_number), {"attempts": 0})
+            if status == STATUS_RUNNING:
+                entry["attempts"] += 1
+            entry.update({
+                "status": status,
+                "iteration": self.iteration,
+                "error": error,
+                "updated_at": datetime.now().isoformat(),
+            })
+            self._save_state()
+
+    def pending(self, pr_numbers: List[int]) -> List[int]:
+        """PR без завершённого ревью этой итерации (прерванные и упавшие — повторяются)."""
+        result = []
+        for pr_number in pr_numbers:
+            entry = self.progress.get(str(pr_number))
+            if entry and entry.get("status") == STATUS_DONE and entry.get("iteration") == self.iteration:
+                continue
+            result.append(pr_number)
+        return result
+
+    # ------------------------------------------------------------------
+    # Выполнение
+    # ------------------------------------------------------------------
+
+    def _review_one(self, pr_number: int) -> bool:
+        self._set_status(pr_number, STATUS_RUNNING)
+        try:
+            self.review_fn(pr_number, self.iteration, self.repo, self.limiter)
+        except Exception as e:
+            logger.error(f"PR #{pr_number}: ревью не выполнено: {e}")
+            self._set_status(pr_number, STATUS_FAILED, error=str(e)[:500])
+            return False
+        logger.info(f"PR #{pr_number}: ревью опубликовано")
+        self._set_status(pr_number, STATUS_DONE)
+        return True
+
+    def run(self, pr_numbers: List[int], restart: bool = False) -> Dict[int, str]:
+        """
+        Отревьюить пачку PR.
+
+        Args:
+            pr_numbers: Номера PR
+            restart: Игнорировать сохранённый прогресс
+
+        Returns:
+            Dict[int, str]: Итоговый статус каждого PR пачки
+        """
+        if restart:
+            with self._lock:
+                for pr_number in pr_numbers:
+                    self.progress.pop(str(pr_number), None)
+
+        todo = self.pending(pr_numbers)
+        skipped = len(pr_numbers) - len(todo)
+        if skipped:
+            logger.info(f"Уже отревьюено ранее: {skipped} PR, осталось {len(todo)}")
+
+        if todo:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(todo))) as pool:
+                list(pool.map(self._review_one, todo))
+
+        return {pr_number: self.progress[str(pr_number)]["status"] for pr_number in pr_numbers}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gemini ревью пачки PR с учётом квоты API")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--prs", type=int, nargs="+", help="Номера PR")
+    target.add_argument("--all-open", action="store_true", help="Все открытые PR репозитория")
+    parser.add_argument("--repo", type=str, default=DEFAULT_REPO, help=f"Репозиторий (по умолчанию: {DEFAULT_REPO})")
+    parser.add_argument("--iteration", type=int, default=1, help="Номер итерации ревью")
+    parser.add_argument("--rpm", type=float, default=DEFAULT_RPM,
+                        help=f"Квота запросов к Gemini в минуту (по умолчанию: {DEFAULT_RPM:g})")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                        help=f"PR одновременно (по умолчанию: {DEFAULT_WORKERS})")
+    parser.add_argument("--restart", action="store_true", help="Начать пачку заново, игнорируя прогресс")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="[%(levelname)s] %(message)s")
+
+    pr_numbers = args.prs or list_open_prs(args.repo)
+    if not pr_numbers:
+        print("[INFO] Открытых PR нет")
+        sys.exit(0)
+
+    batch = BatchReviewer(
+        repo=args.repo,
+        iteration=args.iteration,
+        limiter=TokenBucket.per_minute(args.rpm),
+        max_workers=args.workers,
+    )
+    try:
+        results = batch.run(pr_numbers, restart=args.restart)
+    except KeyboardInterrupt:
+        print(f"\n[INFO] Пачка прервана, прогресс сохранён в {batch.state_path}")
+        sys.exit(130)
+
+    failed = [pr for pr, status in results.items() if status != STATUS_DONE]
+    print(f"\n[INFO] Готово: {len(results) - len(failed)}/{len(results)} PR")
+    if failed:
+        print(f"[WARN] Не удалось: {', '.join(f'#{pr}' for pr in failed)} (повторный запуск продолжит с них)")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""
+Bench Corpus — генератор синтетических PR для бенчмарков review-пайплайна
+
+Генерирует комментарии PR в формате GitHub API (id, body, created_at,
+updated_at, user): ревью основных ревьюверов по итерациям, summary и
+обычные обсуждения. Тела ревью — длинные, с множеством замечаний во всех
+форматах, которые встречаются у ревьюверов, и (по желанию) с «враждебной»
+разметкой: незакрытые `<!--`, backticks без пары, якоря `**[P1]**` без тире,
+длинные строки без двоеточий — то, на чём регулярные выражения откатываются.
+
+Генерация детерминирована (seed), корпус можно сохранить как fixture
+в формате вывода `gh api --paginate --jq '.[]'` (JSONL).
+"""
+
+import json
+import random
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import List
+
+REVIEWERS = ("opus", "codex", "gemini", "copilot")
+STATUSES = ("APPROVED", "CHANGES_REQUESTED", "COMMENTED")
+PRIORITIES = ("P0", "P1", "P2")
+
+FILES = (
+    "server/src/rooms/ArenaRoom.ts",
+    "server/src/rooms/systems/combatSystem.ts",
+    "server/src/meta/services/AuthService.ts",
+    "client/src/main.ts",
+    "client/src/ui/hud/Leaderboard.tsx",
+    "shared/src/config.ts",
+    "admin-dashboard/src/api/rooms.ts",
+    "ops/watchdog/watchdog.py",
+)
+
+WORDS = (
+    "аллокация", "тик", "игрок", "слайм", "буфер", "состояние", "патч", "таймер", "кеш",
+    "сериализация", "детерминизм", "матч", "лидерборд", "latency", "GC", "race", "mutex",
+)
+
+
+@dataclass
+class CorpusConfig:
+    """Параметры синтетического PR"""
+    comments: int = 2000  # Всего комментариев
+    review_share: float = 0.3  # Доля комментариев-ревью
+    issues_per_review: int = 40
+    paragraph_words: int = 400  # Длина «воды» между секциями
+    adversarial: bool = True
+    seed: int = 36
+
+
+def _sentence(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+def _issue_line(rng: random.Random, index: int) -> str:
+    """Замечание в одном из форматов, которые встречаются у ревьюверов."""
+    priority = rng.choice(PRIORITIES)
+    path = rng.choice(FILES)
+    line = rng.randint(1, 2000)
+    problem = _sentence(rng, rng.randint(4, 20))
+    dash = rng.choice(("—", "-", "–"))
+    location = rng.choice((
+        f"`{path}`:{line}",
+        f"`{path}:{line}`",
+        f"{path}:{line}",
+        f"`{path}`",
+        f"'{path}'",
+    ))
+    return f"{index}. **[{priority}]** {location} {dash} {problem}"
+
+
+def _adversarial_block(rng: random.Random) -> str:
+    """Разметка, провоцирующая откаты регулярных выражений."""
+    return rng.choice((
+        "<!-- " + "{ " * 50 + "незакрытый маркер",
+        "**[P1]** " + _sentence(rng, 200),  # Якорь без тире и двоеточия
+        "`" + _sentence(rng, 100),  # Незакрытые backticks
+        "**[P2]**\n" * 20,
+        "<!--" * 30 + "}" * 30,
+        "APPROVED_BUT_NOT_REALLY NOT_APPROVED CHANGES_REQUESTEDx",
+    ))
+
+
+def make_review_body(
+    rng: random.Random,
+    reviewer: str,
+    iteration: int,
+    config: CorpusConfig,
+) -> str:
+    """Тело комментария-ревью с метаданными, замечаниями и вердиктом."""
+    metadata = {
+        "reviewer": reviewer,
+        "iteration": iteration,
+        "timestamp": datetime(2026, 1, 1, tzinfo=timezone.utc).isoformat(),
+        "type": "review",
+    }
+    if rng.random() < 0.5:
+        metadata["status"] = rng.choice(STATUSES)
+
+    parts = [
+        f"<!-- {json.dumps(metadata)} -->",
+        f"## Review by {reviewer}",
+        "",
+        "### Позитивные моменты",
+        _sentence(rng, config.paragraph_words),
+        "",
+        "### Замечания",
+    ]
+    for i in range(1, config.issues_per_review + 1):
+        parts.append(_issue_line(rng, i))
+        if config.adversarial and rng.random() < 0.05:
+            parts.append(_adversarial_block(rng))
+    parts.extend(["", _sentence(rng, config.paragraph_words), "", "### Вердикт"])
+    parts.append(f"**{rng.choice(STATUSES)}**")
+    return "\n".join(parts)
+
+
+def make_chatter_body(rng: random.Random, config: CorpusConfig) -> str:
+    """Обычный комментарий без метаданных (иногда с враждебной разметкой)."""
+    body = _sentence(rng, rng.randint(5, config.paragraph_words // 4 + 5))
+    if config.adversarial and rng.random() < 0.2:
+        body += "\n" + _adversarial_block(rng)
+    return body
+
+
+def make_pr_comments(config: CorpusConfig) -> List[dict]:
+    """
+    Комментарии синтетического PR в порядке создания.
+
+    Returns:
+        List[dict]: Объекты в формате GitHub issues/comments API
+    """
+    rng = random.Random(config.seed)
+    started = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    comments = []
+    iteration = 1
+
+    for i in range(config.comments):
+        if rng.random() < config.review_share:
+            reviewer = rng.choice(REVIEWERS)
+            if rng.random() < 0.05:
+                iteration += 1
+            body = make_review_body(rng, reviewer, iteration, config)
+            login = f"{reviewer}-bot"
+        else:
+            body = make_chatter_body(rng, config)
+            login = rng.choice(("developer", "maintainer", "operator"))
+        at = (started + timedelta(minutes=i)).isoformat().replace("+00:00", "Z")
+        comments.append({
+            "id": 1_000_000 + i,
+            "body": body,
+            "created_at": at,
+            "updated_at": at,
+            "user": {"login": login},
+        })
+    return comments
+
+
+def to_jsonl(comments: List[dict]) -> str:
+    """Комментарии в формате вывода `gh api --paginate --jq '.[]'`."""
+    return "".join(json.dumps(comment, ensure_ascii=False) + "\n" for comment in comments)
+
+
+def write_fixture(path: Path, comments: List[dict]) -> None:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(to_jsonl(comments), encoding="utf-8")
@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+"""
+Bench Review — бенчмарки review-пайплайна tools/
+
+Замеряет горячие функции разбора комментариев и консенсуса:
+- parse_pr_comments — на записанном fixture (gh api отвечает из кассеты транспорта)
+- parse_single_comment, extract_issues_from_body
+- extract_blocking_issues, get_consensus_summary
+
+Корпус — синтетический PR (tools/bench_corpus.py) или записанные комментарии
+реального PR. Результаты сохраняются в JSON (tools/.bench/), их можно сравнить
+с предыдущим прогоном, чтобы увидеть регрессии.
+
+Использование:
+  python tools/bench_review.py
+  python tools/bench_review.py --comments 5000 --issues 80 --repeat 7
+  python tools/bench_review.py --record 110 --fixture tools/.bench/pr110.jsonl
+  python tools/bench_review.py --fixture tools/.bench/pr110.jsonl
+  python tools/bench_review.py --compare tools/.bench/baseline.json --fail-on-regression
+"""
+
+import argparse
+import gc
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, List, Optional, Tuple
+
+# Добавляем корень репозитория в sys.path для импортов
+_REPO_ROOT = Path(__file__).parent.parent
+if str(_REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(_REPO_ROOT))
+
+from tools import pr_parser
+from tools.bench_corpus import CorpusConfig, make_pr_comments, to_jsonl, write_fixture
+from tools.consensus import extract_blocking_issues, get_consensus_summary
+from tools.pr_parser import (
+    DEFAULT_REPO,
+    extract_issues_from_body,
+    comments_command,
+    fetch_pr_comments,
+    parse_comments_jsonl,
+    parse_review_comments,
+    parse_single_comment,
+)
+from tools.transport import KIND_GH, Cassette, ReplayTransport, gh_request, use_transport
+
+DEFAULT_RESULTS_DIR = Path(__file__).parent / ".bench"
+
+# Репозиторий, под которым fixture отдаётся транспортом-кассетой
+BENCH_REPO = "bench/fixture"
+
+# Во сколько раз минимум может вырасти, прежде чем считать это регрессией
+# (минимум подвержен шуму соседних процессов меньше медианы)
+REGRESSION_THRESHOLD = 1.2
+
+# Повторы внутри замера для очень быстрых функций (консенсус по готовым ревью)
+INNER_LOOPS = 200
+
+
+@dataclass
+class BenchResult:
+    """Результат замера одной функции"""
+    name: str
+    runs: int
+    ops: int  # Вызовов функции за один прогон
+    min_ms: float
+    median_ms: float
+    mean_ms: float
+    max_ms: float
+
+    @property
+    def per_op_us(self) -> float:
+        return self.median_ms * 1000 / self.ops
+
+
+def time_call(name: str, fn: Callable[[], None], repeat: int, ops: int = 1) -> BenchResult:
+    """Замерить fn repeat раз (после прогревочного вызова)."""
+    fn()
+    samples = []
+    for _ in range(repeat):
+        gc.collect()
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return BenchResult(
+        name=name,
+        runs=repeat,
+        ops=ops,
+        min_ms=round(min(samples), 3),
+        median_ms=round(statistics.median(samples), 3),
+        mean_ms=round(statistics.fmean(samples), 3),
+        max_ms=round(max(samples), 3),
+    )
+
+
+def _replay_gh(fixture: str):
+    """Транспорт-кассета: gh api «возвращает» записанный вывод без сети."""
+    cassette = Cassette()
+    cassette.add(
+        KIND_GH,
+        gh_request(comments_command(1, BENCH_REPO)),
+        {"returncode": 0, "stdout": fixture, "stderr": ""},
+        save=False,
+    )
+    return use_transport(ReplayTransport(cassette))
+
+
+def build_cases(fixture: str) -> List[Tuple[str, Callable[[], None], int]]:
+    """Замеряемые функции: (имя, вызов, число операций за вызов)."""
+    comments = parse_comments_jsonl(fixture)
+    bodies = [comment.get("body", "") for comment in comments]
+    review_bodies = [body for body in bodies if parse_single_comment(body, 1) is not None]
+    reviews = parse_review_comments(comments, 1)
+
+    def run_parse_pr_comments():
+        with _replay_gh(fixture):
+            pr_parser.parse_pr_comments(1, BENCH_REPO)
+
+    def run_parse_single_comment():
+        for body in bodies:
+            parse_single_comment(body, 1)
+
+    def run_extract_issues():
+        for body in review_bodies:
+            extract_issues_from_body(body, "bench")
+
+    def run_blocking():
+        for _ in range(INNER_LOOPS):
+            extract_blocking_issues(reviews)
+
+    def run_summary():
+        for _ in range(INNER_LOOPS):
+            get_consensus_summary(reviews)
+
+    return [
+        ("parse_pr_comments", run_parse_pr_comments, 1),
+        ("parse_single_comment", run_parse_single_comment, max(1, len(bodies))),
+        ("extract_issues_from_body", run_extract_issues, max(1, len(review_bodies))),
+        ("extract_blocking_issues", run_blocking, INNER_LOOPS),
+        ("get_consensus_summary", run_summary, INNER_LOOPS),
+    ]
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        result = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True, cwd=_REPO_ROOT,
+        )
+        return result.stdout.strip()
+    except (subprocess.CalledProcessError, FileNotFoundError):
+        return None
+
+
+def run_suite(fixture: str, repeat: int = 5, corpus: Optional[dict] = None) -> dict:
+    """
+    Прогнать все замеры.
+
+    Args:
+        fixture: Комментарии PR в JSONL (формат gh api --jq '.[]')
+        repeat: Прогонов на функцию
+        corpus: Описание корпуса для отчёта
+
+    Returns:
+        dict: Результаты с метаданными окружения (сохраняется как JSON)
+    """
+    comments = parse_comments_jsonl(fixture)
+    results = [time_call(name, fn, repeat, ops) for name, fn, ops in build_cases(fixture)]
+    return {
+        "timestamp": datetime.now().isoformat(),
+        "revision": _git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "corpus": {
+            **(corpus or {}),
+            "comments": len(comments),
+            "chars": sum(len(comment.get("body", "")) for comment in comments),
+        },
+        "results": {result.name: {**asdict(result), "per_op_us": round(result.per_op_us, 3)}
+                    for result in results},
+    }
+
+
+def compare_results(current: dict, baseline: dict, threshold: float = REGRESSION_THRESHOLD) -> Tuple[List[str], List[str]]:
+    """
+    Сравнить минимальное время с базовым прогоном.
+
+    Returns:
+        (строки отчёта, имена функций с регрессией)
+    """
+    lines = []
+    regressions = []
+    for name, result in current["results"].items():
+        base = baseline.get("results", {}).get(name)
+        if not base:
+            lines.append(f"  {name:<26} {result['min_ms']:>10.3f} ms   (нет в базовом прогоне)")
+            continue
+        ratio = result["min_ms"] / base["min_ms"] if base["min_ms"] else float("inf")
+        mark = ""
+        if ratio > threshold:
+            mark = "  [REGRESSION]"
+            regressions.append(name)
+        elif ratio < 1 / threshold:
+            mark = "  [FASTER]"
+        lines.append(
+            f"  {name:<26} {base['min_ms']:>10.3f} → {result['min_ms']:>10.3f} ms  x{ratio:.2f}{mark}"
+        )
+    return lines, regressions
+
+
+def print_results(payload: dict) -> None:
+    corpus = payload["corpus"]
+    print(f"[INFO] Корпус: {corpus['comments']} комментариев, {corpus['chars']} символов")
+    for name, result in payload["results"].items():
+        print(
+            f"  {name:<26} median {result['median_ms']:>10.3f} ms  "
+            f"min {result['min_ms']:>10.3f} ms  ({result['per_op_us']:.1f} µs/op)"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарки review-пайплайна tools/")
+    parser.add_argument("--fixture", type=str, default=None,
+                        help="JSONL с комментариями PR (без него — синтетический корпус)")
+    parser.add_argument("--record", type=int, metavar="PR", default=None,
+                        help="Записать комментарии PR в --fixture и выйти")
+    parser.add_argument("--repo", type=str, default=DEFAULT_REPO, help=f"Репозиторий для --record (по умолчанию: {DEFAULT_REPO})")
+    parser.add_argument("--comments", type=int, default=CorpusConfig.comments, help="Комментариев в синтетическом PR")
+    parser.add_argument("--issues", type=int, default=CorpusConfig.issues_per_review, help="Замечаний в одном ревью")
+    parser.add_argument("--no-adversarial", action="store_true", help="Без враждебной разметки")
+    parser.add_argument("--seed", type=int, default=CorpusConfig.seed, help="Seed генератора корпуса")
+    parser.add_argument("--repeat", type=int, default=5, help="Прогонов на функцию")
+    parser.add_argument("--output", type=str, default=None, help="Куда сохранить результаты JSON")
+    parser.add_argument("--compare", type=str, default=None, help="JSON базового прогона для сравнения")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD,
+                        help=f"Порог регрессии по минимальному времени (по умолчанию: x{REGRESSION_THRESHOLD})")
+    parser.add_argument("--fail-on-regression", action="store_true", help="Код выхода 1 при регрессии")
+    args = parser.parse_args()
+
+    if args.record is not None:
+        if not args.fixture:
+            parser.error("--record требует --fixture")
+        comments = fetch_pr_comments(args.record, args.repo)
+        if comments is None:
+            sys.exit(1)
+        write_fixture(Path(args.fixture), comments)
+        print(f"[OK] Записано {len(comments)} комментариев PR #{args.record} в {args.fixture}")
+        sys.exit(0)
+
+    if args.fixture:
+        fixture = Path(args.fixture).read_text(encoding="utf-8")
+        corpus = {"source": str(args.fixture)}
+    else:
+        config = CorpusConfig(
+            comments=args.comments,
+            issues_per_review=args.issues,
+            adversarial=not args.no_adversarial,
+            seed=args.seed,
+        )
+        fixture = to_jsonl(make_pr_comments(config))
+        corpus = {"source": "synthetic", **asdict(config)}
+
+    payload = run_suite(fixture, repeat=args.repeat, corpus=corpus)
+    print_results(payload)
+
+    output = Path(args.output) if args.output else (
+        DEFAULT_RESULTS_DIR / f"bench-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
+    print(f"[OK] Результаты сохранены в {output}")
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text(encoding="utf-8"))
+        lines, regressions = compare_results(payload, baseline, args.threshold)
+        print(f"\n[INFO] Сравнение с {args.compare} ({baseline.get('revision') or '?'}):")
+        print("\n".join(lines))
+        if regressions:
+            print(f"\n[WARN] Регрессии: {', '.join(regressions)}")
+            if args.fail_on_regression:
+                sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -15,6 +15,7 @@ if str(_REPO_ROOT) not in sys.path:
 
 from typing import Dict, List, Tuple
 
+from tools.issue_tracker import DUPLICATE_SIMILARITY, IssueTracker
 from tools.review_state import (
     ReviewData,
     ReviewStatus,
@@ -61,19 +62,31 @@ def extract_blocking_issues(reviews: Dict[str, ReviewData]) -> List[Issue]:
         List[Issue]: Список уникальных блокирующих проблем
     """
     blocking_issues: List[Issue] = []
-    seen_issues: set = set()  # Для дедупликации
+    seen_keys: Dict[tuple, int] = {}  # (файл, строка, начало текста) → индекс в blocking_issues
+    # Переформулировки тут не склеиваются: только дословные и почти дословные повторы,
+    # иначе разные проблемы на соседних строках выпали бы из гейта
+    seen_issues = IssueTracker()
+    tracked_index: Dict[str, int] = {}  # id в seen_issues → индекс в blocking_issues
 
     for reviewer, data in reviews.items():
         for issue in data.issues:
             if not issue.is_blocking():
                 continue
 
-            # Дедупликация по файлу и строке
             issue_key = (issue.file, issue.line, issue.problem[:50])
-            if issue_key in seen_issues:
+            duplicate = seen_keys.get(issue_key)
+            if duplicate is None:
+                tracked = seen_issues.match(issue, min_similarity=DUPLICATE_SIMILARITY)
+                duplicate = tracked_index[tracked.id] if tracked is not None else None
+            if duplicate is not None:
+                kept = blocking_issues[duplicate]
+                if issue.priority < kept.priority:
+                    # Повтор с более высоким приоритетом: P0 не должен прятаться за P1
+                    blocking_issues[duplicate] = kept.replace(priority=issue.priority)
                 continue
 
-            seen_issues.add(issue_key)
+            seen_keys[issue_key] = len(blocking_issues)
+            tracked_index[seen_issues.add(issue, reviewer=reviewer).id] = len(blocking_issues)
             # Создаём копию с установленным reviewer (не мутируем оригинал)
             blocking_issue = Issue(
                 priority=issue.priority,
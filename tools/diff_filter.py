@@ -0,0 +1,237 @@
+"""
+Diff Filter — предварительная фильтрация diff-а перед ревью
+
+Убирает из diff-а то, что модели ревьюить бессмысленно: lock-файлы,
+собранные ассеты, бинарные и сгенерированные файлы, hunk-и с изменениями
+только в пробелах. Возвращает список пропущенного, чтобы отчёт ревью
+честно показывал, что не проверялось.
+
+Конфигурация: DiffFilterConfig по умолчанию, JSON-файл (--filter-config)
+или дополнительные glob-ы (--exclude).
+"""
+
+import json
+import sys
+from dataclasses import dataclass, field
+from fnmatch import fnmatchcase
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+# Добавляем корень репозитория в sys.path для импортов
+_REPO_ROOT = Path(__file__).parent.parent
+if str(_REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(_REPO_ROOT))
+
+from tools.diff_splitter import FileDiff, split_diff
+
+# Пути, которые не ревьюятся (glob, `**/` — любой уровень вложенности)
+DEFAULT_EXCLUDE_GLOBS = (
+    "**/package-lock.json",
+    "**/yarn.lock",
+    "**/pnpm-lock.yaml",
+    "**/*.lock",
+    "assets-dist/**",
+    "**/dist/**",
+    "**/*.min.js",
+    "**/*.min.css",
+    "**/*.map",
+    "**/*.snap",
+    ".obsidian/**",
+    ".beads/*.jsonl",
+)
+
+# Маркеры сгенерированных файлов (ищутся в первых добавленных строках)
+GENERATED_MARKERS = ("@generated", "DO NOT EDIT", "Code generated by", "auto-generated", "AUTO-GENERATED")
+GENERATED_SCAN_LINES = 15
+
+# Строки длиннее — признак минифицированного/собранного файла
+DEFAULT_MAX_LINE_LENGTH = 500
+# Доля длинных среди добавленных строк, с которой файл считается минифицированным
+MINIFIED_LINE_SHARE = 0.5
+# Исходники руками не минифицируют: длинная строка в них (регулярка, SQL,
+# data URI) — не повод прятать от ревью остальные изменения файла
+SOURCE_EXTENSIONS = (
+    ".ts", ".tsx", ".js", ".jsx", ".mjs", ".cjs", ".py", ".cs", ".go", ".rs",
+    ".java", ".kt", ".sql", ".sh", ".ps1", ".md",
+)
+
+# Маркеры бинарных файлов в выводе git diff
+BINARY_MARKERS = ("Binary files ", "GIT binary patch")
+
+
+@dataclass
+class DiffFilterConfig:
+    """Настройки фильтра"""
+    exclude_globs: List[str] = field(default_factory=lambda: list(DEFAULT_EXCLUDE_GLOBS))
+    include_globs: List[str] = field(default_factory=list)  # Всегда ревьюить, даже если исключено
+    detect_binary: bool = True
+    detect_generated: bool = True
+    drop_whitespace_hunks: bool = True
+    max_line_length: int = DEFAULT_MAX_LINE_LENGTH
+    source_extensions: List[str] = field(default_factory=lambda: list(SOURCE_EXTENSIONS))
+
+    @classmethod
+    def from_file(cls, path: Path) -> "DiffFilterConfig":
+        """
+        Загрузить конфигурацию из JSON. Ключи совпадают с полями,
+        `extra_exclude_globs` дополняет список по умолчанию.
+        """
+        data = json.loads(Path(path).read_text(encoding="utf-8"))
+        extra = data.pop("extra_exclude_globs", [])
+        config = cls(**data)
+        config.exclude_globs.extend(extra)
+        return config
+
+
+@dataclass
+class SkippedFile:
+    """Файл, не переданный на ревью"""
+    path: str
+    reason: str
+
+
+@dataclass
+class FilterResult:
+    """Результат фильтрации"""
+    diff: str
+    reviewed_files: List[str] = field(default_factory=list)
+    skipped: List[SkippedFile] = field(default_factory=list)
+    dropped_hunks: int = 0  # Hunk-и только с пробельными изменениями
+    original_chars: int = 0
+
+    @property
+    def saved_chars(self) -> int:
+        return self.original_chars - len(self.diff)
+
+
+def _glob_match(path: str, pattern: str) -> bool:
+    if fnmatchcase(path, pattern):
+        return True
+    # `**/x` должен совпадать и с `x` в корне репозитория
+    return pattern.startswith("**/") and fnmatchcase(path, pattern[3:])
+
+
+def _matches_any(path: str, patterns: List[str]) -> bool:
+    return any(_glob_match(path, pattern) for pattern in patterns)
+
+
+def _is_binary(file_diff: FileDiff) -> bool:
+    return any(marker in file_diff.header for marker in BINARY_MARKERS) or any(
+        hunk.startswith(BINARY_MARKERS) for hunk in file_diff.hunks
+    )
+
+
+def _added_lines(file_diff: FileDiff):
+    for hunk in file_diff.hunks:
+        for line in hunk.splitlines():
+            if line.startswith("+") and not line.startswith("+++"):
+                yield line[1:]
+
+
+def _generated_reason(file_diff: FileDiff, config: DiffFilterConfig) -> Optional[str]:
+    """Причина считать файл сгенерированным или None."""
+    added = long_lines = 0
+    for i, line in enumerate(_added_lines(file_diff)):
+        if i < GENERATED_SCAN_LINES and any(marker in line for marker in GENERATED_MARKERS):
+            return "сгенерированный файл (маркер)"
+        if line.strip():
+            added += 1
+            long_lines += len(line) > config.max_line_length
+
+    if file_diff.path.lower().endswith(tuple(config.source_extensions)):
+        return None
+    if added and long_lines / added >= MINIFIED_LINE_SHARE:
+        return f"минифицированный файл (строки > {config.max_line_length} символов)"
+    return None
+
+
+def _is_whitespace_only_hunk(hunk: str) -> bool:
+    """Hunk меняет только пробелы/переводы строк (удалённое == добавленное без пробелов)."""
+    removed: List[str] = []
+    added: List[str] = []
+    has_changes = False
+    for line in hunk.splitlines()[1:]:
+        if line.startswith("-"):
+            target = removed
+        elif line.startswith("+"):
+            target = added
+        else:
+            continue
+        has_changes = True
+        compact = "".join(line[1:].split())
+        if compact:
+            target.append(compact)
+    return has_changes and removed == added
+
+
+def _filter_file(file_diff: FileDiff, config: DiffFilterConfig) -> Tuple[Optional[str], Optional[str], int]:
+    """
+    Returns:
+        (текст файла для ревью или None, причина пропуска, число выброшенных hunk-ов)
+    """
+    path = file_diff.path
+    forced = _matches_any(path, config.include_globs)
+
+    if not forced:
+        if _matches_any(path, config.exclude_globs):
+            return None, "исключён по шаблону пути", 0
+        if config.detect_binary and _is_binary(file_diff):
+            return None, "бинарный файл", 0
+        if config.detect_generated:
+            reason = _generated_reason(file_diff, config)
+            if reason:
+                return None, reason, 0
+
+    if not config.drop_whitespace_hunks or not file_diff.hunks:
+        return file_diff.text, None, 0
+
+    kept = [hunk for hunk in file_diff.hunks if not _is_whitespace_only_hunk(hunk)]
+    dropped = len(file_diff.hunks) - len(kept)
+    if not kept:
+        return None, "изменены только пробелы", dropped
+    return file_diff.header + "".join(kept), None, dropped
+
+
+def filter_diff(diff: str, config: Optional[DiffFilterConfig] = None) -> FilterResult:
+    """
+    Отфильтровать diff перед ревью.
+
+    Args:
+        diff: Полный unified diff
+        config: Настройки (None = по умолчанию)
+
+    Returns:
+        FilterResult: Отфильтрованный diff и список пропущенного
+    """
+    config = config or DiffFilterConfig()
+    result = FilterResult(diff="", original_chars=len(diff))
+    parts: List[str] = []
+
+    for file_diff in split_diff(diff):
+        text, reason, dropped = _filter_file(file_diff, config)
+        result.dropped_hunks += dropped
+        if text is None:
+            result.skipped.append(SkippedFile(path=file_diff.path, reason=reason))
+            continue
+        parts.append(text)
+        result.reviewed_files.append(file_diff.path)
+
+    result.diff = "".join(parts)
+    return result
+
+
+def format_skipped_section(result: FilterResult, max_files: int = 50) -> str:
+    """Markdown-секция для отчёта: что не передавалось на ревью."""
+    if not result.skipped and not result.dropped_hunks:
+        return ""
+
+    lines = ["### Пропущено при ревью", ""]
+    for skipped in result.skipped[:max_files]:
+        lines.append(f"- `{skipped.path}` — {skipped.reason}")
+    if len(result.skipped) > max_files:
+        lines.append(f"- … и ещё {len(result.skipped) - max_files} файлов")
+    if result.dropped_hunks:
+        lines.append(f"- Hunk-ов только с пробельными изменениями: {result.dropped_hunks}")
+    lines.append("")
+    lines.append(f"_Diff сокращён на {result.saved_chars} символов._")
+    return "\n".join(lines)
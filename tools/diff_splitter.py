@@ -0,0 +1,199 @@
+"""
+Diff Splitter — разбиение unified diff на части для ревью
+
+Diff делится по файлам (`diff --git`), крупные файлы — по hunk-ам (`@@`),
+после чего части упаковываются в чанки с бюджетом токенов.
+Каждый чанк — самостоятельный корректный diff с заголовками файлов.
+"""
+
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+# Грубая оценка: ~4 символа на токен (для кода и английского текста)
+CHARS_PER_TOKEN = 4
+
+FILE_HEADER_PREFIX = "diff --git "
+HUNK_PREFIX = "@@"
+
+
+def estimate_tokens(text: str) -> int:
+    """Оценка числа токенов без обращения к токенизатору модели."""
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+@dataclass
+class FileDiff:
+    """Diff одного файла: заголовок (diff --git, index, ---/+++) и hunk-и"""
+    path: str
+    header: str
+    hunks: List[str] = field(default_factory=list)
+    old_path: Optional[str] = None
+    blob_sha: Optional[str] = None  # Хеш содержимого после изменения (строка index)
+
+    @property
+    def text(self) -> str:
+        return self.header + "".join(self.hunks)
+
+    @property
+    def tokens(self) -> int:
+        return estimate_tokens(self.text)
+
+
+@dataclass
+class DiffChunk:
+    """Часть diff-а для одного запроса к модели"""
+    index: int
+    files: List[str]
+    text: str
+
+    @property
+    def tokens(self) -> int:
+        return estimate_tokens(self.text)
+
+
+def _parse_paths(header_line: str) -> tuple:
+    """Пути из строки `diff --git a/old b/new` (без учёта пробелов в именах)."""
+    rest = header_line[len(FILE_HEADER_PREFIX):].strip()
+    old, sep, new = rest.partition(" b/")
+    if not sep:
+        return rest, rest
+    return old[2:] if old.startswith("a/") else old, new
+
+
+def _finish_file(lines: List[str]) -> FileDiff:
+    """Собрать FileDiff из строк одного файла."""
+    old_path, path = _parse_paths(lines[0])
+    header_end = len(lines)
+    for i, line in enumerate(lines):
+        if line.startswith(HUNK_PREFIX):
+            header_end = i
+            break
+
+    blob_sha = None
+    for line in lines[1:header_end]:
+        if line.startswith("index "):
+            # index <old>..<new> [mode]
+            shas = line.split()[1]
+            blob_sha = shas.partition("..")[2] or None
+        elif line.startswith("+++ b/"):
+            path = line[len("+++ b/"):].rstrip("\n")
+
+    hunks: List[str] = []
+    current: List[str] = []
+    for line in lines[header_end:]:
+        if line.startswith(HUNK_PREFIX) and current:
+            hunks.append("".join(current))
+            current = []
+        current.append(line)
+    if current:
+        hunks.append("".join(current))
+
+    return FileDiff(
+        path=path,
+        header="".join(lines[:header_end]),
+        hunks=hunks,
+        old_path=old_path if old_path != path else None,
+        blob_sha=blob_sha,
+    )
+
+
+def split_diff(diff: str) -> List[FileDiff]:
+    """
+    Разбить unified diff (`gh pr diff`) на файлы.
+
+    Args:
+        diff: Полный diff
+
+    Returns:
+        List[FileDiff]: Файлы в порядке появления
+    """
+    files: List[FileDiff] = []
+    current: List[str] = []
+
+    for line in diff.splitlines(keepends=True):
+        if line.startswith(FILE_HEADER_PREFIX):
+            if current:
+                files.append(_finish_file(current))
+            current = [line]
+        elif current:
+            current.append(line)
+
+    if current:
+        files.append(_finish_file(current))
+    return files
+
+
+def _split_oversized(text: str, header: str, max_tokens: int) -> List[str]:
+    """Разрезать hunk больше бюджета по строкам (крайний случай)."""
+    budget_chars = max(1, max_tokens * CHARS_PER_TOKEN - len(header))
+    parts: List[str] = []
+    current: List[str] = []
+    size = 0
+    for line in text.splitlines(keepends=True):
+        if current and size + len(line) > budget_chars:
+            parts.append("".join(current))
+            current, size = [], 0
+        current.append(line)
+        size += len(line)
+    if current:
+        parts.append("".join(current))
+    return parts
+
+
+def _file_pieces(file_diff: FileDiff, max_tokens: int) -> List[str]:
+    """Файл целиком, если влезает в бюджет, иначе группы hunk-ов с повторённым заголовком."""
+    if file_diff.tokens <= max_tokens or not file_diff.hunks:
+        return [file_diff.text]
+
+    pieces: List[str] = []
+    current = file_diff.header
+    for hunk in file_diff.hunks:
+        if estimate_tokens(file_diff.header + hunk) > max_tokens:
+            if current != file_diff.header:
+                pieces.append(current)
+                current = file_diff.header
+            pieces.extend(
+                file_diff.header + part
+                for part in _split_oversized(hunk, file_diff.header, max_tokens)
+            )
+            continue
+        if estimate_tokens(current + hunk) > max_tokens:
+            pieces.append(current)
+            current = file_diff.header
+        current += hunk
+    if current != file_diff.header:
+        pieces.append(current)
+    return pieces
+
+
+def chunk_files(files: List[FileDiff], max_tokens: int) -> List[DiffChunk]:
+    """
+    Упаковать файлы в чанки не больше max_tokens каждый.
+
+    Мелкие файлы объединяются, крупные режутся по hunk-ам.
+    Порядок файлов сохраняется.
+    """
+    chunks: List[DiffChunk] = []
+    current_text = ""
+    current_files: List[str] = []
+
+    def flush() -> None:
+        nonlocal current_text, current_files
+        if current_text:
+            chunks.append(DiffChunk(index=len(chunks), files=current_files, text=current_text))
+        current_text, current_files = "", []
+
+    for file_diff in files:
+        for piece in _file_pieces(file_diff, max_tokens):
+            if current_text and estimate_tokens(current_text + piece) > max_tokens:
+                flush()
+            current_text += piece
+            if file_diff.path not in current_files:
+                current_files.append(file_diff.path)
+    flush()
+    return chunks
+
+
+def chunk_diff(diff: str, max_tokens: int) -> List[DiffChunk]:
+    """Разбить diff на чанки с бюджетом токенов."""
+    return chunk_files(split_diff(diff), max_tokens)
@@ -3,64 +3,58 @@ import sys
 import json
 import subprocess
 import argparse
-from datetime import datetime
-from google import genai
+import functools
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+# Добавляем корень репозитория в sys.path для импортов
+_REPO_ROOT = Path(__file__).parent.parent
+if str(_REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(_REPO_ROOT))
+
+from tools.diff_filter import DiffFilterConfig, FilterResult, filter_diff, format_skipped_section
+from tools.diff_splitter import DiffChunk, chunk_files, split_diff
+from tools.review_cache import (
+    ReviewCache, combine_reports, file_content_id, make_key, split_report_by_file,
+)
+from tools.llm_stream import MetricsLog, stream_text
+from tools.pr_comments import publish_review
+from tools.rate_limit import retry_call
+from tools.review_report import merge_reports, parse_report
+from tools.transport import MODE_REPLAY, get_transport
 
 # Конфигурация
-# Требуется: pip install google-genai
+# Требуется: pip install google-genai (импортируется при первом запросе к модели)
 # Требуется: gh auth login
 DEFAULT_REPO = os.getenv("SLIME_ARENA_REPO", "komleff/slime-arena")
 
 # Модель Gemini для ревью (gemini-2.5-flash — быстрая и качественная)
 GEMINI_MODEL = "gemini-2.5-flash"
 
-class GeminiReviewer:
-    def __init__(self, pr_number, iteration=1, repo=DEFAULT_REPO):
-        self.pr_number = pr_number
-        self.iteration = iteration
-        self.repo = repo
-
-        api_key = os.getenv("GEMINI_API_KEY")
-        if not api_key:
-            print("[ERROR] Не задана переменная окружения GEMINI_API_KEY")
-            sys.exit(1)
-
-        # Новый API: используем Client
-        self.client = genai.Client(api_key=api_key)
-
-        self.check_dependencies()
+# Бюджет токенов diff-а на один запрос. Больший diff делится на чанки
+# (по файлам/hunk-ам), которые ревьюятся параллельно и затем сливаются.
+CHUNK_TOKEN_BUDGET = int(os.getenv("GEMINI_CHUNK_TOKENS", "20000"))
 
-    def check_dependencies(self):
-        """Проверка окружения перед запуском"""
-        try:
-            subprocess.run(["gh", "--version"], check=True, capture_output=True, encoding='utf-8')
-        except (subprocess.CalledProcessError, FileNotFoundError):
-            print("[ERROR] GitHub CLI (gh) не найден. Установите его и выполните `gh auth login`.")
-            sys.exit(1)
+# Максимум одновременных запросов к Gemini при ревью по чанкам
+MAX_PARALLEL_REQUESTS = int(os.getenv("GEMINI_MAX_PARALLEL", "4"))
 
-    def get_pr_data(self):
-        """Получение diff и деталей PR через GitHub CLI"""
-        print(f"[INFO] Получение данных для PR #{self.pr_number} из {self.repo}...")
+# Повторы запроса к Gemini при 429/5xx (экспоненциальная задержка с разбросом)
+MAX_ATTEMPTS = int(os.getenv("GEMINI_MAX_ATTEMPTS", "5"))
+RETRY_BASE_DELAY = 2.0
+RETRY_MAX_DELAY = 60.0
 
-        # Получаем Diff
-        diff_proc = subprocess.run(
-            ["gh", "pr", "diff", str(self.pr_number), "--repo", self.repo],
-            capture_output=True, text=True, check=True, encoding='utf-8'
-        )
+# Таймауты потокового ответа (сек): пауза между частями и весь вызов
+IDLE_TIMEOUT = float(os.getenv("GEMINI_IDLE_TIMEOUT", "120"))
+TOTAL_TIMEOUT = float(os.getenv("GEMINI_TOTAL_TIMEOUT", "600"))
 
-        # Получаем описание
-        view_proc = subprocess.run(
-            ["gh", "pr", "view", str(self.pr_number), "--repo", self.repo, "--json", "title,body,author"],
-            capture_output=True, text=True, check=True, encoding='utf-8'
-        )
+# Как часто печатать прогресс получения ответа (сек)
+PROGRESS_INTERVAL = 5.0
 
-        return diff_proc.stdout, json.loads(view_proc.stdout)
+REPORT_TITLE = "## Review by Gemini 3 Pro"
 
-    def analyze_code(self, diff, pr_details):
-        """Анализ кода через Gemini API"""
-        print("[INFO] Gemini 3 Pro анализирует код...")
-        
-        system_prompt = """
+SYSTEM_PROMPT = """
         Ты — Gemini 3 Pro, элитный AI-ревьювер кода для проекта Slime Arena.
         Твоя специализация: UX, Производительность (Performance), Безопасность и Оптимистичные находки.
         
@@ -83,65 +77,318 @@ class GeminiReviewer:
         (Кратко, что сделано хорошо)
 
         ### Замечания
-        1. **[P0]** `файл:строка` — Критическая проблема (UX блок, краш, утечка памяти).
-        2. **[P1]** `файл:строка` — Важная проблема (плохая производительность, баг логики).
-        3. **[P2]** `файл:строка` — Рекомендация по улучшению.
+        1. **[P0]** `файл`:строка — Критическая проблема (UX блок, краш, утечка памяти).
+        2. **[P1]** `файл`:строка — Важная проблема (плохая производительность, баг логики).
+        3. **[P2]** `файл`:строка — Рекомендация по улучшению.
 
         ### Вердикт
         **APPROVED** ✅ или **CHANGES_REQUESTED** ❌ (если есть P0/P1).
         """
 
-        user_prompt = f"""
+# Пояснение для модели, когда она видит только часть diff-а
+CHUNK_PROMPT_NOTE = """
+        ВАЖНО: это часть {part} из {total} diff-а PR (файлы: {files}).
+        Остальные части ревьюятся отдельно. Оценивай только показанный код,
+        не делай выводов об отсутствии кода в других файлах.
+        """
+
+# Версия промпта для ключа кэша ревью: меняется вместе с текстом промптов,
+# поэтому после правки промпта файлы ревьюятся заново
+PROMPT_VERSION = hashlib.sha256((SYSTEM_PROMPT + CHUNK_PROMPT_NOTE).encode("utf-8")).hexdigest()[:12]
+
+class ReviewerError(Exception):
+    """Окружение не готово к ревью (нет ключа API, нет gh)"""
+
+
+@functools.lru_cache(maxsize=None)
+def gh_available():
+    """Есть ли GitHub CLI (проверяется один раз на процесс)"""
+    try:
+        get_transport().run_gh(["gh", "--version"], check=True)
+        return True
+    except (subprocess.CalledProcessError, FileNotFoundError):
+        return False
+
+
+def fetch_pr_data(pr_number, repo=DEFAULT_REPO):
+    """Diff и детали PR (title, body, author) через GitHub CLI"""
+    print(f"[INFO] Получение данных для PR #{pr_number} из {repo}...")
+
+    # Получаем Diff
+    diff_proc = get_transport().run_gh(["gh", "pr", "diff", str(pr_number), "--repo", repo], check=True)
+
+    # Получаем описание
+    view_proc = get_transport().run_gh(
+        ["gh", "pr", "view", str(pr_number), "--repo", repo, "--json", "title,body,author"], check=True
+    )
+
+    return diff_proc.stdout, json.loads(view_proc.stdout)
+
+
+class GeminiReviewer:
+    def __init__(self, pr_number, iteration=1, repo=DEFAULT_REPO, filter_config=None, cache=None, limiter=None,
+                 model=GEMINI_MODEL, reviewer="gemini"):
+        self.pr_number = pr_number
+        self.iteration = iteration
+        self.repo = repo
+        # Модель и имя ревьювера в метаданных (пул ревьюверов запускает несколько вариантов)
+        self.model = model
+        self.reviewer = reviewer
+        # None — фильтр по умолчанию; DiffFilterConfig с пустыми правилами отключает его
+        self.filter_config = filter_config or DiffFilterConfig()
+        # Кэш ревью файлов между итерациями (None — без кэша)
+        self.cache = cache
+        # Общий бюджет запросов к Gemini (TokenBucket), None — без ограничения
+        self.limiter = limiter
+        # TTFT, задержка и токены каждого вызова модели
+        self.metrics_log = MetricsLog()
+
+        self.api_key = os.getenv("GEMINI_API_KEY")
+        # При воспроизведении кассеты модель не вызывается — ключ не нужен
+        if not self.api_key and get_transport().mode != MODE_REPLAY:
+            raise ReviewerError("Не задана переменная окружения GEMINI_API_KEY")
+
+        # Клиент Gemini создаётся при первом запросе: импорт SDK заметно
+        # замедляет старт, а он не нужен, если ревьюить нечего
+        self._client = None
+        self._client_lock = threading.Lock()
+
+        self.check_dependencies()
+
+    @property
+    def client(self):
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    from google import genai
+                    # Новый API: используем Client
+                    self._client = genai.Client(api_key=self.api_key)
+        return self._client
+
+    def check_dependencies(self):
+        """Проверка окружения перед запуском"""
+        if not gh_available():
+            raise ReviewerError("GitHub CLI (gh) не найден. Установите его и выполните `gh auth login`.")
+
+    def get_pr_data(self):
+        """Получение diff и деталей PR через GitHub CLI"""
+        return fetch_pr_data(self.pr_number, self.repo)
+
+    def prepare_diff(self, diff) -> FilterResult:
+        """Фильтрация diff-а перед ревью: lock-файлы, ассеты, бинарные и сгенерированные файлы"""
+        result = filter_diff(diff, self.filter_config)
+        if result.skipped or result.dropped_hunks:
+            print(
+                f"[INFO] Пропущено файлов: {len(result.skipped)}, "
+                f"пробельных hunk-ов: {result.dropped_hunks}, "
+                f"diff сокращён на {result.saved_chars} символов"
+            )
+        return result
+
+    def _user_prompt(self, diff, pr_details):
+        return f"""
         PR Title: {pr_details['title']}
         Author: {pr_details['author']['login']}
         Description: {pr_details['body']}
         
         Code Diff:
         ```diff
-        {diff[:100000]} 
+        {diff}
         ```
         """
-        # Ограничиваем diff 100к символов, хотя 1.5 Pro может больше
 
-        # Новый API: используем client.models.generate_content
-        response = self.client.models.generate_content(
-            model=GEMINI_MODEL,
-            contents=f"{system_prompt}\n\n{user_prompt}"
+    def _generate(self, prompt, label="diff"):
+        """
+        Один запрос к Gemini API: потоковый ответ с таймаутами,
+        через бюджет запросов, с повторами при 429/5xx и таймауте
+        """
+        last_report = [0.0]
+
+        def on_progress(metrics, elapsed):
+            if elapsed - last_report[0] >= PROGRESS_INTERVAL:
+                last_report[0] = elapsed
+                print(f"[INFO] PR #{self.pr_number} ({label}): получено {metrics.chars} символов за {elapsed:.0f} сек")
+
+        def call():
+            # Каждая попытка расходует квоту, поэтому токен берётся на попытку
+            if self.limiter:
+                self.limiter.acquire()
+            last_report[0] = 0.0
+            text, metrics = stream_text(
+                # Новый API: client.models.generate_content_stream (через транспорт: live/record/replay)
+                lambda: get_transport().stream_gemini(lambda: self.client, self.model, prompt),
+                model=self.model,
+                label=f"pr{self.pr_number}:{label}",
+                idle_timeout=IDLE_TIMEOUT,
+                total_timeout=TOTAL_TIMEOUT,
+                on_progress=on_progress,
+                metrics_log=self.metrics_log,
+            )
+            ttft = f"{metrics.ttft_ms / 1000:.1f} сек" if metrics.ttft_ms is not None else "—"
+            print(
+                f"[INFO] PR #{self.pr_number} ({label}): первый токен через {ttft}, "
+                f"ответ за {metrics.latency_ms / 1000:.1f} сек, токенов: {metrics.output_tokens or '?'}"
+            )
+            return text
+
+        def on_retry(attempt, error, delay):
+            print(f"[WARN] PR #{self.pr_number}: ошибка Gemini ({error}), повтор {attempt} через {delay:.1f} сек")
+
+        return retry_call(
+            call, attempts=MAX_ATTEMPTS, base_delay=RETRY_BASE_DELAY,
+            max_delay=RETRY_MAX_DELAY, on_retry=on_retry,
+        )
+
+    def _review_chunk(self, chunk: DiffChunk, total, pr_details):
+        """Map-шаг: ревью одной части diff-а"""
+        note = CHUNK_PROMPT_NOTE.format(part=chunk.index + 1, total=total, files=", ".join(chunk.files))
+        report = self._generate(
+            f"{SYSTEM_PROMPT}\n{note}\n\n{self._user_prompt(chunk.text, pr_details)}",
+            label=f"часть {chunk.index + 1}/{total}",
         )
-        return response.text
+        print(f"[INFO] Часть {chunk.index + 1}/{total} готова ({len(chunk.files)} файлов)")
+        return report
+
+    def _cache_key(self, file_diff):
+        return make_key(file_content_id(file_diff), PROMPT_VERSION, self.model)
+
+    def _lookup_cache(self, files):
+        """Разделить файлы на найденные в кэше и требующие ревью"""
+        cached, pending = [], []
+        for file_diff in files:
+            hit = self.cache.get(self._cache_key(file_diff)) if self.cache else None
+            if hit is not None:
+                cached.append(hit)
+            else:
+                pending.append(file_diff)
+        return cached, pending
 
-    def publish_report(self, report):
-        """Публикация отчета в PR"""
+    def _store_in_cache(self, files, chunks, parsed):
+        """Сохранить результаты ревью по файлам (файл может быть разрезан на несколько чанков)"""
+        per_file = {file_diff.path: [] for file_diff in files}
+        for chunk, report in zip(chunks, parsed):
+            for path, file_report in split_report_by_file(report, chunk.files).items():
+                per_file[path].append(file_report)
+        for file_diff in files:
+            self.cache.put(self._cache_key(file_diff), combine_reports(per_file[file_diff.path]))
+
+    def analyze_code(self, diff, pr_details):
+        """Анализ кода через Gemini API"""
+        if not diff.strip():
+            # После фильтрации ревьюить нечего — не тратим запрос к модели
+            return merge_reports(
+                [], title=REPORT_TITLE, notes=["Нет файлов для ревью после фильтрации diff-а."], verdict="APPROVED",
+            )
+
+        # На повторных итерациях неизменённые файлы берутся из кэша
+        files = split_diff(diff)
+        cached, pending = self._lookup_cache(files)
+        chunks = chunk_files(pending, CHUNK_TOKEN_BUDGET)
+
+        if len(chunks) <= 1 and not cached:
+            print("[INFO] Gemini 3 Pro анализирует код...")
+            report = self._generate(f"{SYSTEM_PROMPT}\n\n{self._user_prompt(diff, pr_details)}")
+            if self.cache and chunks:
+                self._store_in_cache(pending, chunks, [parse_report(report, self.reviewer)])
+            return report
+
+        # Большой diff: map-reduce вместо обрезки — каждая часть ревьюится
+        # отдельным запросом (параллельно), отчёты сливаются в один
+        reports = []
+        if chunks:
+            workers = max(1, min(MAX_PARALLEL_REQUESTS, len(chunks)))
+            print(f"[INFO] Gemini 3 Pro анализирует код: {len(chunks)} частей, до {workers} параллельно...")
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                reports = list(pool.map(lambda chunk: self._review_chunk(chunk, len(chunks), pr_details), chunks))
+
+        parsed = [parse_report(report, self.reviewer) for report in reports]
+        if self.cache and chunks:
+            self._store_in_cache(pending, chunks, parsed)
+
+        notes = []
+        if chunks:
+            notes.append(f"Diff ({len(pending)} файлов) проверен по частям: {len(chunks)} запросов к модели.")
+        if cached:
+            print(f"[INFO] Из кэша ревью: {len(cached)} файлов из {len(files)}")
+            notes.append(f"Без изменений с прошлой итерации, замечания из кэша: {len(cached)} файлов.")
+        return merge_reports(cached + parsed, title=REPORT_TITLE, notes=notes)
+
+    def publish_report(self, report, upsert=True):
+        """Публикация отчета в PR (upsert — обновить ревью этой итерации, если оно уже есть)"""
         print("[INFO] Публикация отчета в GitHub...")
-        
-        metadata = {
-            "reviewer": "gemini",
-            "iteration": self.iteration,
-            "timestamp": datetime.now().isoformat(),
-            "type": "review"
-        }
-        
-        body = f"<!-- {json.dumps(metadata)} -->\n{report}"
-        
-        subprocess.run([
-            "gh", "pr", "comment", str(self.pr_number),
-            "--repo", self.repo,
-            "--body", body
-        ], check=True, encoding='utf-8')
-        print(f"[OK] Отчет успешно опубликован в PR #{self.pr_number} ({self.repo})")
+        created = publish_review(self.pr_number, self.iteration, self.reviewer, report, repo=self.repo, upsert=upsert)
+        action = "опубликован" if created else "обновлён"
+        print(f"[OK] Отчет успешно {action} в PR #{self.pr_number} ({self.repo})")
+
+
+def run_review(pr_number, iteration=1, repo=DEFAULT_REPO, filter_config=None, cache=None, publish=True,
+               limiter=None, upsert=True):
+    """
+    Полный прогон ревью PR: diff → фильтр → Gemini → публикация.
+
+    Используется из pm_orchestrator в том же процессе и из CLI.
+
+    Args:
+        pr_number: Номер PR
+        iteration: Номер итерации ревью
+        repo: Репозиторий в формате owner/repo
+        filter_config: Настройки фильтра diff-а (None = по умолчанию)
+        cache: Кэш ревью файлов (None = без кэша)
+        publish: Публиковать отчёт в PR
+        limiter: Общий бюджет запросов к Gemini (TokenBucket)
+        upsert: Обновить комментарий ревью этой итерации вместо нового
+
+    Returns:
+        str: Отчёт ревью
+
+    Raises:
+        ReviewerError: Окружение не готово
+        subprocess.CalledProcessError: Ошибка gh
+        GitHubApiError: Не удалось опубликовать отчёт
+    """
+    agent = GeminiReviewer(pr_number, iteration, repo, filter_config=filter_config, cache=cache, limiter=limiter)
+    diff, details = agent.get_pr_data()
+    filtered = agent.prepare_diff(diff)
+    report = agent.analyze_code(filtered.diff, details)
+    skipped_section = format_skipped_section(filtered)
+    if skipped_section:
+        report = f"{report}\n\n{skipped_section}"
+    if publish:
+        agent.publish_report(report, upsert=upsert)
+    return report
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Gemini 3 Pro Agent Reviewer")
     parser.add_argument("--pr", type=int, required=True, help="Номер PR")
     parser.add_argument("--iteration", type=int, default=1, help="Номер итерации ревью")
     parser.add_argument("--repo", type=str, default=DEFAULT_REPO, help=f"Репозиторий (по умолчанию: {DEFAULT_REPO})")
+    parser.add_argument("--exclude", action="append", default=[], metavar="GLOB",
+                        help="Дополнительный glob путей, исключаемых из ревью (можно повторять)")
+    parser.add_argument("--filter-config", type=str, default=None,
+                        help="JSON с настройками фильтра diff-а (поля DiffFilterConfig)")
+    parser.add_argument("--no-filter", action="store_true", help="Отправлять diff без фильтрации")
+    parser.add_argument("--new-comment", action="store_true",
+                        help="Публиковать новый комментарий, даже если ревью этой итерации уже есть")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Не использовать кэш ревью файлов с прошлых итераций")
     args = parser.parse_args()
 
+    if args.no_filter:
+        filter_config = DiffFilterConfig(exclude_globs=[], detect_binary=False,
+                                         detect_generated=False, drop_whitespace_hunks=False)
+    elif args.filter_config:
+        filter_config = DiffFilterConfig.from_file(Path(args.filter_config))
+    else:
+        filter_config = DiffFilterConfig()
+    filter_config.exclude_globs.extend(args.exclude)
+
     try:
-        agent = GeminiReviewer(args.pr, args.iteration, args.repo)
-        diff, details = agent.get_pr_data()
-        report = agent.analyze_code(diff, details)
-        agent.publish_report(report)
+        cache = None if args.no_cache else ReviewCache()
+        run_review(args.pr, args.iteration, args.repo, filter_config=filter_config, cache=cache,
+                   upsert=not args.new_comment)
+    except ReviewerError as e:
+        print(f"[ERROR] {e}")
+        sys.exit(1)
     except Exception as e:
         print(f"[ERROR] Критическая ошибка агента: {e}")
         sys.exit(1)
\ No newline at end of file
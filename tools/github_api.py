@@ -0,0 +1,147 @@
+"""
+GitHub API — вызовы `gh api` с доступом к статусу и заголовкам ответа
+
+Нужен для условных запросов (ETag / If-None-Match): ответ 304 Not Modified
+не расходует лимит GitHub API, поэтому опрос неизменившихся PR почти бесплатен.
+"""
+
+import json
+import logging
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlsplit
+
+from tools.transport import get_transport
+
+logger = logging.getLogger(__name__)
+
+# Элемент заголовка Link: <https://api.github.com/...?page=2>; rel="next"
+_LINK_RE = re.compile(r'<([^>]+)>\s*;\s*rel="([^"]+)"')
+
+
+class GitHubApiError(Exception):
+    """Ошибка вызова gh api (gh не найден, сеть, 4xx/5xx)"""
+
+
+@dataclass
+class ApiResponse:
+    """Ответ GitHub API с заголовками"""
+    status: int
+    headers: Dict[str, str] = field(default_factory=dict)  # Ключи в lowercase
+    body: str = ""
+
+    @property
+    def not_modified(self) -> bool:
+        """304: ресурс не изменился с указанного ETag"""
+        return self.status == 304
+
+    @property
+    def etag(self) -> Optional[str]:
+        return self.headers.get("etag")
+
+    @property
+    def rate_limit_remaining(self) -> Optional[int]:
+        value = self.headers.get("x-ratelimit-remaining")
+        return int(value) if value and value.isdigit() else None
+
+    @property
+    def rate_limit_reset(self) -> Optional[int]:
+        """Unix timestamp сброса лимита"""
+        value = self.headers.get("x-ratelimit-reset")
+        return int(value) if value and value.isdigit() else None
+
+    @property
+    def next_endpoint(self) -> Optional[str]:
+        """Путь следующей страницы из заголовка Link (rel="next") или None"""
+        for url, rel in _LINK_RE.findall(self.headers.get("link", "")):
+            if rel == "next":
+                return api_path(url)
+        return None
+
+    def json(self) -> Any:
+        return json.loads(self.body) if self.body else None
+
+
+def api_path(url: str) -> str:
+    """Абсолютный URL GitHub API → путь для gh api (repositories/1/pulls?page=2)."""
+    parts = urlsplit(url)
+    path = parts.path.lstrip("/")
+    # GitHub Enterprise: API живёт под /api/v3/
+    if path.startswith("api/v3/"):
+        path = path[len("api/v3/"):]
+    return f"{path}?{parts.query}" if parts.query else path
+
+
+def parse_include_output(output: str) -> ApiResponse:
+    """
+    Разобрать вывод `gh api --include`: статус, заголовки, пустая строка, тело.
+
+    Args:
+        output: stdout gh api -i
+
+    Returns:
+        ApiResponse
+    """
+    # Разделитель заголовков и тела — первая пустая строка
+    head, _, body = output.replace("\r\n", "\n").partition("\n\n")
+    lines = head.split("\n")
+
+    status_line = lines[0].split()
+    if len(status_line) < 2 or not status_line[0].startswith("HTTP/") or not status_line[1].isdigit():
+        raise GitHubApiError(f"Неожиданный ответ gh api: {lines[0][:100]!r}")
+
+    headers: Dict[str, str] = {}
+    for line in lines[1:]:
+        name, sep, value = line.partition(":")
+        if sep:
+            headers[name.strip().lower()] = value.strip()
+
+    return ApiResponse(status=int(status_line[1]), headers=headers, body=body)
+
+
+def gh_api(
+    endpoint: str,
+    method: str = "GET",
+    etag: Optional[str] = None,
+    extra_args: Optional[List[str]] = None,
+    input_data: Optional[str] = None,
+) -> ApiResponse:
+    """
+    Выполнить запрос через `gh api --include`.
+
+    Args:
+        endpoint: Путь API (например repos/owner/repo/pulls?state=open)
+        method: HTTP метод
+        etag: ETag предыдущего ответа для условного запроса
+        extra_args: Дополнительные аргументы gh api
+        input_data: Тело запроса (передаётся через stdin, `--input -`)
+
+    Returns:
+        ApiResponse (в т.ч. 304)
+
+    Raises:
+        GitHubApiError: gh не найден или запрос завершился ошибкой
+    """
+    args = ["gh", "api", "--include", "--method", method, endpoint]
+    if etag:
+        args += ["-H", f"If-None-Match: {etag}"]
+    if input_data is not None:
+        args += ["--input", "-"]
+    if extra_args:
+        args += extra_args
+
+    try:
+        result = get_transport().run_gh(args, input_data=input_data)
+    except FileNotFoundError:
+        raise GitHubApiError("GitHub CLI (gh) не найден. Установите gh и выполните 'gh auth login'.")
+
+    # gh завершается с кодом 1 для любого статуса вне 2xx (включая 304),
+    # но с --include заголовки всё равно печатаются в stdout
+    if not result.stdout.startswith("HTTP/"):
+        raise GitHubApiError(result.stderr.strip() or f"gh api завершился с кодом {result.returncode}")
+
+    response = parse_include_output(result.stdout)
+    if response.status >= 400:
+        raise GitHubApiError(f"HTTP {response.status}: {response.body[:200]}")
+    return response
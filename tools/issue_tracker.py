@@ -0,0 +1,343 @@
+"""
+Issue Tracker — отпечатки замечаний ревью и их жизненный цикл между итерациями
+
+Одно и то же замечание разные ревьюверы формулируют по-разному, а после
+фикса оно съезжает на несколько строк. Сравнение по (файл, строка, начало
+текста) считает такие замечания новыми, и цикл заново «чинит» уже
+исправленное.
+
+Отпечаток замечания — MinHash по символьным 4-граммам нормализованного
+текста (одна перестановка с разбиением на корзины: один проход по тексту).
+Кандидаты ищутся по LSH-полосам подписи и по корзинам строк файла, поэтому
+сопоставление нового замечания с известными не зависит от их числа.
+Совпадение засчитывается, если файл тот же, строки близки
+(LINE_TOLERANCE), а тексты похожи (SIMILARITY_THRESHOLD; для той же строки
+достаточно SAME_LINE_SIMILARITY).
+
+Жизненный цикл: opened → fixed (ревьювер, сообщивший о замечании, прислал
+ревью новой итерации без него) → reopened (замечание появилось снова).
+"""
+
+import functools
+import re
+import zlib
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from tools.review_state import Issue, ReviewData
+
+# Длина символьного шингла
+SHINGLE_SIZE = 4
+
+# Корзины подписи MinHash и строки в LSH-полосе
+SIGNATURE_BINS = 16
+BAND_ROWS = 2
+
+# Пустая корзина подписи (короткий текст)
+EMPTY_BIN = 0xFFFFFFFF
+
+# Порог похожести текстов (оценка коэффициента Жаккара)
+SIMILARITY_THRESHOLD = 0.4
+# Для той же строки (±SAME_LINE_TOLERANCE) формулировки могут расходиться сильнее
+SAME_LINE_TOLERANCE = 2
+SAME_LINE_SIMILARITY = 0.2
+# Почти дословный повтор: дедупликация блокирующих проблем в гейте мержа,
+# где разные проблемы на соседних строках склеивать нельзя
+DUPLICATE_SIMILARITY = 0.9
+# Насколько замечание может «съехать» между итерациями
+LINE_TOLERANCE = 20
+
+STATUS_OPEN = "open"
+STATUS_FIXED = "fixed"
+
+EVENT_OPENED = "opened"
+EVENT_FIXED = "fixed"
+EVENT_REOPENED = "reopened"
+
+_NON_WORD = re.compile(r"[^\w\s]+")
+_DIGITS = re.compile(r"\d+")
+_SPACES = re.compile(r"\s+")
+
+Signature = Tuple[int, ...]
+
+
+def normalize_problem(text: str) -> str:
+    """Текст замечания без разметки, регистра и конкретных чисел."""
+    text = _NON_WORD.sub(" ", text.lower())
+    text = _DIGITS.sub("0", text)
+    return _SPACES.sub(" ", text).strip()
+
+
+@functools.lru_cache(maxsize=8192)
+def fingerprint(problem: str) -> Signature:
+    """MinHash-подпись текста замечания."""
+    text = normalize_problem(problem)
+    signature = [EMPTY_BIN] * SIGNATURE_BINS
+    if len(text) < SHINGLE_SIZE:
+        shingles = [text] if text else []
+    else:
+        shingles = (text[i:i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1))
+    for shingle in shingles:
+        value = zlib.crc32(shingle.encode("utf-8"))
+        index = value % SIGNATURE_BINS
+        if value < signature[index]:
+            signature[index] = value
+    return tuple(signature)
+
+
+def similarity(a: Signature, b: Signature) -> float:
+    """Оценка коэффициента Жаккара по подписям."""
+    used = 0
+    equal = 0
+    for x, y in zip(a, b):
+        if x == EMPTY_BIN and y == EMPTY_BIN:
+            continue
+        used += 1
+        equal += x == y
+    return equal / used if used else 1.0
+
+
+@functools.lru_cache(maxsize=8192)
+def _bands(signature: Signature) -> Tuple[Tuple[int, Signature], ...]:
+    """Непустые LSH-полосы подписи: (номер, значения)."""
+    bands = []
+    for band in range(0, SIGNATURE_BINS, BAND_ROWS):
+        rows = signature[band:band + BAND_ROWS]
+        if rows.count(EMPTY_BIN) < len(rows):
+            bands.append((band, rows))
+    return tuple(bands)
+
+
+def _line_bucket(line: Optional[int]) -> Optional[int]:
+    return None if line is None else line // LINE_TOLERANCE
+
+
+@dataclass
+class TrackedIssue:
+    """Замечание, отслеживаемое между итерациями"""
+    id: str
+    priority: str
+    file: str
+    line: Optional[int]
+    problem: str  # Последняя формулировка
+    signatures: List[Signature] = field(default_factory=list)  # Все встреченные формулировки
+    status: str = STATUS_OPEN
+    opened_iteration: int = 1
+    last_seen_iteration: int = 1
+    fixed_iteration: Optional[int] = None
+    reopen_count: int = 0
+    reviewers: List[str] = field(default_factory=list)
+    history: List[dict] = field(default_factory=list)  # {event, iteration, reviewer?}
+
+    def to_issue(self) -> Issue:
+        reviewer = self.reviewers[0] if self.reviewers else ""
+        return Issue(priority=self.priority, file=self.file, line=self.line, problem=self.problem, reviewer=reviewer)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "priority": self.priority,
+            "file": self.file,
+            "line": self.line,
+            "problem": self.problem,
+            "signatures": [list(signature) for signature in self.signatures],
+            "status": self.status,
+            "opened_iteration": self.opened_iteration,
+            "last_seen_iteration": self.last_seen_iteration,
+            "fixed_iteration": self.fixed_iteration,
+            "reopen_count": self.reopen_count,
+            "reviewers": list(self.reviewers),
+            "history": list(self.history),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "TrackedIssue":
+        return cls(
+            id=data["id"],
+            priority=data["priority"],
+            file=data["file"],
+            line=data.get("line"),
+            problem=data.get("problem", ""),
+            signatures=[tuple(signature) for signature in data.get("signatures", [])],
+            status=data.get("status", STATUS_OPEN),
+            opened_iteration=data.get("opened_iteration", 1),
+            last_seen_iteration=data.get("last_seen_iteration", 1),
+            fixed_iteration=data.get("fixed_iteration"),
+            reopen_count=data.get("reopen_count", 0),
+            reviewers=list(data.get("reviewers", [])),
+            history=list(data.get("history", [])),
+        )
+
+
+class IssueTracker:
+    """
+    Индекс отпечатков замечаний PR и их жизненный цикл.
+
+    Состояние сериализуется в dict (to_dict/from_dict) и хранится
+    в CycleContext.issue_log между запусками цикла.
+    """
+
+    def __init__(self):
+        self.issues: Dict[str, TrackedIssue] = {}
+        self._by_band: Dict[Tuple[str, int, Signature], Set[str]] = {}
+        self._by_place: Dict[Tuple[str, Optional[int]], Set[str]] = {}
+        self._next_id = 1
+
+    # ------------------------------------------------------------------
+    # Индекс
+    # ------------------------------------------------------------------
+
+    def _index(self, tracked: TrackedIssue, signature: Signature) -> None:
+        for band, rows in _bands(signature):
+            self._by_band.setdefault((tracked.file, band, rows), set()).add(tracked.id)
+        self._by_place.setdefault((tracked.file, _line_bucket(tracked.line)), set()).add(tracked.id)
+
+    def _candidates(self, issue: Issue, signature: Signature) -> Set[str]:
+        found: Set[str] = set()
+        by_band, by_place, file = self._by_band, self._by_place, issue.file
+        for band, rows in _bands(signature):
+            ids = by_band.get((file, band, rows))
+            if ids:
+                found.update(ids)
+        bucket = _line_bucket(issue.line)
+        for neighbour in (None,) if bucket is None else (bucket - 1, bucket, bucket + 1):
+            ids = by_place.get((file, neighbour))
+            if ids:
+                found.update(ids)
+        return found
+
+    def match(self, issue: Issue, min_similarity: Optional[float] = None) -> Optional[TrackedIssue]:
+        """
+        Известное замечание, совпадающее с issue (или None).
+
+        Args:
+            issue: Замечание из ревью
+            min_similarity: Единый порог похожести вместо порогов по расстоянию строк
+        """
+        signature = fingerprint(issue.problem)
+        best, best_score = None, 0.0
+        for issue_id in self._candidates(issue, signature):
+            tracked = self.issues[issue_id]
+            if tracked.file != issue.file:
+                continue
+            if tracked.line is None or issue.line is None:
+                distance = LINE_TOLERANCE  # Место неизвестно — решает только текст
+            else:
+                distance = abs(tracked.line - issue.line)
+            if distance > LINE_TOLERANCE:
+                continue
+            if min_similarity is not None:
+                threshold = min_similarity
+            else:
+                threshold = SAME_LINE_SIMILARITY if distance <= SAME_LINE_TOLERANCE else SIMILARITY_THRESHOLD
+            score = max(similarity(signature, known) for known in tracked.signatures)
+            if score >= threshold and score > best_score:
+                best, best_score = tracked, score
+        return best
+
+    def add(self, issue: Issue, iteration: int = 1, reviewer: str = "") -> TrackedIssue:
+        """Начать отслеживать новое замечание."""
+        tracked = TrackedIssue(
+            id=f"I{self._next_id}",
+            priority=issue.priority,
+            file=issue.file,
+            line=issue.line,
+            problem=issue.problem,
+            signatures=[fingerprint(issue.problem)],
+            opened_iteration=iteration,
+            last_seen_iteration=iteration,
+            reviewers=[reviewer],
+            history=[{"event": EVENT_OPENED, "iteration": iteration, "reviewer": reviewer}],
+        )
+        self._next_id += 1
+        self.issues[tracked.id] = tracked
+        self._index(tracked, tracked.signatures[0])
+        return tracked
+
+    def _observe(self, tracked: TrackedIssue, issue: Issue, iteration: int, reviewer: str) -> None:
+        """Замечание встречено снова: обновить место, формулировку и ревьюверов."""
+        signature = fingerprint(issue.problem)
+        moved = _line_bucket(issue.line) != _line_bucket(tracked.line)
+        tracked.line = issue.line if issue.line is not None else tracked.line
+        tracked.problem = issue.problem
+        tracked.priority = min(tracked.priority, issue.priority)  # P0 < P1 < P2
+        tracked.last_seen_iteration = max(tracked.last_seen_iteration, iteration)
+        if reviewer not in tracked.reviewers:
+            tracked.reviewers.append(reviewer)
+        if signature not in tracked.signatures:
+            tracked.signatures.append(signature)
+            self._index(tracked, signature)
+        elif moved:
+            self._index(tracked, signature)
+
+    # ------------------------------------------------------------------
+    # Жизненный цикл
+    # ------------------------------------------------------------------
+
+    def update(self, iteration: int, reviews: Dict[str, ReviewData]) -> List[Tuple[str, TrackedIssue]]:
+        """
+        Учесть ревью итерации (можно вызывать повторно по мере прихода ревью).
+
+        Замечание считается исправленным, если кто-то из сообщивших о нём
+        уже прислал ревью этой итерации без него.
+
+        Returns:
+            Список (событие, замечание) — только новые переходы
+        """
+        events: List[Tuple[str, TrackedIssue]] = []
+        seen: Set[str] = set()
+
+        for reviewer, review in reviews.items():
+            for issue in review.issues:
+                tracked = self.match(issue)
+                if tracked is None:
+                    tracked = self.add(issue, iteration, reviewer)
+                    events.append((EVENT_OPENED, tracked))
+                elif tracked.status == STATUS_FIXED:
+                    if tracked.fixed_iteration == iteration:
+                        # Отмечено исправленным по ревью одного ревьювера, но другой его видит
+                        tracked.history.pop()
+                    else:
+                        tracked.reopen_count += 1
+                        tracked.history.append({"event": EVENT_REOPENED, "iteration": iteration, "reviewer": reviewer})
+                        events.append((EVENT_REOPENED, tracked))
+                    tracked.status = STATUS_OPEN
+                    tracked.fixed_iteration = None
+                if tracked.id not in seen or reviewer not in tracked.reviewers:
+                    self._observe(tracked, issue, iteration, reviewer)
+                seen.add(tracked.id)
+
+        reviewed = set(reviews)
+        for tracked in self.issues.values():
+            if tracked.status != STATUS_OPEN or tracked.id in seen:
+                continue
+            if tracked.opened_iteration >= iteration or not reviewed.intersection(tracked.reviewers):
+                continue
+            tracked.status = STATUS_FIXED
+            tracked.fixed_iteration = iteration
+            tracked.history.append({"event": EVENT_FIXED, "iteration": iteration})
+            events.append((EVENT_FIXED, tracked))
+
+        return events
+
+    def open_issues(self) -> List[TrackedIssue]:
+        return [tracked for tracked in self.issues.values() if tracked.status == STATUS_OPEN]
+
+    def fixed_issues(self) -> List[TrackedIssue]:
+        return [tracked for tracked in self.issues.values() if tracked.status == STATUS_FIXED]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"next_id": self._next_id, "issues": [tracked.to_dict() for tracked in self.issues.values()]}
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict[str, Any]]) -> "IssueTracker":
+        tracker = cls()
+        if not data:
+            return tracker
+        for item in data.get("issues", []):
+            tracked = TrackedIssue.from_dict(item)
+            tracker.issues[tracked.id] = tracked
+            for signature in tracked.signatures:
+                tracker._index(tracked, signature)
+        tracker._next_id = data.get("next_id", len(tracker.issues) + 1)
+        return tracker
@@ -0,0 +1,203 @@
+"""
+LLM Stream — потоковое получение ответа модели с таймаутами и метриками
+
+Ответ Gemini читается по частям (generate_content_stream): видно, что модель
+работает, а зависший вызов прерывается по таймауту простоя (нет новых частей)
+или общему таймауту. Для каждого вызова пишется строка метрик в JSONL:
+время до первого токена (TTFT), полная задержка, число токенов.
+
+Поток ответа читается в фоновом потоке и передаётся через очередь, поэтому
+таймауты работают, даже если SDK заблокировался на чтении из сети. После
+таймаута поток ответа закрывается, а чтение останавливается на следующей
+части: брошенная генерация не держит соединение и не тратит квоту.
+"""
+
+import json
+import os
+import queue
+import threading
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Iterable, Optional, Tuple
+
+DEFAULT_METRICS_LOG = Path(os.getenv(
+    "GEMINI_METRICS_LOG",
+    str(Path(__file__).parent / ".review_cache" / "gemini_metrics.jsonl"),
+))
+
+# Маркер конца потока в очереди
+_DONE = object()
+
+
+class GenerationTimeout(TimeoutError):
+    """Модель не уложилась в таймаут (TimeoutError — повторяется retry_call)"""
+
+
+@dataclass
+class CallMetrics:
+    """Метрики одного вызова модели"""
+    model: str
+    label: str = ""
+    started_at: str = ""
+    status: str = "ok"  # ok | timeout | error
+    ttft_ms: Optional[float] = None
+    latency_ms: Optional[float] = None
+    chunks: int = 0
+    chars: int = 0
+    prompt_tokens: Optional[int] = None
+    output_tokens: Optional[int] = None
+    total_tokens: Optional[int] = None
+    error: Optional[str] = None
+
+
+class MetricsLog:
+    """Потокобезопасная запись метрик в JSONL (None — не писать)."""
+
+    def __init__(self, path: Optional[Path] = DEFAULT_METRICS_LOG):
+        self.path = Path(path) if path is not None else None
+        self._lock = threading.Lock()
+
+    def append(self, metrics: CallMetrics) -> None:
+        if self.path is None:
+            return
+        line = json.dumps(asdict(metrics), ensure_ascii=False)
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with self.path.open("a", encoding="utf-8") as f:
+                f.write(line + "\n")
+
+
+def _apply_usage(metrics: CallMetrics, usage) -> None:
+    """usage_metadata из google-genai (приходит в последней части ответа)."""
+    metrics.prompt_tokens = getattr(usage, "prompt_token_count", None)
+    metrics.output_tokens = getattr(usage, "candidates_token_count", None)
+    metrics.total_tokens = getattr(usage, "total_token_count", None)
+
+
+def _close_stream(stream) -> None:
+    """Закрыть поток ответа SDK, если он это умеет (ошибки закрытия не важны)."""
+    close = getattr(stream, "close", None)
+    if close is None:
+        return
+    try:
+        close()
+    except Exception:
+        pass  # Генератор, занятый в другом потоке, закроет сам reader после следующей части
+
+
+def consume_stream(
+    open_stream: Callable[[], Iterable],
+    metrics: CallMetrics,
+    idle_timeout: float,
+    total_timeout: float,
+    on_progress: Optional[Callable[[CallMetrics, float], None]] = None,
+    clock: Callable[[], float] = time.monotonic,
+) -> str:
+    """
+    Прочитать потоковый ответ модели целиком.
+
+    Args:
+        open_stream: Открывает поток частей ответа (вызывается в фоновом потоке)
+        metrics: Заполняется по ходу чтения
+        idle_timeout: Максимальная пауза между частями (сек), включая ожидание первой
+        total_timeout: Максимальная длительность вызова (сек)
+        on_progress: Callback (метрики, прошедшие секунды) после каждой части
+        clock: Источник времени (для тестов)
+
+    Returns:
+        str: Текст ответа
+
+    Raises:
+        GenerationTimeout: Превышен таймаут простоя или общий таймаут
+        Исключение SDK, если поток завершился ошибкой
+    """
+    events: "queue.Queue" = queue.Queue()
+    stop = threading.Event()
+    streams = []  # Открытый поток ответа (для close() из вызывающего потока)
+    started = clock()
+    metrics.started_at = datetime.now().isoformat()
+
+    def reader() -> None:
+        stream = None
+        try:
+            stream = open_stream()
+            streams.append(stream)
+            for part in stream:
+                if stop.is_set():
+                    return
+                events.put(part)
+            events.put(_DONE)
+        except BaseException as e:  # Передаём ошибку SDK в вызывающий поток
+            if not stop.is_set():
+                events.put(e)
+        finally:
+            if stop.is_set():
+                _close_stream(stream)
+
+    threading.Thread(target=reader, name=f"llm-stream-{metrics.label}", daemon=True).start()
+
+    parts = []
+    try:
+        while True:
+            elapsed = clock() - started
+            remaining = total_timeout - elapsed
+            if remaining <= 0:
+                raise GenerationTimeout(f"общий таймаут {total_timeout:.0f} сек")
+            try:
+                event = events.get(timeout=min(idle_timeout, remaining))
+            except queue.Empty:
+                if clock() - started >= total_timeout:
+                    raise GenerationTimeout(f"общий таймаут {total_timeout:.0f} сек")
+                raise GenerationTimeout(f"нет ответа {idle_timeout:.0f} сек")
+
+            if event is _DONE:
+                break
+            if isinstance(event, BaseException):
+                raise event
+
+            elapsed = clock() - started
+            if metrics.ttft_ms is None:
+                metrics.ttft_ms = round(elapsed * 1000, 1)
+            text = getattr(event, "text", None) or ""
+            parts.append(text)
+            metrics.chunks += 1
+            metrics.chars += len(text)
+            usage = getattr(event, "usage_metadata", None)
+            if usage is not None:
+                _apply_usage(metrics, usage)
+            if on_progress:
+                on_progress(metrics, elapsed)
+    except GenerationTimeout as e:
+        metrics.status, metrics.error = "timeout", str(e)
+        stop.set()
+        if streams:
+            _close_stream(streams[0])
+        raise
+    except Exception as e:
+        metrics.status, metrics.error = "error", str(e)[:500]
+        stop.set()
+        raise
+    finally:
+        metrics.latency_ms = round((clock() - started) * 1000, 1)
+
+    return "".join(parts)
+
+
+def stream_text(
+    open_stream: Callable[[], Iterable],
+    model: str,
+    label: str = "",
+    idle_timeout: float = 120.0,
+    total_timeout: float = 600.0,
+    on_progress: Optional[Callable[[CallMetrics, float], None]] = None,
+    metrics_log: Optional[MetricsLog] = None,
+) -> Tuple[str, CallMetrics]:
+    """consume_stream + запись метрик вызова (в том числе неудачного)."""
+    metrics = CallMetrics(model=model, label=label)
+    try:
+        return consume_stream(open_stream, metrics, idle_timeout, total_timeout, on_progress), metrics
+    finally:
+        if metrics_log is not None:
+            metrics_log.append(metrics)
@@ -3,7 +3,8 @@
 PM Orchestrator — координатор review-fix-review цикла
 
 Основные функции:
-- Запуск Gemini ревьювера (gemini_reviewer.py)
+- Запуск Gemini ревьювера (gemini_reviewer.run_review, в том же процессе)
+- Запуск пула ревьюверов параллельно с бюджетом времени (tools/reviewer_pool.py)
 - Парсинг комментариев PR для сбора вердиктов
 - Расчёт консенсуса (3+ APPROVED от основных ревьюверов)
 - Вывод статуса и рекомендаций
@@ -16,29 +17,53 @@ Workflow:
 5. PM запускает: python tools/pm_orchestrator.py --pr=XXX --check-consensus
 6. Если нет консенсуса — PM запускает Developer для фиксов
 
+Режим --cycle хранит состояние цикла между запусками (tools/review_cycle.py)
+и обрабатывает только новые комментарии и коммиты.
+
+Режим --watch опрашивает открытые PR (tools/pr_watcher.py): запускает Gemini
+при новом HEAD и обновляет summary при новых ревью. С разовыми действиями
+(--run-gemini, --cycle и т.д.) не сочетается.
+
+Вызовы gh и Gemini идут через tools/transport.py: --transport=record записывает
+их в кассету, --transport=replay воспроизводит без сети (для отладки и бенчмарков).
+
 Note: Opus вызывается через Task tool, Codex — человеком.
       Этот скрипт автоматизирует только Gemini и сбор консенсуса.
 """
 
 import argparse
+import logging
 import os
 import subprocess
 import sys
 from pathlib import Path
-from typing import Optional
+from typing import List, Optional
 
 # Добавляем корень репозитория в sys.path для импортов
 _REPO_ROOT = Path(__file__).parent.parent
 if str(_REPO_ROOT) not in sys.path:
     sys.path.insert(0, str(_REPO_ROOT))
 
-from tools.pr_parser import get_latest_reviews
+from tools.github_api import GitHubApiError
+from tools.issue_tracker import IssueTracker
+from tools.pr_comments import SUMMARY_TYPE, is_summary, upsert_pr_comment, with_marker
+from tools.pr_parser import fetch_pr_comments, get_latest_reviews, parse_review_comments
 from tools.consensus import (
     calculate_consensus,
     extract_blocking_issues,
     get_consensus_summary,
 )
-from tools.review_state import MAIN_REVIEWERS, MAIN_REVIEWERS_SET, CONSENSUS_THRESHOLD
+from tools.pr_watcher import DEFAULT_MAX_INTERVAL, DEFAULT_MIN_INTERVAL, PRWatcher
+from tools.review_cycle import ReviewCycleEngine
+from tools.review_state import (
+    MAIN_REVIEWERS,
+    MAIN_REVIEWERS_SET,
+    CONSENSUS_THRESHOLD,
+    CycleContext,
+    CycleState,
+    ReviewStatus,
+)
+from tools.transport import MODE_LIVE, MODE_RECORD, MODE_REPLAY, create_transport, set_transport
 
 # Репозиторий по умолчанию
 DEFAULT_REPO = os.getenv("SLIME_ARENA_REPO", "komleff/slime-arena")
@@ -46,7 +71,7 @@ DEFAULT_REPO = os.getenv("SLIME_ARENA_REPO", "komleff/slime-arena")
 
 def run_gemini_reviewer(pr_number: int, iteration: int = 1, repo: str = DEFAULT_REPO) -> bool:
     """
-    Запустить gemini_reviewer.py для указанного PR.
+    Запустить Gemini ревью для указанного PR в текущем процессе.
 
     Args:
         pr_number: Номер PR
@@ -56,38 +81,61 @@ def run_gemini_reviewer(pr_number: int, iteration: int = 1, repo: str = DEFAULT_
     Returns:
         bool: True если успешно, False при ошибке
     """
-    script_dir = Path(__file__).parent
-    gemini_script = script_dir / "gemini_reviewer.py"
-
-    if not gemini_script.exists():
-        print(f"[ERROR] Скрипт {gemini_script} не найден")
-        return False
+    # Импорт по требованию: --check-consensus и --cycle не платят за модуль ревьювера,
+    # а Gemini SDK загружается только при первом запросе к модели
+    from tools.gemini_reviewer import ReviewerError, run_review
+    from tools.review_cache import ReviewCache
 
     print(f"[INFO] Запуск Gemini reviewer для PR #{pr_number} (iteration {iteration}, repo {repo})...")
 
     try:
-        subprocess.run(
-            [
-                sys.executable,
-                str(gemini_script),
-                "--pr", str(pr_number),
-                "--iteration", str(iteration),
-                "--repo", repo,
-            ],
-            check=True,
-            capture_output=True,
-            text=True,
-        )
+        with ReviewCache() as cache:
+            run_review(pr_number, iteration, repo, cache=cache)
         print("[OK] Gemini review опубликован")
         return True
-    except FileNotFoundError:
-        print("[ERROR] Python не найден")
+    except ReviewerError as e:
+        print(f"[ERROR] {e}")
         return False
     except subprocess.CalledProcessError as e:
         print(f"[ERROR] Gemini reviewer завершился с ошибкой: код {e.returncode}")
         if e.stderr:
             print(f"[INFO] stderr: {e.stderr[:500]}")
         return False
+    except Exception as e:
+        print(f"[ERROR] Критическая ошибка Gemini reviewer: {e}")
+        return False
+
+
+def run_reviewer_pool(
+    pr_number: int,
+    iteration: int = 1,
+    repo: str = DEFAULT_REPO,
+    specs: Optional[List[str]] = None,
+    budget: Optional[float] = None,
+) -> bool:
+    """
+    Запустить пул ревьюверов (tools/reviewer_pool.py) на одном diff-е.
+
+    Ревьюверы, не уложившиеся в бюджет, считаются PENDING и не блокируют цикл.
+
+    Returns:
+        bool: True если ни один ревьювер не завершился ошибкой
+    """
+    from tools.reviewer_pool import DEFAULT_BUDGET, print_outcomes, run_pool
+
+    print(f"[INFO] Запуск пула ревьюверов для PR #{pr_number} (iteration {iteration}, repo {repo})...")
+    try:
+        outcomes = run_pool(pr_number, iteration, repo, specs=specs,
+                            budget=budget if budget is not None else DEFAULT_BUDGET)
+    except ValueError as e:
+        print(f"[ERROR] {e}")
+        return False
+    except subprocess.CalledProcessError as e:
+        print(f"[ERROR] Не удалось получить diff PR: код {e.returncode}")
+        return False
+
+    print_outcomes(outcomes)
+    return all(outcome.status != ReviewStatus.ERROR for outcome in outcomes.values())
 
 
 def check_consensus(
@@ -164,41 +212,139 @@ def check_consensus(
     return False
 
 
-def publish_consensus_summary(pr_number: int, repo: str = DEFAULT_REPO) -> None:
+# Подсказки PM для каждого состояния цикла
+CYCLE_NEXT_ACTIONS = {
+    CycleState.WAITING_FOR_REVIEWS: "Дождитесь ревью от всех основных ревьюверов",
+    CycleState.ANALYZING_CONSENSUS: "Повторите --cycle для завершения анализа",
+    CycleState.WAITING_FOR_FIX: "Запустите Developer для исправления P0/P1 и запушьте фиксы",
+    CycleState.COMPLETED: "PR готов к merge (merge выполняет оператор)",
+    CycleState.ESCALATED: "Эскалация на человека-оператора",
+}
+
+
+def print_cycle_status(ctx: CycleContext) -> None:
+    """
+    Вывести состояние review-fix-review цикла.
+
+    Args:
+        ctx: Контекст цикла
+    """
+    print(f"\n[INFO] Цикл PR #{ctx.pr_number}: {ctx.state.value}")
+    print(f"[INFO] Итерация {ctx.iteration}/{ctx.max_iterations}, "
+          f"попытка {ctx.attempt}, разработчик: {ctx.developer_model}")
+    if ctx.head_sha:
+        print(f"[INFO] HEAD: {ctx.head_sha[:7]}")
+
+    for reviewer in MAIN_REVIEWERS:
+        if reviewer in ctx.reviews:
+            print(f"  - {reviewer}: {ctx.reviews[reviewer].status.value}")
+        else:
+            print(f"  - {reviewer}: NOT FOUND")
+
+    tracker = IssueTracker.from_dict(ctx.issue_log)
+    if ctx.blocking_issues:
+        print(f"\n[WARN] Блокирующие проблемы ({len(ctx.blocking_issues)}):")
+        for issue in ctx.blocking_issues:
+            location = f"{issue.file}:{issue.line}" if issue.line is not None else issue.file
+            tracked = tracker.match(issue)
+            note = ""
+            if tracked is not None and tracked.reopen_count:
+                note = f" [открыто повторно: {tracked.reopen_count}]"
+            elif tracked is not None and tracked.opened_iteration < ctx.iteration:
+                note = f" [с итерации {tracked.opened_iteration}]"
+            print(f"  - [{issue.priority}] {location} - {issue.problem[:60]}{note}")
+
+    fixed = tracker.fixed_issues()
+    if fixed:
+        print(f"\n[OK] Исправлено замечаний за цикл: {len(fixed)}")
+
+    print(f"\n[TIP] {CYCLE_NEXT_ACTIONS[ctx.state]}")
+
+
+def run_cycle(pr_number: int, repo: str = DEFAULT_REPO, max_iterations: Optional[int] = None) -> bool:
+    """
+    Инкрементально обновить review-fix-review цикл PR.
+
+    Args:
+        pr_number: Номер PR
+        repo: Репозиторий
+        max_iterations: Лимит итераций до эскалации (None — сохранённый в состоянии цикла)
+
+    Returns:
+        bool: True если цикл завершён консенсусом
+    """
+    engine = ReviewCycleEngine(repo=repo, max_iterations=max_iterations)
+    ctx = engine.update(pr_number)
+    print_cycle_status(ctx)
+    return ctx.state == CycleState.COMPLETED
+
+
+def watch(
+    repo: str = DEFAULT_REPO,
+    pr_numbers: Optional[List[int]] = None,
+    run_gemini: bool = True,
+    publish_summary: bool = True,
+    max_iterations: Optional[int] = None,
+    min_interval: float = DEFAULT_MIN_INTERVAL,
+    max_interval: float = DEFAULT_MAX_INTERVAL,
+) -> None:
+    """
+    Долгоживущий опрос PR (режим --watch).
+
+    Args:
+        repo: Репозиторий
+        pr_numbers: Следить только за этими PR (None = все открытые)
+        run_gemini: Запускать Gemini ревью при новом HEAD
+        publish_summary: Публиковать summary при новых ревью
+        max_iterations: Лимит итераций цикла до эскалации (None — сохранённый в состоянии цикла)
+        min_interval: Минимальный интервал опроса (сек)
+        max_interval: Максимальный интервал опроса (сек)
+    """
+    watcher = PRWatcher(
+        repo=repo,
+        pr_numbers=pr_numbers,
+        engine=ReviewCycleEngine(repo=repo, max_iterations=max_iterations),
+        on_new_head=(lambda pr, iteration: run_gemini_reviewer(pr, iteration, repo)) if run_gemini else None,
+        on_reviews_changed=(lambda pr: publish_consensus_summary(pr, repo)) if publish_summary else None,
+        min_interval=min_interval,
+        max_interval=max_interval,
+    )
+    target = f"PR {', '.join(f'#{n}' for n in pr_numbers)}" if pr_numbers else "все открытые PR"
+    print(f"[INFO] Watch: {repo}, {target} (интервал {min_interval:.0f}-{max_interval:.0f} сек, Ctrl+C для выхода)")
+    try:
+        watcher.run()
+    except KeyboardInterrupt:
+        print("\n[INFO] Watch остановлен")
+
+
+def publish_consensus_summary(pr_number: int, repo: str = DEFAULT_REPO, upsert: bool = True) -> None:
     """
     Опубликовать summary консенсуса в PR.
 
     Args:
         pr_number: Номер PR
         repo: Репозиторий
+        upsert: Обновить существующий summary вместо нового комментария
     """
-    reviews = get_latest_reviews(pr_number, repo)
+    # Комментарии загружаются один раз: и для ревью, и для поиска прежнего summary
+    comments = fetch_pr_comments(pr_number, repo)
+    if comments is None:
+        # Без комментариев не найти прежний summary — новый стал бы дублем
+        print(f"[ERROR] Не удалось загрузить комментарии PR #{pr_number}: summary не опубликован")
+        return
+    reviews = parse_review_comments(comments, pr_number)
     summary = get_consensus_summary(reviews)
 
-    # Записываем во временный файл (обход лимита командной строки)
-    # Уникальное имя с pr_number и pid для избежания гонок при параллельных запусках
-    tmp_file = Path(__file__).parent / f"tmp_consensus_pr{pr_number}_pid{os.getpid()}.md"
+    # Маркер позволяет найти и обновить summary на следующей итерации
+    body = with_marker({"type": SUMMARY_TYPE}, summary)
     try:
-        tmp_file.write_text(summary, encoding="utf-8")
-
-        subprocess.run(
-            [
-                "gh", "pr", "comment", str(pr_number),
-                "--repo", repo,
-                "--body-file", str(tmp_file),
-            ],
-            check=True,
-            capture_output=True,
-            text=True,
+        _, created = upsert_pr_comment(
+            pr_number, body, is_summary if upsert else None, repo=repo, comments=comments
         )
-        print(f"[OK] Consensus summary опубликован в PR #{pr_number}")
-    except subprocess.CalledProcessError as e:
-        print(f"[ERROR] Не удалось опубликовать summary: код {e.returncode}")
-        if e.stderr:
-            print(f"[INFO] stderr: {e.stderr[:500]}")
-    finally:
-        if tmp_file.exists():
-            tmp_file.unlink()
+        action = "опубликован" if created else "обновлён"
+        print(f"[OK] Consensus summary {action} в PR #{pr_number}")
+    except GitHubApiError as e:
+        print(f"[ERROR] Не удалось опубликовать summary: {e}")
 
 
 def main():
@@ -217,16 +363,29 @@ def main():
   # Опубликовать summary в PR
   python tools/pm_orchestrator.py --pr=110 --publish-summary
 
+  # Пул ревьюверов: два варианта Gemini параллельно, опоздавшие через 5 минут — PENDING
+  python tools/pm_orchestrator.py --pr=110 --run-pool --reviewers gemini codex=gemini:gemini-2.5-pro --budget=300
+
   # Полный цикл: Gemini + проверка
   python tools/pm_orchestrator.py --pr=110 --run-gemini --check-consensus
+
+  # Инкрементальное обновление цикла (состояние хранится между запусками)
+  python tools/pm_orchestrator.py --pr=110 --cycle --max-iterations=5
+
+  # Следить за всеми открытыми PR: Gemini при новом коммите, summary при новых ревью
+  python tools/pm_orchestrator.py --watch
+
+  # Записать вызовы gh/Gemini в кассету и воспроизвести их офлайн с задержкой 50 мс
+  python tools/pm_orchestrator.py --pr=110 --run-gemini --cycle --transport=record --cassette=pr110.json.gz
+  python tools/pm_orchestrator.py --pr=110 --run-gemini --cycle --transport=replay --cassette=pr110.json.gz --replay-latency-ms=50
         """
     )
 
     parser.add_argument(
         "--pr",
         type=int,
-        required=True,
-        help="Номер PR"
+        default=None,
+        help="Номер PR (обязателен для всех действий, кроме --watch)"
     )
     parser.add_argument(
         "--repo",
@@ -245,6 +404,24 @@ def main():
         action="store_true",
         help="Запустить Gemini reviewer"
     )
+    parser.add_argument(
+        "--run-pool",
+        action="store_true",
+        help="Запустить пул ревьюверов параллельно (см. --reviewers, --budget)"
+    )
+    parser.add_argument(
+        "--reviewers",
+        nargs="+",
+        default=None,
+        metavar="SPEC",
+        help="Ревьюверы пула `имя=тип:модель`, например gemini codex=gemini:gemini-2.5-pro (по умолчанию: REVIEWER_POOL)"
+    )
+    parser.add_argument(
+        "--budget",
+        type=float,
+        default=None,
+        help="Сколько ждать ревьюверов пула, сек; опоздавшие — PENDING (по умолчанию: REVIEWER_BUDGET или 900)"
+    )
     parser.add_argument(
         "--check-consensus",
         action="store_true",
@@ -255,15 +432,95 @@ def main():
         action="store_true",
         help="Опубликовать summary консенсуса в PR"
     )
+    parser.add_argument(
+        "--new-comment",
+        action="store_true",
+        help="Публиковать summary новым комментарием вместо обновления прежнего"
+    )
+    parser.add_argument(
+        "--cycle",
+        action="store_true",
+        help="Обновить review-fix-review цикл по новым комментариям и коммитам"
+    )
+    parser.add_argument(
+        "--max-iterations",
+        type=int,
+        default=None,
+        help="Лимит итераций цикла до эскалации; заменяет сохранённый в состоянии цикла (по умолчанию: сохранённый или 5)"
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="Следить за открытыми PR (или за --pr) и запускать действия автоматически"
+    )
+    parser.add_argument(
+        "--min-interval",
+        type=float,
+        default=DEFAULT_MIN_INTERVAL,
+        help=f"Минимальный интервал опроса в --watch, сек (по умолчанию: {DEFAULT_MIN_INTERVAL:.0f})"
+    )
+    parser.add_argument(
+        "--max-interval",
+        type=float,
+        default=DEFAULT_MAX_INTERVAL,
+        help=f"Максимальный интервал опроса в --watch, сек (по умолчанию: {DEFAULT_MAX_INTERVAL:.0f})"
+    )
+    parser.add_argument(
+        "--transport",
+        choices=[MODE_LIVE, MODE_RECORD, MODE_REPLAY],
+        default=None,
+        help="Транспорт вызовов gh/Gemini (по умолчанию: SLIME_ARENA_TRANSPORT или live)"
+    )
+    parser.add_argument(
+        "--cassette",
+        type=str,
+        default=None,
+        help="Файл кассеты для record/replay (по умолчанию: SLIME_ARENA_CASSETTE)"
+    )
+    parser.add_argument(
+        "--replay-latency-ms",
+        type=float,
+        default=None,
+        help="Задержка каждого ответа при replay, мс (по умолчанию: SLIME_ARENA_REPLAY_LATENCY_MS или 0)"
+    )
 
     args = parser.parse_args()
 
+    if args.transport or args.cassette:
+        try:
+            set_transport(create_transport(args.transport, args.cassette, args.replay_latency_ms))
+        except (FileNotFoundError, ValueError) as e:
+            parser.error(str(e))
+
     # Хотя бы одно действие должно быть указано
-    if not any([args.run_gemini, args.check_consensus, args.publish_summary]):
+    if not any([args.run_gemini, args.run_pool, args.check_consensus, args.publish_summary, args.cycle, args.watch]):
         parser.print_help()
-        print("\n[ERROR] Укажите хотя бы одно действие: --run-gemini, --check-consensus, --publish-summary")
+        print("\n[ERROR] Укажите хотя бы одно действие: --run-gemini, --run-pool, --check-consensus, --publish-summary, --cycle, --watch")
         sys.exit(1)
 
+    if args.watch:
+        # Watch сам запускает Gemini, обновляет цикл и summary — разовые действия с ним не сочетаются
+        combined = [flag for flag, enabled in (
+            ("--run-gemini", args.run_gemini), ("--run-pool", args.run_pool),
+            ("--check-consensus", args.check_consensus), ("--publish-summary", args.publish_summary),
+            ("--cycle", args.cycle),
+        ) if enabled]
+        if combined:
+            parser.error(f"--watch нельзя сочетать с {', '.join(combined)}")
+        # Сообщения watcher-а идут через logging
+        logging.basicConfig(level=logging.INFO, format="[%(levelname)s] %(message)s")
+        watch(
+            repo=args.repo,
+            pr_numbers=[args.pr] if args.pr is not None else None,
+            max_iterations=args.max_iterations,
+            min_interval=args.min_interval,
+            max_interval=args.max_interval,
+        )
+        sys.exit(0)
+
+    if args.pr is None:
+        parser.error("--pr обязателен для --run-gemini, --run-pool, --check-consensus, --publish-summary, --cycle")
+
     # Выполнение действий
     success = True
 
@@ -273,13 +530,22 @@ def main():
         if not run_gemini_reviewer(args.pr, gemini_iteration, args.repo):
             success = False
 
+    if args.run_pool:
+        pool_iteration = args.iteration if args.iteration is not None else 1
+        if not run_reviewer_pool(args.pr, pool_iteration, args.repo, specs=args.reviewers, budget=args.budget):
+            success = False
+
     if args.check_consensus:
         # Передаём iteration напрямую (None = все итерации)
         if not check_consensus(args.pr, args.repo, iteration=args.iteration):
             success = False
 
     if args.publish_summary:
-        publish_consensus_summary(args.pr, args.repo)
+        publish_consensus_summary(args.pr, args.repo, upsert=not args.new_comment)
+
+    if args.cycle:
+        if not run_cycle(args.pr, args.repo, max_iterations=args.max_iterations):
+            success = False
 
     sys.exit(0 if success else 1)
 
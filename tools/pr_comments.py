@@ -0,0 +1,158 @@
+"""
+PR Comments — публикация служебных комментариев PR с обновлением на месте
+
+Summary консенсуса и ревью Gemini одной итерации не дублируются: существующий
+комментарий находится по JSON-маркеру `<!-- {...} -->` и редактируется (PATCH).
+Число комментариев PR не растёт с каждой итерацией, поэтому стоимость их
+загрузки и разбора (pr_parser) остаётся постоянной.
+
+Тело передаётся в API через stdin (gh api --input -) — без временных файлов
+и без ограничения длины командной строки.
+"""
+
+import json
+import logging
+import sys
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, List, Optional, Tuple
+
+# Добавляем корень репозитория в sys.path для импортов
+_REPO_ROOT = Path(__file__).parent.parent
+if str(_REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(_REPO_ROOT))
+
+from tools.github_api import GitHubApiError, gh_api
+from tools.pr_parser import DEFAULT_REPO, fetch_pr_comments
+from tools.review_report import extract_verdict
+from tools.review_tokenizer import tokenize_review
+
+logger = logging.getLogger(__name__)
+
+# Маркер комментария с summary консенсуса
+SUMMARY_TYPE = "consensus_summary"
+
+MetadataMatch = Callable[[dict], bool]
+
+
+def comment_metadata(body: str) -> Optional[dict]:
+    """JSON-метаданные из маркера `<!-- {...} -->` или None."""
+    raw = tokenize_review(body or "", with_issues=False).metadata
+    if raw is None:
+        return None
+    try:
+        metadata = json.loads(raw)
+    except json.JSONDecodeError:
+        return None
+    return metadata if isinstance(metadata, dict) else None
+
+
+def with_marker(metadata: dict, body: str) -> str:
+    """Тело комментария с маркером метаданных в первой строке."""
+    return f"<!-- {json.dumps(metadata)} -->\n{body}"
+
+
+def is_summary(metadata: dict) -> bool:
+    return metadata.get("type") == SUMMARY_TYPE
+
+
+def review_matcher(reviewer: str, iteration: int) -> MetadataMatch:
+    """Комментарий-ревью указанного ревьювера за указанную итерацию."""
+    def match(metadata: dict) -> bool:
+        return (
+            metadata.get("type") == "review"
+            and str(metadata.get("reviewer", "")).lower() == reviewer
+            and metadata.get("iteration", 1) == iteration
+        )
+    return match
+
+
+def find_marked_comment(comments: List[dict], match: MetadataMatch) -> Optional[dict]:
+    """Последний комментарий, метаданные которого подходят под match."""
+    for comment in reversed(comments):
+        metadata = comment_metadata(comment.get("body", ""))
+        if metadata is not None and match(metadata):
+            return comment
+    return None
+
+
+def upsert_pr_comment(
+    pr_number: int,
+    body: str,
+    match: Optional[MetadataMatch],
+    repo: str = DEFAULT_REPO,
+    comments: Optional[List[dict]] = None,
+) -> Tuple[int, bool]:
+    """
+    Обновить служебный комментарий PR или создать новый.
+
+    Args:
+        pr_number: Номер PR
+        body: Полное тело комментария (с маркером метаданных)
+        match: Какой существующий комментарий обновлять (None — всегда новый)
+        repo: Репозиторий owner/repo
+        comments: Уже загруженные комментарии PR (None — загрузить)
+
+    Returns:
+        (id комментария, True если создан новый)
+
+    Raises:
+        GitHubApiError: Не удалось загрузить комментарии PR (создать новый
+            значило бы продублировать существующий), обновить или создать комментарий
+    """
+    payload = json.dumps({"body": body})
+
+    existing = None
+    if match is not None:
+        if comments is None:
+            comments = fetch_pr_comments(pr_number, repo)
+            if comments is None:
+                raise GitHubApiError(f"Не удалось загрузить комментарии PR #{pr_number}: публикация пропущена")
+        existing = find_marked_comment(comments, match)
+
+    if existing is not None:
+        try:
+            gh_api(f"repos/{repo}/issues/comments/{existing['id']}", method="PATCH", input_data=payload)
+            return existing["id"], False
+        except GitHubApiError as e:
+            # Например, комментарий оставлен другим пользователем (403) — публикуем новый
+            logger.warning(f"Не удалось обновить комментарий {existing['id']}: {e}. Публикуем новый.")
+
+    response = gh_api(f"repos/{repo}/issues/{pr_number}/comments", method="POST", input_data=payload)
+    return response.json()["id"], True
+
+
+def publish_review(
+    pr_number: int,
+    iteration: int,
+    reviewer: str,
+    report: str,
+    repo: str = DEFAULT_REPO,
+    upsert: bool = True,
+) -> bool:
+    """
+    Опубликовать отчёт ревьювера с метаданными `{"reviewer", "iteration", "type": "review"}`.
+
+    Args:
+        upsert: Обновить ревью этого ревьювера за эту итерацию, если оно уже есть
+
+    Returns:
+        bool: True если создан новый комментарий
+
+    Raises:
+        GitHubApiError: Не удалось опубликовать отчёт
+    """
+    metadata = {
+        "reviewer": reviewer,
+        "iteration": iteration,
+        "timestamp": datetime.now().isoformat(),
+        "type": "review",
+    }
+    # Вердикт в метаданных: pr_parser не зависит от порядка слов в тексте
+    verdict = extract_verdict(report)
+    if verdict:
+        metadata["status"] = verdict
+
+    match = review_matcher(reviewer, iteration) if upsert else None
+    _, created = upsert_pr_comment(pr_number, with_marker(metadata, report), match, repo=repo)
+    return created
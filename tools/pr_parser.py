@@ -20,7 +20,9 @@ _REPO_ROOT = Path(__file__).parent.parent
 if str(_REPO_ROOT) not in sys.path:
     sys.path.insert(0, str(_REPO_ROOT))
 
-from tools.review_state import ReviewData, ReviewStatus, Issue
+from tools.review_state import BodyStore, ReviewData, ReviewStatus, Issue, default_body_store
+from tools.review_tokenizer import IssueTuple, tokenize_review
+from tools.transport import get_transport
 
 # Логгер модуля; конфигурация логирования задаётся в точке входа
 logger = logging.getLogger(__name__)
@@ -28,7 +30,12 @@ logger = logging.getLogger(__name__)
 # Репозиторий по умолчанию (можно переопределить через env)
 DEFAULT_REPO = os.getenv("SLIME_ARENA_REPO", "komleff/slime-arena")
 
-# Паттерны для парсинга
+# Лимит разбираемого текста комментария. GitHub ограничивает тело 65536 символами,
+# больший текст — не ревью; разбираем только начало
+MAX_COMMENT_CHARS = int(os.getenv("PR_PARSER_MAX_COMMENT_CHARS", "262144"))
+
+# Паттерны для парсинга. Комментарии разбирает review_tokenizer за один проход
+# с той же семантикой; паттерны остаются спецификацией (и используются в review_report)
 METADATA_PATTERN = re.compile(r"<!--\s*(\{.*?\})\s*-->", re.DOTALL)
 VERDICT_PATTERN = re.compile(r"\b(APPROVED|CHANGES_REQUESTED|COMMENTED)\b")
 ISSUE_PATTERN = re.compile(
@@ -37,47 +44,63 @@ ISSUE_PATTERN = re.compile(
 )
 
 
-def parse_pr_comments(
+def comments_command(pr_number: int, repo: str = DEFAULT_REPO, since: Optional[str] = None) -> List[str]:
+    """Команда gh для загрузки комментариев PR (она же — ключ записи в кассете транспорта)."""
+    endpoint = f"repos/{repo}/issues/{pr_number}/comments"
+    if since:
+        endpoint += f"?since={since}"
+
+    # Используем --jq '.[]' чтобы развернуть массивы страниц в JSONL
+    # Без --jq при >30 комментариях --paginate выводит несколько JSON массивов
+    return [
+        "gh", "api",
+        "--paginate",  # Получить все страницы (>30 комментариев)
+        "--jq", ".[]",  # Развернуть массив в JSONL (один объект на строку)
+        endpoint,
+    ]
+
+
+def fetch_pr_comments(
     pr_number: int,
     repo: str = DEFAULT_REPO,
-    iteration: Optional[int] = None
-) -> Dict[str, ReviewData]:
+    since: Optional[str] = None
+) -> Optional[List[dict]]:
     """
-    Получить и распарсить все комментарии PR.
+    Получить сырые комментарии PR через GitHub API.
 
     Args:
         pr_number: Номер PR
         repo: Репозиторий в формате owner/repo
-        iteration: Фильтр по номеру итерации (None = все)
+        since: ISO timestamp — вернуть только комментарии с updated_at >= since
 
     Returns:
-        Dict[str, ReviewData]: Словарь {reviewer_name: ReviewData}
+        List[dict]: Комментарии в порядке создания, None при ошибке gh
     """
-    # Используем --jq '.[]' чтобы развернуть массивы страниц в JSONL
-    # Без --jq при >30 комментариях --paginate выводит несколько JSON массивов
     try:
-        result = subprocess.run(
-            [
-                "gh", "api",
-                "--paginate",  # Получить все страницы (>30 комментариев)
-                "--jq", ".[]",  # Развернуть массив в JSONL (один объект на строку)
-                f"repos/{repo}/issues/{pr_number}/comments",
-            ],
-            capture_output=True,
-            text=True,
-            check=True,
-            encoding="utf-8"
-        )
+        result = get_transport().run_gh(comments_command(pr_number, repo, since), check=True)
     except FileNotFoundError:
         logger.error("GitHub CLI (gh) не найден. Установите gh и выполните 'gh auth login'.")
-        return {}
+        return None
     except subprocess.CalledProcessError as e:
         logger.error(f"Ошибка при получении комментариев PR #{pr_number}: {e.stderr}")
-        return {}
+        return None
+
+    return parse_comments_jsonl(result.stdout)
 
+
+def parse_comments_jsonl(output: str) -> List[dict]:
+    """
+    Разобрать вывод `gh api --jq '.[]'` (JSONL, один комментарий на строку).
+
+    Args:
+        output: stdout gh api (или записанный fixture)
+
+    Returns:
+        List[dict]: Комментарии; строки с ошибкой JSON пропускаются
+    """
     # Парсим JSONL (каждая строка — отдельный JSON объект)
     comments_json = []
-    for line in result.stdout.strip().split("\n"):
+    for line in output.strip().split("\n"):
         if not line.strip():
             continue
         try:
@@ -85,9 +108,28 @@ def parse_pr_comments(
         except json.JSONDecodeError as e:
             logger.warning(f"Пропущена строка с ошибкой JSON: {e}")
 
+    return comments_json
+
+
+def parse_review_comments(
+    comments: List[dict],
+    pr_number: int,
+    iteration: Optional[int] = None
+) -> Dict[str, ReviewData]:
+    """
+    Распарсить список сырых комментариев в ревью.
+
+    Args:
+        comments: Комментарии из GitHub API (в порядке создания)
+        pr_number: Номер PR
+        iteration: Фильтр по номеру итерации (None = все)
+
+    Returns:
+        Dict[str, ReviewData]: Словарь {reviewer_name: ReviewData}
+    """
     reviews: Dict[str, ReviewData] = {}
 
-    for comment in comments_json:
+    for comment in comments:
         comment_body = comment.get("body", "")
         if not comment_body:
             continue
@@ -106,24 +148,59 @@ def parse_pr_comments(
     return reviews
 
 
-def parse_single_comment(body: str, pr_number: int) -> Optional[ReviewData]:
+def parse_pr_comments(
+    pr_number: int,
+    repo: str = DEFAULT_REPO,
+    iteration: Optional[int] = None
+) -> Dict[str, ReviewData]:
+    """
+    Получить и распарсить все комментарии PR.
+
+    Args:
+        pr_number: Номер PR
+        repo: Репозиторий в формате owner/repo
+        iteration: Фильтр по номеру итерации (None = все)
+
+    Returns:
+        Dict[str, ReviewData]: Словарь {reviewer_name: ReviewData}
+    """
+    comments = fetch_pr_comments(pr_number, repo)
+    if comments is None:
+        return {}
+
+    return parse_review_comments(comments, pr_number, iteration=iteration)
+
+
+def parse_single_comment(
+    body: str,
+    pr_number: int,
+    body_store: Optional[BodyStore] = None,
+) -> Optional[ReviewData]:
     """
     Распарсить один комментарий PR.
 
     Args:
         body: Тело комментария
         pr_number: Номер PR
+        body_store: Где хранить тело ревью (по умолчанию — общее хранилище процесса)
 
     Returns:
         ReviewData или None если комментарий не является ревью
     """
+    if len(body) > MAX_COMMENT_CHARS:
+        logger.warning(
+            f"Комментарий PR #{pr_number} длиной {len(body)} символов, "
+            f"разбираются первые {MAX_COMMENT_CHARS}"
+        )
+    # Метаданные, вердикт и замечания — за один проход
+    tokens = tokenize_review(body[:MAX_COMMENT_CHARS])
+
     # Попытка извлечь JSON метаданные
-    metadata_match = METADATA_PATTERN.search(body)
-    if not metadata_match:
+    if tokens.metadata is None:
         return None  # Не ревью комментарий (без метаданных)
 
     try:
-        metadata = json.loads(metadata_match.group(1))
+        metadata = json.loads(tokens.metadata)
     except json.JSONDecodeError as e:
         logger.warning(f"Не удалось распарсить JSON метаданные: {e}")
         return None
@@ -139,8 +216,7 @@ def parse_single_comment(body: str, pr_number: int) -> Optional[ReviewData]:
     # Извлекаем статус из метаданных или из текста
     status_str = metadata.get("status")
     if not status_str:
-        verdict_match = VERDICT_PATTERN.search(body)
-        status_str = verdict_match.group(1) if verdict_match else "COMMENTED"
+        status_str = tokens.verdict or "COMMENTED"
 
     # Нормализуем к uppercase для корректного поиска в Enum
     try:
@@ -158,12 +234,13 @@ def parse_single_comment(body: str, pr_number: int) -> Optional[ReviewData]:
             pass
 
     # Извлекаем проблемы
-    issues = extract_issues_from_body(body, reviewer)
+    issues = _build_issues(tokens.issues, reviewer)
 
     return ReviewData(
         reviewer=reviewer,
         status=status,
         body=body,
+        body_store=body_store or default_body_store(),
         issues=issues,
         iteration=iteration,
         timestamp=timestamp,
@@ -182,14 +259,14 @@ def extract_issues_from_body(body: str, reviewer: str) -> List[Issue]:
     Returns:
         List[Issue]: Список найденных проблем
     """
-    issues: List[Issue] = []
+    return _build_issues(tokenize_review(body[:MAX_COMMENT_CHARS]).issues, reviewer)
 
-    for match in ISSUE_PATTERN.finditer(body):
-        priority = match.group(1)
-        file_path = match.group(2).strip()
-        line_str = match.group(3)
-        problem = match.group(4).strip()
 
+def _build_issues(found: List[IssueTuple], reviewer: str) -> List[Issue]:
+    """Issue из групп (приоритет, файл, строка, текст), найденных токенизатором."""
+    issues: List[Issue] = []
+
+    for priority, file_path, line_str, problem in found:
         line = int(line_str) if line_str else None
 
         issues.append(Issue(
@@ -0,0 +1,306 @@
+"""
+PR Watcher — режим --watch для PM Orchestrator
+
+Долгоживущий опрос открытых PR:
+- Список PR запрашивается условно (ETag / If-None-Match): ответ 304 означает,
+  что ни один PR не изменился, и не расходует лимит GitHub API.
+- Список читается постранично по заголовку Link (rel="next"), ETag — у каждой
+  страницы свой; номера PR страницы запоминаются, чтобы 304 не терял их.
+- Для изменившихся PR цикл обновляется инкрементально (ReviewCycleEngine).
+- Смена HEAD → запуск Gemini ревью; новые ревью → обновление summary.
+- Интервал опроса адаптивный: растёт, пока ничего не меняется,
+  и сбрасывается к минимуму при изменениях.
+- Все запросы проходят через общий бюджет (TokenBucket) и учитывают
+  заголовки X-RateLimit-* от GitHub.
+"""
+
+import json
+import logging
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+# Добавляем корень репозитория в sys.path для импортов
+_REPO_ROOT = Path(__file__).parent.parent
+if str(_REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(_REPO_ROOT))
+
+from tools.github_api import ApiResponse, GitHubApiError, gh_api
+from tools.pr_parser import DEFAULT_REPO
+from tools.rate_limit import TokenBucket
+from tools.review_cycle import ReviewCycleEngine
+from tools.review_state import CycleContext, CycleState
+
+logger = logging.getLogger(__name__)
+
+# Интервалы опроса (секунды)
+DEFAULT_MIN_INTERVAL = float(os.getenv("PM_WATCH_MIN_INTERVAL", "30"))
+DEFAULT_MAX_INTERVAL = float(os.getenv("PM_WATCH_MAX_INTERVAL", "600"))
+BACKOFF_FACTOR = 1.5
+
+# Бюджет запросов к GitHub API в час (лимит токена — 5000/ч, оставляем запас другим инструментам)
+DEFAULT_HOURLY_BUDGET = float(os.getenv("PM_WATCH_HOURLY_BUDGET", "1000"))
+
+# Если у токена осталось меньше запросов — ждём сброса лимита
+RATE_LIMIT_RESERVE = 100
+
+# Callback-и действий: (pr_number, iteration)
+HeadCallback = Callable[[int, int], bool]
+ReviewsCallback = Callable[[int], None]
+
+
+def _reviews_signature(ctx: CycleContext) -> Dict[str, tuple]:
+    """Отпечаток ревью для определения, пришли ли новые вердикты."""
+    return {
+        name: (review.iteration, review.status.value, len(review.issues))
+        for name, review in ctx.reviews.items()
+    }
+
+
+class PRWatcher:
+    """
+    Опрос открытых PR с условными запросами.
+
+    Args:
+        repo: Репозиторий owner/repo
+        on_new_head: Вызывается при новом HEAD PR (запуск Gemini ревью)
+        on_reviews_changed: Вызывается при новых ревью (публикация summary)
+        pr_numbers: Следить только за этими PR (None = все открытые)
+        engine: Движок цикла
+        budget: Общий бюджет запросов
+    """
+
+    def __init__(
+        self,
+        repo: str = DEFAULT_REPO,
+        on_new_head: Optional[HeadCallback] = None,
+        on_reviews_changed: Optional[ReviewsCallback] = None,
+        pr_numbers: Optional[List[int]] = None,
+        engine: Optional[ReviewCycleEngine] = None,
+        budget: Optional[TokenBucket] = None,
+        min_interval: float = DEFAULT_MIN_INTERVAL,
+        max_interval: float = DEFAULT_MAX_INTERVAL,
+    ):
+        self.repo = repo
+        self.on_new_head = on_new_head
+        self.on_reviews_changed = on_reviews_changed
+        self.pr_numbers = pr_numbers
+        self.engine = engine or ReviewCycleEngine(repo=repo)
+        self.budget = budget or TokenBucket.per_hour(DEFAULT_HOURLY_BUDGET)
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.interval = min_interval
+
+        safe_repo = repo.replace("/", "__")
+        self.state_path = self.engine.store.state_dir / f"{safe_repo}-watch.json"
+        self.etags: Dict[str, str] = {}
+        self.prs: Dict[str, dict] = {}  # str(pr_number) → {head, updated_at, gemini_head}
+        self.pages: Dict[str, dict] = {}  # endpoint страницы → {numbers, next}
+        self._load_state()
+
+    # ------------------------------------------------------------------
+    # Состояние
+    # ------------------------------------------------------------------
+
+    def _load_state(self) -> None:
+        if not self.state_path.exists():
+            return
+        try:
+            data = json.loads(self.state_path.read_text(encoding="utf-8"))
+        except ValueError as e:
+            logger.warning(f"Повреждённое состояние watch {self.state_path}: {e}")
+            return
+        self.etags = data.get("etags", {})
+        self.prs = data.get("prs", {})
+        self.pages = data.get("pages", {})
+
+    def _save_state(self) -> None:
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.state_path.with_suffix(f".tmp{os.getpid()}")
+        tmp_path.write_text(json.dumps({"etags": self.etags, "prs": self.prs, "pages": self.pages}, indent=2), encoding="utf-8")
+        tmp_path.replace(self.state_path)
+
+    # ------------------------------------------------------------------
+    # Запросы
+    # ------------------------------------------------------------------
+
+    def _endpoints(self) -> List[str]:
+        if self.pr_numbers:
+            return [f"repos/{self.repo}/pulls/{number}" for number in self.pr_numbers]
+        return [f"repos/{self.repo}/pulls?state=open&per_page=100"]
+
+    def _respect_rate_limit(self, response: ApiResponse) -> None:
+        """Если лимит токена почти исчерпан — ждать его сброса."""
+        remaining = response.rate_limit_remaining
+        reset_at = response.rate_limit_reset
+        if remaining is None or reset_at is None or remaining >= RATE_LIMIT_RESERVE:
+            return
+        delay = max(0.0, reset_at - time.time()) + 1
+        logger.warning(f"Лимит GitHub API почти исчерпан ({remaining}), пауза {delay:.0f} сек")
+        time.sleep(delay)
+
+    def _conditional_get(self, endpoint: str) -> Optional[ApiResponse]:
+        """Условный GET с учётом бюджета. None — запрос пропущен (бюджет исчерпан)."""
+        if not self.budget.try_acquire():
+            logger.info("Бюджет запросов исчерпан, пропускаем опрос")
+            return None
+
+        response = gh_api(endpoint, etag=self.etags.get(endpoint))
+        self._respect_rate_limit(response)
+
+        if response.not_modified:
+            # 304 не расходует лимит GitHub — возвращаем токен в бюджет
+            self.budget.refund()
+            return response
+
+        if response.etag:
+            self.etags[endpoint] = response.etag
+        return response
+
+    # ------------------------------------------------------------------
+    # Обработка PR
+    # ------------------------------------------------------------------
+
+    def _handle_pr(self, pull: dict) -> bool:
+        """Обработать снимок PR из API. Returns: True если что-то изменилось."""
+        if pull.get("state", "open") != "open" or pull.get("draft"):
+            return False
+
+        number = pull["number"]
+        head = pull["head"]["sha"]
+        updated_at = pull.get("updated_at")
+        snapshot = self.prs.setdefault(str(number), {})
+
+        if snapshot.get("head") == head and snapshot.get("updated_at") == updated_at:
+            return False
+
+        before = _reviews_signature(self.engine.load(number))
+        # Запрос комментариев с курсором — тоже из бюджета
+        self.budget.acquire()
+        ctx = self.engine.update(number, head_sha=head)
+        after = _reviews_signature(ctx)
+
+        if ctx.state != CycleState.ESCALATED and snapshot.get("gemini_head") != head:
+            if "gemini" in ctx.reviews and "gemini_head" not in snapshot:
+                # Первое наблюдение PR: Gemini уже отревьюил текущую итерацию
+                snapshot["gemini_head"] = head
+            elif self.on_new_head is not None:
+                logger.info(f"PR #{number}: новый HEAD {head[:7]}, запуск Gemini (iteration {ctx.iteration})")
+                if self.on_new_head(number, ctx.iteration):
+                    snapshot["gemini_head"] = head
+
+        if after != before and self.on_reviews_changed is not None:
+            logger.info(f"PR #{number}: новые ревью, обновляем summary ({ctx.state.value})")
+            self.on_reviews_changed(number)
+
+        snapshot["head"] = head
+        snapshot["updated_at"] = updated_at
+        return True
+
+    def poll_once(self) -> bool:
+        """
+        Один проход опроса.
+
+        Returns:
+            bool: True если хотя бы один PR изменился
+        """
+        if not self.pr_numbers:
+            changed = self._poll_open_pulls()
+            self._save_state()
+            return changed
+
+        changed = False
+        for endpoint in self._endpoints():
+            try:
+                response = self._conditional_get(endpoint)
+            except GitHubApiError as e:
+                logger.error(f"Ошибка опроса {endpoint}: {e}")
+                continue
+            if response is None or response.not_modified:
+                continue
+            changed |= self._handle_pulls([response.json()])
+
+        self._save_state()
+        return changed
+
+    def _handle_pulls(self, pulls: List[dict]) -> bool:
+        """Обработать снимки PR; ошибка одного PR не прерывает остальные."""
+        changed = False
+        for pull in pulls:
+            try:
+                changed |= self._handle_pr(pull)
+            except GitHubApiError as e:
+                logger.error(f"Ошибка обработки PR #{pull.get('number')}: {e}")
+        return changed
+
+    def _poll_open_pulls(self) -> bool:
+        """
+        Постраничный опрос открытых PR (Link: rel="next").
+
+        На 304 номера PR и ссылка на следующую страницу берутся из прошлого
+        ответа этой страницы. Снимки закрытых PR удаляются, только если
+        пройдены все страницы — иначе PR со следующих страниц сочли бы закрытыми.
+
+        Returns:
+            bool: True если хотя бы один PR изменился
+        """
+        changed = False
+        open_numbers: set = set()
+        visited: List[str] = []
+        endpoint: Optional[str] = self._endpoints()[0]
+
+        while endpoint is not None and endpoint not in visited:
+            visited.append(endpoint)
+            try:
+                response = self._conditional_get(endpoint)
+            except GitHubApiError as e:
+                logger.error(f"Ошибка опроса {endpoint}: {e}")
+                return changed
+
+            page = self.pages.get(endpoint)
+            if response is None:
+                return changed
+            if response.not_modified and page is None:
+                # Номера страницы неизвестны (состояние старого формата) — перечитать целиком
+                self.etags.pop(endpoint, None)
+                return changed
+
+            if response.not_modified:
+                numbers, endpoint = page["numbers"], page.get("next")
+            else:
+                pulls = response.json() or []
+                changed |= self._handle_pulls(pulls)
+                numbers = [pull["number"] for pull in pulls]
+                self.pages[endpoint] = {"numbers": numbers, "next": response.next_endpoint}
+                endpoint = response.next_endpoint
+            open_numbers.update(str(number) for number in numbers)
+
+        # Все страницы пройдены: закрытые PR исчезли из списка — забываем их снимки
+        for number in list(self.prs):
+            if number not in open_numbers:
+                del self.prs[number]
+        for stale in set(self.pages) - set(visited):
+            del self.pages[stale]
+            self.etags.pop(stale, None)
+        return changed
+
+    def next_interval(self, changed: bool) -> float:
+        """Адаптивный интервал: минимум после изменений, экспоненциальный рост в тишине."""
+        if changed:
+            self.interval = self.min_interval
+        else:
+            self.interval = min(self.max_interval, self.interval * BACKOFF_FACTOR)
+        return self.interval
+
+    def run(self, max_polls: Optional[int] = None) -> None:
+        """Главный цикл опроса (Ctrl+C для выхода)."""
+        polls = 0
+        while max_polls is None or polls < max_polls:
+            changed = self.poll_once()
+            polls += 1
+            delay = self.next_interval(changed)
+            logger.debug(f"Следующий опрос через {delay:.0f} сек")
+            if max_polls is None or polls < max_polls:
+                time.sleep(delay)
@@ -0,0 +1,168 @@
+"""
+Rate Limit — ограничение частоты вызовов внешних API
+
+TokenBucket используется для глобального бюджета запросов:
+опрос GitHub в режиме --watch и вызовы Gemini API.
+retry_call повторяет вызов при временных ошибках (429, 5xx, сеть)
+с экспоненциальной задержкой и случайным разбросом (full jitter).
+"""
+
+import random
+import threading
+import time
+from typing import Callable, Optional, TypeVar
+
+T = TypeVar("T")
+
+# HTTP-статусы, при которых запрос имеет смысл повторить
+TRANSIENT_STATUS_CODES = frozenset({408, 429, 500, 502, 503, 504})
+
+
+class TokenBucket:
+    """
+    Потокобезопасный token bucket.
+
+    Args:
+        rate: Скорость пополнения (токенов в секунду)
+        capacity: Максимальный запас токенов (допустимый всплеск)
+        clock: Источник времени (для тестов)
+    """
+
+    def __init__(self, rate: float, capacity: float, clock: Callable[[], float] = time.monotonic):
+        if rate <= 0 or capacity <= 0:
+            raise ValueError("rate и capacity должны быть положительными")
+        self.rate = rate
+        self.capacity = capacity
+        self._clock = clock
+        self._tokens = capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def per_hour(cls, budget: float, burst: Optional[float] = None) -> "TokenBucket":
+        """Бюджет N запросов в час (всплеск по умолчанию — 5% бюджета, не меньше 1)"""
+        return cls(rate=budget / 3600.0, capacity=burst or max(1.0, budget * 0.05))
+
+    @classmethod
+    def per_minute(cls, budget: float, burst: Optional[float] = None) -> "TokenBucket":
+        """Бюджет N запросов в минуту (всплеск по умолчанию — весь минутный бюджет)"""
+        return cls(rate=budget / 60.0, capacity=burst or budget)
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    @property
+    def available(self) -> float:
+        with self._lock:
+            self._refill()
+            return self._tokens
+
+    def try_acquire(self, tokens: float = 1.0) -> bool:
+        """Взять токены без ожидания."""
+        with self._lock:
+            self._refill()
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return True
+            return False
+
+    def wait_time(self, tokens: float = 1.0) -> float:
+        """Сколько секунд ждать, пока накопится нужное число токенов."""
+        with self._lock:
+            self._refill()
+            missing = tokens - self._tokens
+            return max(0.0, missing / self.rate)
+
+    def acquire(self, tokens: float = 1.0, timeout: Optional[float] = None) -> bool:
+        """
+        Взять токены, ожидая пополнения.
+
+        Returns:
+            bool: False если не удалось уложиться в timeout
+        """
+        if tokens > self.capacity:
+            raise ValueError(f"Запрошено {tokens} токенов при ёмкости {self.capacity}")
+        deadline = None if timeout is None else self._clock() + timeout
+        while True:
+            if self.try_acquire(tokens):
+                return True
+            delay = self.wait_time(tokens)
+            if deadline is not None:
+                remaining = deadline - self._clock()
+                if remaining <= 0 or delay > remaining:
+                    return False
+            time.sleep(delay)
+
+    def refund(self, tokens: float = 1.0) -> None:
+        """Вернуть токены (например, запрос оказался бесплатным 304)."""
+        with self._lock:
+            self._refill()
+            self._tokens = min(self.capacity, self._tokens + tokens)
+
+
+def error_status(exc: BaseException) -> Optional[int]:
+    """
+    HTTP-статус из исключения клиента API.
+
+    google-genai кладёт его в `code`, requests/httpx — в `response.status_code`.
+    """
+    for attr in ("code", "status_code", "status"):
+        value = getattr(exc, attr, None)
+        if isinstance(value, int):
+            return value
+    response = getattr(exc, "response", None)
+    value = getattr(response, "status_code", None)
+    return value if isinstance(value, int) else None
+
+
+def is_transient_error(exc: BaseException) -> bool:
+    """Временная ошибка: перегрузка/квота (429, 5xx) или сбой сети."""
+    if isinstance(exc, (ConnectionError, TimeoutError)):
+        return True
+    return error_status(exc) in TRANSIENT_STATUS_CODES
+
+
+def backoff_delay(attempt: int, base_delay: float, max_delay: float, rng: random.Random = random) -> float:
+    """Задержка перед повтором номер attempt (с 0): равномерно в [0, min(max, base * 2^attempt)]."""
+    return rng.uniform(0.0, min(max_delay, base_delay * (2 ** attempt)))
+
+
+def retry_call(
+    fn: Callable[[], T],
+    attempts: int = 5,
+    base_delay: float = 2.0,
+    max_delay: float = 60.0,
+    is_retryable: Callable[[BaseException], bool] = is_transient_error,
+    on_retry: Optional[Callable[[int, BaseException, float], None]] = None,
+    sleep: Callable[[float], None] = time.sleep,
+    rng: random.Random = random,
+) -> T:
+    """
+    Вызвать fn, повторяя при временных ошибках.
+
+    Args:
+        fn: Вызов без аргументов
+        attempts: Максимум попыток (включая первую)
+        base_delay: Базовая задержка (сек)
+        max_delay: Потолок задержки (сек)
+        is_retryable: Стоит ли повторять после этого исключения
+        on_retry: Callback (номер попытки, исключение, задержка) перед ожиданием
+        sleep: Функция ожидания (для тестов)
+        rng: Источник случайности (для тестов)
+
+    Raises:
+        Последнее исключение, если попытки исчерпаны или ошибка не временная
+    """
+    for attempt in range(attempts):
+        try:
+            return fn()
+        except Exception as e:
+            if attempt + 1 >= attempts or not is_retryable(e):
+                raise
+            delay = backoff_delay(attempt, base_delay, max_delay, rng)
+            if on_retry:
+                on_retry(attempt + 1, e, delay)
+            sleep(delay)
+    raise ValueError("attempts должен быть положительным")
@@ -0,0 +1,187 @@
+"""
+Review Cache — кэш ревью файлов между итерациями
+
+Результат ревью одного файла (замечания, вердикт) хранится по ключу
+содержимого: путь + хеш отфильтрованного diff-а файла + версия промпта +
+модель. Diff включает строку index (blob до и после) и hunk-и после
+фильтра, поэтому тот же новый blob от другой базы или с другими
+настройками diff_filter — другой ключ. На следующей итерации повторно
+ревьюятся только файлы, diff которых изменился; для остальных замечания
+берутся из кэша.
+
+Хранилище — SQLite с вытеснением LRU по суммарному размеру записей.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# Добавляем корень репозитория в sys.path для импортов
+_REPO_ROOT = Path(__file__).parent.parent
+if str(_REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(_REPO_ROOT))
+
+from tools.diff_splitter import FileDiff
+from tools.review_report import ParsedReport, combine_verdicts
+from tools.review_state import Issue
+
+DEFAULT_CACHE_PATH = Path(os.getenv(
+    "GEMINI_REVIEW_CACHE",
+    str(Path(__file__).parent / ".review_cache" / "reviews.sqlite3"),
+))
+
+# Лимит размера кэша (значения записей), МБ
+DEFAULT_MAX_MB = float(os.getenv("GEMINI_REVIEW_CACHE_MB", "50"))
+
+def file_content_id(file_diff: FileDiff) -> str:
+    """
+    Идентификатор того, что видит модель: путь и хеш diff-а файла.
+
+    Только blob после изменения недостаточно: с другой базой или другим
+    фильтром diff (а значит и ревью) другой при том же blob.
+    """
+    digest = hashlib.sha256(file_diff.text.encode("utf-8")).hexdigest()
+    return f"{file_diff.path}@{file_diff.blob_sha or '-'}:{digest}"
+
+
+def make_key(content_id: str, prompt_version: str, model: str) -> str:
+    """Ключ записи кэша."""
+    return hashlib.sha256(f"{content_id}\0{prompt_version}\0{model}".encode("utf-8")).hexdigest()
+
+
+def report_to_json(report: ParsedReport) -> str:
+    return json.dumps({
+        "issues": [issue.to_dict() for issue in report.issues],
+        "verdict": report.verdict,
+        "positives": report.positives,
+    }, ensure_ascii=False)
+
+
+def report_from_json(value: str) -> ParsedReport:
+    data = json.loads(value)
+    return ParsedReport(
+        issues=[Issue.from_dict(item) for item in data.get("issues", [])],
+        verdict=data.get("verdict"),
+        positives=data.get("positives", []),
+    )
+
+
+class ReviewCache:
+    """
+    LRU-кэш ревью файлов в SQLite.
+
+    Args:
+        path: Файл базы (None = DEFAULT_CACHE_PATH)
+        max_bytes: Максимальный суммарный размер значений
+    """
+
+    def __init__(self, path: Optional[Path] = None, max_bytes: Optional[int] = None):
+        self.path = Path(path) if path is not None else DEFAULT_CACHE_PATH
+        self.max_bytes = max_bytes if max_bytes is not None else int(DEFAULT_MAX_MB * 1024 * 1024)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path))
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS reviews ("
+            " key TEXT PRIMARY KEY,"
+            " value TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS reviews_last_used ON reviews(last_used)")
+        self._conn.commit()
+        self.hits = 0
+        self.misses = 0
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def __enter__(self) -> "ReviewCache":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def get(self, key: str) -> Optional[ParsedReport]:
+        """Получить запись и отметить её как недавно использованную."""
+        row = self._conn.execute("SELECT value FROM reviews WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self._conn.execute("UPDATE reviews SET last_used = ? WHERE key = ?", (time.time(), key))
+        self._conn.commit()
+        self.hits += 1
+        return report_from_json(row[0])
+
+    def put(self, key: str, report: ParsedReport) -> None:
+        """Сохранить запись и вытеснить самые старые при превышении лимита."""
+        value = report_to_json(report)
+        self._conn.execute(
+            "INSERT OR REPLACE INTO reviews (key, value, size, last_used) VALUES (?, ?, ?, ?)",
+            (key, value, len(value.encode("utf-8")), time.time()),
+        )
+        self._evict()
+        self._conn.commit()
+
+    def total_bytes(self) -> int:
+        return self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM reviews").fetchone()[0]
+
+    def _evict(self) -> None:
+        excess = self.total_bytes() - self.max_bytes
+        if excess <= 0:
+            return
+        freed = 0
+        victims = []
+        for key, size in self._conn.execute("SELECT key, size FROM reviews ORDER BY last_used ASC"):
+            victims.append((key,))
+            freed += size
+            if freed >= excess:
+                break
+        self._conn.executemany("DELETE FROM reviews WHERE key = ?", victims)
+
+
+def _owner_of(issue_file: str, paths: List[str]) -> str:
+    """Файл чанка, к которому относится замечание (модель может сократить путь)."""
+    if issue_file in paths:
+        return issue_file
+    for path in paths:
+        if path.endswith("/" + issue_file) or issue_file.endswith("/" + path):
+            return path
+    return paths[0]
+
+
+def split_report_by_file(report: ParsedReport, paths: List[str]) -> Dict[str, ParsedReport]:
+    """
+    Разложить отчёт по чанку на отчёты по файлам для кэширования.
+
+    Замечания с нераспознанным путём и позитивные моменты относятся к первому
+    файлу чанка. Вердикт файла — CHANGES_REQUESTED при блокирующих замечаниях;
+    если модель запросила изменения, не указав блокирующих замечаний,
+    вердикт чанка получают все его файлы. Файлы чанка без явного вердикта
+    (или с COMMENTED) остаются COMMENTED, а не одобренными.
+    """
+    per_file = {path: ParsedReport() for path in paths}
+    for issue in report.issues:
+        per_file[_owner_of(issue.file, paths)].issues.append(issue)
+    per_file[paths[0]].positives = list(report.positives)
+
+    unexplained = report.verdict == "CHANGES_REQUESTED" and not any(i.is_blocking() for i in report.issues)
+    reviewed = "APPROVED" if report.verdict in ("APPROVED", "CHANGES_REQUESTED") else "COMMENTED"
+    for parsed in per_file.values():
+        blocking = any(issue.is_blocking() for issue in parsed.issues)
+        parsed.verdict = "CHANGES_REQUESTED" if blocking or unexplained else reviewed
+    return per_file
+
+
+def combine_reports(reports: List[ParsedReport]) -> ParsedReport:
+    """Объединить отчёты по одному файлу (файл, разрезанный на несколько чанков)."""
+    combined = ParsedReport()
+    for report in reports:
+        combined.issues.extend(report.issues)
+        combined.positives.extend(p for p in report.positives if p not in combined.positives)
+    combined.verdict = combine_verdicts(report.verdict for report in reports)
+    return combined
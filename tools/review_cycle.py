@@ -0,0 +1,352 @@
+"""
+Review Cycle — инкрементальный движок review-fix-review цикла
+
+Хранит CycleContext для каждого PR между запусками и переводит его
+по состояниям CycleState при появлении новых комментариев или коммитов.
+Каждый запуск обрабатывает только изменения с последнего перехода:
+комментарии запрашиваются с курсором `since`, уже учтённые ревью
+не перепарсиваются.
+
+Переходы:
+    WAITING_FOR_REVIEWS → ANALYZING_CONSENSUS  (пришли новые ревью)
+    ANALYZING_CONSENSUS → COMPLETED            (консенсус без P0/P1)
+    ANALYZING_CONSENSUS → WAITING_FOR_FIX      (все основные ревьюверы ответили, консенсуса нет)
+    ANALYZING_CONSENSUS → WAITING_FOR_REVIEWS  (ждём остальных ревьюверов)
+    WAITING_FOR_FIX     → WAITING_FOR_REVIEWS  (новый коммит → следующая итерация)
+    COMPLETED           → WAITING_FOR_REVIEWS  (новый коммит после консенсуса)
+    *                   → ESCALATED            (исчерпаны попытки или итерации)
+
+Замечания сопоставляются между итерациями по отпечаткам (tools/issue_tracker.py):
+их жизненный цикл opened → fixed → reopened хранится в CycleContext.issue_log.
+"""
+
+import json
+import logging
+import os
+import subprocess
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+# Добавляем корень репозитория в sys.path для импортов
+_REPO_ROOT = Path(__file__).parent.parent
+if str(_REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(_REPO_ROOT))
+
+from tools.consensus import calculate_consensus, extract_blocking_issues
+from tools.issue_tracker import IssueTracker
+from tools.pr_parser import DEFAULT_REPO, fetch_pr_comments, parse_single_comment
+from tools.review_state import (
+    CycleContext,
+    CycleResult,
+    CycleState,
+    MAIN_REVIEWERS_SET,
+)
+from tools.transport import get_transport
+
+logger = logging.getLogger(__name__)
+
+# Директория хранения состояния циклов (можно переопределить через env)
+DEFAULT_STATE_DIR = Path(os.getenv("PM_STATE_DIR", str(Path(__file__).parent / ".pm_state")))
+
+# Сколько последних переходов хранить в журнале контекста
+HISTORY_LIMIT = 50
+
+# Терминальные состояния: новые события их не меняют
+TERMINAL_STATES = frozenset({CycleState.ESCALATED})
+
+
+class CycleStore:
+    """Файловое хранилище CycleContext (один JSON на PR)."""
+
+    def __init__(self, state_dir: Optional[Path] = None):
+        self.state_dir = Path(state_dir) if state_dir is not None else DEFAULT_STATE_DIR
+
+    def _path(self, repo: str, pr_number: int) -> Path:
+        safe_repo = repo.replace("/", "__")
+        return self.state_dir / f"{safe_repo}-pr{pr_number}.json"
+
+    def load(self, repo: str, pr_number: int) -> Optional[CycleContext]:
+        """Загрузить контекст PR или None, если цикл ещё не начинался."""
+        path = self._path(repo, pr_number)
+        if not path.exists():
+            return None
+        try:
+            return CycleContext.from_dict(json.loads(path.read_text(encoding="utf-8")))
+        except (ValueError, KeyError) as e:
+            logger.warning(f"Повреждённое состояние цикла {path}: {e}. Начинаем заново.")
+            return None
+
+    def save(self, repo: str, ctx: CycleContext) -> None:
+        """Атомарно сохранить контекст PR."""
+        self.state_dir.mkdir(parents=True, exist_ok=True)
+        path = self._path(repo, ctx.pr_number)
+        tmp_path = path.with_suffix(f".tmp{os.getpid()}")
+        tmp_path.write_text(json.dumps(ctx.to_dict(), ensure_ascii=False, indent=2), encoding="utf-8")
+        tmp_path.replace(path)
+
+    def reset(self, repo: str, pr_number: int) -> None:
+        """Удалить сохранённый контекст PR."""
+        path = self._path(repo, pr_number)
+        if path.exists():
+            path.unlink()
+
+
+def fetch_head_sha(pr_number: int, repo: str = DEFAULT_REPO) -> Optional[str]:
+    """
+    Получить SHA последнего коммита PR.
+
+    Returns:
+        str: SHA или None при ошибке gh
+    """
+    try:
+        result = get_transport().run_gh(
+            ["gh", "api", f"repos/{repo}/pulls/{pr_number}", "--jq", ".head.sha"],
+            check=True,
+        )
+    except FileNotFoundError:
+        logger.error("GitHub CLI (gh) не найден. Установите gh и выполните 'gh auth login'.")
+        return None
+    except subprocess.CalledProcessError as e:
+        logger.error(f"Ошибка при получении HEAD PR #{pr_number}: {e.stderr}")
+        return None
+
+    sha = result.stdout.strip()
+    return sha or None
+
+
+class ReviewCycleEngine:
+    """
+    Инкрементальный движок цикла.
+
+    update() загружает сохранённый контекст, запрашивает только новые
+    комментарии (по курсору updated_at) и текущий HEAD, применяет
+    переходы и сохраняет результат.
+
+    max_iterations=None — лимит из сохранённого контекста (для нового — 5);
+    явно заданный лимит заменяет сохранённый.
+    """
+
+    def __init__(
+        self,
+        repo: str = DEFAULT_REPO,
+        store: Optional[CycleStore] = None,
+        max_iterations: Optional[int] = None,
+    ):
+        self.repo = repo
+        self.store = store or CycleStore()
+        self.max_iterations = max_iterations
+
+    def _load(self, pr_number: int) -> Tuple[CycleContext, bool]:
+        """Контекст PR и признак, что лимит итераций в нём изменён."""
+        ctx = self.store.load(self.repo, pr_number)
+        if ctx is None:
+            ctx = CycleContext(pr_number=pr_number)
+            if self.max_iterations is not None:
+                ctx.max_iterations = self.max_iterations
+            return ctx, False
+        if self.max_iterations is None or ctx.max_iterations == self.max_iterations:
+            return ctx, False
+        set_max_iterations(ctx, self.max_iterations)
+        return ctx, True
+
+    def load(self, pr_number: int) -> CycleContext:
+        """Загрузить контекст PR или создать новый."""
+        return self._load(pr_number)[0]
+
+    def update(
+        self,
+        pr_number: int,
+        head_sha: Optional[str] = None,
+        comments: Optional[List[dict]] = None,
+    ) -> CycleContext:
+        """
+        Обновить цикл PR по изменениям с последнего запуска.
+
+        Args:
+            pr_number: Номер PR
+            head_sha: Текущий HEAD (None = запросить через gh)
+            comments: Комментарии, изменённые после курсора (None = запросить через gh)
+
+        Returns:
+            CycleContext: Обновлённый и сохранённый контекст
+        """
+        ctx, limit_changed = self._load(pr_number)
+
+        if head_sha is None:
+            head_sha = fetch_head_sha(pr_number, self.repo)
+        if comments is None:
+            comments = fetch_pr_comments(pr_number, self.repo, since=ctx.comments_cursor) or []
+
+        if apply_changes(ctx, head_sha, comments) or limit_changed:
+            self.store.save(self.repo, ctx)
+        return ctx
+
+
+def set_max_iterations(ctx: CycleContext, max_iterations: int) -> None:
+    """
+    Сменить лимит итераций сохранённого цикла.
+
+    Если цикл был эскалирован только из-за лимита, а новый лимит его
+    допускает, цикл возвращается в состояние до эскалации.
+    """
+    ctx.max_iterations = max_iterations
+    if (
+        ctx.state == CycleState.ESCALATED
+        and ctx.result == CycleResult.MAX_ITERATIONS_REACHED
+        and ctx.iteration <= max_iterations
+        and ctx.history
+    ):
+        ctx.result = None
+        _record_transition(ctx, CycleState(ctx.history[-1]["from"]), f"max_iterations raised to {max_iterations}")
+
+
+def _record_transition(ctx: CycleContext, new_state: CycleState, reason: str) -> None:
+    """Сменить состояние и записать переход в журнал."""
+    if ctx.state == new_state:
+        return
+    ctx.history.append({
+        "from": ctx.state.value,
+        "to": new_state.value,
+        "reason": reason,
+        "iteration": ctx.iteration,
+        "at": datetime.now(timezone.utc).isoformat(),
+    })
+    del ctx.history[:-HISTORY_LIMIT]
+    ctx.state = new_state
+
+
+def _select_new_comments(ctx: CycleContext, comments: List[dict]) -> List[dict]:
+    """
+    Отобрать комментарии, которые ещё не учитывались, и сдвинуть курсор.
+
+    GitHub `since` включает границу, поэтому комментарии с updated_at,
+    равным курсору, отсекаются по сохранённым id.
+    """
+    cursor = ctx.comments_cursor
+    seen_at_cursor = set(ctx.cursor_comment_ids)
+    fresh: List[dict] = []
+
+    for comment in comments:
+        updated_at = comment.get("updated_at") or comment.get("created_at") or ""
+        if cursor is not None:
+            if updated_at < cursor:
+                continue
+            if updated_at == cursor and comment.get("id") in seen_at_cursor:
+                continue
+        fresh.append(comment)
+
+    for comment in fresh:
+        updated_at = comment.get("updated_at") or comment.get("created_at") or ""
+        if ctx.comments_cursor is None or updated_at > ctx.comments_cursor:
+            ctx.comments_cursor = updated_at
+            ctx.cursor_comment_ids = []
+        if updated_at == ctx.comments_cursor and comment.get("id") is not None:
+            ctx.cursor_comment_ids.append(comment["id"])
+
+    return fresh
+
+
+def _start_next_iteration(ctx: CycleContext, reason: str) -> None:
+    """Перейти к следующей итерации ревью после нового коммита."""
+    ctx.iteration += 1
+    ctx.reviews = {}
+    ctx.blocking_issues = []
+    ctx.result = None
+    _record_transition(ctx, CycleState.WAITING_FOR_REVIEWS, reason)
+
+
+def _analyze(ctx: CycleContext) -> None:
+    """ANALYZING_CONSENSUS: решить, куда двигаться дальше."""
+    _record_transition(ctx, CycleState.ANALYZING_CONSENSUS, "new reviews")
+
+    consensus, approved, total = calculate_consensus(ctx.reviews)
+    ctx.blocking_issues = extract_blocking_issues(ctx.reviews)
+
+    # Жизненный цикл замечаний: исправленные, повторно открытые, съехавшие по строкам
+    tracker = IssueTracker.from_dict(ctx.issue_log)
+    tracker.update(ctx.iteration, ctx.reviews)
+    ctx.issue_log = tracker.to_dict()
+
+    if consensus and not ctx.blocking_issues:
+        ctx.result = CycleResult.CONSENSUS_APPROVED
+        _record_transition(ctx, CycleState.COMPLETED, f"consensus {approved}/{total}")
+        return
+
+    if MAIN_REVIEWERS_SET.issubset(ctx.reviews.keys()):
+        _record_transition(
+            ctx,
+            CycleState.WAITING_FOR_FIX,
+            f"{approved}/{total} approved, {len(ctx.blocking_issues)} blocking",
+        )
+        return
+
+    _record_transition(ctx, CycleState.WAITING_FOR_REVIEWS, "waiting for remaining reviewers")
+
+
+def apply_changes(ctx: CycleContext, head_sha: Optional[str], comments: List[dict]) -> bool:
+    """
+    Применить новые события к контексту.
+
+    Args:
+        ctx: Контекст цикла (изменяется на месте)
+        head_sha: Текущий HEAD PR (None = неизвестен, коммиты не учитываются)
+        comments: Комментарии, полученные с курсором since
+
+    Returns:
+        bool: True если контекст изменился и его нужно сохранить
+    """
+    if ctx.state in TERMINAL_STATES:
+        return False
+
+    changed = False
+
+    # Новый коммит: фиксы опубликованы, начинаем следующую итерацию
+    if head_sha and head_sha != ctx.head_sha:
+        previous_sha = ctx.head_sha
+        ctx.head_sha = head_sha
+        changed = True
+        if previous_sha is not None:
+            if ctx.state == CycleState.WAITING_FOR_FIX:
+                ctx.increment_attempt()
+                _start_next_iteration(ctx, f"new commit {head_sha[:7]}")
+            elif ctx.state == CycleState.COMPLETED:
+                _start_next_iteration(ctx, f"new commit {head_sha[:7]} after consensus")
+
+    # Новые ревью: парсим только комментарии после курсора
+    reviews_changed = False
+    for comment in _select_new_comments(ctx, comments):
+        changed = True
+        body = comment.get("body") or ""
+        review = parse_single_comment(body, ctx.pr_number) if body else None
+        if review is None or review.iteration < ctx.iteration:
+            continue
+        if review.iteration > ctx.iteration:
+            # Ревьюверы уже перешли на новую итерацию (например, первый запуск движка)
+            ctx.iteration = review.iteration
+            ctx.reviews = {}
+            while ctx.attempt < ctx.iteration:
+                ctx.increment_attempt()
+        ctx.reviews[review.reviewer] = review
+        reviews_changed = True
+
+    if reviews_changed:
+        _analyze(ctx)
+
+    if ctx.state != CycleState.COMPLETED and (
+        ctx.should_escalate_to_human() or ctx.iteration > ctx.max_iterations
+    ):
+        ctx.result = (
+            CycleResult.ESCALATED_TO_HUMAN
+            if ctx.should_escalate_to_human()
+            else CycleResult.MAX_ITERATIONS_REACHED
+        )
+        _record_transition(
+            ctx,
+            CycleState.ESCALATED,
+            f"attempt {ctx.attempt}, iteration {ctx.iteration}/{ctx.max_iterations}",
+        )
+        changed = True
+
+    return changed
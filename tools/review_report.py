@@ -0,0 +1,173 @@
+"""
+Review Report — разбор и слияние отчётов ревьюверов
+
+Используется для map-reduce ревью: каждый чанк diff-а даёт свой отчёт,
+из которого извлекаются замечания и вердикт, а затем всё собирается
+в один отчёт формата, понятного pr_parser (ISSUE_PATTERN, VERDICT_PATTERN).
+"""
+
+import re
+import sys
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import List, Optional
+
+# Добавляем корень репозитория в sys.path для импортов
+_REPO_ROOT = Path(__file__).parent.parent
+if str(_REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(_REPO_ROOT))
+
+from tools.pr_parser import VERDICT_PATTERN
+from tools.review_state import Issue
+
+# Замечание в ответе модели. Терпимее ISSUE_PATTERN: допускает `файл:строка`
+# внутри одних backticks и не переходит на следующую строку.
+# Группы: приоритет, путь в backticks, путь без кавычек, строка после backticks, текст.
+REPORT_ISSUE_PATTERN = re.compile(
+    r"\*\*\[(P[012])\]\*\*[ \t]*(?:`([^`\n]+)`|([^\s`]+))(?::(\d+))?[ \t]*[—\-–][ \t]*(.+)"
+)
+
+# Заголовок секции вердикта
+VERDICT_HEADING_PATTERN = re.compile(r"^#+\s*Вердикт", re.MULTILINE | re.IGNORECASE)
+
+# Заголовок секции позитивных моментов и следующий заголовок
+POSITIVE_HEADING_PATTERN = re.compile(r"^#+\s*Позитивные моменты\s*$", re.MULTILINE | re.IGNORECASE)
+NEXT_HEADING_PATTERN = re.compile(r"^#+\s", re.MULTILINE)
+
+VERDICT_MARKS = {"APPROVED": "✅", "CHANGES_REQUESTED": "❌", "COMMENTED": "💬"}
+
+
+def combine_verdicts(verdicts, has_blocking: bool = False) -> str:
+    """
+    Общий вердикт частей: CHANGES_REQUESTED при блокирующих замечаниях или
+    запросе изменений, APPROVED — только если хотя бы одна часть явно одобрена,
+    иначе COMMENTED (одни комментарии не засчитываются в консенсус).
+    """
+    verdicts = set(verdicts)
+    if has_blocking or "CHANGES_REQUESTED" in verdicts:
+        return "CHANGES_REQUESTED"
+    return "APPROVED" if "APPROVED" in verdicts else "COMMENTED"
+
+
+@dataclass
+class ParsedReport:
+    """Замечания, вердикт и позитивные моменты одного отчёта"""
+    issues: List[Issue] = field(default_factory=list)
+    verdict: Optional[str] = None
+    positives: List[str] = field(default_factory=list)
+
+
+def extract_verdict(report: str) -> Optional[str]:
+    """
+    Вердикт отчёта: первое ключевое слово в секции «Вердикт»,
+    иначе последнее во всём тексте (шаблон промпта упоминает оба варианта).
+    """
+    heading = VERDICT_HEADING_PATTERN.search(report)
+    if heading:
+        match = VERDICT_PATTERN.search(report, heading.end())
+        if match:
+            return match.group(1)
+    matches = VERDICT_PATTERN.findall(report)
+    return matches[-1] if matches else None
+
+
+def parse_report(report: str, reviewer: str) -> ParsedReport:
+    """Извлечь замечания, вердикт и позитивные моменты из ответа модели."""
+    issues = []
+    for match in REPORT_ISSUE_PATTERN.finditer(report):
+        location = (match.group(2) or match.group(3)).strip()
+        line_str = match.group(4)
+        # `файл:строка` внутри backticks или файл:строка без кавычек
+        path, sep, tail = location.rpartition(":")
+        if sep and tail.isdigit() and path:
+            location, line_str = path, line_str or tail
+        issues.append(Issue(
+            priority=match.group(1),
+            file=location,
+            line=int(line_str) if line_str else None,
+            problem=match.group(5).strip(),
+            reviewer=reviewer,
+        ))
+
+    positives: List[str] = []
+    heading = POSITIVE_HEADING_PATTERN.search(report)
+    if heading:
+        next_heading = NEXT_HEADING_PATTERN.search(report, heading.end())
+        section = report[heading.end():next_heading.start() if next_heading else len(report)]
+        positives = [
+            line.strip().lstrip("-*•").strip()
+            for line in section.splitlines()
+            if line.strip().lstrip("-*•").strip()
+        ]
+
+    return ParsedReport(issues=issues, verdict=extract_verdict(report), positives=positives)
+
+
+def format_issue(issue: Issue) -> str:
+    """Замечание в формате, который распознаёт pr_parser.ISSUE_PATTERN."""
+    location = f"`{issue.file}`:{issue.line}" if issue.line is not None else f"`{issue.file}`"
+    return f"**[{issue.priority}]** {location} — {issue.problem}"
+
+
+def merge_reports(
+    parsed: List[ParsedReport],
+    title: str,
+    notes: Optional[List[str]] = None,
+    max_positives: int = 10,
+    verdict: Optional[str] = None,
+) -> str:
+    """
+    Собрать один отчёт из отчётов по частям diff-а.
+
+    Args:
+        parsed: Разобранные отчёты частей
+        title: Заголовок отчёта (например "## Review by Gemini 3 Pro")
+        notes: Служебные пометки (как был разбит diff и т.п.)
+        max_positives: Сколько позитивных моментов оставить
+        verdict: Вердикт как есть (иначе выводится из частей, см. combine_verdicts)
+
+    Returns:
+        str: Markdown-отчёт с секциями замечаний и вердиктом
+    """
+    issues: List[Issue] = []
+    seen = set()
+    positives: List[str] = []
+    verdicts = set()
+
+    for report in parsed:
+        if report.verdict:
+            verdicts.add(report.verdict)
+        for issue in report.issues:
+            key = (issue.priority, issue.file, issue.line, issue.problem)
+            if key not in seen:
+                seen.add(key)
+                issues.append(issue)
+        for positive in report.positives:
+            if positive not in positives:
+                positives.append(positive)
+
+    issues.sort(key=lambda x: (x.priority, x.file, x.line or 0))
+
+    if verdict is None:
+        verdict = combine_verdicts(verdicts, any(issue.is_blocking() for issue in issues))
+
+    lines = [title, ""]
+    for note in notes or []:
+        lines.append(f"_{note}_")
+    if notes:
+        lines.append("")
+
+    lines.extend(["### Позитивные моменты", ""])
+    if positives:
+        lines.extend(f"- {positive}" for positive in positives[:max_positives])
+    else:
+        lines.append("- —")
+
+    lines.extend(["", "### Замечания", ""])
+    if issues:
+        lines.extend(f"{i}. {format_issue(issue)}" for i, issue in enumerate(issues, start=1))
+    else:
+        lines.append("Замечаний нет.")
+
+    lines.extend(["", "### Вердикт", f"**{verdict}** {VERDICT_MARKS[verdict]}"])
+    return "\n".join(lines)
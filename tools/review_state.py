@@ -5,9 +5,14 @@ Review State — структуры данных для PM Orchestrator
 и типы результатов цикла.
 """
 
+import hashlib
+import sys
+import tempfile
+import threading
+import weakref
 from dataclasses import dataclass, field
 from enum import Enum
-from typing import List, Optional
+from typing import Any, Dict, List, Optional, Union
 from datetime import datetime
 
 
@@ -37,31 +42,262 @@ class CycleResult(Enum):
     ERROR = "error"
 
 
-@dataclass
 class Issue:
-    """Проблема, найденная ревьювером"""
-    priority: str  # P0, P1, P2
-    file: str
-    line: Optional[int]
-    problem: str
-    solution: Optional[str] = None
-    reviewer: str = ""
+    """
+    Проблема, найденная ревьювером.
+
+    Неизменяемая и без __dict__: сканы по многим PR держат тысячи замечаний.
+    Приоритет, ревьювер и путь файла интернируются — это несколько значений,
+    повторяющихся во всех замечаниях. __slots__ объявлены вручную, как
+    у ReviewData: dataclass(slots=True) требует Python 3.10.
+    """
+
+    __slots__ = ("priority", "file", "line", "problem", "solution", "reviewer")
+
+    def __init__(
+        self,
+        priority: str,  # P0, P1, P2
+        file: str,
+        line: Optional[int],
+        problem: str,
+        solution: Optional[str] = None,
+        reviewer: str = "",
+    ):
+        object.__setattr__(self, "priority", sys.intern(priority))
+        object.__setattr__(self, "file", sys.intern(file))
+        object.__setattr__(self, "line", line)
+        object.__setattr__(self, "problem", problem)
+        object.__setattr__(self, "solution", solution)
+        object.__setattr__(self, "reviewer", sys.intern(reviewer))
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError(f"Issue неизменяемый: нельзя присвоить {name}")
+
+    def __delattr__(self, name: str) -> None:
+        raise AttributeError(f"Issue неизменяемый: нельзя удалить {name}")
+
+    def _astuple(self) -> tuple:
+        return (self.priority, self.file, self.line, self.problem, self.solution, self.reviewer)
+
+    def __eq__(self, other: object) -> bool:
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return self._astuple() == other._astuple()
+
+    def __hash__(self) -> int:
+        return hash(self._astuple())
+
+    def __repr__(self) -> str:
+        return (
+            f"Issue(priority={self.priority!r}, file={self.file!r}, line={self.line!r}, "
+            f"problem={self.problem!r}, solution={self.solution!r}, reviewer={self.reviewer!r})"
+        )
+
+    def replace(self, **changes: Any) -> "Issue":
+        """Копия с изменёнными полями"""
+        values = dict(zip(self.__slots__, self._astuple()))
+        values.update(changes)
+        return Issue(**values)
 
     def is_blocking(self) -> bool:
         """P0 и P1 блокируют merge"""
         return self.priority in ("P0", "P1")
 
+    def to_dict(self) -> Dict[str, Any]:
+        """Сериализация для сохранения состояния цикла"""
+        return {
+            "priority": self.priority,
+            "file": self.file,
+            "line": self.line,
+            "problem": self.problem,
+            "solution": self.solution,
+            "reviewer": self.reviewer,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Issue":
+        """Восстановить Issue из сохранённого состояния"""
+        return cls(
+            priority=data["priority"],
+            file=data["file"],
+            line=data.get("line"),
+            problem=data.get("problem", ""),
+            solution=data.get("solution"),
+            reviewer=data.get("reviewer", ""),
+        )
+
+
+# Тела короче этого хранятся в самом ReviewData: обращение к файлу дороже строки
+INLINE_BODY_CHARS = 256
+
+# Файл хранилища уплотняется, когда занят больше чем вдвое от живых тел (и не меньше этого)
+BODY_STORE_COMPACT_BYTES = 4 * 1024 * 1024
+
+
+class BodyRef:
+    """Положение тела комментария в BodyStore (смещение меняется при уплотнении)"""
+
+    __slots__ = ("store", "offset", "length", "digest", "__weakref__")
+
+    def __init__(self, store: "BodyStore", offset: int, length: int, digest: str):
+        self.store = store
+        self.offset = offset
+        self.length = length  # Байт UTF-8
+        self.digest = digest
+
+    def load(self) -> str:
+        return self.store.get(self)
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, BodyRef):
+            return NotImplemented
+        return self.digest == other.digest
+
+    def __hash__(self) -> int:
+        return hash(self.digest)
+
+    def __repr__(self) -> str:
+        return f"BodyRef(offset={self.offset}, length={self.length}, digest={self.digest!r})"
+
+
+class BodyStore:
+    """
+    Хранилище тел комментариев вне памяти процесса.
+
+    Тела дописываются во временный файл (удаляется при закрытии), в памяти
+    остаются только смещение, длина и хеш. Одинаковые тела (повторный разбор
+    тех же комментариев в --watch) записываются один раз.
+
+    Ссылки на тела слабые: когда ReviewData с телом больше никому не нужен
+    (контекст цикла перешёл к новой итерации), тело освобождается, а файл
+    уплотняется, как только мёртвые тела занимают больше половины. Поэтому
+    долгий --watch не растёт ни в памяти, ни на диске.
+    """
+
+    def __init__(self, compact_bytes: int = BODY_STORE_COMPACT_BYTES):
+        self._file = tempfile.TemporaryFile()
+        self._refs: "weakref.WeakValueDictionary[str, BodyRef]" = weakref.WeakValueDictionary()
+        self._end = 0
+        self._compact_bytes = compact_bytes
+        self._next_compact = compact_bytes
+        self._lock = threading.Lock()
+
+    def put(self, text: str) -> BodyRef:
+        data = text.encode("utf-8")
+        digest = hashlib.blake2b(data, digest_size=16).hexdigest()
+        with self._lock:
+            ref = self._refs.get(digest)
+            if ref is None:
+                if self._end + len(data) > self._next_compact:
+                    self._compact()
+                self._file.seek(self._end)
+                self._file.write(data)
+                ref = BodyRef(self, self._end, len(data), digest)
+                self._refs[digest] = ref
+                self._end += len(data)
+            return ref
+
+    def _compact(self) -> None:
+        """Переписать живые тела в новый файл (под блокировкой)."""
+        live = sorted(self._refs.values(), key=lambda ref: ref.offset)
+        if sum(ref.length for ref in live) * 2 <= self._end:
+            compacted = tempfile.TemporaryFile()
+            end = 0
+            for ref in live:
+                self._file.seek(ref.offset)
+                compacted.write(self._file.read(ref.length))
+                ref.offset = end
+                end += ref.length
+            self._file.close()
+            self._file, self._end = compacted, end
+        self._next_compact = max(self._compact_bytes, self._end * 2)
+
+    def get(self, ref: BodyRef) -> str:
+        with self._lock:
+            self._file.seek(ref.offset)
+            return self._file.read(ref.length).decode("utf-8")
+
+    @property
+    def size(self) -> int:
+        """Байт на диске"""
+        return self._end
+
+    def __len__(self) -> int:
+        """Живых тел"""
+        return len(self._refs)
+
+    def close(self) -> None:
+        self._file.close()
+
+
+_default_body_store: Optional[BodyStore] = None
+_default_body_store_lock = threading.Lock()
+
+
+def default_body_store() -> BodyStore:
+    """Общее хранилище тел процесса (создаётся при первом обращении)."""
+    global _default_body_store
+    if _default_body_store is None:
+        with _default_body_store_lock:
+            if _default_body_store is None:
+                _default_body_store = BodyStore()
+    return _default_body_store
+
 
-@dataclass
 class ReviewData:
-    """Данные ревью от одного ревьювера"""
-    reviewer: str  # opus, codex, gemini, copilot
-    status: ReviewStatus
-    body: str
-    issues: List[Issue] = field(default_factory=list)
-    iteration: int = 1
-    timestamp: Optional[datetime] = None
-    pr_number: int = 0
+    """
+    Данные ревью от одного ревьювера.
+
+    Тело комментария держится строкой, только если оно короткое или передано
+    без хранилища; иначе в BodyStore, а атрибут body читает его при обращении.
+    Для консенсуса и цикла тело не нужно — нужны статус и замечания.
+    """
+
+    __slots__ = ("reviewer", "status", "_body", "issues", "iteration", "timestamp", "pr_number")
+
+    def __init__(
+        self,
+        reviewer: str,  # opus, codex, gemini, copilot
+        status: ReviewStatus,
+        body: Union[str, BodyRef] = "",
+        issues: Optional[List[Issue]] = None,
+        iteration: int = 1,
+        timestamp: Optional[datetime] = None,
+        pr_number: int = 0,
+        body_store: Optional[BodyStore] = None,
+    ):
+        self.reviewer = sys.intern(reviewer)
+        self.status = status
+        if body_store is not None and isinstance(body, str) and len(body) >= INLINE_BODY_CHARS:
+            body = body_store.put(body)
+        self._body = body
+        self.issues = issues if issues is not None else []
+        self.iteration = iteration
+        self.timestamp = timestamp
+        self.pr_number = pr_number
+
+    @property
+    def body(self) -> str:
+        body = self._body
+        return body.load() if isinstance(body, BodyRef) else body
+
+    @body.setter
+    def body(self, value: str) -> None:
+        self._body = value
+
+    def _key(self) -> tuple:
+        return (self.reviewer, self.status, self.issues, self.iteration, self.timestamp, self.pr_number)
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, ReviewData):
+            return NotImplemented
+        return self._key() == other._key() and self.body == other.body
+
+    def __repr__(self) -> str:
+        return (
+            f"ReviewData(reviewer={self.reviewer!r}, status={self.status}, issues={len(self.issues)}, "
+            f"iteration={self.iteration}, pr_number={self.pr_number})"
+        )
 
     @classmethod
     def from_error(cls, reviewer: str, error_message: str) -> "ReviewData":
@@ -77,6 +313,36 @@ class ReviewData:
         """Есть ли блокирующие проблемы (P0/P1)"""
         return any(issue.is_blocking() for issue in self.issues)
 
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Сериализация для сохранения состояния цикла.
+
+        Тело комментария не сохраняется: для переходов цикла нужны только
+        статус и проблемы, а полный текст всегда доступен в PR.
+        """
+        return {
+            "reviewer": self.reviewer,
+            "status": self.status.value,
+            "issues": [issue.to_dict() for issue in self.issues],
+            "iteration": self.iteration,
+            "timestamp": self.timestamp.isoformat() if self.timestamp else None,
+            "pr_number": self.pr_number,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ReviewData":
+        """Восстановить ReviewData из сохранённого состояния (без тела)"""
+        timestamp = data.get("timestamp")
+        return cls(
+            reviewer=data["reviewer"],
+            status=ReviewStatus(data["status"]),
+            body="",
+            issues=[Issue.from_dict(item) for item in data.get("issues", [])],
+            iteration=data.get("iteration", 1),
+            timestamp=datetime.fromisoformat(timestamp) if timestamp else None,
+            pr_number=data.get("pr_number", 0),
+        )
+
 
 @dataclass
 class CycleContext:
@@ -89,6 +355,13 @@ class CycleContext:
     blocking_issues: List[Issue] = field(default_factory=list)
     developer_model: str = "opus"  # opus или codex
     attempt: int = 1
+    result: Optional[CycleResult] = None
+    # Курсоры инкрементального обновления (см. tools/review_cycle.py)
+    head_sha: Optional[str] = None  # Последний известный HEAD коммит PR
+    comments_cursor: Optional[str] = None  # Максимальный updated_at обработанных комментариев
+    cursor_comment_ids: List[int] = field(default_factory=list)  # id комментариев с updated_at == cursor
+    history: List[dict] = field(default_factory=list)  # Журнал переходов (последние записи)
+    issue_log: dict = field(default_factory=dict)  # Замечания между итерациями (IssueTracker.to_dict)
 
     def should_escalate_to_codex(self) -> bool:
         """Нужно ли эскалировать на Codex (после 3 попыток Opus)"""
@@ -104,6 +377,49 @@ class CycleContext:
         if self.should_escalate_to_codex():
             self.developer_model = "codex"
 
+    def to_dict(self) -> Dict[str, Any]:
+        """Сериализация контекста для хранения между запусками"""
+        return {
+            "pr_number": self.pr_number,
+            "iteration": self.iteration,
+            "max_iterations": self.max_iterations,
+            "state": self.state.value,
+            "reviews": {name: review.to_dict() for name, review in self.reviews.items()},
+            "blocking_issues": [issue.to_dict() for issue in self.blocking_issues],
+            "developer_model": self.developer_model,
+            "attempt": self.attempt,
+            "result": self.result.value if self.result else None,
+            "head_sha": self.head_sha,
+            "comments_cursor": self.comments_cursor,
+            "cursor_comment_ids": list(self.cursor_comment_ids),
+            "history": list(self.history),
+            "issue_log": self.issue_log,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "CycleContext":
+        """Восстановить контекст из сохранённого состояния"""
+        result = data.get("result")
+        return cls(
+            pr_number=data["pr_number"],
+            iteration=data.get("iteration", 1),
+            max_iterations=data.get("max_iterations", 5),
+            state=CycleState(data.get("state", CycleState.WAITING_FOR_REVIEWS.value)),
+            reviews={
+                name: ReviewData.from_dict(review)
+                for name, review in data.get("reviews", {}).items()
+            },
+            blocking_issues=[Issue.from_dict(item) for item in data.get("blocking_issues", [])],
+            developer_model=data.get("developer_model", "opus"),
+            attempt=data.get("attempt", 1),
+            result=CycleResult(result) if result else None,
+            head_sha=data.get("head_sha"),
+            comments_cursor=data.get("comments_cursor"),
+            cursor_comment_ids=list(data.get("cursor_comment_ids", [])),
+            history=list(data.get("history", [])),
+            issue_log=data.get("issue_log") or {},
+        )
+
 
 # Основные ревьюверы для консенсуса (3 APPROVED = консенсус)
 # Tuple для детерминированного порядка вывода
@@ -0,0 +1,263 @@
+"""
+Review Tokenizer — разбор комментария-ревью за один линейный проход
+
+Заменяет три регулярных выражения pr_parser (METADATA_PATTERN, VERDICT_PATTERN,
+ISSUE_PATTERN), каждое из которых сканировало тело комментария целиком,
+а METADATA_PATTERN (`.*?` под DOTALL) мог сильно откатываться на больших телах
+с множеством фрагментов `<!--`.
+
+Лексер ищет только литеральные токены (`<!--`, `**[P0]**`..`**[P2]**`,
+слова вердикта), курсор движется только вперёд. Обработчики токенов
+воспроизводят семантику прежних регулярных выражений (включая откаты),
+но без повторного сканирования: границы групп кешируются, поэтому каждый
+символ просматривается ограниченное число раз.
+
+Результаты совпадают с регулярными выражениями pr_parser — это проверяется
+тестом эквивалентности (tools/test_review_tokenizer.py).
+"""
+
+import re
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+
+# Токены лексера: только литералы, без квантификаторов — поиск линейный
+TOKEN_PATTERN = re.compile(r"<!--|\*\*\[P[012]\]\*\*|APPROVED|CHANGES_REQUESTED|COMMENTED")
+
+# Символы, на которых обрывается путь файла в замечании ([^:`'"]+)
+PATH_STOP_PATTERN = re.compile(r"[:`'\"]")
+
+QUOTES = "`'\""
+DASHES = "—-–"
+VERDICT_WORDS = frozenset({"APPROVED", "CHANGES_REQUESTED", "COMMENTED"})
+
+METADATA_OPEN = "<!--"
+METADATA_CLOSE = "-->"
+ANCHOR_LENGTH = len("**[P0]**")
+
+# (приоритет, путь, строка, текст проблемы) — группы ISSUE_PATTERN
+IssueTuple = Tuple[str, str, Optional[str], str]
+
+
+@dataclass
+class ReviewTokens:
+    """Результат разбора: то же, что давали регулярные выражения pr_parser"""
+    metadata: Optional[str] = None  # Группа METADATA_PATTERN (JSON-текст)
+    verdict: Optional[str] = None  # Первое слово VERDICT_PATTERN
+    issues: List[IssueTuple] = field(default_factory=list)  # Группы ISSUE_PATTERN
+
+
+def _is_word(ch: str) -> bool:
+    """Символ \\w (для проверки \\b)."""
+    return ch.isalnum() or ch == "_"
+
+
+class _Scanner:
+    """Состояние одного прохода по телу комментария."""
+
+    def __init__(self, text: str):
+        self.text = text
+        self.n = len(text)
+        # Последний символ, отличный от \n: после тире должен найтись хоть один такой
+        stripped = text.rstrip("\n")
+        self.last_non_newline = len(stripped) - 1
+        # Кеши границ пути: одна «серия» символов без :`'" общая для соседних замечаний
+        self._run_start = -1
+        self._run_end = -1
+        self._tails = {}
+        self._dash_cache = {}  # run_end → (лучшее тире или None, нижняя просмотренная граница)
+
+    def skip_ws(self, i: int) -> int:
+        text, n = self.text, self.n
+        while i < n and text[i].isspace():
+            i += 1
+        return i
+
+    # ------------------------------------------------------------------
+    # Метаданные: <!--\s*(\{.*?\})\s*-->
+    # ------------------------------------------------------------------
+
+    def metadata_at(self, start: int) -> Tuple[bool, Optional[str]]:
+        """
+        Returns:
+            (решено, группа): решено=False — у этого `<!--` нет `{`, искать дальше.
+            Если `{` есть, но закрывающего `}\\s*-->` нет, его не будет
+            и у последующих `<!--` — метаданных нет.
+        """
+        brace = self.skip_ws(start + len(METADATA_OPEN))
+        if brace >= self.n or self.text[brace] != "{":
+            return False, None
+        text = self.text
+        close = text.find("}", brace + 1)
+        while close != -1:
+            if text.startswith(METADATA_CLOSE, self.skip_ws(close + 1)):
+                return True, text[brace:close + 1]
+            close = text.find("}", close + 1)
+        return True, None
+
+    # ------------------------------------------------------------------
+    # Вердикт: \b(APPROVED|CHANGES_REQUESTED|COMMENTED)\b
+    # ------------------------------------------------------------------
+
+    def verdict_at(self, start: int, word: str) -> bool:
+        end = start + len(word)
+        if start > 0 and _is_word(self.text[start - 1]):
+            return False
+        return end >= self.n or not _is_word(self.text[end])
+
+    # ------------------------------------------------------------------
+    # Замечания: **[P0]** `путь`:строка — текст
+    # ------------------------------------------------------------------
+
+    def _run_end_from(self, start: int) -> int:
+        """Конец серии символов [^:`'"]+ начиная со start."""
+        if self._run_start <= start <= self._run_end:
+            return self._run_end
+        match = PATH_STOP_PATTERN.search(self.text, start)
+        self._run_start = start
+        self._run_end = match.start() if match else self.n
+        return self._run_end
+
+    def _dash_ok(self, pos: int) -> bool:
+        return pos < self.n and self.text[pos] in DASHES and self.last_non_newline > pos
+
+    def _tail(self, run_end: int) -> Optional[Tuple[Optional[str], int]]:
+        """
+        Продолжение после полного пути: [`'"]?(?::(\\d+))?\\s*[—-–].
+
+        Returns:
+            (строка или None, позиция тире) или None
+        """
+        if run_end in self._tails:
+            return self._tails[run_end]
+        text, n = self.text, self.n
+        result = None
+        if run_end < n:
+            pos = run_end + 1 if text[run_end] in QUOTES else run_end
+            line = None
+            if pos < n and text[pos] == ":" and pos + 1 < n and text[pos + 1].isdecimal():
+                digits_end = pos + 1
+                while digits_end < n and text[digits_end].isdecimal():
+                    digits_end += 1
+                line = text[pos + 1:digits_end]
+                pos = digits_end
+            elif text[run_end] == ":":
+                pos = -1  # Двоеточие без номера строки — совпадения нет
+            if pos >= 0:
+                dash = self.skip_ws(pos)
+                if self._dash_ok(dash):
+                    result = (line, dash)
+        self._tails[run_end] = result
+        return result
+
+    def _last_dash(self, run_end: int, group_start: int) -> Optional[int]:
+        """Самое правое тире внутри пути (откат группы [^:`'"]+), левее run_end и правее group_start."""
+        best, low = self._dash_cache.get(run_end, (None, run_end))
+        if best is None and low > group_start + 1:
+            text = self.text
+            pos = low - 1
+            while pos > group_start:
+                if text[pos] in DASHES and self.last_non_newline > pos:
+                    best = pos
+                    break
+                pos -= 1
+            # Просмотрены позиции [low, run_end)
+            low = pos + 1 if best is None else best
+            self._dash_cache[run_end] = (best, low)
+        return best if best is not None and best > group_start else None
+
+    def _problem_after(self, dash: int) -> Tuple[str, int]:
+        """\\s*(.+?)(?=\\n|$) после тире: (текст, конец совпадения)."""
+        start = self.skip_ws(dash + 1)
+        if start < self.n:
+            eol = self.text.find("\n", start)
+            if eol == -1:
+                eol = self.n
+            return self.text[start:eol], eol
+        # Одни пробелы до конца: откат \s* до последнего символа, отличного от \n
+        last = self.last_non_newline
+        return self.text[last:last + 1], last + 1
+
+    def _issue_from(self, group_start: int) -> Optional[Tuple[str, Optional[str], int]]:
+        """Путь начинается в group_start: (путь, строка, позиция тире) или None."""
+        run_end = self._run_end_from(group_start)
+        tail = self._tail(run_end)
+        if tail is not None:
+            return self.text[group_start:run_end], tail[0], tail[1]
+        dash = self._last_dash(run_end, group_start)
+        if dash is None:
+            return None
+        return self.text[group_start:dash], None, dash
+
+    def issue_at(self, start: int) -> Optional[Tuple[IssueTuple, int]]:
+        """
+        Замечание с якорем `**[Px]**` в позиции start.
+
+        Returns:
+            ((приоритет, путь, строка, текст), конец совпадения) или None
+        """
+        text, n = self.text, self.n
+        after_anchor = start + ANCHOR_LENGTH
+        first = self.skip_ws(after_anchor)
+        if first >= n:
+            return None
+
+        found = None
+        ch = text[first]
+        if ch in QUOTES:
+            if first + 1 < n and text[first + 1] not in QUOTES and text[first + 1] != ":":
+                found = self._issue_from(first + 1)
+        elif ch != ":":
+            found = self._issue_from(first)
+        # Откат \s* на один символ: путь из одного пробела перед кавычкой, двоеточием или тире
+        if found is None and first > after_anchor and (ch in QUOTES or ch == ":" or ch in DASHES):
+            found = self._issue_from(first - 1)
+        if found is None:
+            return None
+
+        path, line, dash = found
+        problem, end = self._problem_after(dash)
+        priority = text[start + 3:start + 5]
+        return (priority, path.strip(), line, problem.strip()), end
+
+
+def tokenize_review(text: str, with_issues: bool = True) -> ReviewTokens:
+    """
+    Разобрать комментарий за один проход.
+
+    Args:
+        text: Тело комментария
+        with_issues: Искать замечания (False — только метаданные и вердикт)
+
+    Returns:
+        ReviewTokens
+    """
+    scanner = _Scanner(text)
+    tokens = ReviewTokens()
+    metadata_done = False
+    verdict_done = False
+    issues_from = 0  # Замечания не перекрываются: следующее ищется после конца предыдущего
+
+    pos = 0
+    while True:
+        if metadata_done and verdict_done and not with_issues:
+            break
+        match = TOKEN_PATTERN.search(text, pos)
+        if match is None:
+            break
+        start, token = match.start(), match.group()
+        pos = start + 1
+
+        if token == METADATA_OPEN:
+            if not metadata_done:
+                metadata_done, tokens.metadata = scanner.metadata_at(start)
+        elif token in VERDICT_WORDS:
+            if not verdict_done and scanner.verdict_at(start, token):
+                tokens.verdict = token
+                verdict_done = True
+        elif with_issues and start >= issues_from:
+            found = scanner.issue_at(start)
+            if found is not None:
+                issue, issues_from = found
+                tokens.issues.append(issue)
+
+    return tokens
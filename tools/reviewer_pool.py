@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+"""
+Reviewer Pool — параллельное ревью одного diff-а несколькими моделями
+
+Каждый ревьювер — адаптер с именем из метаданных (`reviewer`) и моделью:
+- gemini — GeminiReviewer с указанной моделью (варианты Gemini)
+- stub   — локальная заглушка без сети: детерминированный отчёт по diff-у;
+           в PR не публикуется, чтобы не подменять настоящее ревью в консенсусе
+
+Diff и детали PR загружаются и фильтруются один раз, адаптеры работают
+одновременно. Отчёт каждого публикуется с обычными метаданными
+(`<!-- {"reviewer", "iteration", "type": "review", "status"} -->`),
+поэтому pr_parser и консенсус не отличают их от ревью, оставленных вручную.
+
+Бюджет времени (--budget) ограничивает ожидание: ревьюверы, не успевшие
+к сроку, возвращаются со статусом PENDING и не задерживают цикл. Они
+продолжают работу в фоне и публикуют отчёт, если процесс ещё жив
+(например, в --watch); при выходе CLI их работа прерывается.
+
+Спецификация ревьювера: `имя=тип:модель`, например
+  gemini                          — gemini=gemini:GEMINI_MODEL
+  codex=gemini:gemini-2.5-pro     — вариант Gemini под именем codex
+  copilot=stub:CHANGES_REQUESTED  — заглушка с заданным вердиктом
+
+Использование:
+  python tools/reviewer_pool.py --pr 110 --reviewers gemini codex=gemini:gemini-2.5-pro --budget 300
+  python tools/reviewer_pool.py --pr 110 --reviewers opus=stub codex=stub:approved
+"""
+
+import argparse
+import os
+import queue
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# Добавляем корень репозитория в sys.path для импортов
+_REPO_ROOT = Path(__file__).parent.parent
+if str(_REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(_REPO_ROOT))
+
+from tools.diff_filter import DiffFilterConfig, filter_diff, format_skipped_section
+from tools.diff_splitter import split_diff
+from tools.pr_comments import publish_review
+from tools.pr_parser import DEFAULT_REPO
+from tools.review_report import VERDICT_MARKS, ParsedReport, extract_verdict, merge_reports
+from tools.review_state import ReviewData, ReviewStatus
+
+# Ревьюверы пула по умолчанию (спецификации через запятую)
+DEFAULT_POOL = os.getenv("REVIEWER_POOL", "gemini")
+
+# Сколько ждать ревьюверов, сек
+DEFAULT_BUDGET = float(os.getenv("REVIEWER_BUDGET", "900"))
+
+ADAPTER_GEMINI = "gemini"
+ADAPTER_STUB = "stub"
+
+
+@dataclass
+class ReviewRequest:
+    """Общий для всех ревьюверов вход: отфильтрованный diff и детали PR"""
+    pr_number: int
+    iteration: int
+    repo: str
+    diff: str
+    details: dict
+    skipped_section: str = ""
+
+
+@dataclass
+class ReviewOutcome:
+    """Результат одного ревьювера пула"""
+    reviewer: str
+    status: ReviewStatus
+    report: Optional[str] = None
+    elapsed: Optional[float] = None  # Сек; None — не успел к сроку
+    error: Optional[str] = None
+    published: bool = False
+
+    def to_review_data(self, pr_number: int, iteration: int) -> ReviewData:
+        return ReviewData(
+            reviewer=self.reviewer,
+            status=self.status,
+            body=self.report or self.error or "",
+            iteration=iteration,
+            pr_number=pr_number,
+        )
+
+
+class ReviewerAdapter:
+    """Ревьювер пула: имя в метаданных и review() → markdown-отчёт"""
+
+    kind = ""
+    publishable = True  # False — отчёт только локально, даже при publish=True
+
+    def __init__(self, name: str, model: Optional[str] = None):
+        self.name = name
+        self.model = model
+
+    def review(self, request: ReviewRequest) -> str:
+        raise NotImplementedError
+
+    def __repr__(self) -> str:
+        return f"{self.name}={self.kind}:{self.model}" if self.model else f"{self.name}={self.kind}"
+
+
+class GeminiAdapter(ReviewerAdapter):
+    """Вариант Gemini (модель задаётся), с кэшем ревью файлов и общим бюджетом запросов"""
+
+    kind = ADAPTER_GEMINI
+
+    def __init__(self, name: str, model: Optional[str] = None, use_cache: bool = True, limiter=None):
+        # Импорт здесь: модуль пула не должен тянуть gemini_reviewer, если Gemini в пуле нет
+        from tools.gemini_reviewer import GEMINI_MODEL
+        super().__init__(name, model or GEMINI_MODEL)
+        self.use_cache = use_cache
+        self.limiter = limiter
+
+    def review(self, request: ReviewRequest) -> str:
+        from tools.gemini_reviewer import GeminiReviewer
+        from tools.review_cache import ReviewCache
+
+        # Соединение SQLite кэша открывается в потоке ревьювера
+        cache = ReviewCache() if self.use_cache else None
+        try:
+            agent = GeminiReviewer(
+                request.pr_number, request.iteration, request.repo,
+                cache=cache, limiter=self.limiter, model=self.model, reviewer=self.name,
+            )
+            return agent.analyze_code(request.diff, request.details)
+        finally:
+            if cache is not None:
+                cache.close()
+
+
+class StubAdapter(ReviewerAdapter):
+    """
+    Локальная заглушка: без сети, отчёт со списком файлов и заданным вердиктом.
+
+    Для отладки пула и цикла без квоты моделей; delay имитирует медленную модель.
+    Не публикуется: иначе `opus=stub codex=stub gemini=stub` дали бы консенсус
+    без единого настоящего ревью. Вердикт по умолчанию — COMMENTED.
+    """
+
+    kind = ADAPTER_STUB
+    publishable = False
+
+    def __init__(self, name: str, model: Optional[str] = None, delay: float = 0.0):
+        super().__init__(name, (model or "COMMENTED").upper())
+        if self.model not in VERDICT_MARKS:
+            raise ValueError(f"Неизвестный вердикт заглушки '{model}' (доступны: {', '.join(VERDICT_MARKS)})")
+        self.delay = delay
+
+    def review(self, request: ReviewRequest) -> str:
+        if self.delay:
+            time.sleep(self.delay)
+        files = [file_diff.path for file_diff in split_diff(request.diff)]
+        parsed = ParsedReport(
+            verdict=self.model,
+            positives=[f"Просмотрено файлов: {len(files)}"] + [f"`{path}`" for path in files[:5]],
+        )
+        return merge_reports([parsed], title=f"## Review by {self.name} (stub)", verdict=self.model)
+
+
+ADAPTERS = {
+    ADAPTER_GEMINI: GeminiAdapter,
+    ADAPTER_STUB: StubAdapter,
+}
+
+
+def parse_adapter_spec(spec: str) -> ReviewerAdapter:
+    """
+    Адаптер из спецификации `имя=тип:модель` (тип и модель необязательны).
+
+    Raises:
+        ValueError: Неизвестный тип адаптера
+    """
+    name, _, target = spec.strip().partition("=")
+    kind, _, model = (target or name).partition(":")
+    kind = kind.strip().lower()
+    if kind not in ADAPTERS:
+        raise ValueError(f"Неизвестный тип ревьювера '{kind}' в '{spec}' (доступны: {', '.join(ADAPTERS)})")
+    return ADAPTERS[kind](name.strip().lower(), model.strip() or None)
+
+
+def build_pool(specs: List[str]) -> List[ReviewerAdapter]:
+    """Адаптеры из спецификаций (имена ревьюверов не должны повторяться)."""
+    adapters = [parse_adapter_spec(spec) for spec in specs if spec.strip()]
+    names = [adapter.name for adapter in adapters]
+    duplicates = sorted({name for name in names if names.count(name) > 1})
+    if duplicates:
+        raise ValueError(f"Ревьюверы указаны дважды: {', '.join(duplicates)}")
+    return adapters
+
+
+def prepare_request(
+    pr_number: int,
+    iteration: int = 1,
+    repo: str = DEFAULT_REPO,
+    filter_config: Optional[DiffFilterConfig] = None,
+) -> ReviewRequest:
+    """Загрузить и отфильтровать diff PR один раз для всех ревьюверов."""
+    from tools.gemini_reviewer import fetch_pr_data
+
+    diff, details = fetch_pr_data(pr_number, repo)
+    filtered = filter_diff(diff, filter_config or DiffFilterConfig())
+    return ReviewRequest(
+        pr_number=pr_number,
+        iteration=iteration,
+        repo=repo,
+        diff=filtered.diff,
+        details=details,
+        skipped_section=format_skipped_section(filtered) or "",
+    )
+
+
+class ReviewerPool:
+    """
+    Запуск адаптеров на одном diff-е с общим бюджетом времени.
+
+    Args:
+        adapters: Ревьюверы
+        budget: Сколько ждать, сек
+        publish: Публиковать отчёты в PR
+        upsert: Обновлять ревью этой итерации вместо новых комментариев
+    """
+
+    def __init__(self, adapters: List[ReviewerAdapter], budget: float = DEFAULT_BUDGET,
+                 publish: bool = True, upsert: bool = True):
+        self.adapters = adapters
+        self.budget = budget
+        self.publish = publish
+        self.upsert = upsert
+
+    def _run_adapter(self, adapter: ReviewerAdapter, request: ReviewRequest, done: "queue.Queue") -> None:
+        started = time.monotonic()
+        try:
+            report = adapter.review(request)
+            if request.skipped_section:
+                report = f"{report}\n\n{request.skipped_section}"
+            verdict = extract_verdict(report)
+            outcome = ReviewOutcome(
+                reviewer=adapter.name,
+                status=ReviewStatus[verdict] if verdict else ReviewStatus.COMMENTED,
+                report=report,
+            )
+            if self.publish and adapter.publishable:
+                publish_review(request.pr_number, request.iteration, adapter.name, report,
+                               repo=request.repo, upsert=self.upsert)
+                outcome.published = True
+        except Exception as e:
+            outcome = ReviewOutcome(reviewer=adapter.name, status=ReviewStatus.ERROR, error=str(e))
+        outcome.elapsed = round(time.monotonic() - started, 3)
+        done.put(outcome)
+
+    def run(self, request: ReviewRequest) -> Dict[str, ReviewOutcome]:
+        """
+        Ревью всеми адаптерами параллельно.
+
+        Returns:
+            {ревьювер: результат}; не успевшие к сроку — со статусом PENDING
+        """
+        done: "queue.Queue[ReviewOutcome]" = queue.Queue()
+        for adapter in self.adapters:
+            # Потоки-демоны: не успевший ревьювер не держит процесс после выхода
+            threading.Thread(
+                target=self._run_adapter, args=(adapter, request, done),
+                name=f"reviewer-{adapter.name}", daemon=True,
+            ).start()
+
+        outcomes: Dict[str, ReviewOutcome] = {}
+        deadline = time.monotonic() + self.budget
+        while len(outcomes) < len(self.adapters):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                outcome = done.get(timeout=remaining)
+            except queue.Empty:
+                break
+            outcomes[outcome.reviewer] = outcome
+
+        for adapter in self.adapters:
+            if adapter.name not in outcomes:
+                outcomes[adapter.name] = ReviewOutcome(reviewer=adapter.name, status=ReviewStatus.PENDING)
+        return {adapter.name: outcomes[adapter.name] for adapter in self.adapters}
+
+
+def run_pool(
+    pr_number: int,
+    iteration: int = 1,
+    repo: str = DEFAULT_REPO,
+    specs: Optional[List[str]] = None,
+    budget: float = DEFAULT_BUDGET,
+    publish: bool = True,
+    upsert: bool = True,
+    filter_config: Optional[DiffFilterConfig] = None,
+) -> Dict[str, ReviewOutcome]:
+    """Полный прогон пула: diff → адаптеры параллельно → публикация."""
+    adapters = build_pool(specs if specs is not None else DEFAULT_POOL.split(","))
+    request = prepare_request(pr_number, iteration, repo, filter_config)
+    print(f"[INFO] Ревьюверы: {', '.join(map(repr, adapters))}; бюджет {budget:.0f} сек")
+    return ReviewerPool(adapters, budget=budget, publish=publish, upsert=upsert).run(request)
+
+
+def print_outcomes(outcomes: Dict[str, ReviewOutcome]) -> None:
+    for name, outcome in outcomes.items():
+        if outcome.status == ReviewStatus.PENDING:
+            print(f"  - {name}: PENDING (не уложился в бюджет)")
+        elif outcome.status == ReviewStatus.ERROR:
+            print(f"  - {name}: ERROR ({outcome.error})")
+        else:
+            where = "опубликован" if outcome.published else "не публиковался"
+            print(f"  - {name}: {outcome.status.value} за {outcome.elapsed:.1f} сек ({where})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Параллельное ревью PR пулом ревьюверов")
+    parser.add_argument("--pr", type=int, required=True, help="Номер PR")
+    parser.add_argument("--iteration", type=int, default=1, help="Номер итерации ревью")
+    parser.add_argument("--repo", type=str, default=DEFAULT_REPO, help=f"Репозиторий (по умолчанию: {DEFAULT_REPO})")
+    parser.add_argument("--reviewers", nargs="+", default=None, metavar="SPEC",
+                        help=f"Ревьюверы `имя=тип:модель` (по умолчанию: REVIEWER_POOL или '{DEFAULT_POOL}')")
+    parser.add_argument("--budget", type=float, default=DEFAULT_BUDGET,
+                        help=f"Сколько ждать ревьюверов, сек (по умолчанию: {DEFAULT_BUDGET:.0f})")
+    parser.add_argument("--no-publish", action="store_true", help="Не публиковать отчёты в PR")
+    parser.add_argument("--new-comment", action="store_true",
+                        help="Публиковать новые комментарии вместо обновления ревью этой итерации")
+    args = parser.parse_args()
+
+    try:
+        outcomes = run_pool(args.pr, args.iteration, args.repo, specs=args.reviewers, budget=args.budget,
+                            publish=not args.no_publish, upsert=not args.new_comment)
+    except ValueError as e:
+        parser.error(str(e))
+
+    print(f"\n[INFO] Пул ревьюверов PR #{args.pr}, итерация {args.iteration}:")
+    print_outcomes(outcomes)
+    failed = [outcome for outcome in outcomes.values() if outcome.status == ReviewStatus.ERROR]
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+# Telemetry analytics tools
@@ -0,0 +1,387 @@
+#!/usr/bin/env python3
+"""
+Archive — сжатые архивы телеметрии с произвольным доступом и ретенция
+
+Закрытый день telemetry-YYYY-MM-DD.jsonl сжимается в telemetry-YYYY-MM-DD.jsonl.gz
+кадрами: файл режется по границам строк на куски ~FRAME_BYTES, каждый кусок —
+отдельный gzip-член (распаковывается независимо). Вместе это обычный
+многочленный gzip — zcat и gzip.open читают его целиком. Индекс кадров лежит
+рядом (.jsonl.gz.frames.json): [смещение в исходном файле, длина, смещение
+в архиве, длина в архиве] для каждого кадра.
+
+Смещения индекса матчей (match_index.py) и колоночного хранилища
+(columnar.py) — байты исходного файла, поэтому после сжатия они не меняются:
+индекс матчей переносится к архиву, а чтение диапазона распаковывает только
+покрывающие его кадры. open_telemetry() открывает JSONL и архив одинаково —
+через него читают match_index.py, columnar.py и balance_report.py.
+
+День считается закрытым, когда он не сегодняшний и файл не менялся
+CLOSED_IDLE_SEC: имя файла фиксируется при создании комнаты, поэтому комнаты,
+созданные до полуночи, ещё какое-то время дописывают вчерашний файл.
+
+Ретенция (run): сжать закрытые дни, удалить архивы старше --keep-days
+(вместе с индексами и колоночными хранилищами дня), затем удалять самые
+старые архивы, пока телеметрия больше --max-mb. Несжатые файлы не удаляются.
+
+Использование:
+  python tools/telemetry/archive.py run --logs server/logs --keep-days 30 --max-mb 2048
+  python tools/telemetry/archive.py compress server/logs/telemetry-2026-10-18.jsonl
+  python tools/telemetry/archive.py info server/logs/telemetry-2026-10-18.jsonl.gz
+
+Cron (раз в час):
+  15 * * * * cd /opt/slime-arena && python3 tools/telemetry/archive.py run >> server/logs/retention.log 2>&1
+"""
+
+import argparse
+import bisect
+import gzip
+import json
+import mmap
+import os
+import re
+import shutil
+import sys
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+# Добавляем корень репозитория в sys.path для импортов
+_REPO_ROOT = Path(__file__).parent.parent.parent
+if str(_REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(_REPO_ROOT))
+
+DEFAULT_LOG_DIR = _REPO_ROOT / "server" / "logs"
+
+FRAMES_VERSION = 1
+ARCHIVE_SUFFIX = ".gz"
+FRAMES_SUFFIX = ".frames.json"
+
+# Несжатый размер кадра: меньше — быстрее чтение матча, больше — лучше сжатие
+FRAME_BYTES = 1 << 20
+COMPRESS_LEVEL = 6
+
+# Сколько файл дня должен не меняться, чтобы считаться закрытым (сек)
+CLOSED_IDLE_SEC = 3600
+
+DEFAULT_KEEP_DAYS = 30
+DEFAULT_MAX_MB = 2048
+
+DAY_RE = re.compile(r"^telemetry-(\d{4}-\d{2}-\d{2})\.jsonl(\.gz)?$")
+
+READ_BYTES = 1 << 20
+
+
+def is_archive(path: Path) -> bool:
+    return Path(path).name.endswith(".jsonl" + ARCHIVE_SUFFIX)
+
+
+def archive_path_for(source: Path) -> Path:
+    return source.with_name(source.name + ARCHIVE_SUFFIX)
+
+
+def frames_path_for(archive: Path) -> Path:
+    return archive.with_name(archive.name + FRAMES_SUFFIX)
+
+
+def day_of(path: Path) -> Optional[date]:
+    """Дата из имени telemetry-YYYY-MM-DD.jsonl[.gz] или None."""
+    match = DAY_RE.match(Path(path).name)
+    if not match:
+        return None
+    return datetime.strptime(match.group(1), "%Y-%m-%d").date()
+
+
+class PlainReader:
+    """Несжатый JSONL: те же методы, что у ArchiveReader; диапазоны читаются через mmap."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._file = open(self.path, "rb")
+        self.size = os.fstat(self._file.fileno()).st_size
+        self._view = None
+
+    def _map(self) -> None:
+        """Отобразить файл заново — он мог дописаться после открытия."""
+        if self._view is not None:
+            self._view.close()
+            self._view = None
+        self.size = os.fstat(self._file.fileno()).st_size
+        if self.size:  # Пустой файл mmap не отображает
+            self._view = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def read(self, start: int, end: int) -> bytes:
+        if self._view is None or end > len(self._view):
+            self._map()
+        if self._view is None:
+            return b""
+        return self._view[start:max(start, end)]
+
+    def iter_lines(self, start: int = 0) -> Iterator[bytes]:
+        """Строки с байта start; последняя может быть неполной (файл ещё пишется)."""
+        self._file.seek(start)
+        for line in self._file:  # Не yield from: закрытие генератора закрыло бы и файл
+            yield line
+
+    def close(self) -> None:
+        if self._view is not None:
+            self._view.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class ArchiveReader:
+    """
+    Чтение архива по смещениям исходного файла: распаковываются только нужные кадры.
+
+    Args:
+        path: Архив telemetry-*.jsonl.gz (рядом — индекс кадров)
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        meta = json.loads(frames_path_for(self.path).read_text(encoding="utf-8"))
+        if meta.get("version") != FRAMES_VERSION:
+            raise ValueError(f"{self.path}: версия индекса кадров {meta.get('version')}, ожидалась {FRAMES_VERSION}")
+        self.size: int = meta["size"]
+        self.frames: List[List[int]] = meta["frames"]
+        self._starts = [frame[0] for frame in self.frames]
+        self._file = open(self.path, "rb")
+        self._cached: tuple = (-1, b"")  # Последний распакованный кадр: чтение диапазонов идёт по возрастанию
+
+    def frame(self, index: int) -> bytes:
+        if self._cached[0] != index:
+            _, _, offset, length = self.frames[index]
+            self._file.seek(offset)
+            self._cached = (index, gzip.decompress(self._file.read(length)))
+        return self._cached[1]
+
+    def _frame_at(self, offset: int) -> int:
+        return max(0, bisect.bisect_right(self._starts, offset) - 1)
+
+    def read(self, start: int, end: int) -> bytes:
+        end = min(end, self.size)
+        parts = []
+        index = self._frame_at(start)
+        while start < end and index < len(self.frames):
+            frame_start, frame_length = self.frames[index][:2]
+            data = self.frame(index)
+            parts.append(data[start - frame_start:min(end, frame_start + frame_length) - frame_start])
+            start = frame_start + frame_length
+            index += 1
+        return b"".join(parts)
+
+    def iter_lines(self, start: int = 0) -> Iterator[bytes]:
+        """Строки с байта start (кадры режутся по границам строк)."""
+        for index in range(self._frame_at(start), len(self.frames)):
+            frame_start = self.frames[index][0]
+            data = self.frame(index)
+            if start > frame_start:
+                data = data[start - frame_start:]
+            yield from data.splitlines(keepends=True)
+
+    def close(self) -> None:
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def open_telemetry(path: Path):
+    """Открыть файл телеметрии — JSONL или архив — для чтения по смещениям."""
+    return ArchiveReader(path) if is_archive(path) else PlainReader(path)
+
+
+def compress_file(source: Path, frame_bytes: int = FRAME_BYTES, level: int = COMPRESS_LEVEL, remove: bool = True) -> Path:
+    """
+    Сжать закрытый день кадрами и перенести к архиву индекс матчей.
+
+    Args:
+        source: telemetry-YYYY-MM-DD.jsonl
+        frame_bytes: Несжатый размер кадра
+        level: Уровень gzip
+        remove: Удалить исходный файл после сжатия
+
+    Returns:
+        Путь архива
+    """
+    from tools.telemetry.match_index import MatchIndex, index_path_for, open_index
+
+    source = Path(source)
+    archive = archive_path_for(source)
+    before = source.stat()
+    # Индекс дочитывается до сжатия: по архиву он потом только читается
+    index = open_index(source)
+
+    frames = []
+    tmp_archive = archive.with_name(archive.name + ".tmp")
+    raw_offset = 0
+    with open(source, "rb") as src, open(tmp_archive, "wb") as out:
+        pending = b""
+        while True:
+            block = src.read(READ_BYTES)
+            pending += block
+            while len(pending) >= frame_bytes or (not block and pending):
+                cut = pending.rfind(b"\n", 0, frame_bytes) + 1 if len(pending) >= frame_bytes else len(pending)
+                if cut <= 0:
+                    cut = pending.find(b"\n", frame_bytes) + 1 or len(pending)  # Строка длиннее кадра
+                frame, pending = pending[:cut], pending[cut:]
+                packed = gzip.compress(frame, compresslevel=level, mtime=0)
+                frames.append([raw_offset, len(frame), out.tell(), len(packed)])
+                out.write(packed)
+                raw_offset += len(frame)
+            if not block:
+                break
+
+    after = source.stat()
+    if (after.st_size, after.st_mtime_ns) != (before.st_size, before.st_mtime_ns):
+        tmp_archive.unlink()
+        raise RuntimeError(f"{source} изменился во время сжатия — день ещё не закрыт")
+
+    meta = {"version": FRAMES_VERSION, "source": source.name, "size": raw_offset, "frame_bytes": frame_bytes, "frames": frames}
+    frames_path = frames_path_for(archive)
+    tmp_frames = frames_path.with_name(frames_path.name + ".tmp")
+    tmp_frames.write_text(json.dumps(meta, separators=(",", ":")), encoding="utf-8")
+    os.replace(tmp_frames, frames_path)
+    os.replace(tmp_archive, archive)  # Архив появляется последним — он и есть признак готовности
+
+    moved = MatchIndex(archive, index_path_for(archive))
+    moved.offset, moved.head, moved.skipped = index.offset, index.head, index.skipped
+    moved.matches, moved.rooms = index.matches, index.rooms
+    moved.save()
+    index.path.unlink(missing_ok=True)
+    if remove:
+        source.unlink()
+    return archive
+
+
+def _sidecars(path: Path) -> List[Path]:
+    """Файл дня и его индексы (матчей, кадров)."""
+    from tools.telemetry.match_index import index_path_for
+
+    paths = [path, index_path_for(path)]
+    if is_archive(path):
+        paths.append(frames_path_for(path))
+    return [p for p in paths if p.exists()]
+
+
+def _drop_day(path: Path, columnar_dir: Optional[Path]) -> int:
+    """Удалить день (архив, индексы, колоночное хранилище); вернуть освобождённые байты телеметрии."""
+    freed = 0
+    for p in _sidecars(path):
+        freed += p.stat().st_size
+        p.unlink()
+    if columnar_dir is not None:
+        from tools.telemetry.columnar import store_path_for
+
+        store = store_path_for(path, columnar_dir)
+        if store.is_dir():
+            shutil.rmtree(store)  # Производные данные дня: в лимит размера не входят
+    return freed
+
+
+def apply_retention(
+    log_dir: Path,
+    keep_days: int = DEFAULT_KEEP_DAYS,
+    max_bytes: int = DEFAULT_MAX_MB * 1024 * 1024,
+    columnar_dir: Optional[Path] = None,
+    today: Optional[date] = None,
+    now: Optional[float] = None,
+) -> Dict[str, list]:
+    """
+    Сжать закрытые дни и применить лимиты возраста и размера.
+
+    Returns:
+        {"compressed": [...], "expired": [...], "evicted": [...], "errors": [...]} — имена файлов
+    """
+    log_dir = Path(log_dir)
+    today = today or date.today()
+    now = now if now is not None else time.time()
+    result: Dict[str, list] = {"compressed": [], "expired": [], "evicted": [], "errors": []}
+
+    for source in sorted(log_dir.glob("telemetry-*.jsonl")):
+        day = day_of(source)
+        if day is None or day >= today or now - source.stat().st_mtime < CLOSED_IDLE_SEC:
+            continue
+        if archive_path_for(source).exists():
+            result["errors"].append(f"{source.name}: архив уже есть, файл пропущен")
+            continue
+        try:
+            compress_file(source)
+            result["compressed"].append(source.name)
+        except (OSError, RuntimeError, ValueError) as e:
+            # ValueError — повреждённый индекс матчей: день пропускается, ретенция идёт дальше
+            result["errors"].append(f"{source.name}: {e}")
+
+    archives = sorted((p for p in log_dir.glob("telemetry-*.jsonl" + ARCHIVE_SUFFIX) if day_of(p)), key=day_of)
+    cutoff = today - timedelta(days=keep_days)
+    kept = []
+    for archive in archives:
+        if day_of(archive) < cutoff:
+            _drop_day(archive, columnar_dir)
+            result["expired"].append(archive.name)
+        else:
+            kept.append(archive)
+
+    total = sum(p.stat().st_size for path in log_dir.glob("telemetry-*") if day_of(path) for p in _sidecars(path))
+    for archive in kept:
+        if total <= max_bytes:
+            break
+        total -= _drop_day(archive, columnar_dir)
+        result["evicted"].append(archive.name)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Сжатие и ретенция файлов телеметрии")
+    sub = parser.add_subparsers(dest="command", required=True)
+    run = sub.add_parser("run", help="Сжать закрытые дни и применить лимиты")
+    run.add_argument("--logs", type=Path, default=DEFAULT_LOG_DIR, help=f"Каталог логов (по умолчанию: {DEFAULT_LOG_DIR})")
+    run.add_argument("--keep-days", type=int, default=DEFAULT_KEEP_DAYS, help="Хранить дней")
+    run.add_argument("--max-mb", type=int, default=DEFAULT_MAX_MB, help="Лимит размера телеметрии, МБ")
+    run.add_argument("--columnar", type=Path, default=None, help="Каталог колоночных хранилищ (по умолчанию: <logs>/columnar)")
+    compress = sub.add_parser("compress", help="Сжать файл дня")
+    compress.add_argument("sources", nargs="+", type=Path)
+    compress.add_argument("--frame-kb", type=int, default=FRAME_BYTES // 1024, help="Несжатый размер кадра, КБ")
+    compress.add_argument("--keep", action="store_true", help="Не удалять исходный файл")
+    info = sub.add_parser("info", help="Сводка по архиву")
+    info.add_argument("archive", type=Path)
+    args = parser.parse_args()
+
+    if args.command == "run":
+        result = apply_retention(args.logs, args.keep_days, args.max_mb * 1024 * 1024, args.columnar or args.logs / "columnar")
+        for name in result["compressed"]:
+            print(f"[OK] Сжат: {name}")
+        for name in result["expired"]:
+            print(f"[INFO] Удалён по возрасту: {name}")
+        for name in result["evicted"]:
+            print(f"[WARN] Удалён по лимиту размера: {name}")
+        for message in result["errors"]:
+            print(f"[ERROR] {message}")
+        if not any(result.values()):
+            print("[INFO] Нечего делать")
+        sys.exit(1 if result["errors"] else 0)
+
+    if args.command == "compress":
+        for source in args.sources:
+            size = source.stat().st_size
+            archive = compress_file(source, args.frame_kb * 1024, remove=not args.keep)
+            packed = archive.stat().st_size
+            print(f"[OK] {source.name}: {size / 1048576:.1f} МБ → {packed / 1048576:.1f} МБ ({packed / max(size, 1) * 100:.0f}%) → {archive}")
+        return
+
+    with ArchiveReader(args.archive) as reader:
+        packed = args.archive.stat().st_size
+        print(f"[INFO] {args.archive}: {reader.size} байт исходных, {packed} сжатых, кадров {len(reader.frames)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+"""
+Balance Report — агрегаты баланса по телеметрии за период
+
+Для настройки config/balance.json считает по событиям TelemetryService:
+    talent_chosen  {talentId, level}          — выборы талантов (всего, по уровню)
+    ability_used   {abilityId, slot, level}   — применения умений по слоту и уровню
+    player_death   {killerId, mass, classId}  — смерти по классу и фазе, масса, без убийцы
+    match_start / match_end                   — длительность матчей
+
+Группировки векторные: каждый день — колоночное хранилище (columnar.py,
+скалярные поля data — колонки "d.<ключ>"), группы считаются np.unique /
+np.bincount / np.minimum.at по кодам, а в Python перебираются только
+уникальные группы. Дни обрабатываются параллельно в пуле процессов
+(--jobs): каждый процесс конвертирует свой файл (если хранилище ещё не
+создано или отстало) и возвращает сливаемые агрегаты — счётчики по
+строковым ключам, гистограммы массы и длительности матчей.
+
+Телеметрия не пишет предложенные игроку карточки талантов, поэтому отчёт
+даёт долю выборов (pick share) среди всех выборов, а не pick rate от показов.
+
+Использование:
+  python tools/telemetry/balance_report.py server/logs/telemetry-2026-10-*.jsonl
+  python tools/telemetry/balance_report.py server/logs/telemetry-2026-09-*.jsonl.gz server/logs/telemetry-2026-10-*.jsonl
+  python tools/telemetry/balance_report.py server/logs/columnar/telemetry-2026-10-* --jobs 8 --json report.json
+"""
+
+import argparse
+import json
+import os
+import sys
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# Добавляем корень репозитория в sys.path для импортов
+_REPO_ROOT = Path(__file__).parent.parent.parent
+if str(_REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(_REPO_ROOT))
+
+import numpy as np
+
+from tools.telemetry.columnar import DEFAULT_OUT_DIR, MANIFEST, ColumnStore, convert_file
+
+# Ширина корзины гистограммы массы при смерти
+MASS_BIN = 10.0
+
+# Ширина корзины гистограммы длительности матча (сек)
+DURATION_BIN = 5.0
+
+# Разделитель составного ключа группы в сливаемых счётчиках
+KEY_SEP = "|"
+
+
+def _open_store(source: Path, out_dir: Path) -> ColumnStore:
+    """Каталог хранилища открывается как есть, JSONL — конвертируется (дописывается)."""
+    if (source / MANIFEST).exists():
+        return ColumnStore(source)
+    return convert_file(source, out_dir)
+
+
+def _labels(store: ColumnStore, name: str, values: np.ndarray) -> List[str]:
+    """Подписи группы: строки словаря или целые числа; нет значения — пустая строка."""
+    if name in store.dictionaries:
+        return list(store.decode(name, values))
+    return ["" if value < 0 else str(value) for value in values.tolist()]
+
+
+def _group_counts(store: ColumnStore, rows: np.ndarray, names: List[str]) -> Counter:
+    """
+    Число строк в каждой группе по колонкам names (векторно).
+
+    Числовые поля data приводятся к целым (уровень, слот), NaN → -1.
+    Колонки, которых нет в хранилище, считаются отсутствующим значением.
+    """
+    if not rows.any():
+        return Counter()
+    keys = []
+    for name in names:
+        if name not in store:
+            keys.append(np.full(int(rows.sum()), -1, dtype=np.int64))
+            continue
+        column = store[name][rows]
+        if column.dtype.kind == "f":
+            column = np.where(np.isnan(column), -1, column)
+        keys.append(column.astype(np.int64))
+    groups, counts = np.unique(np.stack(keys, axis=1), axis=0, return_counts=True)
+    labels = [_labels(store, name, groups[:, i]) for i, name in enumerate(names)]
+    return Counter({KEY_SEP.join(parts): int(count) for *parts, count in zip(*labels, counts.tolist())})
+
+
+def _histogram(values: np.ndarray, width: float) -> List[int]:
+    values = values[~np.isnan(values)]
+    if values.size == 0:
+        return []
+    return np.bincount(np.clip(values // width, 0, None).astype(np.int64)).tolist()
+
+
+def _match_durations(store: ColumnStore, starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+    """Длительность (сек) матчей, у которых в дне есть и match_start, и match_end."""
+    matches = len(store.dictionaries["matchId"])
+    match_ids = store["matchId"]
+    ts = store["ts"]
+    first = np.full(matches, np.iinfo(np.int64).max, dtype=np.int64)
+    last = np.full(matches, -1, dtype=np.int64)
+    np.minimum.at(first, match_ids[starts], ts[starts])
+    np.maximum.at(last, match_ids[ends], ts[ends])
+    complete = (last >= 0) & (first <= last)
+    complete[0] = False  # Код 0 — события без matchId
+    return (last[complete] - first[complete]) / 1000.0
+
+
+def analyze_day(source: str, out_dir: str = str(DEFAULT_OUT_DIR)) -> Dict:
+    """
+    Агрегаты одного дня (выполняется в процессе пула).
+
+    Args:
+        source: telemetry-YYYY-MM-DD.jsonl или каталог колоночного хранилища
+        out_dir: Каталог хранилищ для конвертации JSONL
+
+    Returns:
+        Сливаемые агрегаты (см. merge_reports)
+    """
+    store = _open_store(Path(source), Path(out_dir))
+    event = store["event"]
+
+    def rows_of(name: str) -> np.ndarray:
+        return event == store.code("event", name)
+
+    talents = rows_of("talent_chosen")
+    abilities = rows_of("ability_used")
+    deaths = rows_of("player_death")
+    starts = rows_of("match_start")
+    no_killer = int(deaths.sum())
+    if "d.killerId" in store:
+        no_killer = int((store["d.killerId"][deaths] == 0).sum())
+    mass = store["d.mass"][deaths] if "d.mass" in store else np.zeros(0)
+
+    return {
+        "days": [Path(source).name],
+        "events": int(len(store)),
+        "matches": int(np.unique(store["matchId"][starts]).size),
+        "talents": _group_counts(store, talents, ["d.talentId", "d.level"]),
+        "abilities": _group_counts(store, abilities, ["d.abilityId", "d.slot", "d.level"]),
+        "deaths": _group_counts(store, deaths, ["d.classId", "phase"]),
+        "deathsNoKiller": no_killer,
+        "deathMassSum": float(np.nansum(mass)),
+        "deathMassHist": _histogram(mass, MASS_BIN),
+        "durationHist": _histogram(_match_durations(store, starts, rows_of("match_end")), DURATION_BIN),
+    }
+
+
+def _add_lists(a: List[int], b: List[int]) -> List[int]:
+    if len(a) < len(b):
+        a, b = b, a
+    return [x + (b[i] if i < len(b) else 0) for i, x in enumerate(a)]
+
+
+def merge_reports(reports: List[Dict]) -> Dict:
+    """Слить агрегаты дней: счётчики складываются, гистограммы — покорзинно."""
+    total = {
+        "days": [], "events": 0, "matches": 0,
+        "talents": Counter(), "abilities": Counter(), "deaths": Counter(),
+        "deathsNoKiller": 0, "deathMassSum": 0.0, "deathMassHist": [], "durationHist": [],
+    }
+    for report in reports:
+        for key, value in report.items():
+            if key.endswith("Hist"):
+                total[key] = _add_lists(total[key], value)
+            elif isinstance(value, Counter):
+                total[key].update(value)
+            else:
+                total[key] += value
+    total["days"].sort()
+    return total
+
+
+def hist_quantile(hist: List[int], width: float, q: float) -> Optional[float]:
+    """Квантиль по гистограмме (середина корзины)."""
+    counts = np.asarray(hist, dtype=np.int64)
+    if counts.sum() == 0:
+        return None
+    index = int(np.searchsorted(np.cumsum(counts), q * counts.sum()))
+    return (index + 0.5) * width
+
+
+def _split(counter: Counter) -> List[tuple]:
+    return sorted(((key.split(KEY_SEP), count) for key, count in counter.items()), key=lambda item: -item[1])
+
+
+def summarize(total: Dict) -> Dict:
+    """Итоговый отчёт: доли выборов, применения на матч, статистика смертей и матчей."""
+    matches = max(total["matches"], 1)
+
+    talents: Dict[str, Dict] = {}
+    picks = sum(total["talents"].values())
+    for (talent_id, level), count in _split(total["talents"]):
+        entry = talents.setdefault(talent_id or "?", {"picks": 0, "byLevel": {}})
+        entry["picks"] += count
+        entry["byLevel"][level or "?"] = count
+    for entry in talents.values():
+        entry["share"] = round(entry["picks"] / max(picks, 1), 4)
+
+    abilities = [
+        {"abilityId": ability_id or "?", "slot": slot, "level": level, "uses": count, "perMatch": round(count / matches, 2)}
+        for (ability_id, slot, level), count in _split(total["abilities"])
+    ]
+
+    deaths = sum(total["deaths"].values())
+    by_class: Counter = Counter()
+    by_phase: Counter = Counter()
+    for (class_id, phase), count in _split(total["deaths"]):
+        by_class[class_id or "?"] += count
+        by_phase[phase or "?"] += count
+
+    durations = total["durationHist"]
+    return {
+        "days": total["days"],
+        "events": total["events"],
+        "matches": total["matches"],
+        "talents": dict(sorted(talents.items(), key=lambda item: -item[1]["picks"])),
+        "abilities": abilities,
+        "deaths": {
+            "total": deaths,
+            "perMatch": round(deaths / matches, 2),
+            "noKillerShare": round(total["deathsNoKiller"] / max(deaths, 1), 4),
+            "byClass": dict(by_class.most_common()),
+            "byPhase": dict(by_phase.most_common()),
+            "massAvg": round(total["deathMassSum"] / max(deaths, 1), 1),
+            "massP50": hist_quantile(total["deathMassHist"], MASS_BIN, 0.5),
+            "massP90": hist_quantile(total["deathMassHist"], MASS_BIN, 0.9),
+        },
+        "matchDuration": {
+            "complete": int(sum(durations)),
+            "p10": hist_quantile(durations, DURATION_BIN, 0.1),
+            "p50": hist_quantile(durations, DURATION_BIN, 0.5),
+            "p90": hist_quantile(durations, DURATION_BIN, 0.9),
+        },
+    }
+
+
+def build_report(sources: List[Path], out_dir: Path = DEFAULT_OUT_DIR, jobs: Optional[int] = None) -> Dict:
+    """Агрегаты по всем дням: один день — одна задача пула процессов."""
+    jobs = jobs or min(len(sources), os.cpu_count() or 1)
+    if jobs <= 1 or len(sources) <= 1:
+        reports = [analyze_day(str(source), str(out_dir)) for source in sources]
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            reports = list(pool.map(analyze_day, [str(source) for source in sources], [str(out_dir)] * len(sources)))
+    return summarize(merge_reports(reports))
+
+
+def print_report(report: Dict) -> None:
+    print(f"[INFO] Дней: {len(report['days'])}, событий: {report['events']}, матчей: {report['matches']}")
+
+    print("\nТаланты (доля выборов):")
+    for talent_id, entry in report["talents"].items():
+        levels = ", ".join(f"ур.{level}: {count}" for level, count in sorted(entry["byLevel"].items()))
+        print(f"  {talent_id:<24} {entry['picks']:>8} {entry['share'] * 100:>6.1f}%  ({levels})")
+
+    print("\nУмения (применения):")
+    print(f"  {'abilityId':<20} {'слот':>4} {'ур.':>4} {'всего':>9} {'на матч':>8}")
+    for row in report["abilities"]:
+        print(f"  {row['abilityId']:<20} {row['slot']:>4} {row['level']:>4} {row['uses']:>9} {row['perMatch']:>8}")
+
+    deaths = report["deaths"]
+    print(
+        f"\nСмерти: {deaths['total']} ({deaths['perMatch']} на матч), без убийцы {deaths['noKillerShare'] * 100:.1f}%, "
+        f"масса ср. {deaths['massAvg']} / p50 {deaths['massP50']} / p90 {deaths['massP90']}"
+    )
+    print("  По классу: " + ", ".join(f"{key}: {count}" for key, count in deaths["byClass"].items()))
+    print("  По фазе:   " + ", ".join(f"{key}: {count}" for key, count in deaths["byPhase"].items()))
+
+    duration = report["matchDuration"]
+    print(
+        f"\nМатчи с началом и концом: {duration['complete']}, длительность (сек) "
+        f"p10 {duration['p10']} / p50 {duration['p50']} / p90 {duration['p90']}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Отчёт по балансу из телеметрии")
+    parser.add_argument("sources", nargs="+", type=Path, help="telemetry-*.jsonl[.gz] или каталоги хранилищ")
+    parser.add_argument("--out", type=Path, default=DEFAULT_OUT_DIR, help=f"Каталог хранилищ (по умолчанию: {DEFAULT_OUT_DIR})")
+    parser.add_argument("--jobs", type=int, default=None, help="Процессов (по умолчанию: по числу дней, не больше CPU)")
+    parser.add_argument("--json", type=Path, default=None, help="Сохранить отчёт в JSON")
+    args = parser.parse_args()
+
+    missing = [source for source in args.sources if not source.exists()]
+    if missing:
+        print(f"[ERROR] Не найдено: {', '.join(map(str, missing))}", file=sys.stderr)
+        sys.exit(1)
+
+    report = build_report(args.sources, args.out, args.jobs)
+    print_report(report)
+    if args.json:
+        args.json.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"\n[OK] Отчёт: {args.json}")
+
+
+if __name__ == "__main__":
+    main()
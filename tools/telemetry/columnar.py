@@ -0,0 +1,447 @@
+#!/usr/bin/env python3
+"""
+Columnar — потоковый конвертер телеметрии JSONL в колоночное хранилище
+
+TelemetryService (server/src/telemetry/TelemetryService.ts) дописывает события
+в server/logs/telemetry-YYYY-MM-DD.jsonl:
+    {"event", "ts", "tick", "matchId", "roomId", "phase"?, "playerId"?, "data"?}
+
+Конвертер читает файл порциями (CHUNK_ROWS строк) и дописывает каждую
+колонку в свой файл фиксированной ширины — их читает NumPy (np.fromfile /
+np.memmap) без разбора текста:
+
+    ts.i8, tick.i4                      — числа
+    event.u2, phase.u1                  — коды словаря
+    matchId.u4, roomId.u4, playerId.u4  — коды словаря
+    data_offset.u8, data_length.u4      — ссылка в data.bin (длина 0 — нет data)
+    d.<ключ>.u4 / d.<ключ>.f8           — скалярные поля data: строки словарём, числа
+    data.bin                            — компактный JSON полей data подряд
+    manifest.json                       — строки, байт источника, словари, поля data
+
+Скалярные поля data (abilityId, slot, talentId, mass, …) выносятся в колонки
+при первом появлении: тип колонки — по первому значению (строка или число,
+bool — число), ранее записанные строки заполняются «нет значения» (код 0 или
+NaN). Списки и объекты (leaderboard) остаются только в data.bin.
+
+Код 0 в каждом словаре — отсутствующее значение. Память постоянна по размеру
+файла (порция + словари; словари растут только с числом разных матчей/игроков).
+
+Конвертация возобновляема: manifest.json фиксирует число строк и байтовое
+смещение в источнике после каждой порции (атомарной заменой). При повторном
+запуске колонки обрезаются до зафиксированного числа строк (если прошлый
+запуск упал посреди порции), а чтение источника продолжается с его смещения —
+так же дописываются новые события растущего файла текущего дня. Неполная
+последняя строка (TelemetryService ещё пишет) не потребляется.
+
+Источником может быть и архив закрытого дня (archive.py, .jsonl.gz): смещения
+в нём — байты исходного файла, хранилище у дня и архива общее.
+
+Использование:
+  python tools/telemetry/columnar.py convert server/logs/telemetry-2026-10-19.jsonl
+  python tools/telemetry/columnar.py convert server/logs/telemetry-*.jsonl --out /data/columnar
+  python tools/telemetry/columnar.py info server/logs/columnar/telemetry-2026-10-19
+"""
+
+import argparse
+import json
+import os
+import sys
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+# Добавляем корень репозитория в sys.path для импортов
+_REPO_ROOT = Path(__file__).parent.parent.parent
+if str(_REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(_REPO_ROOT))
+
+import numpy as np
+
+from tools.telemetry.archive import open_telemetry
+
+DEFAULT_OUT_DIR = _REPO_ROOT / "server" / "logs" / "columnar"
+
+FORMAT_VERSION = 2
+MANIFEST = "manifest.json"
+DATA_FILE = "data.bin"
+
+# Строк в порции
+CHUNK_ROWS = 65536
+
+# Колонки: имя → dtype (little-endian, фиксированная ширина)
+NUMERIC_COLUMNS = {"ts": "<i8", "tick": "<i4"}
+DICT_COLUMNS = {"event": "<u2", "phase": "<u1", "matchId": "<u4", "roomId": "<u4", "playerId": "<u4"}
+DATA_COLUMNS = {"data_offset": "<u8", "data_length": "<u4"}
+COLUMNS = {**NUMERIC_COLUMNS, **DICT_COLUMNS, **DATA_COLUMNS}
+
+# Скалярные поля data: колонки "d.<ключ>"
+DATA_FIELD_PREFIX = "d."
+DATA_FIELD_DTYPES = {"str": "<u4", "num": "<f8"}
+MAX_DATA_FIELDS = 64
+
+MISSING = 0
+
+
+def column_path(store: Path, name: str, dtype: Optional[str] = None) -> Path:
+    dtype = np.dtype(dtype or COLUMNS[name])
+    return store / f"{name}.{dtype.kind}{dtype.itemsize}"
+
+
+def _missing(kind: str, rows: int) -> np.ndarray:
+    """Колонка поля data без значений."""
+    if kind == "str":
+        return np.zeros(rows, dtype=DATA_FIELD_DTYPES["str"])
+    return np.full(rows, np.nan, dtype=DATA_FIELD_DTYPES["num"])
+
+
+def store_path_for(source: Path, out_dir: Path) -> Path:
+    """Каталог хранилища для файла телеметрии: <out>/<имя без .jsonl[.gz]> — у дня и его архива общий."""
+    return out_dir / source.name.removesuffix(".gz").removesuffix(".jsonl")
+
+
+class Dictionary:
+    """Словарное кодирование строк: значение ↔ код, код 0 — отсутствует."""
+
+    def __init__(self, dtype: str, values: Optional[List[str]] = None):
+        self.limit = np.iinfo(np.dtype(dtype)).max
+        self.values: List[str] = values or [""]
+        self.codes: Dict[str, int] = {value: code for code, value in enumerate(self.values)}
+
+    def encode(self, value) -> int:
+        if value is None or value == "":
+            return MISSING
+        if not isinstance(value, str):
+            value = str(value)
+        code = self.codes.get(value)
+        if code is None:
+            code = len(self.values)
+            if code > self.limit:
+                raise OverflowError(f"Словарь переполнен ({self.limit} значений)")
+            self.codes[value] = code
+            self.values.append(value)
+        return code
+
+
+class _Chunk:
+    """Буферы одной порции: списки по колонкам, в массивы — при фиксации."""
+
+    def __init__(self, size: int):
+        self.size = size
+        self.lists: Dict[str, list] = {name: [] for name in COLUMNS}
+        self.fields: Dict[str, tuple] = {}  # Поле data → (строки порции, значения): поля разрежены
+        self.data = bytearray()
+        self.rows = 0
+
+    def reset(self) -> None:
+        for values in self.lists.values():
+            values.clear()
+        self.fields.clear()
+        self.rows = 0
+        self.data.clear()
+
+
+class ColumnarWriter:
+    """
+    Дописывает события одного файла телеметрии в хранилище.
+
+    Args:
+        store: Каталог хранилища (создаётся)
+        source: Исходный JSONL или его архив (archive.py) — смещения у них общие
+        chunk_rows: Строк в порции
+    """
+
+    def __init__(self, store: Path, source: Path, chunk_rows: int = CHUNK_ROWS):
+        self.store = Path(store)
+        self.source = Path(source)
+        self.chunk = _Chunk(chunk_rows)
+        self.rows = 0
+        self.offset = 0
+        self.data_bytes = 0
+        self.skipped = 0
+        self.dictionaries = {name: Dictionary(dtype) for name, dtype in DICT_COLUMNS.items()}
+        self.data_fields: Dict[str, str] = {}  # Ключ data → "str" | "num"
+        self.field_dictionaries: Dict[str, Dictionary] = {}
+        self._load()
+
+    def _load(self) -> None:
+        """Продолжить с зафиксированного состояния и отрезать незафиксированный хвост."""
+        self.store.mkdir(parents=True, exist_ok=True)
+        manifest_path = self.store / MANIFEST
+        if manifest_path.exists():
+            manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+            if manifest.get("version") != FORMAT_VERSION:
+                raise ValueError(
+                    f"{self.store}: версия хранилища {manifest.get('version')}, ожидалась {FORMAT_VERSION} — "
+                    f"удалите каталог и сконвертируйте заново"
+                )
+            self.rows = manifest["rows"]
+            self.offset = manifest["offset"]
+            self.data_bytes = manifest["data_bytes"]
+            self.skipped = manifest.get("skipped", 0)
+            self.data_fields = manifest["data_fields"]
+            for name, values in manifest["dictionaries"].items():
+                if name.startswith(DATA_FIELD_PREFIX):
+                    self.field_dictionaries[name[len(DATA_FIELD_PREFIX):]] = Dictionary(DATA_FIELD_DTYPES["str"], values)
+                else:
+                    self.dictionaries[name] = Dictionary(DICT_COLUMNS[name], values)
+        for name, dtype in COLUMNS.items():
+            self._truncate(column_path(self.store, name), self.rows * np.dtype(dtype).itemsize)
+        self._truncate(self.store / DATA_FILE, self.data_bytes)
+        fields = {self._field_path(key).name for key in self.data_fields}
+        for path in self.store.glob(DATA_FIELD_PREFIX + "*"):
+            if path.name not in fields:
+                path.unlink()  # Поле появилось в незафиксированной порции
+        for key, kind in self.data_fields.items():
+            self._truncate(self._field_path(key), self.rows * np.dtype(DATA_FIELD_DTYPES[kind]).itemsize)
+
+    def _field_path(self, key: str) -> Path:
+        return column_path(self.store, DATA_FIELD_PREFIX + key, DATA_FIELD_DTYPES[self.data_fields[key]])
+
+    @staticmethod
+    def _truncate(path: Path, size: int) -> None:
+        with open(path, "ab") as f:
+            if f.tell() != size:
+                f.truncate(size)
+
+    def convert(self) -> int:
+        """
+        Дочитать источник с зафиксированного смещения.
+
+        Returns:
+            Число добавленных строк
+        """
+        added = 0
+        with open_telemetry(self.source) as reader:
+            if reader.size < self.offset:
+                raise ValueError(f"{self.source} короче зафиксированного смещения {self.offset} — файл подменён?")
+            for line in reader.iter_lines(self.offset):
+                if not line.endswith(b"\n"):
+                    break  # Неполная строка: TelemetryService ещё пишет
+                self.offset += len(line)
+                if self._add(line):
+                    added += 1
+                if self.chunk.rows == self.chunk.size:
+                    self._commit()
+        self._commit()
+        return added
+
+    def _add(self, line: bytes) -> bool:
+        line = line.strip()
+        if not line:
+            return False
+        try:
+            event = json.loads(line)
+            ts = int(event["ts"])
+            tick = int(event.get("tick") or 0)
+        except (ValueError, KeyError, TypeError):
+            self.skipped += 1
+            return False
+
+        chunk = self.chunk
+        lists = chunk.lists
+        lists["ts"].append(ts)
+        lists["tick"].append(tick)
+        for name, dictionary in self.dictionaries.items():
+            lists[name].append(dictionary.encode(event.get(name)))
+        lists["data_offset"].append(self.data_bytes + len(chunk.data))
+        data = event.get("data")
+        if data is None:
+            lists["data_length"].append(0)
+        else:
+            payload = json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+            lists["data_length"].append(len(payload))
+            chunk.data += payload
+            if isinstance(data, dict):
+                self._add_fields(data)
+        chunk.rows += 1
+        return True
+
+    def _add_fields(self, data: dict) -> None:
+        """Скалярные поля data текущей строки — в разреженные буферы колонок."""
+        row = self.chunk.rows
+        for key, value in data.items():
+            if isinstance(value, str):
+                kind = "str"
+            elif isinstance(value, (int, float)):
+                kind = "num"
+            else:
+                continue  # None, списки и объекты — только в data.bin
+            known = self.data_fields.get(key)
+            if known is None:
+                if len(self.data_fields) >= MAX_DATA_FIELDS:
+                    continue
+                known = self.data_fields[key] = kind
+                if kind == "str":
+                    self.field_dictionaries[key] = Dictionary(DATA_FIELD_DTYPES["str"])
+            if known != kind:
+                continue  # Тип не совпал с первым значением поля
+            rows, values = self.chunk.fields.setdefault(key, ([], []))
+            rows.append(row)
+            values.append(self.field_dictionaries[key].encode(value) if kind == "str" else float(value))
+
+    def _commit(self) -> None:
+        """Дописать порцию в колонки и атомарно зафиксировать manifest."""
+        chunk = self.chunk
+        for name in COLUMNS:
+            with open(column_path(self.store, name), "ab") as f:
+                f.write(np.asarray(chunk.lists[name], dtype=COLUMNS[name]).tobytes())
+        with open(self.store / DATA_FILE, "ab") as f:
+            f.write(chunk.data)
+        for key, kind in self.data_fields.items():
+            column = _missing(kind, chunk.rows)
+            rows, values = chunk.fields.get(key, ((), ()))
+            if rows:
+                column[np.asarray(rows)] = values
+            with open(self._field_path(key), "ab") as f:
+                # Новое поле: строки прошлых порций — без значения
+                backfill = self.rows - f.tell() // column.itemsize
+                while backfill > 0:
+                    f.write(_missing(kind, min(backfill, self.chunk.size)).tobytes())
+                    backfill -= self.chunk.size
+                f.write(column.tobytes())
+        self.rows += chunk.rows
+        self.data_bytes += len(chunk.data)
+        chunk.reset()
+        self._write_manifest()
+
+    def _write_manifest(self) -> None:
+        manifest = {
+            "version": FORMAT_VERSION,
+            "source": str(self.source),
+            "rows": self.rows,
+            "offset": self.offset,
+            "data_bytes": self.data_bytes,
+            "skipped": self.skipped,
+            "columns": COLUMNS,
+            "data_fields": self.data_fields,
+            "dictionaries": {
+                **{name: dictionary.values for name, dictionary in self.dictionaries.items()},
+                **{DATA_FIELD_PREFIX + key: dictionary.values for key, dictionary in self.field_dictionaries.items()},
+            },
+        }
+        tmp_path = self.store / (MANIFEST + ".tmp")
+        tmp_path.write_text(json.dumps(manifest, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp_path, self.store / MANIFEST)
+
+
+def convert_file(source: Path, out_dir: Path = DEFAULT_OUT_DIR, chunk_rows: int = CHUNK_ROWS) -> "ColumnStore":
+    """Сконвертировать (или дописать) один файл телеметрии и открыть результат."""
+    store = store_path_for(Path(source), Path(out_dir))
+    ColumnarWriter(store, source, chunk_rows).convert()
+    return ColumnStore(store)
+
+
+class ColumnStore:
+    """
+    Чтение хранилища: колонки как массивы NumPy (memmap), словари, data.
+
+    Пример:
+        store = ColumnStore("server/logs/columnar/telemetry-2026-10-19")
+        deaths = store.mask(event="player_death")
+        per_match = np.bincount(store["matchId"][deaths])
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        manifest = json.loads((self.path / MANIFEST).read_text(encoding="utf-8"))
+        if manifest.get("version") != FORMAT_VERSION:
+            raise ValueError(f"{self.path}: версия хранилища {manifest.get('version')}, ожидалась {FORMAT_VERSION}")
+        self.rows: int = manifest["rows"]
+        self.offset: int = manifest["offset"]
+        self.source = Path(manifest["source"])
+        self.dictionaries: Dict[str, List[str]] = manifest["dictionaries"]
+        self.data_fields: Dict[str, str] = manifest["data_fields"]
+        self._codes = {name: {value: code for code, value in enumerate(values)} for name, values in self.dictionaries.items()}
+        self._columns: Dict[str, np.ndarray] = {}
+        self._data: Optional[np.ndarray] = None
+
+    def __len__(self) -> int:
+        return self.rows
+
+    def __contains__(self, name: str) -> bool:
+        if name.startswith(DATA_FIELD_PREFIX):
+            return name[len(DATA_FIELD_PREFIX):] in self.data_fields
+        return name in COLUMNS
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        """Колонка целиком (memmap только зафиксированных строк); поля data — "d.<ключ>"."""
+        column = self._columns.get(name)
+        if column is None:
+            if name not in self:
+                raise KeyError(name)
+            dtype = COLUMNS.get(name) or DATA_FIELD_DTYPES[self.data_fields[name[len(DATA_FIELD_PREFIX):]]]
+            if self.rows == 0:
+                column = np.zeros(0, dtype=dtype)
+            else:
+                column = np.memmap(column_path(self.path, name, dtype), dtype=dtype, mode="r", shape=(self.rows,))
+            self._columns[name] = column
+        return column
+
+    def code(self, column: str, value: str) -> int:
+        """Код значения в словаре колонки; -1 — значения нет в хранилище."""
+        return self._codes[column].get(value, -1)
+
+    def decode(self, column: str, codes=None) -> np.ndarray:
+        """Строковые значения для кодов (по умолчанию — для всей колонки), в т.ч. строковых полей data."""
+        values = np.array(self.dictionaries[column], dtype=object)
+        return values[self[column] if codes is None else codes]
+
+    def mask(self, **equals: str) -> np.ndarray:
+        """Булева маска строк, где каждая словарная колонка равна значению."""
+        result = np.ones(self.rows, dtype=bool)
+        for column, value in equals.items():
+            result &= self[column] == self.code(column, value)
+        return result
+
+    def data(self, row: int) -> Optional[dict]:
+        """Поле data строки (None — не было)."""
+        length = int(self["data_length"][row])
+        if length == 0:
+            return None
+        if self._data is None:
+            self._data = np.memmap(self.path / DATA_FILE, dtype=np.uint8, mode="r")
+        offset = int(self["data_offset"][row])
+        return json.loads(self._data[offset:offset + length].tobytes())
+
+    def iter_data(self, rows) -> Iterator[Optional[dict]]:
+        for row in rows:
+            yield self.data(int(row))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Телеметрия JSONL → колоночное хранилище")
+    sub = parser.add_subparsers(dest="command", required=True)
+    convert = sub.add_parser("convert", help="Сконвертировать или дописать файлы телеметрии")
+    convert.add_argument("sources", nargs="+", type=Path, help="server/logs/telemetry-YYYY-MM-DD.jsonl")
+    convert.add_argument("--out", type=Path, default=DEFAULT_OUT_DIR, help=f"Каталог хранилищ (по умолчанию: {DEFAULT_OUT_DIR})")
+    convert.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS, help="Строк в порции")
+    info = sub.add_parser("info", help="Сводка по хранилищу")
+    info.add_argument("store", type=Path)
+    args = parser.parse_args()
+
+    if args.command == "convert":
+        for source in args.sources:
+            writer = ColumnarWriter(store_path_for(source, args.out), source, args.chunk_rows)
+            before = writer.rows
+            added = writer.convert()
+            print(
+                f"[OK] {source.name}: +{added} строк (всего {writer.rows}, байт {writer.offset}, "
+                f"пропущено {writer.skipped}) → {writer.store}"
+            )
+            if before and not added:
+                print("[INFO] Новых событий нет")
+        return
+
+    store = ColumnStore(args.store)
+    print(f"[INFO] {store.path}: {store.rows} строк, источник {store.source} (байт {store.offset})")
+    if store.rows:
+        events = np.bincount(store["event"], minlength=len(store.dictionaries["event"]))
+        for code in np.argsort(events)[::-1]:
+            if events[code]:
+                print(f"  {store.dictionaries['event'][code] or '—':<20} {events[code]:>10}")
+        ts = store["ts"]
+        print(f"[INFO] Матчей: {len(store.dictionaries['matchId']) - 1}, игроков: {len(store.dictionaries['playerId']) - 1}")
+        print(f"[INFO] Время: {int(ts.min())} … {int(ts.max())} (мс)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+"""
+Live Tail — потоковый анализ телеметрии в духе `tail -f`
+
+TelemetryService пишет пачками (flushEvery = 20 событий или каждые 2 с)
+в server/logs/telemetry-YYYY-MM-DD.jsonl. Имя файла фиксируется при создании
+комнаты, поэтому после полуночи новые комнаты пишут в файл нового дня,
+а долгоживущие — ещё в старый. Хвостовик следит за всеми файлами, которые
+менялись за последние FOLLOW_STALE_SEC (и всегда за самым новым), помнит
+смещение каждого и собирает неполную последнюю строку до перевода строки.
+Усечённый или пересозданный файл (другой inode) читается с начала.
+
+Агрегаты — скользящие окна фиксированного размера (кольца счётчиков):
+- событий/с по комнатам (окно 60 с)
+- смертей в минуту и событий по типам (окно 60 мин)
+- активные матчи (match_start без match_end, не старше MATCH_IDLE_SEC)
+Словари комнат, матчей и типов событий ограничены (вытесняются давно
+не встречавшиеся), буфер неполной строки — MAX_LINE_BYTES, чтение за
+один опрос — READ_BYTES, поэтому память не растёт за недели работы.
+
+Агрегаты пишутся атомарно в JSON-файл статуса (его читает watchdog или
+любой мониторинг) и/или печатаются.
+
+Использование:
+  python tools/telemetry/live_tail.py --status /tmp/telemetry-status.json
+  python tools/telemetry/live_tail.py --log-dir server/logs --print 10
+  python tools/telemetry/live_tail.py --from-start --once
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from array import array
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# Добавляем корень репозитория в sys.path для импортов
+_REPO_ROOT = Path(__file__).parent.parent.parent
+if str(_REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(_REPO_ROOT))
+
+from tools.telemetry.match_index import parse_keys
+
+DEFAULT_LOG_DIR = _REPO_ROOT / "server" / "logs"
+FILE_PATTERN = "telemetry-*.jsonl"
+
+# Файлы, менявшиеся за это время, продолжают читаться (комнаты, созданные до полуночи)
+FOLLOW_STALE_SEC = 6 * 3600
+
+# Ограничения памяти
+MAX_LINE_BYTES = 1 << 20  # Неполная строка длиннее — мусор, пропускаем до перевода строки
+READ_BYTES = 4 << 20  # Максимум байт с одного файла за опрос
+MAX_ROOMS = 512
+MAX_MATCHES = 2048
+MAX_EVENT_TYPES = 64
+OTHER_EVENT = "other"
+
+# Активный матч без событий дольше этого считается брошенным (сек)
+MATCH_IDLE_SEC = 900
+
+ROOM_WINDOW_SEC = 60
+MINUTE_WINDOW = 60  # Минут в окнах смертей и типов событий
+
+
+class RollingCounter:
+    """Кольцо счётчиков по слотам времени: память фиксирована."""
+
+    __slots__ = ("slot_sec", "counts", "epochs")
+
+    def __init__(self, slots: int, slot_sec: int):
+        self.slot_sec = slot_sec
+        self.counts = array("I", bytes(4 * slots))
+        self.epochs = array("q", [-1]) * slots
+
+    def add(self, ts: float, count: int = 1) -> None:
+        epoch = int(ts // self.slot_sec)
+        index = epoch % len(self.counts)
+        if self.epochs[index] != epoch:
+            if self.epochs[index] > epoch:
+                return  # Событие старше окна
+            self.epochs[index] = epoch
+            self.counts[index] = 0
+        self.counts[index] += count
+
+    def total(self, now: float, slots: Optional[int] = None) -> int:
+        """Сумма за последние slots слотов (по умолчанию — всё окно), включая текущий."""
+        current = int(now // self.slot_sec)
+        oldest = current - (slots or len(self.counts)) + 1
+        return sum(count for count, epoch in zip(self.counts, self.epochs) if oldest <= epoch <= current)
+
+    def series(self, now: float) -> List[int]:
+        """Значения слотов от старого к текущему."""
+        current = int(now // self.slot_sec)
+        size = len(self.counts)
+        values = []
+        for epoch in range(current - size + 1, current + 1):
+            index = epoch % size
+            values.append(self.counts[index] if self.epochs[index] == epoch else 0)
+        return values
+
+
+class _BoundedMap(OrderedDict):
+    """OrderedDict с вытеснением давно не использованных ключей."""
+
+    def __init__(self, limit: int):
+        super().__init__()
+        self.limit = limit
+
+    def touch(self, key, factory):
+        value = self.get(key)
+        if value is None:
+            if len(self) >= self.limit:
+                self.popitem(last=False)
+            value = self[key] = factory()
+        else:
+            self.move_to_end(key)
+        return value
+
+
+class LiveAggregates:
+    """Скользящие агрегаты по событиям телеметрии."""
+
+    def __init__(self):
+        self.rooms = _BoundedMap(MAX_ROOMS)  # roomId → RollingCounter(секунды)
+        self.events = _BoundedMap(MAX_EVENT_TYPES)  # event → RollingCounter(минуты)
+        self.deaths = RollingCounter(MINUTE_WINDOW, 60)
+        self.matches = _BoundedMap(MAX_MATCHES)  # matchId → [roomId, начало, последнее событие]
+        self.lines = 0
+        self.errors = 0
+
+    def add_line(self, line: bytes, now: float) -> None:
+        keys = parse_keys(line)
+        if keys is None:
+            if line.strip():
+                self.errors += 1
+            return
+        self.lines += 1
+        match_id, room_id, event, ts_ms = keys
+        # Время события, но не из будущего (рассинхронизация часов)
+        ts = min(ts_ms / 1000, now) if ts_ms else now
+
+        self.rooms.touch(room_id, lambda: RollingCounter(ROOM_WINDOW_SEC, 1)).add(ts)
+        if event not in self.events and len(self.events) >= MAX_EVENT_TYPES - 1:
+            event_key = OTHER_EVENT
+        else:
+            event_key = event
+        self.events.touch(event_key, lambda: RollingCounter(MINUTE_WINDOW, 60)).add(ts)
+        if event == "player_death":
+            self.deaths.add(ts)
+
+        if event == "match_end":
+            self.matches.pop(match_id, None)
+        else:
+            match = self.matches.touch(match_id, lambda: [room_id, ts, ts])
+            match[2] = ts
+
+    def expire(self, now: float) -> None:
+        """Убрать комнаты без событий за окно и брошенные матчи."""
+        while self.rooms:
+            room_id, counter = next(iter(self.rooms.items()))
+            if counter.total(now):
+                break
+            del self.rooms[room_id]
+        for match_id in [match_id for match_id, match in self.matches.items() if now - match[2] > MATCH_IDLE_SEC]:
+            del self.matches[match_id]
+
+    def snapshot(self, now: float) -> dict:
+        self.expire(now)
+        rooms = {room_id: round(counter.total(now) / ROOM_WINDOW_SEC, 2) for room_id, counter in self.rooms.items()}
+        deaths = self.deaths.series(now)
+        active_by_room: Dict[str, int] = {}
+        for room_id, _, _ in self.matches.values():
+            active_by_room[room_id] = active_by_room.get(room_id, 0) + 1
+        return {
+            "eventsPerSec": round(sum(rooms.values()), 2),
+            "eventsPerSecByRoom": rooms,
+            "deathsPerMin": deaths[-2] if len(deaths) > 1 else 0,  # Последняя полная минута
+            "deathsPerMinAvg10": round(sum(deaths[-11:-1]) / 10, 2),
+            "deathsLastHour": sum(deaths),
+            "eventsLastHour": {event: counter.total(now) for event, counter in self.events.items()},
+            "activeMatches": len(self.matches),
+            "activeMatchesByRoom": active_by_room,
+            "lines": self.lines,
+            "errors": self.errors,
+        }
+
+
+class FileFollower:
+    """Чтение дописываемого файла: смещение, inode и неполная строка."""
+
+    def __init__(self, path: Path, from_start: bool = True):
+        self.path = path
+        stat = path.stat()
+        self.inode = stat.st_ino
+        self.offset = 0 if from_start else stat.st_size
+        self.partial = b""
+        self.discarding = False  # Пропускаем хвост слишком длинной строки
+        self.last_change = time.time()
+
+    def read_lines(self) -> List[bytes]:
+        """Новые полные строки (не больше READ_BYTES за вызов)."""
+        try:
+            stat = self.path.stat()
+        except FileNotFoundError:
+            return []
+        if stat.st_ino != self.inode or stat.st_size < self.offset:
+            # Пересоздан или усечён — читаем заново
+            self.inode = stat.st_ino
+            self.offset = 0
+            self.partial = b""
+            self.discarding = False
+        if stat.st_size == self.offset:
+            return []
+        with open(self.path, "rb") as f:
+            f.seek(self.offset)
+            data = f.read(READ_BYTES)
+        self.offset += len(data)
+        self.last_change = time.time()
+
+        lines = (self.partial + data).split(b"\n")
+        self.partial = lines.pop()  # Неполная строка (или b"")
+        if self.discarding and lines:
+            lines.pop(0)  # Конец слишком длинной строки
+            self.discarding = False
+        if len(self.partial) > MAX_LINE_BYTES:
+            self.partial = b""
+            self.discarding = True
+        return lines
+
+
+class TelemetryTail:
+    """
+    Следит за файлами телеметрии каталога и обновляет агрегаты.
+
+    Args:
+        log_dir: Каталог с telemetry-*.jsonl
+        from_start: Читать уже существующие файлы с начала (иначе — только новое)
+    """
+
+    def __init__(self, log_dir: Path = DEFAULT_LOG_DIR, from_start: bool = False):
+        self.log_dir = Path(log_dir)
+        self.aggregates = LiveAggregates()
+        self.followers: Dict[str, FileFollower] = {}
+        self._discover(initial=not from_start)
+
+    def _discover(self, initial: bool = False) -> None:
+        """Подхватить новые файлы и отпустить давно не менявшиеся."""
+        now = time.time()
+        files = sorted(self.log_dir.glob(FILE_PATTERN))
+        newest = files[-1].name if files else None
+        present = set()
+        for path in files:
+            try:
+                mtime = path.stat().st_mtime
+            except FileNotFoundError:
+                continue
+            present.add(path.name)
+            if path.name in self.followers:
+                continue
+            if path.name == newest or now - mtime < FOLLOW_STALE_SEC:
+                # Файл, появившийся после старта (новый день), читается с начала
+                self.followers[path.name] = FileFollower(path, from_start=not initial)
+        for name in list(self.followers):
+            follower = self.followers[name]
+            if name not in present or (name != newest and now - follower.last_change > FOLLOW_STALE_SEC):
+                del self.followers[name]
+
+    def poll(self, now: Optional[float] = None) -> int:
+        """Один проход по файлам. Возвращает число прочитанных строк."""
+        self._discover()
+        now = time.time() if now is None else now
+        count = 0
+        for follower in self.followers.values():
+            for line in follower.read_lines():
+                self.aggregates.add_line(line, now)
+                count += 1
+        return count
+
+    def status(self, now: Optional[float] = None) -> dict:
+        now = time.time() if now is None else now
+        return {
+            "updatedAt": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(now)),
+            "files": {name: follower.offset for name, follower in sorted(self.followers.items())},
+            **self.aggregates.snapshot(now),
+        }
+
+
+def write_status(path: Path, status: dict) -> None:
+    """Атомарная запись файла статуса."""
+    tmp_path = path.with_name(path.name + ".tmp")
+    tmp_path.write_text(json.dumps(status, ensure_ascii=False, indent=2), encoding="utf-8")
+    os.replace(tmp_path, path)
+
+
+def _print_status(status: dict) -> None:
+    print(
+        f"[INFO] {status['updatedAt']} событий/с {status['eventsPerSec']}, смертей/мин {status['deathsPerMin']} "
+        f"(ср. за 10 мин {status['deathsPerMinAvg10']}), активных матчей {status['activeMatches']}"
+    )
+    for room_id, rate in sorted(status["eventsPerSecByRoom"].items(), key=lambda item: -item[1])[:10]:
+        print(f"  {room_id:<12} {rate:>7.2f} событий/с, матчей {status['activeMatchesByRoom'].get(room_id, 0)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Потоковый анализ телеметрии (tail -f)")
+    parser.add_argument("--log-dir", type=Path, default=DEFAULT_LOG_DIR, help=f"Каталог логов (по умолчанию: {DEFAULT_LOG_DIR})")
+    parser.add_argument("--status", type=Path, default=None, help="JSON-файл статуса (перезаписывается атомарно)")
+    parser.add_argument("--interval", type=float, default=1.0, help="Интервал опроса файлов (сек)")
+    parser.add_argument("--print", dest="print_every", type=float, default=0, metavar="SEC", help="Печатать сводку раз в SEC секунд")
+    parser.add_argument("--from-start", action="store_true", help="Прочитать существующие файлы с начала")
+    parser.add_argument("--once", action="store_true", help="Один проход и выход")
+    args = parser.parse_args()
+
+    if not args.log_dir.is_dir():
+        print(f"[ERROR] Нет каталога {args.log_dir}")
+        sys.exit(1)
+
+    tail = TelemetryTail(args.log_dir, from_start=args.from_start)
+    if args.once:
+        tail.poll()
+        status = tail.status()
+        if args.status:
+            write_status(args.status, status)
+        _print_status(status)
+        return
+
+    print(f"[INFO] Слежу за {args.log_dir}/{FILE_PATTERN}: {', '.join(tail.followers) or 'файлов пока нет'}")
+    last_print = time.time()
+    try:
+        while True:
+            tail.poll()
+            if args.status:
+                write_status(args.status, tail.status())
+            if args.print_every and time.time() - last_print >= args.print_every:
+                last_print = time.time()
+                _print_status(tail.status())
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        print("[INFO] Остановлено")
+
+
+if __name__ == "__main__":
+    main()
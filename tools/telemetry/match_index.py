@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+"""
+Match Index — индекс байтовых диапазонов матчей в файлах телеметрии
+
+Все комнаты сервера пишут в один server/logs/telemetry-YYYY-MM-DD.jsonl
+пачками (TelemetryService сбрасывает очередь каждые 20 событий или 2 с),
+поэтому строки матча перемежаются строками других комнат. Индекс хранит
+для каждого matchId список диапазонов [начало, конец) его строк — подряд
+идущие строки одного матча сливаются в один диапазон, — комнату, время
+и признаки match_start/match_end; для roomId — список его матчей.
+
+Индекс обновляется инкрементально: запоминает байт, до которого файл
+разобран, и при следующем вызове читает только дописанное (неполная
+последняя строка ждёт). Чтение матча — чтение и разбор только его
+диапазонов, то есть пропорционально размеру матча, а не дня.
+
+Смещения — байты исходного JSONL, поэтому индекс остаётся верным и после
+сжатия закрытого дня в архив (archive.py): индекс переносится к
+telemetry-YYYY-MM-DD.jsonl.gz, а чтение распаковывает только кадры диапазонов.
+
+Поле matchId берётся поиском в байтах строки: JSON.stringify пишет ключи
+в порядке TelemetryEvent без пробелов; строки другого вида разбираются
+json.loads.
+
+Использование:
+  python tools/telemetry/match_index.py build server/logs/telemetry-2026-10-19.jsonl
+  python tools/telemetry/match_index.py list server/logs/telemetry-2026-10-19.jsonl
+  python tools/telemetry/match_index.py extract server/logs/telemetry-2026-10-19.jsonl --match <matchId> > match.jsonl
+  python tools/telemetry/match_index.py extract server/logs/telemetry-2026-10-19.jsonl --room <roomId>
+  python tools/telemetry/match_index.py list server/logs/telemetry-2026-10-18.jsonl.gz
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+# Добавляем корень репозитория в sys.path для импортов
+_REPO_ROOT = Path(__file__).parent.parent.parent
+if str(_REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(_REPO_ROOT))
+
+from tools.telemetry.archive import open_telemetry
+
+INDEX_VERSION = 1
+INDEX_SUFFIX = ".idx.json"
+
+# Байт начала файла, по которым распознаётся подмена файла (ротация, перезапись)
+HEAD_BYTES = 256
+
+MATCH_KEY = b'"matchId":"'
+ROOM_KEY = b'"roomId":"'
+EVENT_KEY = b'"event":"'
+TS_KEY = b'"ts":'
+
+
+@dataclass
+class MatchEntry:
+    """Матч в индексе"""
+
+    room_id: str = ""
+    ranges: List[List[int]] = field(default_factory=list)  # [[начало, конец), ...] по возрастанию
+    lines: int = 0
+    first_ts: int = 0
+    last_ts: int = 0
+    started: bool = False  # Встречен match_start
+    ended: bool = False  # Встречен match_end
+
+    @property
+    def size(self) -> int:
+        return sum(end - start for start, end in self.ranges)
+
+
+def index_path_for(source: Path) -> Path:
+    """Индекс лежит рядом с файлом: telemetry-YYYY-MM-DD.jsonl.idx.json"""
+    return source.with_name(source.name + INDEX_SUFFIX)
+
+
+def _string_after(line: bytes, key: bytes) -> Optional[str]:
+    i = line.find(key)
+    if i < 0:
+        return None
+    i += len(key)
+    end = line.find(b'"', i)
+    if end < 0:
+        return None
+    return line[i:end].decode("utf-8", errors="replace")
+
+
+def _int_after(line: bytes, key: bytes) -> int:
+    i = line.find(key)
+    if i < 0:
+        return 0
+    i += len(key)
+    end = i
+    while end < len(line) and 48 <= line[end] <= 57:
+        end += 1
+    return int(line[i:end]) if end > i else 0
+
+
+def parse_keys(line: bytes) -> Optional[tuple]:
+    """(matchId, roomId, event, ts) строки или None, если это не событие телеметрии."""
+    match_id = _string_after(line, MATCH_KEY)
+    if match_id is not None and not match_id.endswith("\\"):
+        return match_id, _string_after(line, ROOM_KEY) or "", _string_after(line, EVENT_KEY) or "", _int_after(line, TS_KEY)
+    try:
+        event = json.loads(line)
+    except ValueError:
+        return None
+    if not isinstance(event, dict) or not event.get("matchId"):
+        return None
+    return str(event["matchId"]), str(event.get("roomId") or ""), str(event.get("event") or ""), int(event.get("ts") or 0)
+
+
+class MatchIndex:
+    """
+    Индекс одного файла телеметрии.
+
+    Args:
+        source: Файл telemetry-*.jsonl или архив telemetry-*.jsonl.gz
+        path: Файл индекса (по умолчанию рядом с источником)
+    """
+
+    def __init__(self, source: Path, path: Optional[Path] = None):
+        self.source = Path(source)
+        self.path = Path(path) if path else index_path_for(self.source)
+        self.offset = 0
+        self.head = ""
+        self.skipped = 0
+        self.matches: Dict[str, MatchEntry] = {}
+        self.rooms: Dict[str, List[str]] = {}
+        self._load()
+
+    def _load(self) -> None:
+        if not self.path.exists():
+            return
+        data = json.loads(self.path.read_text(encoding="utf-8"))
+        if data.get("version") != INDEX_VERSION:
+            return  # Устаревший формат — перестроим
+        self.offset = data["offset"]
+        self.head = data["head"]
+        self.skipped = data.get("skipped", 0)
+        self.matches = {match_id: MatchEntry(**entry) for match_id, entry in data["matches"].items()}
+        self.rooms = data["rooms"]
+
+    def _reset(self) -> None:
+        self.offset = 0
+        self.head = ""
+        self.skipped = 0
+        self.matches = {}
+        self.rooms = {}
+
+    def _head_digest(self, reader) -> str:
+        return hashlib.sha1(reader.read(0, HEAD_BYTES)).hexdigest()
+
+    def update(self) -> int:
+        """
+        Дочитать файл с последнего проиндексированного байта.
+
+        Returns:
+            Число новых проиндексированных строк
+        """
+        added = 0
+        with open_telemetry(self.source) as reader:
+            if self.offset:
+                # Файл усечён или заменён — индекс недействителен
+                if reader.size < self.offset or (self.offset >= HEAD_BYTES and self._head_digest(reader) != self.head):
+                    self._reset()
+            position = self.offset
+            for line in reader.iter_lines(self.offset):
+                if not line.endswith(b"\n"):
+                    break  # Неполная строка: TelemetryService ещё пишет
+                start, position = position, position + len(line)
+                keys = parse_keys(line)
+                if keys is None:
+                    if line.strip():
+                        self.skipped += 1
+                    continue
+                self._add(start, position, *keys)
+                added += 1
+            self.offset = position
+            if self.offset >= HEAD_BYTES and not self.head:
+                self.head = self._head_digest(reader)
+        if added or not self.path.exists():
+            self.save()
+        return added
+
+    def _add(self, start: int, end: int, match_id: str, room_id: str, event: str, ts: int) -> None:
+        entry = self.matches.get(match_id)
+        if entry is None:
+            entry = self.matches[match_id] = MatchEntry(room_id=room_id, first_ts=ts)
+            self.rooms.setdefault(room_id, []).append(match_id)
+        ranges = entry.ranges
+        if ranges and ranges[-1][1] == start:
+            ranges[-1][1] = end  # Продолжение подряд идущих строк матча
+        else:
+            ranges.append([start, end])
+        entry.lines += 1
+        if ts:
+            entry.first_ts = min(entry.first_ts, ts) if entry.first_ts else ts
+            entry.last_ts = max(entry.last_ts, ts)
+        if event == "match_start":
+            entry.started = True
+        elif event == "match_end":
+            entry.ended = True
+
+    def save(self) -> None:
+        """Атомарно записать индекс."""
+        data = {
+            "version": INDEX_VERSION,
+            "source": str(self.source),
+            "offset": self.offset,
+            "head": self.head,
+            "skipped": self.skipped,
+            "matches": {match_id: asdict(entry) for match_id, entry in self.matches.items()},
+            "rooms": self.rooms,
+        }
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        tmp_path.write_text(json.dumps(data, ensure_ascii=False, separators=(",", ":")), encoding="utf-8")
+        os.replace(tmp_path, self.path)
+
+    def ranges_for(self, match_id: Optional[str] = None, room_id: Optional[str] = None) -> List[List[int]]:
+        """Диапазоны матча или всех матчей комнаты, по возрастанию смещения."""
+        if match_id is not None:
+            entry = self.matches.get(match_id)
+            return list(entry.ranges) if entry else []
+        ranges = []
+        for room_match in self.rooms.get(room_id or "", []):
+            ranges.extend(self.matches[room_match].ranges)
+        return sorted(ranges)
+
+    def read_lines(self, match_id: Optional[str] = None, room_id: Optional[str] = None) -> Iterator[bytes]:
+        """Сырые строки матча (или комнаты): mmap JSONL или распаковка нужных кадров архива — без чтения остального файла."""
+        ranges = self.ranges_for(match_id, room_id)
+        if not ranges:
+            return
+        with open_telemetry(self.source) as reader:
+            for start, end in ranges:
+                chunk = reader.read(start, end)
+                if match_id is None:
+                    yield from chunk.splitlines(keepends=True)
+                    continue
+                # В диапазоне только строки матча, но проверка дешёвая и защищает от подмены файла
+                for line in chunk.splitlines(keepends=True):
+                    keys = parse_keys(line)
+                    if keys is not None and keys[0] == match_id:
+                        yield line
+
+    def read_events(self, match_id: Optional[str] = None, room_id: Optional[str] = None) -> Iterator[dict]:
+        for line in self.read_lines(match_id, room_id):
+            yield json.loads(line)
+
+
+def open_index(source: Path, update: bool = True) -> MatchIndex:
+    """Открыть индекс файла и (по умолчанию) дочитать новые строки."""
+    index = MatchIndex(source)
+    if update:
+        index.update()
+    return index
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Индекс матчей в файлах телеметрии")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="Построить или дополнить индексы")
+    build.add_argument("sources", nargs="+", type=Path)
+    listing = sub.add_parser("list", help="Матчи файла")
+    listing.add_argument("source", type=Path)
+    extract = sub.add_parser("extract", help="Строки матча или комнаты в stdout (или --out)")
+    extract.add_argument("source", type=Path)
+    target = extract.add_mutually_exclusive_group(required=True)
+    target.add_argument("--match", help="matchId")
+    target.add_argument("--room", help="roomId")
+    extract.add_argument("--out", type=Path, default=None, help="Файл вместо stdout")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        for source in args.sources:
+            index = MatchIndex(source)
+            added = index.update()
+            print(f"[OK] {source.name}: +{added} строк, матчей {len(index.matches)}, комнат {len(index.rooms)} → {index.path}")
+        return
+
+    index = open_index(args.source)
+    if args.command == "list":
+        print(f"{'matchId':<38} {'roomId':<12} {'строк':>7} {'диапазонов':>10} {'КБ':>8} {'сек':>6}  статус")
+        for match_id, entry in sorted(index.matches.items(), key=lambda item: item[1].first_ts):
+            status = "полный" if entry.started and entry.ended else ("идёт" if entry.started else "без начала")
+            seconds = (entry.last_ts - entry.first_ts) / 1000
+            print(
+                f"{match_id:<38} {entry.room_id:<12} {entry.lines:>7} {len(entry.ranges):>10} "
+                f"{entry.size / 1024:>8.1f} {seconds:>6.0f}  {status}"
+            )
+        return
+
+    if args.match and args.match not in index.matches:
+        print(f"[ERROR] Матч {args.match} не найден в {args.source}", file=sys.stderr)
+        sys.exit(1)
+    if args.room and args.room not in index.rooms:
+        print(f"[ERROR] Комната {args.room} не найдена в {args.source}", file=sys.stderr)
+        sys.exit(1)
+    output = open(args.out, "wb") if args.out else sys.stdout.buffer
+    try:
+        count = 0
+        for line in index.read_lines(args.match, args.room):
+            output.write(line)
+            count += 1
+    finally:
+        if args.out:
+            output.close()
+    print(f"[OK] Строк: {count}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Unit-тесты для пакетного ревью
+
+Тестирует:
+- retry_call: повтор временных ошибок (429/5xx) с экспоненциальной задержкой
+- BatchReviewer: параллельное ревью, сохранение прогресса и продолжение пачки
+- Передачу репозитория пачки в run_review
+"""
+
+import random
+import sys
+from pathlib import Path
+
+# Добавляем корень репозитория в sys.path для импортов
+_REPO_ROOT = Path(__file__).parent.parent
+if str(_REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(_REPO_ROOT))
+
+import pytest
+from tools.batch_reviewer import STATUS_DONE, STATUS_FAILED, BatchReviewer
+from tools.pr_parser import DEFAULT_REPO
+from tools.rate_limit import TokenBucket, retry_call
+
+
+class FakeApiError(Exception):
+    """Ошибка в стиле google-genai: HTTP-статус в атрибуте code"""
+
+    def __init__(self, code):
+        super().__init__(f"HTTP {code}")
+        self.code = code
+
+
+def test_retry_call_retries_transient_errors():
+    """429 и 503 повторяются с растущим потолком задержки, результат возвращается"""
+    errors = [FakeApiError(429), FakeApiError(503)]
+    delays = []
+
+    def flaky():
+        if errors:
+            raise errors.pop(0)
+        return "ok"
+
+    result = retry_call(flaky, attempts=5, base_delay=1.0, max_delay=10.0,
+                        sleep=delays.append, rng=random.Random(1))
+
+    assert result == "ok"
+    assert len(delays) == 2
+    assert 0 <= delays[0] <= 1.0 and 0 <= delays[1] <= 2.0
+
+
+def test_retry_call_does_not_retry_client_errors():
+    """400 (ошибка запроса) пробрасывается сразу"""
+    calls = []
+
+    def bad_request():
+        calls.append(1)
+        raise FakeApiError(400)
+
+    with pytest.raises(FakeApiError):
+        retry_call(bad_request, attempts=5, sleep=lambda _: None)
+    assert len(calls) == 1
+
+
+def test_batch_resumes_after_failure(tmp_path):
+    """Упавший PR повторяется при следующем запуске, завершённые — нет"""
+    calls = []
+    fail_once = {102}
+
+    def review(pr_number, iteration, repo, limiter):
+        calls.append(pr_number)
+        assert repo == "owner/repo"
+        assert limiter.try_acquire()
+        if pr_number in fail_once:
+            fail_once.discard(pr_number)
+            raise RuntimeError("quota exhausted")
+
+    def make_batch():
+        return BatchReviewer(
+            repo="owner/repo",
+            limiter=TokenBucket(rate=1000, capacity=10),
+            max_workers=3,
+            review_fn=review,
+            state_dir=tmp_path,
+        )
+
+    first = make_batch().run([101, 102, 103])
+    assert first == {101: STATUS_DONE, 102: STATUS_FAILED, 103: STATUS_DONE}
+
+    calls.clear()
+    second = make_batch().run([101, 102, 103])
+
+    assert calls == [102]
+    assert set(second.values()) == {STATUS_DONE}
+
+
+def test_default_review_uses_batch_repo(tmp_path, monkeypatch):
+    """Репозиторий пачки доходит до run_review (а не DEFAULT_REPO)"""
+    from tools import gemini_reviewer, review_cache
+
+    seen = []
+
+    def fake_run_review(pr_number, iteration=1, repo=DEFAULT_REPO, limiter=None, cache=None, **kwargs):
+        seen.append((pr_number, iteration, repo))
+        return "report"
+
+    monkeypatch.setattr(gemini_reviewer, "run_review", fake_run_review)
+    monkeypatch.setattr(review_cache, "DEFAULT_CACHE_PATH", tmp_path / "cache.sqlite")
+
+    batch = BatchReviewer(repo="fork/other-repo", iteration=2, limiter=TokenBucket(rate=1000, capacity=10), state_dir=tmp_path)
+    assert batch.run([7]) == {7: STATUS_DONE}
+    assert seen == [(7, 2, "fork/other-repo")]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,53 @@
+"""
+Unit-тесты для бенчмарков review-пайплайна
+
+Тестирует:
+- Детерминированность синтетического корпуса и его разбор pr_parser
+- Прогон набора замеров на маленьком корпусе и сравнение с базовым прогоном
+"""
+
+import sys
+from pathlib import Path
+
+# Добавляем корень репозитория в sys.path для импортов
+_REPO_ROOT = Path(__file__).parent.parent
+if str(_REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(_REPO_ROOT))
+
+import pytest
+from tools.bench_corpus import CorpusConfig, make_pr_comments, to_jsonl
+from tools.bench_review import compare_results, run_suite
+from tools.pr_parser import parse_comments_jsonl, parse_review_comments
+
+SMALL = CorpusConfig(comments=60, issues_per_review=10, paragraph_words=30, seed=1)
+
+
+def test_corpus_is_deterministic_and_parseable():
+    """Один seed — один корпус; ревью и замечания из него распознаются"""
+    comments = make_pr_comments(SMALL)
+
+    assert comments == make_pr_comments(SMALL)
+    assert parse_comments_jsonl(to_jsonl(comments)) == comments
+    reviews = parse_review_comments(comments, 1)
+    assert reviews
+    assert all(review.issues for review in reviews.values())
+
+
+def test_suite_runs_and_compares():
+    """Все функции замеряются, рост времени выше порога отмечается как регрессия"""
+    payload = run_suite(to_jsonl(make_pr_comments(SMALL)), repeat=1)
+
+    assert set(payload["results"]) == {
+        "parse_pr_comments", "parse_single_comment", "extract_issues_from_body",
+        "extract_blocking_issues", "get_consensus_summary",
+    }
+    assert payload["corpus"]["comments"] == SMALL.comments
+
+    baseline = {"results": {name: {**result, "min_ms": result["min_ms"] / 2}
+                            for name, result in payload["results"].items()}}
+    _, regressions = compare_results(payload, baseline, threshold=1.5)
+    assert set(regressions) == set(payload["results"])
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
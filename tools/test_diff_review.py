@@ -0,0 +1,248 @@
+"""
+Unit-тесты для ревью больших diff-ов
+
+Тестирует:
+- split_diff / chunk_diff: разбиение по файлам и hunk-ам с бюджетом токенов
+- merge_reports: слияние отчётов частей в формат, понятный pr_parser
+- filter_diff: отсев lock-файлов, бинарных, сгенерированных и пробельных изменений
+- ReviewCache: кэш ревью файлов по содержимому, LRU-вытеснение
+"""
+
+import json
+import sys
+from pathlib import Path
+
+# Добавляем корень репозитория в sys.path для импортов
+_REPO_ROOT = Path(__file__).parent.parent
+if str(_REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(_REPO_ROOT))
+
+import pytest
+from tools.diff_filter import DiffFilterConfig, filter_diff, format_skipped_section
+from tools.diff_splitter import chunk_diff, estimate_tokens, split_diff
+from tools.pr_parser import parse_single_comment
+from tools.review_cache import ReviewCache, combine_reports, file_content_id, make_key, split_report_by_file
+from tools.review_report import ParsedReport, extract_verdict, merge_reports, parse_report
+from tools.review_state import Issue
+
+
+def make_file_diff(path, hunks=1, lines_per_hunk=5):
+    parts = [
+        f"diff --git a/{path} b/{path}\n",
+        "index 1111111..2222222 100644\n",
+        f"--- a/{path}\n",
+        f"+++ b/{path}\n",
+    ]
+    for h in range(hunks):
+        parts.append(f"@@ -{h * 10 + 1},3 +{h * 10 + 1},4 @@\n")
+        parts.extend(f"+line {h}-{i} {'x' * 40}\n" for i in range(lines_per_hunk))
+    return "".join(parts)
+
+
+def test_split_diff_by_file():
+    """Файлы, hunk-и и blob SHA извлекаются из diff"""
+    diff = make_file_diff("src/a.ts", hunks=2) + make_file_diff("src/b.ts")
+
+    files = split_diff(diff)
+
+    assert [f.path for f in files] == ["src/a.ts", "src/b.ts"]
+    assert len(files[0].hunks) == 2
+    assert files[0].blob_sha == "2222222"
+    assert "".join(f.text for f in files) == diff
+
+
+def test_chunk_diff_respects_budget():
+    """Каждый чанк укладывается в бюджет, крупный файл режется по hunk-ам"""
+    diff = make_file_diff("big.ts", hunks=20) + make_file_diff("small.ts")
+    budget = 400
+
+    chunks = chunk_diff(diff, budget)
+
+    assert len(chunks) > 1
+    assert all(chunk.tokens <= budget for chunk in chunks)
+    # Каждая часть крупного файла — самостоятельный diff с заголовком
+    assert all(chunk.text.startswith("diff --git ") for chunk in chunks)
+    assert chunks[-1].files[-1] == "small.ts"
+
+
+def test_small_diff_is_single_chunk():
+    """Небольшой diff не делится"""
+    diff = make_file_diff("a.ts")
+
+    assert len(chunk_diff(diff, estimate_tokens(diff) + 10)) == 1
+
+
+def test_merged_report_is_parsed_by_pr_parser():
+    """Слитый отчёт распознаётся ISSUE_PATTERN и VERDICT_PATTERN"""
+    part1 = (
+        "### Замечания\n"
+        "1. **[P1]** `src/a.ts:12` — Таймер не очищается\n"
+        "### Вердикт\n**CHANGES_REQUESTED** ❌"
+    )
+    part2 = (
+        "### Замечания\n"
+        "1. **[P2]** `src/b.ts`:3 — Можно упростить\n"
+        "### Вердикт\n**APPROVED** ✅"
+    )
+
+    report = merge_reports([parse_report(part1, "gemini"), parse_report(part2, "gemini")], "## Review")
+    metadata = json.dumps({"reviewer": "gemini", "type": "review"})
+    review = parse_single_comment(f"<!-- {metadata} -->\n{report}", 1)
+
+    assert review.status.value == "CHANGES_REQUESTED"
+    assert [(i.priority, i.file, i.line) for i in review.issues] == [
+        ("P1", "src/a.ts", 12),
+        ("P2", "src/b.ts", 3),
+    ]
+
+
+def test_merged_verdict_needs_explicit_approval():
+    """Части только с комментариями не дают APPROVED — ни при слиянии, ни в кэше файлов"""
+    commented = "### Замечания\n1. **[P2]** `src/a.ts:3` — Можно упростить\n### Вердикт\n**COMMENTED** 💬"
+    approved = "### Замечания\nЗамечаний нет.\n### Вердикт\n**APPROVED** ✅"
+    parts = [parse_report(commented, "gemini"), parse_report(commented, "gemini")]
+
+    assert extract_verdict(merge_reports(parts, "## Review")) == "COMMENTED"
+    assert extract_verdict(merge_reports(parts + [parse_report(approved, "gemini")], "## Review")) == "APPROVED"
+    assert extract_verdict(merge_reports([parse_report("Без вердикта", "gemini")], "## Review")) == "COMMENTED"
+
+    per_file = split_report_by_file(parts[0], ["src/a.ts", "src/b.ts"])
+    assert {path: report.verdict for path, report in per_file.items()} == {"src/a.ts": "COMMENTED", "src/b.ts": "COMMENTED"}
+    assert combine_reports(list(per_file.values())).verdict == "COMMENTED"
+
+
+def test_filter_drops_noise_and_reports_it():
+    """Lock-файл, ассеты, бинарный и сгенерированный файлы не попадают в ревью"""
+    binary = (
+        "diff --git a/assets/sprites/slime.png b/assets/sprites/slime.png\n"
+        "index 1111111..2222222 100644\n"
+        "Binary files a/assets/sprites/slime.png and b/assets/sprites/slime.png differ\n"
+    )
+    generated = make_file_diff("shared/src/generated.ts").replace("+line 0-0", "+// @generated line 0-0")
+    diff = (
+        make_file_diff("package-lock.json")
+        + make_file_diff("assets-dist/hud/a.webp")
+        + binary
+        + generated
+        + make_file_diff("server/src/rooms/ArenaRoom.ts")
+    )
+
+    result = filter_diff(diff)
+
+    assert result.reviewed_files == ["server/src/rooms/ArenaRoom.ts"]
+    assert [s.path for s in result.skipped] == [
+        "package-lock.json",
+        "assets-dist/hud/a.webp",
+        "assets/sprites/slime.png",
+        "shared/src/generated.ts",
+    ]
+    assert "`package-lock.json`" in format_skipped_section(result)
+
+
+def test_filter_drops_whitespace_only_hunks():
+    """Hunk с изменением только отступов выбрасывается, содержательный остаётся"""
+    diff = (
+        "diff --git a/a.ts b/a.ts\n"
+        "--- a/a.ts\n"
+        "+++ b/a.ts\n"
+        "@@ -1,2 +1,2 @@\n"
+        "-if (x) {\n"
+        "+if (x)  {\n"
+        "@@ -10,1 +10,1 @@\n"
+        "-return 1;\n"
+        "+return 2;\n"
+    )
+
+    result = filter_diff(diff)
+
+    assert result.dropped_hunks == 1
+    assert "return 2" in result.diff
+    assert "if (x)  {" not in result.diff
+
+
+def test_filter_minified_needs_mostly_long_lines():
+    """Одна длинная строка в исходнике не прячет файл; собранный CSS — пропускается"""
+    long_line = "x" * 600
+    source = make_file_diff("server/src/rooms/ArenaRoom.ts").replace("+line 0-0", f"+const RE = /{long_line}/; // 0-0")
+    lone = make_file_diff("client/src/sql.ts", lines_per_hunk=1).replace("+line 0-0", f"+const SQL = '{long_line}'; // 0-0")
+    bundle = make_file_diff("client/public/app.css", lines_per_hunk=1).replace("+line 0-0", f"+{long_line}")
+
+    result = filter_diff(source + lone + bundle)
+
+    assert result.reviewed_files == ["server/src/rooms/ArenaRoom.ts", "client/src/sql.ts"]
+    assert [(s.path, s.reason.split()[0]) for s in result.skipped] == [("client/public/app.css", "минифицированный")]
+
+
+def test_filter_include_overrides_exclude():
+    """include_globs сильнее exclude_globs"""
+    config = DiffFilterConfig(include_globs=["package-lock.json"])
+
+    result = filter_diff(make_file_diff("package-lock.json"), config)
+
+    assert result.reviewed_files == ["package-lock.json"]
+
+
+def test_cache_key_follows_file_content(tmp_path):
+    """Ключ меняется вместе с diff-ом файла (blob, база, фильтр), запись переживает переоткрытие"""
+    before = split_diff(make_file_diff("a.ts"))[0]
+    after = split_diff(make_file_diff("a.ts").replace("..2222222", "..3333333"))[0]
+    key = make_key(file_content_id(before), "v1", "model")
+    report = ParsedReport(
+        issues=[Issue(priority="P1", file="a.ts", line=3, problem="Утечка", reviewer="gemini")],
+        verdict="CHANGES_REQUESTED",
+    )
+
+    with ReviewCache(tmp_path / "cache.sqlite3") as cache:
+        cache.put(key, report)
+    with ReviewCache(tmp_path / "cache.sqlite3") as cache:
+        hit = cache.get(key)
+        assert cache.get(make_key(file_content_id(after), "v1", "model")) is None
+        assert cache.get(make_key(file_content_id(before), "v2", "model")) is None
+        assert cache.get(make_key(file_content_id(split_diff(make_file_diff("a.ts"))[0]), "v1", "model")) is not None
+
+        # Тот же blob после изменения, но другая база или другой набор hunk-ов после фильтра
+        other_base = split_diff(make_file_diff("a.ts").replace("1111111..", "4444444.."))[0]
+        fewer_hunks = split_diff(make_file_diff("a.ts", lines_per_hunk=3))[0]
+        assert other_base.blob_sha == before.blob_sha == fewer_hunks.blob_sha
+        assert cache.get(make_key(file_content_id(other_base), "v1", "model")) is None
+        assert cache.get(make_key(file_content_id(fewer_hunks), "v1", "model")) is None
+
+    assert hit.verdict == "CHANGES_REQUESTED"
+    assert [(i.file, i.line) for i in hit.issues] == [("a.ts", 3)]
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    """При превышении лимита вытесняется давно не читанная запись"""
+    report = ParsedReport(positives=["x" * 100], verdict="APPROVED")
+
+    with ReviewCache(tmp_path / "cache.sqlite3", max_bytes=350) as cache:
+        cache.put("old", report)
+        cache.put("used", report)
+        cache.get("old")
+        cache.put("new", report)
+
+        assert cache.get("used") is None
+        assert cache.get("old") is not None
+        assert cache.total_bytes() <= 350
+
+
+def test_split_report_by_file():
+    """Замечания чанка раскладываются по файлам, в том числе по сокращённому пути"""
+    report = parse_report(
+        "### Замечания\n"
+        "1. **[P1]** `ArenaRoom.ts`:10 — Аллокация в тике\n"
+        "2. **[P2]** `client/src/main.ts`:5 — Можно упростить\n"
+        "### Вердикт\n**CHANGES_REQUESTED** ❌",
+        "gemini",
+    )
+
+    per_file = split_report_by_file(report, ["server/src/rooms/ArenaRoom.ts", "client/src/main.ts", "shared/x.ts"])
+
+    assert [i.line for i in per_file["server/src/rooms/ArenaRoom.ts"].issues] == [10]
+    assert per_file["server/src/rooms/ArenaRoom.ts"].verdict == "CHANGES_REQUESTED"
+    assert per_file["client/src/main.ts"].verdict == "APPROVED"
+    assert per_file["shared/x.ts"].issues == []
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
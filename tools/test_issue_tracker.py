@@ -0,0 +1,118 @@
+"""
+Unit-тесты для отпечатков замечаний и их жизненного цикла
+
+Тестирует:
+- Сопоставление переформулированного и съехавшего по строкам замечания
+- Жизненный цикл opened → fixed → reopened и сохранение трекера
+- Дедупликацию блокирующих проблем разных ревьюверов
+"""
+
+import sys
+from pathlib import Path
+
+# Добавляем корень репозитория в sys.path для импортов
+_REPO_ROOT = Path(__file__).parent.parent
+if str(_REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(_REPO_ROOT))
+
+from tools.consensus import extract_blocking_issues
+from tools.issue_tracker import (
+    EVENT_FIXED,
+    EVENT_OPENED,
+    EVENT_REOPENED,
+    STATUS_FIXED,
+    STATUS_OPEN,
+    IssueTracker,
+)
+from tools.review_state import Issue, ReviewData, ReviewStatus
+
+LEAK = "Утечка памяти: таймер не очищается при dispose комнаты"
+LEAK_REWORDED = "Таймер не очищается в dispose — утечка памяти комнаты"
+RACE = "Race condition when two players join simultaneously"
+
+
+def _review(reviewer, *issues):
+    return ReviewData(
+        reviewer=reviewer,
+        status=ReviewStatus.CHANGES_REQUESTED,
+        body="",
+        issues=[Issue(priority=p, file=f, line=line, problem=text, reviewer=reviewer) for p, f, line, text in issues],
+    )
+
+
+def test_match_reworded_and_moved_issue():
+    """Та же проблема другими словами и на 7 строк ниже — известное замечание"""
+    tracker = IssueTracker()
+    known = tracker.add(Issue(priority="P1", file="server/ArenaRoom.ts", line=120, problem=LEAK))
+
+    assert tracker.match(Issue(priority="P1", file="server/ArenaRoom.ts", line=127, problem=LEAK_REWORDED)) is known
+    # Другой файл, далёкая строка или другая проблема — новые замечания
+    assert tracker.match(Issue(priority="P1", file="client/main.ts", line=120, problem=LEAK)) is None
+    assert tracker.match(Issue(priority="P1", file="server/ArenaRoom.ts", line=400, problem=LEAK)) is None
+    assert tracker.match(Issue(priority="P1", file="server/ArenaRoom.ts", line=130, problem=RACE)) is None
+
+
+def test_lifecycle_across_iterations():
+    """opened → fixed → reopened, состояние переживает сериализацию"""
+    tracker = IssueTracker()
+    events = tracker.update(1, {
+        "opus": _review("opus", ("P1", "a.ts", 10, LEAK), ("P0", "b.ts", 50, RACE)),
+        "gemini": _review("gemini", ("P1", "a.ts", 12, LEAK_REWORDED)),
+    })
+    assert [event for event, _ in events] == [EVENT_OPENED, EVENT_OPENED]
+
+    # Итерация 2: гонку исправили, утечка съехала на 5 строк
+    tracker = IssueTracker.from_dict(tracker.to_dict())
+    events = tracker.update(2, {"opus": _review("opus", ("P1", "a.ts", 15, LEAK))})
+    assert [(event, tracked.file) for event, tracked in events] == [(EVENT_FIXED, "b.ts")]
+    leak = tracker.match(Issue(priority="P1", file="a.ts", line=15, problem=LEAK))
+    assert leak.status == STATUS_OPEN and leak.opened_iteration == 1
+    assert sorted(leak.reviewers) == ["gemini", "opus"]
+
+    # Итерация 3: гонка вернулась
+    tracker = IssueTracker.from_dict(tracker.to_dict())
+    events = tracker.update(3, {"codex": _review("codex", ("P0", "b.ts", 52, "Race condition: two players join at once"))})
+    assert [event for event, _ in events] == [EVENT_REOPENED]
+    race = events[0][1]
+    assert race.reopen_count == 1 and race.status == STATUS_OPEN
+    # Утечку codex не отмечал, а opus с gemini ещё не прислали ревью итерации 3
+    assert leak.id in {tracked.id for tracked in tracker.open_issues()}
+    assert tracker.fixed_issues() == []
+    assert [entry["event"] for entry in race.history] == [EVENT_OPENED, EVENT_FIXED, EVENT_REOPENED]
+    assert STATUS_FIXED not in {tracked.status for tracked in tracker.issues.values()}
+
+
+def test_blocking_issues_deduplicated_by_fingerprint():
+    """Почти дословный повтор от двух ревьюверов — одна блокирующая с высшим приоритетом"""
+    reviews = {
+        "opus": _review("opus", ("P1", "a.ts", 10, LEAK), ("P2", "a.ts", 30, "Стиль")),
+        "gemini": _review("gemini", ("P0", "a.ts", 11, LEAK + "."), ("P0", "b.ts", 5, RACE)),
+    }
+    blocking = extract_blocking_issues(reviews)
+    assert [(issue.priority, issue.file, issue.reviewer) for issue in blocking] == [
+        ("P0", "a.ts", "opus"),
+        ("P0", "b.ts", "gemini"),
+    ]
+
+
+def test_distinct_blockers_on_adjacent_lines_kept():
+    """Разные проблемы на соседних строках не склеиваются, даже если похожи по словам"""
+    reviews = {
+        "opus": _review(
+            "opus",
+            ("P1", "a.ts", 10, "Missing null check for player"),
+            ("P1", "ArenaRoom.ts", 120, "Race condition при обработке входа игрока"),
+        ),
+        "gemini": _review(
+            "gemini",
+            ("P1", "a.ts", 11, "Missing rate limit for player input"),
+            ("P0", "ArenaRoom.ts", 122, "Нет проверки авторизации при обработке входа игрока"),
+        ),
+    }
+    blocking = extract_blocking_issues(reviews)
+    assert [(issue.priority, issue.file, issue.line) for issue in blocking] == [
+        ("P0", "ArenaRoom.ts", 122),
+        ("P1", "ArenaRoom.ts", 120),
+        ("P1", "a.ts", 10),
+        ("P1", "a.ts", 11),
+    ]
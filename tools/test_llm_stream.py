@@ -0,0 +1,104 @@
+"""
+Unit-тесты для потокового ответа модели
+
+Тестирует:
+- consume_stream: сборка текста, TTFT, токены из usage_metadata
+- Таймаут простоя при зависшем потоке и остановку чтения после таймаута
+- Запись метрик в JSONL
+"""
+
+import json
+import sys
+import threading
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+# Добавляем корень репозитория в sys.path для импортов
+_REPO_ROOT = Path(__file__).parent.parent
+if str(_REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(_REPO_ROOT))
+
+import pytest
+from tools.llm_stream import GenerationTimeout, MetricsLog, stream_text
+from tools.rate_limit import is_transient_error
+
+
+def test_stream_collects_text_and_metrics(tmp_path):
+    """Текст склеивается из частей, токены берутся из последней части"""
+    usage = SimpleNamespace(prompt_token_count=100, candidates_token_count=7, total_token_count=107)
+    parts = [
+        SimpleNamespace(text="## Review", usage_metadata=None),
+        SimpleNamespace(text=" by Gemini", usage_metadata=usage),
+    ]
+    progress = []
+    log = MetricsLog(tmp_path / "metrics.jsonl")
+
+    text, metrics = stream_text(
+        lambda: iter(parts), model="m", label="pr1:diff",
+        on_progress=lambda m, elapsed: progress.append(m.chars), metrics_log=log,
+    )
+
+    assert text == "## Review by Gemini"
+    assert progress == [9, 19]
+    assert metrics.ttft_ms is not None and metrics.latency_ms >= metrics.ttft_ms
+    record = json.loads((tmp_path / "metrics.jsonl").read_text(encoding="utf-8"))
+    assert (record["status"], record["output_tokens"], record["chunks"]) == ("ok", 7, 2)
+
+
+def test_stream_idle_timeout(tmp_path):
+    """Зависший поток прерывается по таймауту простоя, ошибка считается временной"""
+    release = threading.Event()
+
+    def hung_stream():
+        yield SimpleNamespace(text="partial", usage_metadata=None)
+        release.wait(5)
+
+    log = MetricsLog(tmp_path / "metrics.jsonl")
+    with pytest.raises(GenerationTimeout) as exc_info:
+        stream_text(hung_stream, model="m", idle_timeout=0.05, total_timeout=5, metrics_log=log)
+    release.set()
+
+    assert is_transient_error(exc_info.value)
+    record = json.loads((tmp_path / "metrics.jsonl").read_text(encoding="utf-8"))
+    assert record["status"] == "timeout"
+    assert record["chars"] == len("partial")
+
+
+def test_reader_stops_after_timeout():
+    """После таймаута поток ответа закрывается, reader не читает дальше"""
+    release = threading.Event()
+    stopped = threading.Event()
+    pulled = []
+
+    class SdkStream:
+        def __init__(self):
+            self.closed = threading.Event()
+
+        def __iter__(self):
+            for n in range(100):
+                if n == 1:
+                    release.wait(5)  # Модель «зависла» после первой части
+                pulled.append(n)
+                yield SimpleNamespace(text=str(n), usage_metadata=None)
+            stopped.set()
+
+        def close(self):
+            self.closed.set()
+
+    stream = SdkStream()
+    with pytest.raises(GenerationTimeout):
+        stream_text(lambda: stream, model="m", idle_timeout=0.05, total_timeout=5)
+    assert stream.closed.is_set()
+
+    release.set()  # Модель «ожила»: reader должен остановиться на следующей части
+    deadline = time.monotonic() + 1.0
+    while len(pulled) < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    time.sleep(0.05)
+    assert pulled == [0, 1]
+    assert not stopped.is_set()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -5,8 +5,15 @@ Unit-тесты для PM Orchestrator
 - calculate_consensus: расчёт консенсуса (3+ APPROVED от основных ревьюверов)
 - extract_blocking_issues: извлечение P0/P1 проблем
 - Исключение copilot из расчёта консенсуса
+- Ленивые импорты: старт оркестратора без Gemini SDK
+- Обновление summary консенсуса на месте по маркеру метаданных; без дубля при ошибке загрузки
+- Компактные Issue/ReviewData: без __dict__, тело ревью в BodyStore
+- Освобождение тел ревью прошлых итераций и уплотнение BodyStore
+- CLI: --watch не сочетается с разовыми действиями
 """
 
+import json
+import subprocess
 import sys
 from pathlib import Path
 
@@ -16,7 +23,7 @@ if str(_REPO_ROOT) not in sys.path:
     sys.path.insert(0, str(_REPO_ROOT))
 
 import pytest
-from tools.review_state import ReviewData, ReviewStatus, Issue
+from tools.review_state import BodyRef, BodyStore, ReviewData, ReviewStatus, Issue
 from tools.consensus import calculate_consensus, extract_blocking_issues
 
 
@@ -137,5 +144,116 @@ def test_copilot_excluded_from_consensus():
     assert consensus is True
 
 
+def test_orchestrator_import_skips_gemini_sdk():
+    """Импорт оркестратора не загружает ревьювер и Gemini SDK"""
+    code = (
+        "import sys; import tools.pm_orchestrator; "
+        "print('google.genai' in sys.modules, 'tools.gemini_reviewer' in sys.modules)"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code], cwd=_REPO_ROOT, capture_output=True, text=True, check=True
+    )
+
+    assert result.stdout.split() == ["False", "False"]
+
+
+def test_publish_summary_updates_existing_comment(monkeypatch):
+    """Прежний summary редактируется (PATCH), ревью-комментарии не трогаются"""
+    from tools import pm_orchestrator, pr_comments
+    from tools.github_api import ApiResponse
+
+    comments = [
+        {"id": 1, "body": '<!-- {"type": "consensus_summary"} -->\n## Итоги консенсуса'},
+        {"id": 2, "body": '<!-- {"reviewer": "opus", "iteration": 1, "type": "review"} -->\n**APPROVED**'},
+    ]
+    calls = []
+
+    def fake_gh_api(endpoint, method="GET", input_data=None, **kwargs):
+        calls.append((method, endpoint, json.loads(input_data)["body"]))
+        return ApiResponse(status=200, body='{"id": 3}')
+
+    monkeypatch.setattr(pm_orchestrator, "fetch_pr_comments", lambda pr, repo: comments)
+    monkeypatch.setattr(pr_comments, "gh_api", fake_gh_api)
+
+    pm_orchestrator.publish_consensus_summary(7, "owner/repo")
+    pm_orchestrator.publish_consensus_summary(7, "owner/repo", upsert=False)
+
+    assert [(method, endpoint) for method, endpoint, _ in calls] == [
+        ("PATCH", "repos/owner/repo/issues/comments/1"),
+        ("POST", "repos/owner/repo/issues/7/comments"),
+    ]
+    assert "opus**: APPROVED" in calls[0][2]
+
+
+def test_upsert_skips_publishing_when_comments_unavailable(monkeypatch):
+    """Ошибка загрузки комментариев — не «комментариев нет»: новый не создаётся"""
+    from tools import pm_orchestrator, pr_comments
+    from tools.github_api import GitHubApiError
+
+    calls = []
+    monkeypatch.setattr(pr_comments, "fetch_pr_comments", lambda pr, repo: None)
+    monkeypatch.setattr(pm_orchestrator, "fetch_pr_comments", lambda pr, repo: None)
+    monkeypatch.setattr(pr_comments, "gh_api", lambda *args, **kwargs: calls.append(args))
+
+    with pytest.raises(GitHubApiError):
+        pr_comments.publish_review(7, 2, "gemini", "### Вердикт\n**APPROVED**", repo="owner/repo")
+    pm_orchestrator.publish_consensus_summary(7, "owner/repo")
+    assert calls == []
+
+
+def test_compact_review_model():
+    """Issue неизменяемый и без __dict__; длинное тело хранится в BodyStore"""
+    issue = Issue(priority="".join(["P", "1"]), file="a.ts", line=1, problem="x")
+    assert not hasattr(issue, "__dict__")
+    assert issue.priority is sys.intern("P1")
+    with pytest.raises(AttributeError):
+        issue.line = 2
+    assert len({issue, Issue(priority="P1", file="a.ts", line=1, problem="x")}) == 1
+    assert issue.replace(priority="P0") == Issue(priority="P0", file="a.ts", line=1, problem="x")
+
+    store = BodyStore()
+    body = "## Review by opus\n" + "текст " * 500
+    first = ReviewData(reviewer="opus", status=ReviewStatus.APPROVED, body=body, body_store=store)
+    second = ReviewData(reviewer="opus", status=ReviewStatus.APPROVED, body=body, body_store=store)
+    assert isinstance(first._body, BodyRef)
+    assert first.body == body
+    assert first == second
+    assert store.size == len(body.encode("utf-8"))  # Одинаковые тела записаны один раз
+    assert not hasattr(first, "__dict__")
+    store.close()
+
+
+def test_body_store_releases_dropped_bodies():
+    """Тела ревью, которые больше никто не держит, освобождаются, файл уплотняется"""
+    store = BodyStore(compact_bytes=64 * 1024)
+    kept = ReviewData(reviewer="opus", status=ReviewStatus.APPROVED, body="keep " * 400, body_store=store)
+
+    # Как --watch: каждая итерация заменяет ревью предыдущей
+    for iteration in range(200):
+        reviews = {
+            name: ReviewData(reviewer=name, status=ReviewStatus.COMMENTED, body=f"{name} {iteration} " + "x" * 2000,
+                             body_store=store)
+            for name in ("codex", "gemini")
+        }
+        assert reviews["codex"].body.startswith(f"codex {iteration} ")
+
+    assert len(store) == 3  # kept + ревью последней итерации
+    assert store.size < 2 * 64 * 1024
+    assert kept.body == "keep " * 400
+    store.close()
+
+
+def test_watch_rejects_other_actions(monkeypatch, capsys):
+    """--watch с --run-gemini/--cycle — ошибка аргументов, а не молча пропущенные флаги"""
+    from tools import pm_orchestrator
+
+    monkeypatch.setattr(pm_orchestrator, "watch", lambda **kwargs: pytest.fail("watch не должен запускаться"))
+    monkeypatch.setattr(sys, "argv", ["pm_orchestrator.py", "--watch", "--run-gemini", "--cycle", "--pr=5"])
+    with pytest.raises(SystemExit) as error:
+        pm_orchestrator.main()
+    assert error.value.code == 2
+    assert "--watch нельзя сочетать с --run-gemini, --cycle" in capsys.readouterr().err
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
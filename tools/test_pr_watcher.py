@@ -0,0 +1,172 @@
+"""
+Unit-тесты для режима --watch
+
+Тестирует:
+- Разбор вывода `gh api --include` (статус, ETag, 304)
+- TokenBucket (бюджет запросов)
+- PRWatcher: запуск Gemini при новом HEAD, summary при новых ревью, backoff
+- Постраничный опрос списка PR (Link: rel="next") с ETag на страницу
+"""
+
+import json
+import sys
+from pathlib import Path
+
+# Добавляем корень репозитория в sys.path для импортов
+_REPO_ROOT = Path(__file__).parent.parent
+if str(_REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(_REPO_ROOT))
+
+import pytest
+from tools import pr_watcher, review_cycle
+from tools.github_api import ApiResponse, parse_include_output
+from tools.pr_watcher import PRWatcher
+from tools.rate_limit import TokenBucket
+from tools.review_cycle import CycleStore, ReviewCycleEngine
+
+
+def test_parse_include_output_not_modified():
+    """304 с ETag и заголовками лимита"""
+    output = (
+        "HTTP/2.0 304 Not Modified\r\n"
+        "Etag: W/\"abc\"\r\n"
+        "X-Ratelimit-Remaining: 4999\r\n"
+        "\r\n"
+    )
+    response = parse_include_output(output)
+
+    assert response.not_modified
+    assert response.etag == 'W/"abc"'
+    assert response.rate_limit_remaining == 4999
+
+
+def test_parse_include_output_body():
+    """200 с JSON телом"""
+    response = parse_include_output('HTTP/2.0 200 OK\nEtag: "x"\n\n[{"number": 1}]')
+
+    assert response.status == 200
+    assert response.json() == [{"number": 1}]
+
+
+def test_token_bucket_refills_over_time():
+    """Токены расходуются и пополняются со скоростью rate"""
+    now = [0.0]
+    bucket = TokenBucket(rate=1.0, capacity=2.0, clock=lambda: now[0])
+
+    assert bucket.try_acquire()
+    assert bucket.try_acquire()
+    assert not bucket.try_acquire()
+
+    now[0] = 1.5
+    assert bucket.try_acquire()
+    assert bucket.wait_time() == pytest.approx(0.5)
+
+
+def make_pull(number, sha, updated_at):
+    return {"number": number, "state": "open", "head": {"sha": sha}, "updated_at": updated_at}
+
+
+def make_review(comment_id, reviewer, updated_at):
+    metadata = {"reviewer": reviewer, "iteration": 1, "type": "review", "status": "APPROVED"}
+    return {"id": comment_id, "updated_at": updated_at, "body": f"<!-- {json.dumps(metadata)} -->"}
+
+
+def test_watcher_triggers_actions(tmp_path, monkeypatch):
+    """Новый HEAD → Gemini; новые ревью → summary; без изменений → ничего"""
+    comments = []
+    monkeypatch.setattr(review_cycle, "fetch_pr_comments", lambda *args, **kwargs: list(comments))
+
+    heads, summaries = [], []
+    watcher = PRWatcher(
+        repo="owner/repo",
+        engine=ReviewCycleEngine(repo="owner/repo", store=CycleStore(tmp_path)),
+        on_new_head=lambda pr, iteration: heads.append((pr, iteration)) or True,
+        on_reviews_changed=summaries.append,
+    )
+
+    assert watcher._handle_pr(make_pull(5, "aaa", "t1")) is True
+    assert heads == [(5, 1)]
+    assert summaries == []
+
+    comments.append(make_review(1, "gemini", "t2"))
+    assert watcher._handle_pr(make_pull(5, "aaa", "t2")) is True
+    assert heads == [(5, 1)]
+    assert summaries == [5]
+
+    assert watcher._handle_pr(make_pull(5, "aaa", "t2")) is False
+
+
+def test_watcher_adaptive_interval(tmp_path):
+    """Интервал растёт без изменений и сбрасывается при изменениях"""
+    watcher = PRWatcher(
+        repo="owner/repo",
+        engine=ReviewCycleEngine(repo="owner/repo", store=CycleStore(tmp_path)),
+        min_interval=10,
+        max_interval=30,
+    )
+
+    assert watcher.next_interval(False) == 15
+    assert watcher.next_interval(False) == 22.5
+    assert watcher.next_interval(False) == 30
+    assert watcher.next_interval(True) == 10
+
+
+def test_next_endpoint_from_link_header():
+    """Ссылка rel="next" превращается в путь для gh api"""
+    link = (
+        '<https://api.github.com/repositories/1/pulls?state=open&page=2>; rel="next", '
+        '<https://api.github.com/repositories/1/pulls?state=open&page=5>; rel="last"'
+    )
+    assert ApiResponse(200, {"link": link}).next_endpoint == "repositories/1/pulls?state=open&page=2"
+    assert ApiResponse(200, {"link": '<https://ghe.local/api/v3/x?page=3>; rel="next"'}).next_endpoint == "x?page=3"
+    assert ApiResponse(200).next_endpoint is None
+
+
+def test_watcher_paginates_open_pulls(tmp_path, monkeypatch):
+    """PR со второй страницы не забываются; 304 страницы сохраняет её номера"""
+    monkeypatch.setattr(review_cycle, "fetch_pr_comments", lambda *args, **kwargs: [])
+    first = "repos/owner/repo/pulls?state=open&per_page=100"
+    second = "repositories/1/pulls?state=open&per_page=100&page=2"
+    pages = {
+        first: ([make_pull(1, "aaa", "t1")], f'<https://api.github.com/{second}>; rel="next"'),
+        second: ([make_pull(2, "bbb", "t1")], None),
+    }
+    calls = []
+
+    def fake_gh_api(endpoint, etag=None):
+        calls.append((endpoint, etag))
+        pulls, link = pages[endpoint]
+        tag = f'"{endpoint}:{json.dumps(pulls)}"'
+        if etag == tag:
+            return ApiResponse(304, {"etag": tag})
+        headers = {"etag": tag, **({"link": link} if link else {})}
+        return ApiResponse(200, headers, json.dumps(pulls))
+
+    monkeypatch.setattr(pr_watcher, "gh_api", fake_gh_api)
+    watcher = PRWatcher(
+        repo="owner/repo",
+        engine=ReviewCycleEngine(repo="owner/repo", store=CycleStore(tmp_path)),
+    )
+
+    assert watcher.poll_once() is True
+    assert set(watcher.prs) == {"1", "2"}
+    assert [endpoint for endpoint, _ in calls] == [first, second]
+
+    # Первая страница не изменилась (304), вторая — PR #2 закрыт
+    calls.clear()
+    pages[second] = ([], None)
+    assert watcher.poll_once() is False
+    assert calls[0][1] is not None and [endpoint for endpoint, _ in calls] == [first, second]
+    assert set(watcher.prs) == {"1"}
+
+    # Состояние переживает перезапуск: 304 на обеих страницах ничего не теряет
+    restarted = PRWatcher(
+        repo="owner/repo",
+        engine=ReviewCycleEngine(repo="owner/repo", store=CycleStore(tmp_path)),
+    )
+    assert restarted.poll_once() is False
+    assert set(restarted.prs) == {"1"}
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,126 @@
+"""
+Unit-тесты для инкрементального review cycle
+
+Тестирует:
+- Переходы CycleState по новым ревью и коммитам
+- Курсор комментариев (повторно полученные комментарии не учитываются)
+- Сохранение и загрузку CycleContext
+- Явный --max-iterations поверх сохранённого лимита
+"""
+
+import json
+import sys
+from pathlib import Path
+
+# Добавляем корень репозитория в sys.path для импортов
+_REPO_ROOT = Path(__file__).parent.parent
+if str(_REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(_REPO_ROOT))
+
+import pytest
+from tools.review_cycle import CycleStore, ReviewCycleEngine, apply_changes
+from tools.review_state import CycleContext, CycleResult, CycleState
+
+
+def make_comment(comment_id, reviewer, status, iteration=1, updated_at="2026-01-01T00:00:00Z", extra=""):
+    metadata = {"reviewer": reviewer, "iteration": iteration, "type": "review", "status": status}
+    return {
+        "id": comment_id,
+        "updated_at": updated_at,
+        "body": f"<!-- {json.dumps(metadata)} -->\n## Review\n{extra}",
+    }
+
+
+def test_consensus_completes_cycle():
+    """3 APPROVED → COMPLETED"""
+    ctx = CycleContext(pr_number=1)
+    comments = [
+        make_comment(1, "opus", "APPROVED"),
+        make_comment(2, "codex", "APPROVED"),
+        make_comment(3, "gemini", "APPROVED"),
+    ]
+
+    assert apply_changes(ctx, "aaa", comments) is True
+    assert ctx.state == CycleState.COMPLETED
+    assert ctx.result == CycleResult.CONSENSUS_APPROVED
+
+
+def test_fix_commit_starts_next_iteration():
+    """Все ответили без консенсуса → WAITING_FOR_FIX → новый коммит → итерация 2"""
+    ctx = CycleContext(pr_number=1)
+    comments = [
+        make_comment(1, "opus", "CHANGES_REQUESTED", extra="1. **[P1]** src/a.ts:10 — Утечка таймера"),
+        make_comment(2, "codex", "APPROVED"),
+        make_comment(3, "gemini", "APPROVED"),
+    ]
+    apply_changes(ctx, "aaa", comments)
+
+    assert ctx.state == CycleState.WAITING_FOR_FIX
+    assert len(ctx.blocking_issues) == 1
+
+    apply_changes(ctx, "bbb", [])
+
+    assert ctx.state == CycleState.WAITING_FOR_REVIEWS
+    assert ctx.iteration == 2
+    assert ctx.attempt == 2
+    assert ctx.reviews == {}
+
+
+def test_cursor_skips_already_seen_comments():
+    """Комментарии на границе курсора не обрабатываются повторно"""
+    ctx = CycleContext(pr_number=1)
+    first = make_comment(1, "opus", "APPROVED", updated_at="2026-01-01T00:00:00Z")
+    apply_changes(ctx, "aaa", [first])
+
+    assert ctx.comments_cursor == "2026-01-01T00:00:00Z"
+    assert apply_changes(ctx, "aaa", [first]) is False
+
+    second = make_comment(2, "codex", "APPROVED", updated_at="2026-01-01T00:00:00Z")
+    assert apply_changes(ctx, "aaa", [first, second]) is True
+    assert set(ctx.reviews) == {"opus", "codex"}
+
+
+def test_escalation_after_max_iterations():
+    """Превышение лимита итераций → ESCALATED"""
+    ctx = CycleContext(pr_number=1, max_iterations=1, state=CycleState.WAITING_FOR_FIX, head_sha="aaa")
+
+    apply_changes(ctx, "bbb", [])
+
+    assert ctx.state == CycleState.ESCALATED
+    assert ctx.result == CycleResult.MAX_ITERATIONS_REACHED
+
+
+def test_engine_persists_context(tmp_path):
+    """Контекст сохраняется между запусками движка"""
+    engine = ReviewCycleEngine(repo="owner/repo", store=CycleStore(tmp_path))
+    engine.update(7, head_sha="aaa", comments=[make_comment(1, "gemini", "CHANGES_REQUESTED")])
+
+    restored = CycleStore(tmp_path).load("owner/repo", 7)
+
+    assert restored is not None
+    assert restored.head_sha == "aaa"
+    assert restored.reviews["gemini"].status.value == "CHANGES_REQUESTED"
+    assert restored.history[-1]["to"] == CycleState.WAITING_FOR_REVIEWS.value
+
+
+def test_explicit_max_iterations_overrides_saved(tmp_path):
+    """Явный лимит заменяет сохранённый; эскалация по лимиту снимается, если новый лимит её допускает"""
+    store = CycleStore(tmp_path)
+    ReviewCycleEngine(repo="owner/repo", store=store, max_iterations=1).update(
+        7, head_sha="aaa", comments=[make_comment(i, name, "CHANGES_REQUESTED", extra="1. **[P1]** `a.ts:1` — Баг")
+                                     for i, name in enumerate(("opus", "codex", "gemini"), start=1)],
+    )
+    escalated = ReviewCycleEngine(repo="owner/repo", store=store).update(7, head_sha="bbb", comments=[])
+    assert escalated.state == CycleState.ESCALATED and escalated.max_iterations == 1
+
+    # Без флага остаётся сохранённый лимит
+    assert ReviewCycleEngine(repo="owner/repo", store=store).update(7, head_sha="bbb", comments=[]).max_iterations == 1
+
+    resumed = ReviewCycleEngine(repo="owner/repo", store=store, max_iterations=5).update(7, head_sha="bbb", comments=[])
+    assert resumed.max_iterations == 5 and resumed.result is None
+    assert resumed.state == CycleState.WAITING_FOR_REVIEWS
+    assert store.load("owner/repo", 7).max_iterations == 5
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,109 @@
+"""
+Unit-тесты для однопроходного разбора комментариев-ревью
+
+Тестирует:
+- Совпадение tokenize_review с METADATA_PATTERN / VERDICT_PATTERN / ISSUE_PATTERN
+  на корпусе типичных комментариев и на случайных строках
+- Линейное время на входе, где ISSUE_PATTERN откатывается квадратично
+- Ограничение размера разбираемого комментария
+"""
+
+import json
+import random
+import sys
+import time
+from pathlib import Path
+
+# Добавляем корень репозитория в sys.path для импортов
+_REPO_ROOT = Path(__file__).parent.parent
+if str(_REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(_REPO_ROOT))
+
+import pytest
+from tools import pr_parser
+from tools.pr_parser import ISSUE_PATTERN, METADATA_PATTERN, VERDICT_PATTERN, parse_single_comment
+from tools.review_tokenizer import tokenize_review
+
+CORPUS = [
+    # Gemini (формат промпта)
+    '<!-- {"reviewer": "gemini", "iteration": 2, "timestamp": "2026-01-20T10:00:00", "type": "review"} -->\n'
+    "## Review by Gemini 3 Pro\n\n### Чеклист\n- [x] Сборка проходит\n\n### Позитивные моменты\n"
+    "- Хорошо\n\n### Замечания\n"
+    "1. **[P1]** `server/src/rooms/ArenaRoom.ts`:412 — Аллокация массива в каждом тике\n"
+    "2. **[P2]** `client/src/main.ts`:88 — Можно кешировать селектор\n\n"
+    "### Вердикт\n**APPROVED** ✅ или **CHANGES_REQUESTED** ❌ (если есть P0/P1).\n",
+    # Opus: путь и строка внутри одних backticks, тире-дефис
+    '<!--{"reviewer":"Opus","iteration":1,"type":"review","status":"CHANGES_REQUESTED"}-->\n'
+    "### Замечания\n- **[P0]** `server/src/meta/auth.ts:57` - Токен пишется в лог\n"
+    "- **[P1]** shared/src/config.ts:12 – Значение не валидируется\n"
+    "- **[P2]** 'client/src/ui/hud.ts' — Лишний ререндер\n",
+    # Copilot без строки, текст после тире на следующей строке
+    '<!-- {"reviewer": "copilot", "type": "review"} -->\n**[P2]** README.md —\n  Опечатка\n\nCOMMENTED',
+    # Summary и обычные комментарии
+    '<!-- {"type": "consensus_summary"} -->\n## Итоги консенсуса\n- **opus**: APPROVED [OK]',
+    "LGTM, но <!-- заметка --> и ещё <!-- {not json} --> здесь",
+    "Просто комментарий без метаданных, NOT_APPROVED, APPROVEDx",
+]
+
+FRAGMENTS = [
+    "**[P1]**", "**[P0]**", "**[P3]**", "***[P2]**", "**[P1]**[P2]**", " ", "\n", "\n\n", "\t",
+    "`", "'", '"', ":", "12", ":7", "—", "-", "–", "a", "src/a-b.ts", "<!--", "-->", "{", "}",
+    '{"type": "review"}', "APPROVED", "_APPROVED", "COMMENTED", "xCHANGES_REQUESTED", "é", " ", "٣",
+]
+
+
+def reference(body):
+    """Результат прежних регулярных выражений"""
+    metadata = METADATA_PATTERN.search(body)
+    verdict = VERDICT_PATTERN.search(body)
+    issues = [
+        (m.group(1), m.group(2).strip(), m.group(3), m.group(4).strip())
+        for m in ISSUE_PATTERN.finditer(body)
+    ]
+    return metadata.group(1) if metadata else None, verdict.group(1) if verdict else None, issues
+
+
+def tokenized(body):
+    tokens = tokenize_review(body)
+    return tokens.metadata, tokens.verdict, tokens.issues
+
+
+@pytest.mark.parametrize("body", CORPUS)
+def test_tokenizer_matches_regexes_on_corpus(body):
+    """Типичные комментарии разбираются так же, как регулярными выражениями"""
+    assert tokenized(body) == reference(body)
+
+
+def test_tokenizer_matches_regexes_on_random_input():
+    """Случайные комбинации пограничных фрагментов (кавычки, двоеточия, тире, переводы строк)"""
+    rng = random.Random(35)
+    for _ in range(5000):
+        body = "".join(rng.choice(FRAGMENTS) for _ in range(rng.randint(0, 40)))
+        assert tokenized(body) == reference(body), repr(body)
+
+
+def test_tokenizer_is_linear_on_backtracking_input():
+    """Много якорей без тире и кавычек: ISSUE_PATTERN квадратичен, токенизатор — нет"""
+    body = "**[P1]** x\n" * 20000
+
+    started = time.perf_counter()
+    tokens = tokenize_review(body)
+
+    assert tokens.issues == []
+    assert time.perf_counter() - started < 2.0
+
+
+def test_parse_single_comment_size_guard(monkeypatch):
+    """Текст сверх лимита не разбирается, тело ревью сохраняется целиком"""
+    monkeypatch.setattr(pr_parser, "MAX_COMMENT_CHARS", 200)
+    metadata = json.dumps({"reviewer": "gemini", "type": "review"})
+    body = f"<!-- {metadata} -->\n**[P1]** `a.ts`:1 — Проблема\n" + "x" * 300 + "\n**[P0]** `b.ts` — Вне лимита"
+
+    review = parse_single_comment(body, 1)
+
+    assert [issue.file for issue in review.issues] == ["a.ts"]
+    assert review.body == body
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
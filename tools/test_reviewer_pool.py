@@ -0,0 +1,109 @@
+"""
+Unit-тесты для пула ревьюверов
+
+Тестирует:
+- Разбор спецификаций ревьюверов `имя=тип:модель`
+- Параллельный запуск: опоздавший ревьювер — PENDING и не блокирует консенсус
+- Публикацию отчётов с метаданными, которые понимает pr_parser
+"""
+
+import sys
+import time
+from pathlib import Path
+
+# Добавляем корень репозитория в sys.path для импортов
+_REPO_ROOT = Path(__file__).parent.parent
+if str(_REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(_REPO_ROOT))
+
+import pytest
+from tools import pr_comments
+from tools.consensus import calculate_consensus
+from tools.pr_parser import parse_single_comment
+from tools.review_state import ReviewStatus
+from tools.reviewer_pool import GeminiAdapter, ReviewerPool, ReviewRequest, StubAdapter, build_pool
+
+DIFF = """diff --git a/server/src/rooms/ArenaRoom.ts b/server/src/rooms/ArenaRoom.ts
+--- a/server/src/rooms/ArenaRoom.ts
++++ b/server/src/rooms/ArenaRoom.ts
+@@ -1,1 +1,2 @@
+ const a = 1;
++const b = 2;
+"""
+
+
+def _request():
+    return ReviewRequest(pr_number=5, iteration=2, repo="owner/repo", diff=DIFF, details={})
+
+
+class _PublishingStub(StubAdapter):
+    """Заглушка в роли настоящего ревьювера — чтобы проверить публикацию"""
+    publishable = True
+
+
+def test_build_pool_from_specs():
+    """Спецификации: тип и модель необязательны, имена уникальны"""
+    gemini, codex, copilot = build_pool(["gemini", "Codex=gemini:gemini-2.5-pro", "copilot=stub:changes_requested"])
+    assert isinstance(gemini, GeminiAdapter) and gemini.name == "gemini"
+    assert (codex.name, codex.model) == ("codex", "gemini-2.5-pro")
+    assert isinstance(copilot, StubAdapter) and copilot.model == "CHANGES_REQUESTED"
+
+    with pytest.raises(ValueError):
+        build_pool(["opus=claude"])
+    with pytest.raises(ValueError):
+        build_pool(["opus=stub:lgtm"])
+    with pytest.raises(ValueError):
+        build_pool(["gemini", "gemini=stub"])
+
+
+def test_slow_reviewer_reported_pending(monkeypatch):
+    """Ревьюверы работают параллельно, опоздавший — PENDING; отчёты идут с метаданными"""
+    posted = {}
+
+    def fake_upsert(pr_number, body, match, repo, comments=None):
+        posted[(pr_number, body.split('"reviewer": "')[1].split('"')[0])] = body
+        return len(posted), True
+
+    monkeypatch.setattr(pr_comments, "upsert_pr_comment", fake_upsert)
+
+    adapters = [
+        _PublishingStub("opus", "APPROVED", delay=0.1),
+        _PublishingStub("codex", "APPROVED", delay=0.1),
+        _PublishingStub("gemini", "CHANGES_REQUESTED", delay=5.0),
+    ]
+    started = time.monotonic()
+    outcomes = ReviewerPool(adapters, budget=1.0).run(_request())
+    assert time.monotonic() - started < 2.0  # Ждём бюджет, а не медленного ревьювера
+
+    assert {name: outcome.status for name, outcome in outcomes.items()} == {
+        "opus": ReviewStatus.APPROVED,
+        "codex": ReviewStatus.APPROVED,
+        "gemini": ReviewStatus.PENDING,
+    }
+    assert outcomes["opus"].published and not outcomes["gemini"].published
+
+    review = parse_single_comment(posted[(5, "opus")], 5)
+    assert (review.reviewer, review.iteration, review.status) == ("opus", 2, ReviewStatus.APPROVED)
+
+    reviews = {name: outcome.to_review_data(5, 2) for name, outcome in outcomes.items()}
+    assert calculate_consensus(reviews) == (False, 2, 3)
+
+
+def test_failed_adapter_and_stubs_not_published(monkeypatch):
+    """Ошибка адаптера не роняет пул; заглушки не публикуются и по умолчанию не одобряют"""
+    class Broken(StubAdapter):
+        def review(self, request):
+            raise RuntimeError("quota")
+
+    def fail_upsert(*args, **kwargs):
+        raise AssertionError("заглушка не должна публиковаться")
+
+    monkeypatch.setattr(pr_comments, "upsert_pr_comment", fail_upsert)
+
+    adapters = build_pool(["codex=stub", "gemini=stub:approved"]) + [Broken("opus")]
+    outcomes = ReviewerPool(adapters, budget=5.0, publish=True).run(_request())
+    assert outcomes["opus"].status == ReviewStatus.ERROR and outcomes["opus"].error == "quota"
+    assert outcomes["codex"].status == ReviewStatus.COMMENTED
+    assert outcomes["gemini"].status == ReviewStatus.APPROVED
+    assert not outcomes["codex"].published and not outcomes["gemini"].published
+    assert "ArenaRoom.ts" in outcomes["codex"].report
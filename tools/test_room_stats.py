@@ -0,0 +1,75 @@
+"""
+Unit-тесты для кольцевого файла статистики комнат watchdog (ops/watchdog/room_stats.py)
+
+Тестирует:
+- Запись и чтение замеров (в т.ч. после переоткрытия файла)
+- Перезапись кольца: теряются только самые старые блоки
+- Опросы без комнат: учитываются в числе опросов и среднем по часам
+"""
+
+import sys
+from pathlib import Path
+
+# Модуль деплоится отдельным скриптом: импорт из ops/watchdog
+_WATCHDOG_DIR = Path(__file__).parent.parent / "ops" / "watchdog"
+if str(_WATCHDOG_DIR) not in sys.path:
+    sys.path.insert(0, str(_WATCHDOG_DIR))
+
+import pytest  # noqa: E402
+
+pytest.importorskip("requests")
+
+from room_stats import CAPACITY, PHASES, RingFile, query_players, query_rooms  # noqa: E402
+
+HOUR = 1_800_000_000 // 3600 * 3600
+
+
+def _room(room_id, players=5, phase="Hunt", tick_max=12.5):
+    return {
+        "roomId": room_id, "playerCount": players, "maxPlayers": 10, "phase": phase,
+        "duration": 90, "tick": {"avg": 4.25, "max": tick_max},
+    }
+
+
+def test_ring_round_trip(tmp_path):
+    """Замеры читаются теми же, что записаны, и после переоткрытия файла"""
+    ring = RingFile(tmp_path / "stats.ring", blocks=4)
+    ring.append(HOUR, [_room("a", 3), _room("b", 7, "Results")])
+    ring.append(HOUR + 15, [_room("a", 4)])
+
+    for reader in (ring, RingFile(tmp_path / "stats.ring")):
+        samples = list(reader.samples())
+        assert [(s.ts, s.players, PHASES[s.phase]) for s in samples] == [
+            (HOUR, 3, "Hunt"), (HOUR, 7, "Results"), (HOUR + 15, 4, "Hunt"),
+        ]
+        assert samples[0].room == samples[2].room != samples[1].room
+        assert (samples[0].max_players, samples[0].duration) == (10, 90)
+        assert (samples[0].tick_avg_ms, samples[0].tick_max_ms) == (4.25, 12.5)
+    assert len(list(ring.samples(since=HOUR + 1))) == 1
+
+
+def test_ring_wraps_around(tmp_path):
+    """При переполнении перезаписывается самый старый блок, порядок сохраняется"""
+    ring = RingFile(tmp_path / "stats.ring", blocks=3)
+    rooms = [_room(f"r{i}") for i in range(100)]
+    polls = 12  # 1200 замеров при ёмкости кольца 3 × CAPACITY
+    for poll in range(polls):
+        ring.append(HOUR + poll * 15, rooms)
+
+    samples = list(RingFile(tmp_path / "stats.ring").samples())
+    timestamps = [s.ts for s in samples]
+    assert timestamps == sorted(timestamps) and timestamps[-1] == HOUR + (polls - 1) * 15
+    assert 2 * CAPACITY < len(samples) <= 3 * CAPACITY
+    assert timestamps[0] > HOUR
+
+
+def test_empty_polls_count_towards_hourly_average(tmp_path):
+    """240 опросов за час, комнаты только в 4 — среднее по всем опросам"""
+    ring = RingFile(tmp_path / "stats.ring", blocks=4)
+    for poll in range(240):
+        ring.append(HOUR + poll * 15, [_room("a", 6)] if poll % 60 == 0 else [])
+
+    [(hour, polls, avg, peak, players)] = query_rooms(ring.samples())
+    assert (hour, polls, peak, players) == (HOUR, 240, 1, 6)
+    assert avg == pytest.approx(4 / 240)
+    assert query_players(ring.samples()) == {6: 4}
@@ -0,0 +1,134 @@
+"""
+Unit-тесты для архивов телеметрии и ретенции
+
+Тестирует:
+- Сжатие кадрами и чтение произвольных диапазонов
+- Прозрачное чтение архива индексом матчей и колоночным конвертером
+- Чтение несжатого файла через mmap, в т.ч. дописанного после открытия
+- Лимиты возраста и размера, пропуск незакрытых дней и дней с битым индексом
+"""
+
+import gzip
+import json
+import os
+import sys
+import time
+from datetime import date
+from pathlib import Path
+
+# Добавляем корень репозитория в sys.path для импортов
+_REPO_ROOT = Path(__file__).parent.parent
+if str(_REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(_REPO_ROOT))
+
+import pytest
+
+from tools.telemetry.archive import (
+    CLOSED_IDLE_SEC,
+    ArchiveReader,
+    PlainReader,
+    apply_retention,
+    compress_file,
+    frames_path_for,
+)
+from tools.telemetry.match_index import index_path_for, open_index
+
+
+def _line(match, tick):
+    record = {"event": "ability_used", "ts": 1_700_000_000_000 + tick, "tick": tick, "matchId": match, "roomId": "r1", "phase": "Hunt"}
+    return json.dumps(record, separators=(",", ":")) + "\n"
+
+
+def _day(path, lines=200):
+    path.write_text("".join(_line(f"m{tick % 3}", tick) for tick in range(lines)), encoding="utf-8")
+    return path
+
+
+def test_frames_random_access(tmp_path):
+    """Кадры по границам строк, диапазон читается через границы кадров, весь архив — обычный gzip"""
+    source = _day(tmp_path / "telemetry-2026-10-18.jsonl")
+    raw = source.read_bytes()
+    archive = compress_file(source, frame_bytes=1000)
+
+    assert not source.exists() and frames_path_for(archive).exists()
+    assert gzip.decompress(archive.read_bytes()) == raw
+    with ArchiveReader(archive) as reader:
+        assert reader.size == len(raw) and len(reader.frames) > 5
+        assert all(reader.frame(i).endswith(b"\n") for i in range(len(reader.frames)))
+        assert reader.read(950, 2100) == raw[950:2100]
+        assert reader.read(len(raw) - 10, len(raw) + 50) == raw[-10:]
+        assert b"".join(reader.iter_lines(1500)) == raw[1500:]
+
+
+def test_plain_reader_sees_appended_lines(tmp_path):
+    """mmap переотображается, если диапазон вышел за размер на момент открытия"""
+    source = tmp_path / "telemetry-2026-10-19.jsonl"
+    source.write_bytes(b"")
+    with PlainReader(source) as reader:
+        assert reader.read(0, 10) == b""
+        _day(source, 5)
+        raw = source.read_bytes()
+        assert reader.read(0, len(raw)) == raw
+        assert reader.read(len(raw) - 5, len(raw) + 50) == raw[-5:]
+        assert b"".join(reader.iter_lines(0)) == raw
+
+
+def test_readers_open_archive_transparently(tmp_path):
+    """Индекс матчей переезжает к архиву, конвертер дочитывает день из архива"""
+    np = pytest.importorskip("numpy")
+    from tools.telemetry.columnar import ColumnarWriter, ColumnStore, store_path_for
+
+    source = _day(tmp_path / "telemetry-2026-10-18.jsonl", 40)
+    store_dir = store_path_for(source, tmp_path / "columnar")
+    assert ColumnarWriter(store_dir, source, chunk_rows=16).convert() == 40  # Конвертация до конца дня
+    with open(source, "a", encoding="utf-8") as f:
+        f.writelines(_line(f"m{tick % 3}", tick) for tick in range(40, 100))
+    before = [event["tick"] for event in open_index(source).read_events("m1")]
+
+    archive = compress_file(source, frame_bytes=512)
+    assert not index_path_for(source).exists() and index_path_for(archive).exists()
+    index = open_index(archive)
+    assert [event["tick"] for event in index.read_events("m1")] == before
+    assert index.update() == 0
+
+    assert store_path_for(archive, tmp_path / "columnar") == store_dir
+    assert ColumnarWriter(store_dir, archive).convert() == 60
+    assert np.array_equal(ColumnStore(store_dir)["tick"], np.arange(100))
+
+
+def test_retention_limits(tmp_path):
+    """Открытые дни не трогаются, старые удаляются, затем — по размеру от самых старых"""
+    today = date(2026, 10, 19)
+    now = time.time()
+    for day in ("2026-08-01", "2026-10-10", "2026-10-15", "2026-10-18", "2026-10-19"):
+        _day(tmp_path / f"telemetry-{day}.jsonl", 2000)
+    fresh = tmp_path / "telemetry-2026-10-18.jsonl"
+    os.utime(fresh, (now, now))  # Вчерашний день ещё дописывается
+    for path in tmp_path.glob("*.jsonl"):
+        if path != fresh:
+            os.utime(path, (now - CLOSED_IDLE_SEC - 1, now - CLOSED_IDLE_SEC - 1))
+    (tmp_path / "columnar" / "telemetry-2026-08-01").mkdir(parents=True)
+
+    result = apply_retention(tmp_path, keep_days=30, max_bytes=10**9, columnar_dir=tmp_path / "columnar", today=today, now=now)
+    assert result["compressed"] == ["telemetry-2026-08-01.jsonl", "telemetry-2026-10-10.jsonl", "telemetry-2026-10-15.jsonl"]
+    assert result["expired"] == ["telemetry-2026-08-01.jsonl.gz"]
+    assert not (tmp_path / "columnar" / "telemetry-2026-08-01").exists()
+    assert fresh.exists() and (tmp_path / "telemetry-2026-10-19.jsonl").exists()
+
+    raw = sum(p.stat().st_size for p in tmp_path.glob("*.jsonl"))
+    result = apply_retention(tmp_path, keep_days=30, max_bytes=raw + 1, today=today, now=now)
+    assert result["evicted"] == ["telemetry-2026-10-10.jsonl.gz", "telemetry-2026-10-15.jsonl.gz"]
+    assert sorted(p.name for p in tmp_path.iterdir() if p.is_file()) == ["telemetry-2026-10-18.jsonl", "telemetry-2026-10-19.jsonl"]
+
+
+def test_retention_skips_day_with_corrupt_index(tmp_path):
+    """Битый .idx.json одного дня не прерывает ретенцию остальных"""
+    old = time.time() - CLOSED_IDLE_SEC - 1
+    for day in ("2026-10-15", "2026-10-16"):
+        os.utime(_day(tmp_path / f"telemetry-{day}.jsonl"), (old, old))
+    index_path_for(tmp_path / "telemetry-2026-10-15.jsonl").write_text("{not json", encoding="utf-8")
+
+    result = apply_retention(tmp_path, today=date(2026, 10, 19))
+    assert result["compressed"] == ["telemetry-2026-10-16.jsonl"]
+    assert [message.split(":")[0] for message in result["errors"]] == ["telemetry-2026-10-15.jsonl"]
+    assert (tmp_path / "telemetry-2026-10-15.jsonl").exists()
@@ -0,0 +1,95 @@
+"""
+Unit-тесты для отчёта по балансу из телеметрии
+
+Тестирует:
+- Векторные группировки одного дня (таланты, умения, смерти, длительность матчей)
+- Слияние дней и квантили по гистограммам
+- Пул процессов по дням
+"""
+
+import json
+import sys
+from pathlib import Path
+
+# Добавляем корень репозитория в sys.path для импортов
+_REPO_ROOT = Path(__file__).parent.parent
+if str(_REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(_REPO_ROOT))
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from tools.telemetry.balance_report import analyze_day, build_report, hist_quantile, merge_reports, summarize
+
+
+def _event(event, ts, match="m1", phase="Hunt", player="p1", data=None):
+    record = {"event": event, "ts": ts, "tick": 1, "matchId": match, "roomId": "r1", "phase": phase, "playerId": player}
+    if data is not None:
+        record["data"] = data
+    return json.dumps(record) + "\n"
+
+
+def _day(path, match, start_ts, seconds):
+    lines = [
+        _event("match_start", start_ts, match, "Spawn", data={"mapSize": 2000, "worldShape": "circle", "seed": 1}),
+        _event("talent_chosen", start_ts + 10, match, data={"talentId": "thorns", "level": 1}),
+        _event("talent_chosen", start_ts + 20, match, data={"talentId": "thorns", "level": 2}),
+        _event("talent_chosen", start_ts + 30, match, data={"talentId": "haste", "level": 1}),
+        _event("ability_used", start_ts + 40, match, data={"abilityId": "dash", "slot": 0, "level": 1}),
+        _event("ability_used", start_ts + 50, match, data={"abilityId": "dash", "slot": 0, "level": 1}),
+        _event("ability_used", start_ts + 60, match, data={"abilityId": "shield", "slot": 1, "level": 2}),
+        _event("player_death", start_ts + 70, match, data={"killerId": None, "mass": 55.0, "classId": 1}),
+        _event("player_death", start_ts + 80, match, "Final", "p2", {"killerId": "p1", "mass": 140.0, "classId": 2}),
+        _event("match_end", start_ts + seconds * 1000, match, "Results", data={"leaderboard": ["p1"], "playersAlive": 1}),
+    ]
+    path.write_text("".join(lines), encoding="utf-8")
+    return path
+
+
+def test_analyze_day_groups(tmp_path):
+    """Группы одного дня считаются по колонкам полей data"""
+    source = _day(tmp_path / "telemetry-2026-10-18.jsonl", "m1", 1_700_000_000_000, 180)
+    day = analyze_day(str(source), str(tmp_path / "columnar"))
+
+    assert day["matches"] == 1 and day["events"] == 10
+    assert day["talents"] == {"thorns|1": 1, "thorns|2": 1, "haste|1": 1}
+    assert day["abilities"] == {"dash|0|1": 2, "shield|1|2": 1}
+    assert day["deaths"] == {"1|Hunt": 1, "2|Final": 1}
+    assert day["deathsNoKiller"] == 1
+    assert day["deathMassSum"] == 195.0
+    assert sum(day["durationHist"]) == 1 and len(day["durationHist"]) == 180 // 5 + 1
+
+    # Повторный анализ — из готового хранилища
+    again = analyze_day(str(tmp_path / "columnar" / "telemetry-2026-10-18"), str(tmp_path / "columnar"))
+    assert again["abilities"] == day["abilities"]
+
+
+def test_merge_and_summary(tmp_path):
+    """Дни сливаются: доли выборов, применения на матч, квантили"""
+    days = [
+        analyze_day(str(_day(tmp_path / f"telemetry-2026-10-{n}.jsonl", f"m{n}", 1_700_000_000_000 + n, seconds)), str(tmp_path / "c"))
+        for n, seconds in ((18, 120), (19, 300))
+    ]
+    report = summarize(merge_reports(days))
+
+    assert report["days"] == ["telemetry-2026-10-18.jsonl", "telemetry-2026-10-19.jsonl"]
+    assert report["matches"] == 2
+    assert report["talents"]["thorns"]["picks"] == 4 and report["talents"]["thorns"]["share"] == round(4 / 6, 4)
+    assert report["talents"]["thorns"]["byLevel"] == {"1": 2, "2": 2}
+    assert report["abilities"][0] == {"abilityId": "dash", "slot": "0", "level": "1", "uses": 4, "perMatch": 2.0}
+    assert report["deaths"]["byPhase"] == {"Hunt": 2, "Final": 2}
+    assert report["deaths"]["noKillerShare"] == 0.5
+    assert report["matchDuration"]["complete"] == 2
+    assert hist_quantile([0, 3, 1], 10.0, 0.5) == 15.0
+    assert hist_quantile([], 10.0, 0.5) is None
+
+
+def test_build_report_process_pool(tmp_path):
+    """Пул процессов даёт тот же отчёт, что и последовательный расчёт"""
+    sources = [_day(tmp_path / f"telemetry-2026-10-{n}.jsonl", f"m{n}", 1_700_000_000_000, 60 + n) for n in range(10, 14)]
+    parallel = build_report(sources, tmp_path / "a", jobs=2)
+    serial = build_report(sources, tmp_path / "b", jobs=1)
+
+    assert parallel == serial
+    assert parallel["matches"] == 4 and parallel["deaths"]["total"] == 8
@@ -0,0 +1,111 @@
+"""
+Unit-тесты для колоночного хранилища телеметрии
+
+Тестирует:
+- Конвертацию JSONL в колонки, словари, data и колонки полей data
+- Возобновление с байтового смещения растущего файла
+- Восстановление после сбоя посреди порции
+"""
+
+import json
+import sys
+from pathlib import Path
+
+# Добавляем корень репозитория в sys.path для импортов
+_REPO_ROOT = Path(__file__).parent.parent
+if str(_REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(_REPO_ROOT))
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from tools.telemetry.columnar import DATA_FILE, ColumnarWriter, ColumnStore, column_path, convert_file, store_path_for
+
+
+def _event(i, event="ability_used", player="p1", data=None):
+    record = {"event": event, "ts": 1_700_000_000_000 + i, "tick": i, "matchId": "m1", "roomId": "r1", "phase": "Hunt"}
+    if player:
+        record["playerId"] = player
+    if data is not None:
+        record["data"] = data
+    return json.dumps(record, ensure_ascii=False) + "\n"
+
+
+def _write(path, lines, mode="w"):
+    with open(path, mode, encoding="utf-8") as f:
+        f.writelines(lines)
+
+
+def test_convert_columns_and_data(tmp_path):
+    """Числа, словарные коды и data восстанавливаются из колонок"""
+    source = tmp_path / "telemetry-2026-10-19.jsonl"
+    _write(source, [
+        _event(1, data={"abilityId": "dash", "slot": 0}),
+        _event(2, "player_death", "p2", {"killerId": "p1", "mass": 120.5}),
+        "not json\n",
+        _event(3, "match_end", player=None, data={"leaderboard": ["Слизень"], "playersAlive": 3}),
+    ])
+    store = convert_file(source, tmp_path / "out", chunk_rows=2)
+
+    assert store.path == store_path_for(source, tmp_path / "out")
+    assert len(store) == 3
+    assert store["tick"].tolist() == [1, 2, 3]
+    assert list(store.decode("event")) == ["ability_used", "player_death", "match_end"]
+    assert list(store.decode("playerId")) == ["p1", "p2", ""]
+    assert store.mask(event="player_death").tolist() == [False, True, False]
+    assert store.data(1) == {"killerId": "p1", "mass": 120.5}
+    assert store.data(2) == {"leaderboard": ["Слизень"], "playersAlive": 3}
+    assert store.code("event", "boost_gained") == -1
+
+    # Скалярные поля data — отдельные колонки; поле из второй порции дополнено назад
+    assert list(store.decode("d.abilityId")) == ["dash", "", ""]
+    assert np.isnan(store["d.slot"][1:]).all() and store["d.slot"][0] == 0
+    assert store["d.mass"][1] == 120.5
+    assert np.isnan(store["d.playersAlive"][:2]).all() and store["d.playersAlive"][2] == 3
+    assert "d.leaderboard" not in store
+
+
+def test_resume_from_offset_of_growing_file(tmp_path):
+    """Повторный запуск дочитывает только новые строки, неполная строка ждёт"""
+    source = tmp_path / "telemetry-2026-10-19.jsonl"
+    _write(source, [_event(i) for i in range(5)])
+    writer = ColumnarWriter(tmp_path / "store", source)
+    assert writer.convert() == 5
+
+    # TelemetryService дописал две строки и начал третью
+    partial = _event(7, "player_death")
+    _write(source, [_event(5), _event(6), partial[:20]], mode="a")
+    writer = ColumnarWriter(tmp_path / "store", source)
+    assert writer.convert() == 2
+    offset = writer.offset
+
+    _write(source, [partial[20:]], mode="a")
+    writer = ColumnarWriter(tmp_path / "store", source)
+    assert writer.convert() == 1 and writer.offset == source.stat().st_size > offset
+
+    store = ColumnStore(tmp_path / "store")
+    assert store["tick"].tolist() == list(range(8))
+    assert store.decode("event")[-1] == "player_death"
+
+
+def test_crash_mid_chunk_is_rolled_back(tmp_path):
+    """Хвост колонок, не попавший в manifest, обрезается при следующем запуске"""
+    source = tmp_path / "telemetry-2026-10-19.jsonl"
+    _write(source, [_event(i, data={"i": i}) for i in range(4)])
+    store_dir = tmp_path / "store"
+    ColumnarWriter(store_dir, source).convert()
+
+    # Имитация сбоя: порция дописана в колонки, manifest не обновлён
+    with open(column_path(store_dir, "tick"), "ab") as f:
+        f.write(np.arange(3, dtype="<i4").tobytes())
+    with open(store_dir / DATA_FILE, "ab") as f:
+        f.write(b'{"i":99}')
+
+    _write(source, [_event(4, data={"i": 4})], mode="a")
+    assert ColumnarWriter(store_dir, source).convert() == 1
+
+    store = ColumnStore(store_dir)
+    assert store["tick"].tolist() == [0, 1, 2, 3, 4]
+    assert column_path(store_dir, "tick").stat().st_size == 5 * 4
+    assert [store.data(row)["i"] for row in range(5)] == [0, 1, 2, 3, 4]
@@ -0,0 +1,86 @@
+"""
+Unit-тесты для индекса матчей в файлах телеметрии
+
+Тестирует:
+- Диапазоны перемежающихся матчей разных комнат и извлечение матча
+- Инкрементальное обновление растущего файла
+- Перестроение индекса при подмене файла
+"""
+
+import json
+import sys
+from pathlib import Path
+
+# Добавляем корень репозитория в sys.path для импортов
+_REPO_ROOT = Path(__file__).parent.parent
+if str(_REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(_REPO_ROOT))
+
+from tools.telemetry.match_index import MatchIndex, index_path_for, open_index, parse_keys
+
+
+def _line(match, room, event, tick, data=None):
+    # Порядок ключей как у JSON.stringify(TelemetryEvent)
+    record = {"event": event, "ts": 1_700_000_000_000 + tick, "tick": tick, "matchId": match, "roomId": room, "phase": "Hunt"}
+    if data is not None:
+        record["data"] = data
+    return json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n"
+
+
+def _append(path, lines):
+    with open(path, "a", encoding="utf-8") as f:
+        f.writelines(lines)
+
+
+def test_interleaved_matches_extracted_by_ranges(tmp_path):
+    """Пачки строк двух комнат: у матча несколько диапазонов, извлекаются только его строки"""
+    source = tmp_path / "telemetry-2026-10-19.jsonl"
+    _append(source, [
+        _line("A", "r1", "match_start", 1),
+        _line("A", "r1", "ability_used", 2, {"note": '"matchId":"B"'}),
+        _line("B", "r2", "match_start", 1),
+        _line("B", "r2", "player_death", 3),
+        _line("A", "r1", "player_death", 4),
+        _line("A", "r1", "match_end", 5),
+    ])
+    index = open_index(source)
+
+    a = index.matches["A"]
+    assert (a.room_id, a.lines, a.started, a.ended) == ("r1", 4, True, True)
+    assert len(a.ranges) == 2
+    assert [event["tick"] for event in index.read_events("A")] == [1, 2, 4, 5]
+    assert [event["event"] for event in index.read_events(room_id="r2")] == ["match_start", "player_death"]
+    assert index.rooms == {"r1": ["A"], "r2": ["B"]}
+    assert index_path_for(source).exists()
+
+
+def test_incremental_update_of_growing_file(tmp_path):
+    """Дописанные строки добавляются к диапазонам, неполная строка ждёт"""
+    source = tmp_path / "telemetry-2026-10-19.jsonl"
+    _append(source, [_line("A", "r1", "match_start", 1), _line("A", "r1", "ability_used", 2)])
+    assert MatchIndex(source).update() == 2
+
+    tail = _line("A", "r1", "match_end", 4)
+    _append(source, [_line("A", "r1", "ability_used", 3), tail[:15]])
+    index = MatchIndex(source)
+    assert index.update() == 1
+    assert len(index.matches["A"].ranges) == 1 and not index.matches["A"].ended
+
+    _append(source, [tail[15:]])
+    index = open_index(source)
+    entry = index.matches["A"]
+    assert entry.ended and entry.lines == 4
+    assert entry.ranges == [[0, source.stat().st_size]]
+    assert index.update() == 0
+
+
+def test_rebuild_when_file_replaced(tmp_path):
+    """Подменённый файл (другое начало) индексируется заново"""
+    source = tmp_path / "telemetry-2026-10-19.jsonl"
+    _append(source, [_line("A", "r1", "ability_used", tick) for tick in range(10)])
+    open_index(source)
+
+    source.write_text("".join(_line("C", "r3", "ability_used", tick) for tick in range(12)), encoding="utf-8")
+    index = open_index(source)
+    assert set(index.matches) == {"C"} and index.matches["C"].lines == 12
+    assert parse_keys(b"not json\n") is None
@@ -0,0 +1,103 @@
+"""
+Unit-тесты для потокового анализа телеметрии
+
+Тестирует:
+- Неполные строки и переход на файл нового дня при дописывании старого
+- Скользящие окна и ограничение словарей
+- Файл статуса
+"""
+
+import json
+import sys
+import time
+from pathlib import Path
+
+# Добавляем корень репозитория в sys.path для импортов
+_REPO_ROOT = Path(__file__).parent.parent
+if str(_REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(_REPO_ROOT))
+
+from tools.telemetry import live_tail
+from tools.telemetry.live_tail import LiveAggregates, RollingCounter, TelemetryTail, write_status
+
+
+def _line(match, room, event, ts):
+    record = {"event": event, "ts": int(ts * 1000), "tick": 1, "matchId": match, "roomId": room}
+    return (json.dumps(record, separators=(",", ":")) + "\n").encode("utf-8")
+
+
+def _append(path, data):
+    with open(path, "ab") as f:
+        f.write(data)
+
+
+def test_follow_partial_lines_and_day_rollover(tmp_path):
+    """Неполная строка дочитывается, новый файл дня — с начала, старый продолжает читаться"""
+    now = time.time()
+    day1 = tmp_path / "telemetry-2026-10-18.jsonl"
+    _append(day1, _line("old", "r1", "ability_used", now - 1))  # До старта — пропускается
+    tail = TelemetryTail(tmp_path)
+
+    death = _line("A", "r1", "player_death", now)
+    _append(day1, _line("A", "r1", "match_start", now) + death[:10])
+    assert tail.poll(now) == 1
+    _append(day1, death[10:])
+    assert tail.poll(now) == 1
+
+    # Полночь: новая комната пишет в файл нового дня, старая — ещё в старый
+    day2 = tmp_path / "telemetry-2026-10-19.jsonl"
+    _append(day2, _line("B", "r2", "match_start", now))
+    _append(day1, _line("A", "r1", "match_end", now))
+    assert tail.poll(now) == 2
+    assert set(tail.followers) == {day1.name, day2.name}
+
+    aggregates = tail.aggregates
+    assert list(aggregates.matches) == ["B"]
+    assert aggregates.deaths.total(now) == 1
+    assert aggregates.lines == 4 and aggregates.errors == 0
+
+
+def test_windows_expire_and_maps_stay_bounded(monkeypatch):
+    """Старые слоты обнуляются, комнаты и типы событий ограничены"""
+    counter = RollingCounter(60, 1)
+    counter.add(1000.0, 5)
+    counter.add(1030.0, 2)
+    assert counter.total(1030.0) == 7
+    assert counter.total(1075.0) == 2  # Слот 1000 вышел из окна
+    counter.add(900.0)  # Старше окна — игнорируется
+    assert sum(counter.series(1075.0)) == 2
+
+    monkeypatch.setattr(live_tail, "MAX_ROOMS", 3)
+    monkeypatch.setattr(live_tail, "MAX_EVENT_TYPES", 4)
+    aggregates = LiveAggregates()
+    now = 10_000.0
+    for i in range(10):
+        aggregates.add_line(_line(f"m{i}", f"r{i}", f"event_{i}", now), now)
+    assert list(aggregates.rooms) == ["r7", "r8", "r9"]
+    assert set(aggregates.events) == {"event_0", "event_1", "event_2", "other"}
+    assert aggregates.events["other"].total(now) == 7
+
+    aggregates.expire(now + live_tail.MATCH_IDLE_SEC + 1)
+    assert len(aggregates.matches) == 0 and len(aggregates.rooms) == 0
+
+
+def test_status_file(tmp_path):
+    """Статус: скорость по комнатам, смерти в минуту, активные матчи"""
+    now = 1_800_000_030.0  # Середина минуты
+    aggregates = LiveAggregates()
+    for second in range(30):
+        aggregates.add_line(_line("A", "r1", "ability_used", now - second), now)
+    for _ in range(4):
+        aggregates.add_line(_line("A", "r1", "player_death", now - 45), now)  # Прошлая полная минута
+    aggregates.add_line(b"garbage\n", now)
+
+    tail = TelemetryTail(tmp_path)
+    tail.aggregates = aggregates
+    path = tmp_path / "status.json"
+    write_status(path, tail.status(now))
+    status = json.loads(path.read_text(encoding="utf-8"))
+
+    assert status["eventsPerSecByRoom"] == {"r1": round(34 / 60, 2)}
+    assert status["deathsPerMin"] == 4
+    assert status["activeMatches"] == 1 and status["activeMatchesByRoom"] == {"r1": 1}
+    assert status["errors"] == 1
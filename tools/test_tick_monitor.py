@@ -0,0 +1,85 @@
+"""
+Unit-тесты для монитора бюджета тика watchdog (ops/watchdog/tick_monitor.py)
+
+Тестирует:
+- Разбор строк [PERF] и секундной статистики ArenaRoom
+- Границы корзин перцентилей около бюджета
+- Тревоги: dt_max подряд выше бюджета и p95 за окно
+"""
+
+import sys
+from pathlib import Path
+
+# Монитор деплоится отдельным скриптом: импорт из ops/watchdog
+_WATCHDOG_DIR = Path(__file__).parent.parent / "ops" / "watchdog"
+if str(_WATCHDOG_DIR) not in sys.path:
+    sys.path.insert(0, str(_WATCHDOG_DIR))
+
+from tick_monitor import (  # noqa: E402
+    KIND_PERF,
+    KIND_STATS,
+    TICK_BREACH_SAMPLES,
+    TICK_MIN_SAMPLES,
+    TickMonitor,
+    WindowHistogram,
+    parse_line,
+)
+
+BUDGET_MS = 1000 / 30
+NOW = 1_800_000_000.0
+
+
+def _stats(room, tick, dt_max, dt_avg=5.0):
+    return f"room={room} tick={tick} dt_avg={dt_avg:.2f}ms dt_max={dt_max:.2f}ms players=8 orbs=100 chests=2"
+
+
+def test_parse_line_kinds():
+    """Оба формата строк ArenaRoom и посторонние строки"""
+    assert parse_line("[PERF] room=abc tick=120 took 41.50ms (budget: 33.33ms)") == (KIND_PERF, "abc", 120, 41.5, 33.33, 0)
+    assert parse_line(_stats("abc", 150, 12.5)) == (KIND_STATS, "abc", 150, 5.0, 12.5, 8)
+    assert parse_line("[ArenaRoom] Client joined") is None
+
+
+def test_percentile_bucket_edges_at_budget():
+    """dt_max чуть ниже бюджета не попадает в корзину выше бюджета"""
+    histogram = WindowHistogram()
+    for _ in range(100):
+        histogram.add(31.0, NOW)
+    assert histogram.percentile(0.95, NOW) == BUDGET_MS
+    assert histogram.percentile_floor(0.95, NOW) == 30.0
+
+    histogram.add(BUDGET_MS, NOW)  # Ровно бюджет — ещё в бюджете
+    assert histogram.percentile(1.0, NOW) == BUDGET_MS
+
+    over = WindowHistogram()
+    for _ in range(100):
+        over.add(35.0, NOW)
+    assert over.percentile(0.95, NOW) == 40.0
+    assert over.percentile_floor(0.95, NOW) == BUDGET_MS
+    assert WindowHistogram().percentile_floor(0.95, NOW) is None
+
+
+def test_breaches_consecutive_and_window_p95():
+    """Здоровая комната у границы бюджета не даёт тревоги, устойчивое превышение — даёт"""
+    samples = max(TICK_MIN_SAMPLES, 120)
+
+    healthy = TickMonitor("test", budget_ms=BUDGET_MS)
+    for tick in range(samples):
+        healthy.feed(_stats("ok", tick, 31.0), NOW)
+    assert healthy.rooms["ok"].consecutive == 0
+    assert healthy.breaches(NOW) == []
+
+    # Превышения вразбивку: подряд их мало, но p95 за окно выше бюджета
+    slow = TickMonitor("test", budget_ms=BUDGET_MS)
+    for tick in range(samples):
+        slow.feed(_stats("slow", tick, 45.0 if tick % 2 else 20.0), NOW)
+    slow.feed(_stats("slow", samples, 20.0), NOW)
+    assert slow.rooms["slow"].consecutive == 0
+    [(room, reason)] = slow.breaches(NOW)
+    assert room.room == "slow" and reason.startswith("p95(dt_max)")
+
+    stuck = TickMonitor("test", budget_ms=BUDGET_MS)
+    for tick in range(TICK_BREACH_SAMPLES):
+        stuck.feed(_stats("stuck", tick, 50.0), NOW)
+    [(room, reason)] = stuck.breaches(NOW)
+    assert reason.startswith("dt_max >") and room.consecutive == TICK_BREACH_SAMPLES
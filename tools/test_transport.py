@@ -0,0 +1,154 @@
+"""
+Unit-тесты для транспорта с записью и воспроизведением
+
+Тестирует:
+- Запись вызова в кассету (журнал, сборка gzip при закрытии) и воспроизведение без процесса
+- Порядок ответов на повторяющийся запрос, промах кассеты
+- Поток Gemini: запись частей и usage_metadata, воспроизведение ошибки 429
+- Загрузку комментариев PR офлайн с задержкой
+- Публикацию ревью: метка времени в метаданных не мешает воспроизведению
+"""
+
+import subprocess
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+# Добавляем корень репозитория в sys.path для импортов
+_REPO_ROOT = Path(__file__).parent.parent
+if str(_REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(_REPO_ROOT))
+
+import pytest
+from tools import pr_comments
+from tools.llm_stream import MetricsLog, stream_text
+from tools.pr_parser import comments_command, fetch_pr_comments
+from tools.rate_limit import is_transient_error
+from tools.transport import (
+    KIND_GH,
+    Cassette,
+    CassetteMissError,
+    RecordingTransport,
+    ReplayTransport,
+    create_transport,
+    gh_request,
+    use_transport,
+)
+
+
+def _python(code):
+    return [sys.executable, "-c", code]
+
+
+def test_gh_record_then_replay(tmp_path):
+    """Записанные ответы воспроизводятся по порядку, ошибки — с тем же кодом"""
+    path = tmp_path / "cassette.json.gz"
+    recorder = RecordingTransport(Cassette(path))
+    recorder.run_gh(_python("print('first')"))
+    recorder.run_gh(_python("print('first')"))
+    with pytest.raises(subprocess.CalledProcessError):
+        recorder.run_gh(_python("import sys; sys.exit(3)"), check=True)
+
+    # Во время записи кассета не переписывается: взаимодействия дописываются в журнал,
+    # который читается и без закрытия (прерванная сессия)
+    journal = recorder.cassette.journal_path
+    assert not path.exists() and len(journal.read_text(encoding="utf-8").splitlines()) == 3
+    assert len(Cassette(path).interactions) == 3
+    recorder.close()
+    assert path.exists() and not journal.exists()
+
+    replay = create_transport("replay", path, latency_ms=0)
+    assert replay.run_gh(_python("print('first')")).stdout == "first\n"
+    assert replay.run_gh(_python("print('first')")).stdout == "first\n"
+    # Записи исчерпаны — повторяется последняя
+    assert replay.run_gh(_python("print('first')")).stdout == "first\n"
+    with pytest.raises(subprocess.CalledProcessError) as error:
+        replay.run_gh(_python("import sys; sys.exit(3)"), check=True)
+    assert error.value.returncode == 3
+    with pytest.raises(CassetteMissError):
+        replay.run_gh(_python("print('never recorded')"))
+
+
+def test_gemini_stream_record_then_replay(tmp_path):
+    """Поток воспроизводится без клиента; ошибка 429 остаётся транзиентной"""
+    usage = SimpleNamespace(prompt_token_count=10, candidates_token_count=2, total_token_count=12)
+    parts = [SimpleNamespace(text="## Review", usage_metadata=None),
+             SimpleNamespace(text=" ok", usage_metadata=usage)]
+
+    class QuotaError(Exception):
+        code = 429
+
+    def failing_stream(**kwargs):
+        yield parts[0]
+        raise QuotaError("RESOURCE_EXHAUSTED")
+
+    live_client = SimpleNamespace(models=SimpleNamespace(generate_content_stream=lambda **kwargs: iter(parts)))
+    failing_client = SimpleNamespace(models=SimpleNamespace(generate_content_stream=failing_stream))
+
+    path = tmp_path / "cassette.json.gz"
+    recorder = RecordingTransport(Cassette(path))
+    assert "".join(p.text for p in recorder.stream_gemini(lambda: live_client, "m", "prompt")) == "## Review ok"
+    with pytest.raises(QuotaError):
+        list(recorder.stream_gemini(lambda: failing_client, "m", "other prompt"))
+    recorder.close()
+
+    def no_client():
+        raise AssertionError("клиент не должен создаваться при replay")
+
+    replay = ReplayTransport(Cassette(path))
+    text, metrics = stream_text(
+        lambda: replay.stream_gemini(no_client, "m", "prompt"), model="m",
+        metrics_log=MetricsLog(tmp_path / "metrics.jsonl"),
+    )
+    assert text == "## Review ok"
+    assert metrics.output_tokens == 2
+
+    with pytest.raises(Exception) as error:
+        list(replay.stream_gemini(no_client, "m", "other prompt"))
+    assert is_transient_error(error.value)
+
+
+def test_publish_review_record_then_replay(tmp_path, monkeypatch):
+    """POST отчёта с другой меткой времени находит записанный ответ"""
+    ticks = iter(["2026-10-19T10:00:00.000001", "2026-10-19T11:30:00.654321"])
+
+    class Clock:
+        @staticmethod
+        def now():
+            return SimpleNamespace(isoformat=lambda: next(ticks))
+
+    def fake_run(args, **kwargs):
+        return subprocess.CompletedProcess(args, 0, stdout='HTTP/2.0 201 Created\n\n{"id": 7}', stderr="")
+
+    monkeypatch.setattr(pr_comments, "datetime", Clock)
+    path = tmp_path / "cassette.json.gz"
+    recorder = RecordingTransport(Cassette(path))
+    monkeypatch.setattr(subprocess, "run", fake_run)
+    with use_transport(recorder):
+        assert pr_comments.publish_review(5, 1, "gemini", "## Review\nAPPROVED", repo="owner/repo", upsert=False)
+    recorder.close()
+    monkeypatch.undo()
+    monkeypatch.setattr(pr_comments, "datetime", Clock)
+
+    with use_transport(ReplayTransport(Cassette(path))):
+        assert pr_comments.publish_review(5, 1, "gemini", "## Review\nAPPROVED", repo="owner/repo", upsert=False)
+
+
+def test_fetch_comments_offline_with_latency():
+    """Комментарии PR загружаются из кассеты с инжектированной задержкой"""
+    cassette = Cassette()
+    cassette.add(
+        KIND_GH,
+        gh_request(comments_command(7, "owner/repo")),
+        {"returncode": 0, "stdout": '{"id": 1, "body": "hi"}\n', "stderr": ""},
+        save=False,
+    )
+    with use_transport(ReplayTransport(cassette, latency_ms=30)):
+        started = time.perf_counter()
+        comments = fetch_pr_comments(7, "owner/repo")
+        assert time.perf_counter() - started >= 0.03
+        # Неизвестный запрос не уходит в сеть
+        with pytest.raises(CassetteMissError):
+            fetch_pr_comments(8, "owner/repo")
+    assert comments == [{"id": 1, "body": "hi"}]
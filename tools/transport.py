@@ -0,0 +1,352 @@
+"""
+Transport — единая точка вызовов внешних сервисов (gh CLI и Gemini API)
+
+Режим задаётся переменными окружения:
+- SLIME_ARENA_TRANSPORT=live    — реальные вызовы (по умолчанию)
+- SLIME_ARENA_TRANSPORT=record  — реальные вызовы + запись пар запрос/ответ в кассету
+- SLIME_ARENA_TRANSPORT=replay  — ответы из кассеты, без сети, gh и ключа Gemini
+- SLIME_ARENA_CASSETTE          — файл кассеты (gzip JSON), по умолчанию tools/.cassettes/default.json.gz
+- SLIME_ARENA_REPLAY_LATENCY_MS — задержка, добавляемая к каждому ответу при воспроизведении
+
+Запрос идентифицируется аргументами gh (и хешем stdin) либо моделью и хешем
+промпта Gemini. Метка времени в маркере метаданных комментария
+(`"timestamp": ...`) в хеш stdin не входит — иначе публикация ревью не
+воспроизводилась бы. Одинаковые запросы воспроизводятся в порядке записи
+(опрос одного и того же endpoint-а может возвращать разные ответы),
+после исчерпания повторяется последний ответ.
+
+При записи каждое взаимодействие дописывается строкой в журнал рядом с
+кассетой (<кассета>.journal) — O(1) на вызов, запись переживает прерывание.
+Кассета пересобирается из журнала один раз: при закрытии транспорта или
+выходе процесса; журнал прерванной сессии подхватывается при загрузке.
+"""
+
+import atexit
+import gzip
+import hashlib
+import json
+import os
+import re
+import subprocess
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+DEFAULT_CASSETTE = Path(__file__).parent / ".cassettes" / "default.json.gz"
+
+MODE_LIVE = "live"
+MODE_RECORD = "record"
+MODE_REPLAY = "replay"
+
+CASSETTE_VERSION = 1
+
+KIND_GH = "gh"
+KIND_GEMINI = "gemini"
+
+# Поля usage_metadata Gemini, которые сохраняются в кассете
+USAGE_FIELDS = ("prompt_token_count", "candidates_token_count", "total_token_count")
+
+
+# Метка времени в маркере метаданных, в т.ч. экранированная внутри JSON-тела запроса
+_VOLATILE_RE = re.compile(r'(\\?"timestamp\\?"\s*:\s*\\?")[0-9T:.+\-]*')
+
+
+class CassetteMissError(LookupError):
+    """В кассете нет ответа на запрос (режим replay)"""
+
+
+def _digest(text: Optional[str]) -> Optional[str]:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest() if text is not None else None
+
+
+def gh_request(args: List[str], input_data: Optional[str] = None) -> dict:
+    stable = _VOLATILE_RE.sub(r"\1", input_data) if input_data is not None else None
+    return {"args": list(args), "input_sha256": _digest(stable)}
+
+
+def gemini_request(model: str, prompt: str) -> dict:
+    return {"model": model, "prompt_sha256": _digest(prompt), "prompt_chars": len(prompt)}
+
+
+def _request_key(kind: str, request: dict) -> str:
+    identity = {k: v for k, v in request.items() if k != "prompt_chars"}
+    return hashlib.sha256(json.dumps([kind, identity], sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class Cassette:
+    """
+    Записанные пары запрос/ответ (gzip JSON) и журнал дописанных при записи.
+
+    Args:
+        path: Файл кассеты (None — только в памяти)
+    """
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = Path(path) if path is not None else None
+        self.journal_path = self.path.with_name(self.path.name + ".journal") if self.path is not None else None
+        self.interactions: List[dict] = []
+        self._by_key: Dict[str, List[dict]] = {}
+        self._cursor: Dict[str, int] = {}
+        self._journal = None
+        self._pending = False  # В журнале есть записи, которых нет в файле кассеты
+        self._lock = threading.Lock()
+        if self.path is not None:
+            self.load()
+
+    def load(self) -> None:
+        if self.path.exists():
+            with gzip.open(self.path, "rt", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") != CASSETTE_VERSION:
+                raise ValueError(f"Неподдерживаемая версия кассеты {self.path}: {data.get('version')}")
+            for interaction in data.get("interactions", []):
+                self._index(interaction)
+        if self.journal_path.exists():
+            # Журнал прерванной записи: последняя строка может быть оборвана
+            with open(self.journal_path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        self._index(json.loads(line))
+                    except json.JSONDecodeError:
+                        break
+            self._pending = True
+
+    def save(self) -> None:
+        """Пересобрать файл кассеты из всех взаимодействий и удалить журнал."""
+        if self.path is None:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(f".tmp{os.getpid()}")
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+            json.dump({"version": CASSETTE_VERSION, "interactions": self.interactions}, f, ensure_ascii=False)
+        tmp_path.replace(self.path)
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+        if self.journal_path.exists():
+            self.journal_path.unlink()
+        self._pending = False
+
+    def close(self) -> None:
+        """Перенести журнал в кассету (если записывали)."""
+        with self._lock:
+            if self._pending:
+                self.save()
+
+    def _index(self, interaction: dict) -> None:
+        self.interactions.append(interaction)
+        self._by_key.setdefault(interaction["key"], []).append(interaction)
+
+    def add(self, kind: str, request: dict, response: dict, save: bool = True) -> None:
+        """Записать взаимодействие (save — дописать в журнал на диске)."""
+        interaction = {"kind": kind, "key": _request_key(kind, request), "request": request, "response": response}
+        with self._lock:
+            self._index(interaction)
+            if save and self.path is not None:
+                if self._journal is None:
+                    self.path.parent.mkdir(parents=True, exist_ok=True)
+                    self._journal = open(self.journal_path, "a", encoding="utf-8")
+                self._journal.write(json.dumps(interaction, ensure_ascii=False) + "\n")
+                self._journal.flush()
+                self._pending = True
+
+    def lookup(self, kind: str, request: dict) -> dict:
+        """Следующий записанный ответ на запрос."""
+        key = _request_key(kind, request)
+        with self._lock:
+            recorded = self._by_key.get(key)
+            if not recorded:
+                raise CassetteMissError(f"Нет записи {kind} для {json.dumps(request, ensure_ascii=False)[:300]}")
+            position = self._cursor.get(key, 0)
+            self._cursor[key] = position + 1
+            return recorded[min(position, len(recorded) - 1)]["response"]
+
+
+def _completed(args: List[str], response: dict) -> subprocess.CompletedProcess:
+    return subprocess.CompletedProcess(
+        args=args, returncode=response["returncode"], stdout=response["stdout"], stderr=response["stderr"]
+    )
+
+
+def _check(result: subprocess.CompletedProcess) -> subprocess.CompletedProcess:
+    if result.returncode != 0:
+        raise subprocess.CalledProcessError(result.returncode, result.args, output=result.stdout, stderr=result.stderr)
+    return result
+
+
+class LiveTransport:
+    """Реальные вызовы gh и Gemini."""
+
+    mode = MODE_LIVE
+
+    def _run(self, args: List[str], input_data: Optional[str]) -> subprocess.CompletedProcess:
+        return subprocess.run(args, capture_output=True, text=True, encoding="utf-8", input=input_data)
+
+    def run_gh(self, args: List[str], input_data: Optional[str] = None, check: bool = False) -> subprocess.CompletedProcess:
+        """
+        Выполнить команду gh.
+
+        Args:
+            args: Аргументы, начиная с "gh"
+            input_data: stdin
+            check: Бросать CalledProcessError при ненулевом коде (как subprocess.run)
+
+        Raises:
+            FileNotFoundError: gh не установлен
+            subprocess.CalledProcessError: check=True и код возврата не 0
+        """
+        result = self._run(args, input_data)
+        return _check(result) if check else result
+
+    def stream_gemini(self, client_provider: Callable[[], Any], model: str, prompt: str) -> Iterator[Any]:
+        """Потоковый ответ Gemini (части с .text и .usage_metadata)."""
+        return iter(client_provider().models.generate_content_stream(model=model, contents=prompt))
+
+
+class RecordingTransport(LiveTransport):
+    """Реальные вызовы с записью в кассету."""
+
+    mode = MODE_RECORD
+
+    def __init__(self, cassette: Cassette):
+        self.cassette = cassette
+
+    def close(self) -> None:
+        """Собрать кассету из журнала записи."""
+        self.cassette.close()
+
+    def _run(self, args: List[str], input_data: Optional[str]) -> subprocess.CompletedProcess:
+        request = gh_request(args, input_data)
+        try:
+            result = super()._run(args, input_data)
+        except FileNotFoundError:
+            self.cassette.add(KIND_GH, request, {"error": "FileNotFoundError"})
+            raise
+        self.cassette.add(KIND_GH, request, {
+            "returncode": result.returncode, "stdout": result.stdout, "stderr": result.stderr,
+        })
+        return result
+
+    def stream_gemini(self, client_provider: Callable[[], Any], model: str, prompt: str) -> Iterator[Any]:
+        request = gemini_request(model, prompt)
+        chunks = []
+        try:
+            for part in super().stream_gemini(client_provider, model, prompt):
+                usage = getattr(part, "usage_metadata", None)
+                chunks.append({
+                    "text": getattr(part, "text", None) or "",
+                    "usage": {f: getattr(usage, f, None) for f in USAGE_FIELDS} if usage is not None else None,
+                })
+                yield part
+        except Exception as e:
+            # Ошибки (429, 5xx) тоже записываются: replay воспроизводит и повторы
+            self.cassette.add(KIND_GEMINI, request, {"chunks": chunks, "error": {
+                "type": type(e).__name__, "message": str(e)[:500], "code": getattr(e, "code", None),
+            }})
+            raise
+        self.cassette.add(KIND_GEMINI, request, {"chunks": chunks})
+
+
+class ReplayedApiError(Exception):
+    """Ошибка API, воспроизведённая из кассеты (код сохраняется для retry_call)"""
+
+    def __init__(self, message: str, code: Optional[int] = None):
+        super().__init__(message)
+        self.code = code
+
+
+class ReplayTransport:
+    """
+    Ответы из кассеты без обращения к сети.
+
+    Args:
+        cassette: Кассета
+        latency_ms: Задержка перед каждым ответом (имитация сети/модели)
+    """
+
+    mode = MODE_REPLAY
+
+    def __init__(self, cassette: Cassette, latency_ms: float = 0.0):
+        self.cassette = cassette
+        self.latency = latency_ms / 1000.0
+
+    def _delay(self) -> None:
+        if self.latency > 0:
+            time.sleep(self.latency)
+
+    def run_gh(self, args: List[str], input_data: Optional[str] = None, check: bool = False) -> subprocess.CompletedProcess:
+        response = self.cassette.lookup(KIND_GH, gh_request(args, input_data))
+        self._delay()
+        if response.get("error") == "FileNotFoundError":
+            raise FileNotFoundError(args[0])
+        result = _completed(args, response)
+        return _check(result) if check else result
+
+    def stream_gemini(self, client_provider: Callable[[], Any], model: str, prompt: str) -> Iterator[Any]:
+        response = self.cassette.lookup(KIND_GEMINI, gemini_request(model, prompt))
+        self._delay()
+        for chunk in response["chunks"]:
+            usage = SimpleNamespace(**chunk["usage"]) if chunk.get("usage") else None
+            yield SimpleNamespace(text=chunk["text"], usage_metadata=usage)
+        error = response.get("error")
+        if error:
+            raise ReplayedApiError(f"{error['type']}: {error['message']}", code=error.get("code"))
+
+
+_transport = None
+_transport_lock = threading.Lock()
+
+
+def create_transport(
+    mode: Optional[str] = None,
+    cassette_path: Optional[Path] = None,
+    latency_ms: Optional[float] = None,
+):
+    """Транспорт по параметрам или переменным окружения."""
+    mode = (mode or os.getenv("SLIME_ARENA_TRANSPORT") or MODE_LIVE).lower()
+    if mode == MODE_LIVE:
+        return LiveTransport()
+
+    path = Path(cassette_path or os.getenv("SLIME_ARENA_CASSETTE") or DEFAULT_CASSETTE)
+    if mode == MODE_RECORD:
+        transport = RecordingTransport(Cassette(path))
+        atexit.register(transport.close)
+        return transport
+    if mode == MODE_REPLAY:
+        if not path.exists() and not path.with_name(path.name + ".journal").exists():
+            raise FileNotFoundError(f"Кассета {path} не найдена (запишите её в режиме record)")
+        if latency_ms is None:
+            latency_ms = float(os.getenv("SLIME_ARENA_REPLAY_LATENCY_MS", "0"))
+        return ReplayTransport(Cassette(path), latency_ms=latency_ms)
+    raise ValueError(f"Неизвестный режим транспорта: {mode} (live, record, replay)")
+
+
+def get_transport():
+    """Текущий транспорт процесса (создаётся из окружения при первом вызове)."""
+    global _transport
+    if _transport is None:
+        with _transport_lock:
+            if _transport is None:
+                _transport = create_transport()
+    return _transport
+
+
+def set_transport(transport) -> None:
+    """Установить транспорт процесса (тесты, бенчмарки). None — пересоздать из окружения."""
+    global _transport
+    with _transport_lock:
+        _transport = transport
+
+
+@contextmanager
+def use_transport(transport):
+    """Временно заменить транспорт процесса."""
+    previous = _transport
+    set_transport(transport)
+    try:
+        yield transport
+    finally:
+        set_transport(previous)